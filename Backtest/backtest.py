@@ -1,7 +1,8 @@
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
-from tqdm import tqdm
+
+from Backtest.ledger import extract_trade_ledger, trade_analytics, equity_matrix
 
 def plot_result(result):
     price = result['fig']['價格序列']
@@ -24,6 +25,27 @@ def plot_result(result):
     plt.tight_layout()
     plt.show()
 
+def format_metrics(strategy_total_return, final_asset, max_drawdown, sharpe_ratio, total_trades, win_rate,
+                   profit_factor, total_commission, average_holding_period, average_trade_profit,
+                   max_single_profit, max_single_loss, buy_and_hold_return, num_k_bars) -> dict:
+    """將回測績效數值格式化為前端顯示用的指標字典。"""
+    return {
+        "策略總報酬率": f"{strategy_total_return:.2%}",
+        "最終資產": f"${final_asset:,.2f}",
+        "最大回撤": f"{max_drawdown:.2%}",
+        "夏普率": f"{sharpe_ratio:.2f}",
+        "總交易次數": total_trades,
+        "勝率": f"{win_rate:.2%}",
+        "Profit Factor": f"{profit_factor:.2f}",
+        "總手續費": f"${total_commission:,.2f}",
+        "平均持有週期 (K棒數)": f"{average_holding_period:.2f}",
+        "平均交易獲利": f"${average_trade_profit:,.2f}",
+        "最大單筆獲利": f"${max_single_profit:,.2f}",
+        "最大單筆虧損": f"${max_single_loss:,.2f}",
+        "單純買進持有策略的總報酬率": f"{buy_and_hold_return:.2%}",
+        "回測K棒數量": num_k_bars,
+    }
+
 def run_backtest(df: pd.DataFrame, initial_capital: float, commission_rate: float = 0.001, slippage: float = 0.0005, risk_free_rate: float = 0.02) -> dict:
     """
     根據給定的收盤價和交易訊號進行回測，並計算多項績效指標。
@@ -45,95 +67,23 @@ def run_backtest(df: pd.DataFrame, initial_capital: float, commission_rate: floa
     if 'close' not in df.columns or 'signal' not in df.columns:
         raise ValueError("DataFrame 必須包含 'close' 和 'signal' 欄位。")
 
-    capital = initial_capital
-    
-    # 策略資產曲線，初始值為初始資金，後續記錄每天結束時的資產淨值
-    strategy_equity_curve = [initial_capital]
-    
-    total_commission = 0
-    
-    # 用於追蹤單筆交易盈虧的詳細記錄
-    detailed_trades = []
-    current_holding_cost = 0 # 當前持倉的總成本 (用於計算平均成本)
-    current_holding_shares = 0 # 當前持倉的總股數
-    current_holding_start_index = -1 # 紀錄目前持有部位的起始索引
-
-    # 新增：用於記錄實際交易點的序列，初始化為0
-    actual_trade_signal = pd.Series(0, index=df.index, dtype=int)
-
-
-    # 迴圈遍歷每一天的數據
-    for i in tqdm(range(len(df))):
-        current_close = df['close'].iloc[i]
-        signal = df['signal'].iloc[i]
-
-        # 買入訊號
-        if signal == 1:
-            if current_holding_shares == 0:  # 只有在沒有持倉時才買入
-                buy_price = current_close * (1 + slippage)
-                # 買入所有可用資金，計算可買入的股數
-                buyable_shares = (capital / (buy_price * (1 + commission_rate)))
-                
-                if buyable_shares > 0:
-                    shares_to_buy = buyable_shares
-                    commission = shares_to_buy * buy_price * commission_rate
-                    capital -= (shares_to_buy * buy_price + commission)
-                    
-                    current_holding_cost = shares_to_buy * buy_price # 記錄買入成本
-                    current_holding_shares = shares_to_buy
-                    total_commission += commission
-                    current_holding_start_index = i # 更新持有開始索引
-                    actual_trade_signal.iloc[i] = 1 # 記錄實際買入點
-
-
-        # 賣出訊號
-        elif signal == -1:
-            if current_holding_shares > 0:  # 只有在有持倉時才賣出
-                sell_price = current_close * (1 - slippage)
-                commission = current_holding_shares * sell_price * commission_rate
-                
-                capital_gain = (current_holding_shares * sell_price - current_holding_cost) - commission # 計算實現利潤
-                
-                detailed_trades.append({
-                    'entry_price': current_holding_cost / current_holding_shares if current_holding_shares > 0 else np.nan, # 平均買入成本
-                    'exit_price': sell_price,
-                    'profit_loss': capital_gain,
-                    'holding_period': i - current_holding_start_index
-                })
-                total_commission += commission
-                capital += (current_holding_shares * sell_price - commission) # 更新資金
-                current_holding_shares = 0 # 清空持倉
-                current_holding_cost = 0 # 清空成本
-                current_holding_start_index = -1 # 重置持有開始索引
-                actual_trade_signal.iloc[i] = -1 # 記錄實際賣出點
-        
-        # 紀錄每日結束時的資產淨值
-        current_total_asset = capital + current_holding_shares * current_close
-        strategy_equity_curve.append(current_total_asset)
+    close = df['close'].to_numpy(dtype=np.float64)
 
+    # 由進出場索引直接建立交易明細與逐根資產淨值 (向量化，不需逐根 K 棒迴圈)
+    ledger, equity, trade_points = extract_trade_ledger(
+        close, df['signal'].to_numpy(), initial_capital, commission_rate, slippage,
+        index=df.index,
+        high=df['high'].to_numpy(dtype=np.float64) if 'high' in df.columns else None,
+        low=df['low'].to_numpy(dtype=np.float64) if 'low' in df.columns else None,
+    )
+    analytics = trade_analytics(ledger)
 
-    # 最後一天的資產結算 (如果還有持倉，需要清算)
-    if current_holding_shares > 0:
-        final_sell_price = df['close'].iloc[-1] * (1 - slippage)
-        final_commission = current_holding_shares * final_sell_price * commission_rate
-        capital_gain = (current_holding_shares * final_sell_price - current_holding_cost) - final_commission
-        
-        detailed_trades.append({
-            'entry_price': current_holding_cost / current_holding_shares if current_holding_shares > 0 else np.nan,
-            'exit_price': final_sell_price,
-            'profit_loss': capital_gain,
-            'holding_period': len(df) - 1 - current_holding_start_index
-        })
-        total_commission += final_commission
-        capital += (current_holding_shares * final_sell_price - final_commission)
-        actual_trade_signal.iloc[-1] = -1 # 記錄最後一次清倉的賣出點
-    
-    # 更新最後的總資產
-    final_asset = capital + current_holding_shares * df['close'].iloc[-1]
-    # 因為 strategy_equity_curve 在迴圈中已經多append了一次，最後清倉時應該更新最後一個值
-    # 如果最後有清倉，則strategy_equity_curve的最後一個值可能需要調整為最終資產
-    if len(strategy_equity_curve) == len(df) + 1: # 如果在迴圈中已經append了 len(df) + 1 次
-        strategy_equity_curve[-1] = final_asset # 更新為最終實際資產
+    # 記錄實際交易點的序列
+    actual_trade_signal = pd.Series(trade_points, index=df.index, dtype=int)
+
+    # 策略資產曲線，初始值為初始資金，後續記錄每根 K 棒結束時的資產淨值 (最後一根為清倉後的最終資產)
+    final_asset = equity[-1]
+    strategy_equity_curve = np.concatenate(([initial_capital], equity))
 
     # --- 回測結果計算 ---
 
@@ -142,11 +92,11 @@ def run_backtest(df: pd.DataFrame, initial_capital: float, commission_rate: floa
 
     # 2. 單純買進持有策略的總報酬率
     # 買入持有資產曲線
-    buy_and_hold_equity_curve = [initial_capital * (df['close'].iloc[i] / df['close'].iloc[0]) for i in range(len(df))]
+    buy_and_hold_equity_curve = initial_capital * (close / close[0])
     buy_and_hold_return = (buy_and_hold_equity_curve[-1] / initial_capital) - 1
     
     # 3. 淨值曲線 (用於最大回撤和夏普率)
-    equity_curve_series = pd.Series(strategy_equity_curve, index=[df.index[0]] + list(df.index)) # 加上初始資金的時間點
+    equity_curve_series = pd.Series(strategy_equity_curve, index=df.index.insert(0, df.index[0])) # 加上初始資金的時間點
     
     # 4. 最大回撤 (Maximum Drawdown)
     peak = equity_curve_series.expanding(min_periods=1).max()
@@ -158,28 +108,21 @@ def run_backtest(df: pd.DataFrame, initial_capital: float, commission_rate: floa
     if len(returns) > 0:
         annualization_factor = np.sqrt(252) # 假設交易日為 252 天
         excess_returns = returns - (risk_free_rate / annualization_factor**2) # 將無風險利率日化
-        sharpe_ratio = np.mean(excess_returns) / np.std(excess_returns) * annualization_factor
+        volatility = np.std(excess_returns)
+        # 淨值完全沒有波動 (例如從未進場) 時夏普率沒有定義
+        sharpe_ratio = np.mean(excess_returns) / volatility * annualization_factor if volatility > 0 else np.nan
     else:
         sharpe_ratio = np.nan 
 
-    # 重新計算相關指標 (基於 detailed_trades)
-    total_trades = len(detailed_trades)
-    winning_trades = [t for t in detailed_trades if t['profit_loss'] > 0]
-    losing_trades = [t for t in detailed_trades if t['profit_loss'] < 0]
-
-    win_rate = len(winning_trades) / total_trades if total_trades > 0 else 0
-
-    total_profit = sum(t['profit_loss'] for t in winning_trades)
-    total_loss = sum(abs(t['profit_loss']) for t in losing_trades)
-
-    profit_factor = total_profit / total_loss if total_loss > 0 else (np.inf if total_profit > 0 else 0)
-
-    average_trade_profit = sum(t['profit_loss'] for t in detailed_trades) / total_trades if total_trades > 0 else 0
-
-    max_single_profit = max([t['profit_loss'] for t in detailed_trades]) if detailed_trades else 0
-    max_single_loss = min([t['profit_loss'] for t in detailed_trades]) if detailed_trades else 0
-
-    average_holding_period = np.mean([t['holding_period'] for t in detailed_trades]) if detailed_trades else 0
+    # 交易相關指標 (基於交易明細)
+    total_trades = analytics['total_trades']
+    win_rate = analytics['win_rate']
+    profit_factor = analytics['profit_factor']
+    total_commission = analytics['total_commission']
+    average_trade_profit = analytics['average_trade_profit']
+    max_single_profit = analytics['max_single_profit']
+    max_single_loss = analytics['max_single_loss']
+    average_holding_period = analytics['average_holding_period']
 
 
     # Added: Number of K-bars
@@ -188,30 +131,143 @@ def run_backtest(df: pd.DataFrame, initial_capital: float, commission_rate: floa
     results = {
         
         # 指標
-        "metrics":{
-        "策略總報酬率": f"{strategy_total_return:.2%}",
-        "最終資產": f"${final_asset:,.2f}",
-        "最大回撤": f"{max_drawdown:.2%}",
-        "夏普率": f"{sharpe_ratio:.2f}",
-        "總交易次數": total_trades,
-        "勝率": f"{win_rate:.2%}",
-        "Profit Factor": f"{profit_factor:.2f}",
-        "總手續費": f"${total_commission:,.2f}",
-        "平均持有週期 (K棒數)": f"{average_holding_period:.2f}",
-        "平均交易獲利": f"${average_trade_profit:,.2f}",
-        "最大單筆獲利": f"${max_single_profit:,.2f}",
-        "最大單筆虧損": f"${max_single_loss:,.2f}",
-        "單純買進持有策略的總報酬率": f"{buy_and_hold_return:.2%}",
-        "回測K棒數量": num_k_bars, # Added this line
-        },
+        "metrics": format_metrics(
+            strategy_total_return=strategy_total_return,
+            final_asset=final_asset,
+            max_drawdown=max_drawdown,
+            sharpe_ratio=sharpe_ratio,
+            total_trades=total_trades,
+            win_rate=win_rate,
+            profit_factor=profit_factor,
+            total_commission=total_commission,
+            average_holding_period=average_holding_period,
+            average_trade_profit=average_trade_profit,
+            max_single_profit=max_single_profit,
+            max_single_loss=max_single_loss,
+            buy_and_hold_return=buy_and_hold_return,
+            num_k_bars=num_k_bars,
+        ),
         
+        # 交易層級分析 (MAE/MFE、連勝連敗、每月損益、期望值等)
+        "analytics": analytics,
+
+        # 交易明細 (每筆交易一列)
+        "ledger": ledger,
+
         # 圖表
         "fig":{
-        "策略資產曲線序列": pd.Series(strategy_equity_curve, index=[df.index[0]] + list(df.index)), # 加上起始日的初始資金
+        "策略資產曲線序列": equity_curve_series, # 加上起始日的初始資金
         "買入持有資產曲線序列": pd.Series(buy_and_hold_equity_curve, index=df.index),
         "價格序列": df['close'],
         "買賣點序列": actual_trade_signal # 將這裡替換為實際交易點序列
         }
     }
 
-    return results
\ No newline at end of file
+    return results
+
+
+def run_backtest_matrix(close, signals, initial_capital: float, commission_rate: float = 0.001, slippage: float = 0.0005,
+                        risk_free_rate: float = 0.02, params: dict | None = None, column_block: int = 8) -> pd.DataFrame:
+    """
+    以 (K棒數, 參數組數) 的訊號矩陣一次回測多組參數，交易規則與 run_backtest 相同。
+
+    Args:
+        close (array-like): 收盤價序列。
+        signals (array-like): 訊號矩陣，第 k 欄為第 k 組參數的交易訊號 (通常來自策略的 generate_signal_matrix)。
+        initial_capital, commission_rate, slippage, risk_free_rate: 同 run_backtest。
+        params (dict | None): 各參數名稱對應長度為參數組數的陣列，提供時會加入結果的欄位。
+        column_block (int): 每次處理的參數組數；較窄的區塊讓 (K棒數, 參數組數) 中間矩陣較小、快取命中較好。
+
+    Returns:
+        pd.DataFrame: 每組參數一列的績效數值 (與 run_backtest 的 metrics 對應，但為未格式化的數值)。
+    """
+    close = np.asarray(close, dtype=np.float64)
+    signals = np.asarray(signals)
+    if signals.ndim == 1:
+        signals = signals.reshape(-1, 1)
+    if signals.shape[0] != len(close):
+        raise ValueError("signals 的列數必須與收盤價數量相同。")
+
+    blocks = [_matrix_block_metrics(close, signals[:, start:start + column_block], initial_capital, commission_rate, slippage, risk_free_rate)
+              for start in range(0, signals.shape[1], column_block)]
+    results = pd.DataFrame({key: np.concatenate([block[key] for block in blocks]) for key in blocks[0]})
+    results["buy_and_hold_return"] = close[-1] / close[0] - 1
+    if params is not None:
+        results = pd.concat([pd.DataFrame({name: np.ravel(values) for name, values in params.items()}), results], axis=1)
+    return results
+
+
+def _matrix_block_metrics(close, signals, initial_capital, commission_rate, slippage, risk_free_rate) -> dict:
+    equity, holding = equity_matrix(close, signals, initial_capital, commission_rate, slippage)
+    n, k = equity.shape
+    curve = np.vstack((np.full((1, k), float(initial_capital)), equity))
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        drawdown = curve / np.maximum.accumulate(curve, axis=0) - 1
+        annualization_factor = np.sqrt(252) # 假設交易日為 252 天
+        excess_returns = (curve[1:] / curve[:-1] - 1) - (risk_free_rate / annualization_factor**2)
+        volatility = excess_returns.std(axis=0)
+        sharpe_ratio = np.where(volatility > 0, excess_returns.mean(axis=0) / volatility * annualization_factor, np.nan)
+
+    # 交易層級指標：以 (參數組, K棒) 排序取出所有進出場，第 i 個進場與第 i 個出場屬於同一筆交易
+    previous = np.vstack((np.zeros((1, k), dtype=bool), holding[:-1]))
+    exits = ~holding & previous
+    exits[-1] |= holding[-1]
+    trade_columns, entry_rows = np.nonzero((holding & ~previous).T)
+    _, exit_rows = np.nonzero(exits.T)
+
+    buy_price = close[entry_rows] * (1 + slippage)
+    sell_price = close[exit_rows] * (1 - slippage)
+    # 由進場前一根的淨值換算股數 (curve 多了起始列，curve[i] 即第 i - 1 根的淨值)；進場當根若為最後一根，其淨值已是平倉後的結果
+    shares = curve[entry_rows, trade_columns] / ((1 + slippage) * (1 + commission_rate) * close[entry_rows])
+    profit_loss = shares * sell_price * (1 - commission_rate) - shares * buy_price
+
+    total_trades = np.bincount(trade_columns, minlength=k)
+    traded = total_trades > 0
+    total_profit = np.bincount(trade_columns, np.where(profit_loss > 0, profit_loss, 0), minlength=k)
+    total_loss = np.bincount(trade_columns, np.where(profit_loss < 0, -profit_loss, 0), minlength=k)
+    max_single_profit = np.full(k, -np.inf)
+    max_single_loss = np.full(k, np.inf)
+    np.maximum.at(max_single_profit, trade_columns, profit_loss)
+    np.minimum.at(max_single_loss, trade_columns, profit_loss)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return {
+            "total_return": equity[-1] / initial_capital - 1,
+            "final_asset": equity[-1],
+            "max_drawdown": drawdown.min(axis=0),
+            "sharpe_ratio": sharpe_ratio,
+            "total_trades": total_trades,
+            "win_rate": np.where(traded, np.bincount(trade_columns, profit_loss > 0, minlength=k) / total_trades, 0.0),
+            "profit_factor": np.where(total_loss > 0, total_profit / total_loss, np.where(total_profit > 0, np.inf, 0.0)),
+            "total_commission": np.bincount(trade_columns, shares * (buy_price + sell_price) * commission_rate, minlength=k),
+            "average_holding_period": np.where(traded, np.bincount(trade_columns, exit_rows - entry_rows, minlength=k) / total_trades, 0.0),
+            "average_trade_profit": np.where(traded, np.bincount(trade_columns, profit_loss, minlength=k) / total_trades, 0.0),
+            "max_single_profit": np.where(traded, max_single_profit, 0.0),
+            "max_single_loss": np.where(traded, max_single_loss, 0.0),
+        }
+
+
+def parameter_grid(**param_values) -> dict:
+    """各參數候選值的笛卡兒積，回傳參數名稱對應長度相同之陣列的字典。"""
+    grids = np.meshgrid(*(np.atleast_1d(values) for values in param_values.values()), indexing="ij")
+    return {name: grid.ravel() for name, grid in zip(param_values, grids)}
+
+
+def run_parameter_sweep(strategy_module, df: pd.DataFrame, initial_capital: float, commission_rate: float = 0.001,
+                        slippage: float = 0.0005, risk_free_rate: float = 0.02, **param_values) -> pd.DataFrame:
+    """
+    對策略的參數組合做網格回測，例如 run_parameter_sweep(rsi, df, 10000, buy_threshold=range(10, 50), sell_threshold=range(50, 90))。
+
+    策略若提供 generate_signal_matrix(df, **參數陣列) 便一次取得所有參數組的訊號矩陣；
+    否則退回逐組呼叫 generate_signal。
+    """
+    params = parameter_grid(**param_values)
+    if hasattr(strategy_module, "generate_signal_matrix"):
+        signals = strategy_module.generate_signal_matrix(df, **params)
+    else:
+        signals = np.column_stack([
+            strategy_module.generate_signal(df, **{name: values[i].item() for name, values in params.items()})['signal'].to_numpy()
+            for i in range(len(next(iter(params.values()))))
+        ])
+    return run_backtest_matrix(df['close'], signals, initial_capital, commission_rate, slippage, risk_free_rate, params=params)
@@ -0,0 +1,284 @@
+"""
+記憶體映射欄位檔的分塊 (out-of-core) 回測。
+
+長週期、多幣種的 1m 歷史資料在 pandas 複製幾次之後就放不進記憶體。這裡把 OHLCV 以
+「每個欄位一個二進位檔」的方式存放，回測時用 np.memmap 逐塊讀取：
+每一塊會往前多讀 warmup 根 K 棒給指標暖機，持倉、資金與績效統計則以串流方式跨塊延續，
+因此記憶體用量只與 chunk_size + warmup 有關，與歷史長度無關。
+
+只要 warmup 涵蓋策略指標的記憶長度 (例如 EMA 需要約 10 倍 span 才能收斂到浮點誤差內)，
+產生的指標與 run_backtest 一次性在記憶體中回測的結果一致。
+"""
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from Backtest.backtest import format_metrics
+
+META_FILE = "meta.json"
+INDEX_FILE = "open_time.bin"
+
+
+class ColumnStore:
+    """
+    以目錄存放的欄位式 K 線資料。每個欄位是一個原生 float64 二進位檔，
+    open_time 以 int64 (ns) 存放，meta.json 記錄欄位名稱與資料長度。
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, META_FILE), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        self.columns = meta["columns"]
+        self.length = meta["length"]
+
+    def __len__(self):
+        return self.length
+
+    @classmethod
+    def create(cls, path: str, columns=("open", "high", "low", "close", "volume")) -> "ColumnStore":
+        os.makedirs(path, exist_ok=True)
+        for name in [INDEX_FILE] + [f"{col}.bin" for col in columns]:
+            open(os.path.join(path, name), "wb").close()
+        cls._write_meta(path, list(columns), 0)
+        return cls(path)
+
+    @classmethod
+    def from_dataframe(cls, df: pd.DataFrame, path: str, columns=None) -> "ColumnStore":
+        store = cls.create(path, columns or [c for c in df.columns if np.issubdtype(df[c].dtype, np.number)])
+        store.append(df)
+        return store
+
+    @staticmethod
+    def _write_meta(path: str, columns: list, length: int):
+        with open(os.path.join(path, META_FILE), "w", encoding="utf-8") as f:
+            json.dump({"columns": columns, "length": length}, f)
+
+    def append(self, df: pd.DataFrame):
+        """附加一段以 open_time 為索引的資料，可用於分批寫入很長的歷史而不需一次載入。"""
+        if df.empty:
+            return
+        with open(os.path.join(self.path, INDEX_FILE), "ab") as f:
+            f.write(np.ascontiguousarray(df.index.values.astype("datetime64[ns]").view(np.int64)).tobytes())
+        for col in self.columns:
+            with open(os.path.join(self.path, f"{col}.bin"), "ab") as f:
+                f.write(np.ascontiguousarray(df[col].to_numpy(), dtype=np.float64).tobytes())
+        self.length += len(df)
+        self._write_meta(self.path, self.columns, self.length)
+
+    def _memmap(self, name: str, dtype) -> np.memmap:
+        return np.memmap(os.path.join(self.path, name), dtype=dtype, mode="r", shape=(self.length,))
+
+    def column(self, col: str) -> np.memmap:
+        return self._memmap(f"{col}.bin", np.float64)
+
+    def read(self, start: int, stop: int) -> pd.DataFrame:
+        """讀取 [start, stop) 區間為 DataFrame，只會將這一段資料載入記憶體。"""
+        start, stop = max(0, start), min(stop, self.length)
+        index = pd.DatetimeIndex(np.array(self._memmap(INDEX_FILE, np.int64)[start:stop]).view("datetime64[ns]"), name="open_time")
+        return pd.DataFrame({col: np.array(self.column(col)[start:stop]) for col in self.columns}, index=index)
+
+
+class _StreamingBacktest:
+    """
+    逐根 K 棒的回測狀態機，交易規則與 run_backtest 完全相同，
+    但權益曲線與交易紀錄只以累計統計量保存 (最大回撤、Welford 報酬率均值/變異數、交易彙總)。
+    """
+
+    def __init__(self, initial_capital, commission_rate, slippage, risk_free_rate):
+        self.initial_capital = initial_capital
+        self.commission_rate = commission_rate
+        self.slippage = slippage
+        self.daily_risk_free = risk_free_rate / 252
+
+        self.capital = initial_capital
+        self.holding_cost = 0.0
+        self.holding_shares = 0.0
+        self.holding_start_index = -1
+        self.total_commission = 0.0
+        self.bars = 0
+        self.first_close = None
+        self.last_close = None
+
+        # 權益曲線統計；最後一根 K 棒的權益要等回測結束 (可能強制平倉) 才能確定，所以先暫存
+        self.prev_equity = initial_capital
+        self.peak = initial_capital
+        self.max_drawdown = 0.0
+        self.returns_count = 0
+        self.returns_mean = 0.0
+        self.returns_m2 = 0.0
+        self.pending_equity = None
+
+        # 交易統計
+        self.total_trades = 0
+        self.winning_trades = 0
+        self.total_profit = 0.0
+        self.total_loss = 0.0
+        self.total_profit_loss = 0.0
+        self.max_single_profit = None
+        self.max_single_loss = None
+        self.total_holding_period = 0
+
+    def _record_equity(self, equity):
+        self.peak = max(self.peak, equity)
+        self.max_drawdown = min(self.max_drawdown, equity / self.peak - 1)
+        excess = (equity / self.prev_equity - 1) - self.daily_risk_free
+        self.returns_count += 1
+        delta = excess - self.returns_mean
+        self.returns_mean += delta / self.returns_count
+        self.returns_m2 += delta * (excess - self.returns_mean)
+        self.prev_equity = equity
+
+    def _record_trade(self, profit_loss, holding_period):
+        self.total_trades += 1
+        self.total_profit_loss += profit_loss
+        self.total_holding_period += holding_period
+        if profit_loss > 0:
+            self.winning_trades += 1
+            self.total_profit += profit_loss
+        elif profit_loss < 0:
+            self.total_loss += -profit_loss
+        self.max_single_profit = profit_loss if self.max_single_profit is None else max(self.max_single_profit, profit_loss)
+        self.max_single_loss = profit_loss if self.max_single_loss is None else min(self.max_single_loss, profit_loss)
+
+    def process(self, closes: np.ndarray, signals: np.ndarray, equity_out=None, trade_signal_out=None):
+        """處理一塊連續的 K 棒；equity_out / trade_signal_out 若有提供則寫入逐根結果 (例如 memmap)。"""
+        if len(closes) == 0:
+            return
+        if self.first_close is None:
+            self.first_close = float(closes[0])
+        commission_rate, slippage = self.commission_rate, self.slippage
+
+        for offset, (current_close, signal) in enumerate(zip(closes.tolist(), signals.tolist())):
+            i = self.bars + offset
+            if self.pending_equity is not None:
+                self._record_equity(self.pending_equity)
+            trade = 0
+
+            if signal == 1:
+                if self.holding_shares == 0:
+                    buy_price = current_close * (1 + slippage)
+                    shares_to_buy = self.capital / (buy_price * (1 + commission_rate))
+                    if shares_to_buy > 0:
+                        commission = shares_to_buy * buy_price * commission_rate
+                        self.capital -= (shares_to_buy * buy_price + commission)
+                        self.holding_cost = shares_to_buy * buy_price
+                        self.holding_shares = shares_to_buy
+                        self.total_commission += commission
+                        self.holding_start_index = i
+                        trade = 1
+            elif signal == -1:
+                if self.holding_shares > 0:
+                    sell_price = current_close * (1 - slippage)
+                    commission = self.holding_shares * sell_price * commission_rate
+                    self._record_trade((self.holding_shares * sell_price - self.holding_cost) - commission, i - self.holding_start_index)
+                    self.total_commission += commission
+                    self.capital += (self.holding_shares * sell_price - commission)
+                    self.holding_shares = 0
+                    self.holding_cost = 0
+                    self.holding_start_index = -1
+                    trade = -1
+
+            self.pending_equity = self.capital + self.holding_shares * current_close
+            if equity_out is not None:
+                equity_out[i] = self.pending_equity
+            if trade_signal_out is not None:
+                trade_signal_out[i] = trade
+
+        self.bars += len(closes)
+        self.last_close = float(closes[-1])
+
+    def finish(self, equity_out=None, trade_signal_out=None) -> dict:
+        """結束回測：若仍持倉則以最後收盤價平倉，並回傳與 run_backtest 相同格式的指標。"""
+        if self.bars == 0:
+            raise ValueError("No bars were processed.")
+        if self.holding_shares > 0:
+            final_sell_price = self.last_close * (1 - self.slippage)
+            final_commission = self.holding_shares * final_sell_price * self.commission_rate
+            self._record_trade((self.holding_shares * final_sell_price - self.holding_cost) - final_commission, self.bars - 1 - self.holding_start_index)
+            self.total_commission += final_commission
+            self.capital += (self.holding_shares * final_sell_price - final_commission)
+            self.holding_shares = 0
+            if trade_signal_out is not None:
+                trade_signal_out[self.bars - 1] = -1
+        final_asset = self.capital
+        self.pending_equity = final_asset
+        self._record_equity(final_asset)
+        if equity_out is not None:
+            equity_out[self.bars - 1] = final_asset
+
+        std = np.sqrt(self.returns_m2 / self.returns_count) if self.returns_count > 0 else 0.0
+        sharpe_ratio = self.returns_mean / std * np.sqrt(252) if std > 0 else np.nan
+        total_trades = self.total_trades
+        return format_metrics(
+            strategy_total_return=(final_asset / self.initial_capital) - 1,
+            final_asset=final_asset,
+            max_drawdown=self.max_drawdown,
+            sharpe_ratio=sharpe_ratio,
+            total_trades=total_trades,
+            win_rate=self.winning_trades / total_trades if total_trades > 0 else 0,
+            profit_factor=self.total_profit / self.total_loss if self.total_loss > 0 else (np.inf if self.total_profit > 0 else 0),
+            total_commission=self.total_commission,
+            average_holding_period=self.total_holding_period / total_trades if total_trades > 0 else 0,
+            average_trade_profit=self.total_profit_loss / total_trades if total_trades > 0 else 0,
+            max_single_profit=self.max_single_profit if total_trades > 0 else 0,
+            max_single_loss=self.max_single_loss if total_trades > 0 else 0,
+            buy_and_hold_return=(self.last_close / self.first_close) - 1,
+            num_k_bars=self.bars,
+        )
+
+
+def run_backtest_chunked(store: ColumnStore, generate_signal, initial_capital: float, commission_rate: float = 0.001,
+                         slippage: float = 0.0005, risk_free_rate: float = 0.02, chunk_size: int = 100_000,
+                         warmup: int = 1000, output_dir: str | None = None) -> dict:
+    """
+    以分塊方式在 ColumnStore 上執行回測。
+
+    Args:
+        store (ColumnStore): 以 ColumnStore.from_dataframe / append 建立的欄位式資料。
+        generate_signal (callable): 策略的 generate_signal(df)，回傳含 'signal' 欄位的 DataFrame。
+        initial_capital (float): 初始資金。
+        commission_rate (float): 交易手續費率。
+        slippage (float): 交易滑點率。
+        risk_free_rate (float): 無風險利率。
+        chunk_size (int): 每塊處理的 K 棒數量。
+        warmup (int): 每塊額外往前讀取、只用來讓指標暖機的 K 棒數量。
+                      通常設為策略的 REQUIRED_LOOKBACK_PERIODS 或更長。
+        output_dir (str | None): 若提供，逐根的權益與實際交易點會寫入此目錄的 memmap 檔
+                                 (equity.bin / trade_signal.bin)，同樣不佔用記憶體。
+
+    Returns:
+        dict: {"metrics": 與 run_backtest 相同格式的指標, "files": 輸出檔路徑 (若有 output_dir)}。
+    """
+    if chunk_size <= 0:
+        raise ValueError("chunk_size must be positive.")
+    n = len(store)
+    engine = _StreamingBacktest(initial_capital, commission_rate, slippage, risk_free_rate)
+
+    equity_out = trade_signal_out = None
+    files = {}
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+        files = {"equity": os.path.join(output_dir, "equity.bin"), "trade_signal": os.path.join(output_dir, "trade_signal.bin")}
+        equity_out = np.memmap(files["equity"], dtype=np.float64, mode="w+", shape=(n,))
+        trade_signal_out = np.memmap(files["trade_signal"], dtype=np.int8, mode="w+", shape=(n,))
+
+    for start in range(0, n, chunk_size):
+        stop = min(start + chunk_size, n)
+        read_start = max(0, start - warmup)
+        chunk = store.read(read_start, stop)
+        df_with_signal = generate_signal(chunk)
+        if 'close' not in df_with_signal.columns or 'signal' not in df_with_signal.columns:
+            raise ValueError("DataFrame 必須包含 'close' 和 'signal' 欄位。")
+        # 只取本塊的部分，前面的暖機 K 棒已在上一塊處理過
+        tail = df_with_signal.iloc[start - read_start:]
+        engine.process(tail['close'].to_numpy(dtype=np.float64), tail['signal'].to_numpy(), equity_out, trade_signal_out)
+        del chunk, df_with_signal, tail
+
+    metrics = engine.finish(equity_out, trade_signal_out)
+    if output_dir:
+        equity_out.flush()
+        trade_signal_out.flush()
+    return {"metrics": metrics, "files": files}
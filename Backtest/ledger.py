@@ -0,0 +1,229 @@
+"""
+向量化的交易明細 (trade ledger) 與交易層級分析。
+
+回測的交易規則 (訊號 1 且空手時全額買進、訊號 -1 且持倉時全部賣出、最後一根 K 棒強制平倉)
+只取決於「最後一個非零訊號」，因此持倉狀態可以用 forward-fill 一次算出，
+進出場索引再由持倉狀態的變化取得，不需要逐根 K 棒的 Python 迴圈。
+每筆交易的資金只依賴前一筆交易的結果，用交易數量長度的 cumprod 即可求得。
+"""
+import numpy as np
+import pandas as pd
+
+
+def holding_mask(signal) -> np.ndarray:
+    """
+    由交易訊號計算每根 K 棒結束時是否持倉。
+    支援 1-D (K棒數,) 或 2-D (K棒數, 參數組數) 的訊號，非 1 / -1 的值 (包含 NaN) 視為不動作。
+    """
+    signal = np.asarray(signal)
+    active = (signal == 1) | (signal == -1)
+    n = signal.shape[0]
+    positions = np.arange(n).reshape((n,) + (1,) * (signal.ndim - 1))
+    last_active = np.maximum.accumulate(np.where(active, positions, -1), axis=0)
+    last_signal = np.take_along_axis(signal, np.maximum(last_active, 0), axis=0)
+    return (last_active >= 0) & (last_signal == 1)
+
+
+def extract_trade_ledger(close, signal, initial_capital: float, commission_rate: float = 0.001, slippage: float = 0.0005,
+                         index=None, high=None, low=None) -> tuple:
+    """
+    直接由進出場索引建立欄位式的交易明細，並計算逐根 K 棒的策略權益與實際交易點。
+
+    Args:
+        close (array-like): 收盤價序列。
+        signal (array-like): 交易訊號 (-1: 賣出, 0: 不動作, 1: 買進)。
+        initial_capital (float): 初始資金。
+        commission_rate (float): 交易手續費率。
+        slippage (float): 交易滑點率。
+        index (pd.Index | None): K 棒時間索引，提供時會加入進出場時間欄位。
+        high, low (array-like | None): 若提供則以最高/最低價計算 MAE/MFE，否則使用收盤價。
+
+    Returns:
+        tuple: (ledger, equity, trade_signal)
+            ledger (pd.DataFrame): 每筆交易一列。
+            equity (np.ndarray): 每根 K 棒結束時的資產淨值 (最後一根為平倉後的最終資產)。
+            trade_signal (np.ndarray): 實際交易點 (1: 買進, -1: 賣出, 0: 無)。
+    """
+    close = np.asarray(close, dtype=np.float64)
+    n = len(close)
+    if n == 0:
+        raise ValueError("close must not be empty.")
+
+    holding = holding_mask(signal) if initial_capital > 0 else np.zeros(n, dtype=bool)
+    previous = np.concatenate(([False], holding[:-1]))
+    entries = np.flatnonzero(holding & ~previous)
+    exits = np.flatnonzero(~holding & previous)
+    forced_exit = bool(holding[-1])
+    if forced_exit:
+        exits = np.append(exits, n - 1) # 最後一根 K 棒仍持倉，以收盤價強制平倉
+
+    buy_price = close[entries] * (1 + slippage)
+    sell_price = close[exits] * (1 - slippage)
+    growth = (sell_price * (1 - commission_rate)) / (buy_price * (1 + commission_rate))
+    entry_capital = initial_capital * np.concatenate(([1.0], np.cumprod(growth)))[:len(entries)]
+    shares = entry_capital / (buy_price * (1 + commission_rate))
+    buy_commission = shares * buy_price * commission_rate
+    sell_commission = shares * sell_price * commission_rate
+    exit_capital = shares * sell_price - sell_commission
+    profit_loss = (shares * sell_price - shares * buy_price) - sell_commission
+
+    # 逐根權益：持倉時為持股市值，空手時為上一筆交易結束後的現金
+    equity = np.empty(n)
+    trades_opened = np.cumsum(holding & ~previous)
+    trades_closed = np.cumsum(~holding & previous)
+    held = np.flatnonzero(holding)
+    equity[held] = shares[trades_opened[held] - 1] * close[held]
+    flat = np.flatnonzero(~holding)
+    cash_after = np.concatenate(([float(initial_capital)], exit_capital))
+    equity[flat] = cash_after[trades_closed[flat]]
+    if forced_exit:
+        equity[-1] = exit_capital[-1]
+
+    trade_signal = np.zeros(n, dtype=int)
+    trade_signal[entries] = 1
+    trade_signal[exits] = -1
+
+    high = close if high is None else np.asarray(high, dtype=np.float64)
+    low = close if low is None else np.asarray(low, dtype=np.float64)
+    if len(entries):
+        # 進場成交於進場 K 棒的收盤價，該 K 棒收盤前的高低點不屬於持倉期間：
+        # 以 reduceat 一次取得每筆交易 (進場, 出場] 區間內的極值，再與進場價本身 (零偏移) 比較；
+        # 進場與出場在相鄰 K 棒時區間只有出場 K 棒，最後一根 K 棒進場即強制平倉的交易區間為空
+        bounds = np.empty(2 * len(entries), dtype=np.int64)
+        bounds[0::2] = entries + 1
+        bounds[1::2] = exits + 1
+        padded_high = np.append(high, high[-1])
+        padded_low = np.append(low, low[-1])
+        entry_reference = close[entries]
+        held_bars = exits > entries
+        max_high = np.where(held_bars, np.maximum.reduceat(padded_high, bounds)[0::2], entry_reference)
+        min_low = np.where(held_bars, np.minimum.reduceat(padded_low, bounds)[0::2], entry_reference)
+        mfe = np.maximum(max_high / entry_reference - 1, 0)
+        mae = np.minimum(min_low / entry_reference - 1, 0)
+    else:
+        mfe = mae = np.empty(0)
+
+    ledger = pd.DataFrame({
+        "entry_index": entries,
+        "exit_index": exits,
+        "entry_price": buy_price,
+        "exit_price": sell_price,
+        "shares": shares,
+        "entry_capital": entry_capital,
+        "exit_capital": exit_capital,
+        "commission": buy_commission + sell_commission,
+        "profit_loss": profit_loss,
+        "return": exit_capital / entry_capital - 1,
+        "holding_period": exits - entries,
+        "mae": mae,
+        "mfe": mfe,
+        "forced_exit": np.zeros(len(entries), dtype=bool),
+    })
+    if forced_exit:
+        ledger.loc[ledger.index[-1], "forced_exit"] = True
+    if index is not None:
+        ledger.insert(2, "entry_time", np.asarray(index)[entries])
+        ledger.insert(3, "exit_time", np.asarray(index)[exits])
+
+    return ledger, equity, trade_signal
+
+
+def _max_run(mask: np.ndarray) -> int:
+    """布林序列中最長連續 True 的長度。"""
+    if not mask.any():
+        return 0
+    edges = np.diff(np.concatenate(([0], mask.astype(np.int8), [0])))
+    return int((np.flatnonzero(edges == -1) - np.flatnonzero(edges == 1)).max())
+
+
+def trade_analytics(ledger: pd.DataFrame) -> dict:
+    """
+    由交易明細計算交易層級的績效統計，全部以向量運算完成。
+
+    Returns:
+        dict: 勝率、Profit Factor、期望值、連勝/連敗、MAE/MFE 與每月損益等指標 (數值型態)。
+    """
+    pnl = ledger["profit_loss"].to_numpy()
+    total_trades = len(pnl)
+    wins = pnl > 0
+    losses = pnl < 0
+    total_profit = pnl[wins].sum()
+    total_loss = np.abs(pnl[losses]).sum()
+    win_rate = wins.sum() / total_trades if total_trades > 0 else 0
+    loss_rate = losses.sum() / total_trades if total_trades > 0 else 0
+    average_win = pnl[wins].mean() if wins.any() else 0
+    average_loss = -pnl[losses].mean() if losses.any() else 0
+
+    analytics = {
+        "total_trades": total_trades,
+        "winning_trades": int(wins.sum()),
+        "losing_trades": int(losses.sum()),
+        "win_rate": win_rate,
+        "total_profit": total_profit,
+        "total_loss": total_loss,
+        "net_profit": pnl.sum(),
+        "profit_factor": total_profit / total_loss if total_loss > 0 else (np.inf if total_profit > 0 else 0),
+        "average_trade_profit": pnl.mean() if total_trades > 0 else 0,
+        "average_win": average_win,
+        "average_loss": average_loss,
+        "payoff_ratio": average_win / average_loss if average_loss > 0 else (np.inf if average_win > 0 else 0),
+        "expectancy": win_rate * average_win - loss_rate * average_loss,
+        "max_single_profit": pnl.max() if total_trades > 0 else 0,
+        "max_single_loss": pnl.min() if total_trades > 0 else 0,
+        "max_consecutive_wins": _max_run(wins),
+        "max_consecutive_losses": _max_run(losses),
+        "average_holding_period": ledger["holding_period"].mean() if total_trades > 0 else 0,
+        "max_holding_period": int(ledger["holding_period"].max()) if total_trades > 0 else 0,
+        "total_commission": ledger["commission"].sum(),
+        "average_mae": ledger["mae"].mean() if total_trades > 0 else 0,
+        "worst_mae": ledger["mae"].min() if total_trades > 0 else 0,
+        "average_mfe": ledger["mfe"].mean() if total_trades > 0 else 0,
+        "best_mfe": ledger["mfe"].max() if total_trades > 0 else 0,
+        "monthly_profit_loss": {},
+    }
+
+    if total_trades > 0 and "exit_time" in ledger.columns and pd.api.types.is_datetime64_any_dtype(ledger["exit_time"]):
+        monthly = ledger.groupby(ledger["exit_time"].dt.strftime("%Y-%m"))["profit_loss"].sum()
+        analytics["monthly_profit_loss"] = {month: float(value) for month, value in monthly.items()}
+
+    # 轉為 Python 原生型別，方便直接序列化
+    return {key: float(value) if isinstance(value, np.floating) else int(value) if isinstance(value, np.integer) else value
+            for key, value in analytics.items()}
+
+
+
+def equity_matrix(close, signals, initial_capital: float, commission_rate: float = 0.001, slippage: float = 0.0005) -> tuple:
+    """
+    一次回測多組參數：由 (K棒數, 參數組數) 的訊號矩陣計算每組參數的逐根資產淨值。
+
+    每根 K 棒的淨值變化只取決於當根與前一根的持倉狀態 (持倉中乘以價格變化、進場扣除滑點與手續費、
+    出場乘以價格變化再扣除滑點與手續費)，因此以逐根乘數矩陣沿時間軸 cumprod 即可，與 extract_trade_ledger 的結果相同。
+
+    Returns:
+        tuple: (equity, holding)
+            equity (np.ndarray): (K棒數, 參數組數)，每根 K 棒結束時的資產淨值 (最後一根為平倉後的最終資產)。
+            holding (np.ndarray): (K棒數, 參數組數)，每根 K 棒結束時是否持倉。
+    """
+    close = np.asarray(close, dtype=np.float64)
+    signals = np.asarray(signals)
+    if signals.ndim == 1:
+        signals = signals.reshape(-1, 1)
+    n = len(close)
+    if n == 0:
+        raise ValueError("close must not be empty.")
+
+    holding = holding_mask(signals) if initial_capital > 0 else np.zeros(signals.shape, dtype=bool)
+    previous = np.zeros_like(holding)
+    previous[1:] = holding[:-1]
+    price_change = np.concatenate(([1.0], close[1:] / close[:-1]))[:, None]
+    entry_cost = 1 / ((1 + slippage) * (1 + commission_rate))
+    exit_cost = (1 - slippage) * (1 - commission_rate)
+
+    factor = np.where(holding & previous, price_change, 1.0)
+    factor[holding & ~previous] = entry_cost
+    exited = ~holding & previous
+    factor[exited] = np.broadcast_to(price_change, factor.shape)[exited] * exit_cost
+    factor[-1, holding[-1]] *= exit_cost # 最後一根 K 棒仍持倉，以收盤價強制平倉
+
+    equity = initial_capital * np.cumprod(factor, axis=0)
+    return equity, holding
@@ -0,0 +1,311 @@
+"""
+回測引擎效能基準測試。
+
+針對 `Strategy/*.py` 的 `generate_signal`、WMA/HMA/TEMA/ALMA 指標核心、`Backtest.backtest.run_backtest`
+以及 `DataService.parse_klines` (get_crypto_prices 的 K 線解碼) 在不同 K 棒數量下
+量測執行時間、記憶體峰值與每秒處理 K 棒數，並可與已儲存的基準值比較，
+超過門檻即以非零狀態碼結束，方便放在 CI 中作為效能回歸閘門。
+
+用法:
+    python -m Benchmark.benchmark                          # 跑全部案例並列出結果
+    python -m Benchmark.benchmark --sizes 10000 100000     # 指定 K 棒數量
+    python -m Benchmark.benchmark --recorded btc_1m.csv    # 另外使用錄製的歷史資料
+    python -m Benchmark.benchmark --save-baseline          # 儲存為新的基準值
+    python -m Benchmark.benchmark --check                  # 與基準值比較，回歸則失敗
+    python -m Benchmark.benchmark --cases poc adx cci      # 與 Poc/Technicalindicatorstrategy 的原始版本比較
+"""
+import argparse
+import gc
+import importlib
+import importlib.util
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from Backtest.backtest import run_backtest
+from Indicators.indicators import indicator_cache, wma, hma, tema, alma
+from services.data_service import DataService, generate_synthetic_ohlcv
+
+STRATEGY_DIR = "Strategy"
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000, 10_000_000]
+DEFAULT_BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baselines.json")
+DEFAULT_TIME_THRESHOLD = 0.20 # 執行時間允許比基準值慢 20%
+DEFAULT_MEMORY_THRESHOLD = 0.20 # 記憶體峰值允許比基準值多 20%
+
+# 已移植到 Strategy/ 的 Poc 策略及其原始訊號函式；只有在 --cases 指定 poc 或 poc:<名稱> 時才量測
+POC_STRATEGY_PACKAGE = "Poc.Technicalindicatorstrategy"
+POC_DETECTORS = {
+    "adx": "detect_adx_signal",
+    "kd": "detect_kd_signal",
+    "cci": "detect_cci_signal",
+    "williams": "detect_willr_signal",
+    "boll": "detect_bollinger_signal",
+    "momentum": "detect_momentum_signal",
+    "ema": "detect_ema_cross",
+}
+
+
+def load_recorded_ohlcv(path: str) -> pd.DataFrame:
+    """讀取錄製的 OHLCV 資料 (CSV 或 pickle)，需包含 open_time 與 open/high/low/close/volume 欄位。"""
+    if path.endswith(".pkl") or path.endswith(".pickle"):
+        df = pd.read_pickle(path)
+    else:
+        df = pd.read_csv(path, parse_dates=["open_time"], index_col="open_time")
+    if "commit_count" not in df.columns:
+        df["commit_count"] = 0.0
+    return df
+
+
+def resize_ohlcv(df: pd.DataFrame, n_bars: int) -> pd.DataFrame:
+    """
+    將錄製資料截斷或延長到指定的 K 棒數量。
+    延長時重複原始資料的報酬率序列並接續價格水準，避免在接縫處出現跳空。
+    """
+    if len(df) >= n_bars:
+        return df.iloc[-n_bars:].copy()
+
+    price_cols = ["open", "high", "low", "close"]
+    reps = -(-n_bars // len(df))
+    first_open = df["open"].iloc[0]
+    # 每根 K 棒的價格相對於前一根收盤價的比例，重複這個比例序列即可無縫延長
+    prev_close = df["close"].shift(1).fillna(first_open)
+    relative = np.tile(df[price_cols].div(prev_close, axis=0).to_numpy(), (reps, 1))[:n_bars]
+    close = first_open * np.cumprod(relative[:, 3])
+    new_prev_close = np.concatenate(([first_open], close[:-1]))
+    prices = relative * new_prev_close[:, None]
+
+    freq = df.index[-1] - df.index[-2] if len(df) > 1 else pd.Timedelta(minutes=1)
+    index = pd.date_range(start=df.index[0], periods=n_bars, freq=freq, name="open_time")
+    resized = pd.DataFrame(prices, columns=price_cols, index=index)
+    for col in df.columns:
+        if col not in price_cols:
+            resized[col] = np.tile(df[col].to_numpy(), reps)[:n_bars]
+    return resized
+
+
+def ohlcv_to_klines(df: pd.DataFrame) -> list:
+    """將 OHLCV DataFrame 轉回 Binance /api/v3/klines 的原始格式 (價格為字串)，用於量測解碼速度。"""
+    open_ms = df.index.values.astype("datetime64[ms]").view(np.int64)
+    step = int(open_ms[1] - open_ms[0]) if len(open_ms) > 1 else 60_000
+    cols = [df[c].map("{:.8f}".format).tolist() for c in ("open", "high", "low", "close", "volume")]
+    return [
+        [int(t), o, h, l, c, v, int(t) + step - 1, v, 0, v, v, "0"]
+        for t, o, h, l, c, v in zip(open_ms, *cols)
+    ]
+
+
+def load_strategy_modules(strategy_dir: str = STRATEGY_DIR) -> dict:
+    """以與 MiscService.run_backtest 相同的方式載入 Strategy 目錄下的所有策略。"""
+    modules = {}
+    for filename in sorted(os.listdir(strategy_dir)):
+        if not filename.endswith(".py") or filename == "__init__.py":
+            continue
+        name = filename[:-3]
+        with open(os.path.join(strategy_dir, filename), "r", encoding="utf-8") as f:
+            code = f.read()
+        spec = importlib.util.spec_from_loader(f"benchmark_strategy_{name}", loader=None)
+        module = importlib.util.module_from_spec(spec)
+        exec(code, module.__dict__)
+        if hasattr(module, "generate_signal"):
+            modules[name] = module
+    return modules
+
+
+def load_poc_detectors(selected: set | None) -> dict:
+    """載入被選取的 Poc 訊號函式 {名稱: 函式}。"""
+    if not selected:
+        return {}
+    detectors = {}
+    for name, function_name in POC_DETECTORS.items():
+        if "poc" in selected or f"poc:{name}" in selected:
+            module = importlib.import_module(f"{POC_STRATEGY_PACKAGE}.{name}")
+            detectors[name] = getattr(module, function_name)
+    return detectors
+
+
+def build_cases(df: pd.DataFrame, strategy_modules: dict, selected: set | None = None, poc_detectors: dict | None = None) -> dict:
+    """
+    建立要量測的案例，每個案例是一個無參數的 callable。
+    回測引擎使用 sma 策略的訊號 (若不存在則使用隨機訊號)，讓引擎的量測與策略本身分離。
+    """
+    def wanted(case_name):
+        return selected is None or case_name in selected or case_name.split(":", 1)[1] in selected
+
+    cases = {}
+    for name, module in strategy_modules.items():
+        if wanted(f"strategy:{name}"):
+            cases[f"strategy:{name}"] = (lambda m=module: m.generate_signal(df.copy()))
+
+    for name, detector in (poc_detectors or {}).items():
+        cases[f"poc:{name}"] = (lambda d=detector: d(df.copy()))
+
+    # 指標核心 (每次先清空快取，量測的是實際計算而不是快取命中)
+    close = df["close"].to_numpy()
+    for name, fn in (("wma", lambda: wma(close, 55)), ("hma", lambda: hma(close, 55)),
+                     ("tema", lambda: tema(close, 55)), ("alma", lambda: alma(close, 9))):
+        if wanted(f"indicator:{name}"):
+            cases[f"indicator:{name}"] = (lambda f=fn: (indicator_cache.clear(), f()))
+
+    if wanted("engine:run_backtest"):
+        if "sma" in strategy_modules:
+            df_with_signal = strategy_modules["sma"].generate_signal(df.copy())
+        else:
+            df_with_signal = df.copy()
+            df_with_signal["signal"] = np.random.default_rng(0).choice([-1, 0, 0, 0, 1], len(df))
+
+        cases["engine:run_backtest"] = lambda: run_backtest(df_with_signal, 10000, 0.001, 0.0005, 0.02)
+
+    if wanted("decode:parse_klines"):
+        data_service = DataService()
+        klines = ohlcv_to_klines(df)
+        cases["decode:parse_klines"] = lambda: data_service.parse_klines(klines)
+
+    return cases
+
+
+def measure(fn, n_bars: int, repeat: int = 1, track_memory: bool = True) -> dict:
+    """
+    量測單一案例。執行時間取 repeat 次中最快的一次 (不開 tracemalloc，以免干擾計時)，
+    記憶體峰值則另外以 tracemalloc 跑一次取得 (numpy 的配置也會被追蹤)。
+    """
+    gc.collect()
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+        gc.collect()
+
+    peak_memory_mb = None
+    if track_memory:
+        tracemalloc.start()
+        try:
+            fn()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        peak_memory_mb = peak / (1024 * 1024)
+        gc.collect()
+
+    return {
+        "wall_time": best,
+        "peak_memory_mb": peak_memory_mb,
+        "bars_per_second": n_bars / best if best > 0 else float("inf"),
+    }
+
+
+def run_suite(sizes, datasets=("synthetic",), recorded_path=None, cases=None, repeat=1, track_memory=True) -> dict:
+    """執行整個基準測試，回傳 {案例鍵: 量測結果}，案例鍵格式為 '<案例>@<資料集>:<K棒數>'。"""
+    strategy_modules = load_strategy_modules()
+    recorded = load_recorded_ohlcv(recorded_path) if recorded_path else None
+    selected = set(cases) if cases else None
+    poc_detectors = load_poc_detectors(selected)
+    results = {}
+
+    for dataset in datasets:
+        for n_bars in sizes:
+            if dataset == "synthetic":
+                df = generate_synthetic_ohlcv(n_bars)
+            elif dataset == "recorded":
+                if recorded is None:
+                    continue
+                df = resize_ohlcv(recorded, n_bars)
+            else:
+                raise ValueError(f"Unknown dataset '{dataset}'.")
+
+            for case_name, fn in build_cases(df, strategy_modules, selected, poc_detectors).items():
+                key = f"{case_name}@{dataset}:{n_bars}"
+                try:
+                    results[key] = measure(fn, n_bars, repeat=repeat, track_memory=track_memory)
+                except MemoryError:
+                    print(f"WARNING: {key} ran out of memory, skipped.")
+                    continue
+                print(format_result(key, results[key]))
+            del df
+            gc.collect()
+    return results
+
+
+def format_result(key: str, result: dict) -> str:
+    memory = f"{result['peak_memory_mb']:10.1f} MB" if result.get("peak_memory_mb") is not None else "       n/a"
+    return f"{key:<48} {result['wall_time']:10.4f} s {memory} {result['bars_per_second']:14,.0f} bars/s"
+
+
+def load_baselines(path: str = DEFAULT_BASELINE_PATH) -> dict:
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f).get("results", {})
+
+
+def save_baselines(results: dict, path: str = DEFAULT_BASELINE_PATH, merge: bool = True):
+    baselines = load_baselines(path) if merge else {}
+    baselines.update(results)
+    payload = {
+        "machine": {"python": sys.version.split()[0], "platform": platform.platform(), "processor": platform.processor()},
+        "saved_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "results": baselines,
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(payload, f, indent=2, sort_keys=True)
+
+
+def compare_to_baselines(results: dict, baselines: dict, time_threshold: float = DEFAULT_TIME_THRESHOLD, memory_threshold: float = DEFAULT_MEMORY_THRESHOLD) -> list:
+    """比較量測結果與基準值，回傳回歸項目的描述列表 (空列表代表沒有回歸)。"""
+    regressions = []
+    for key, result in results.items():
+        baseline = baselines.get(key)
+        if not baseline:
+            continue
+        if result["wall_time"] > baseline["wall_time"] * (1 + time_threshold):
+            regressions.append(f"{key}: wall time {result['wall_time']:.4f}s vs baseline {baseline['wall_time']:.4f}s (+{result['wall_time'] / baseline['wall_time'] - 1:.1%})")
+        if result.get("peak_memory_mb") is not None and baseline.get("peak_memory_mb"):
+            if result["peak_memory_mb"] > baseline["peak_memory_mb"] * (1 + memory_threshold):
+                regressions.append(f"{key}: peak memory {result['peak_memory_mb']:.1f}MB vs baseline {baseline['peak_memory_mb']:.1f}MB (+{result['peak_memory_mb'] / baseline['peak_memory_mb'] - 1:.1%})")
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark strategies, the backtest engine and kline decoding.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="Number of bars per run.")
+    parser.add_argument("--cases", nargs="+", help="Only run these cases, e.g. sma run_backtest parse_klines (add poc to compare with the Poc strategies).")
+    parser.add_argument("--recorded", help="CSV/pickle OHLCV file used for the 'recorded' dataset.")
+    parser.add_argument("--repeat", type=int, default=1, help="Timing repetitions per case (best is kept).")
+    parser.add_argument("--no-memory", action="store_true", help="Skip the tracemalloc peak memory run.")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE_PATH, help="Baseline JSON file.")
+    parser.add_argument("--save-baseline", action="store_true", help="Store these results as the new baseline.")
+    parser.add_argument("--check", action="store_true", help="Fail if results regress past the thresholds.")
+    parser.add_argument("--time-threshold", type=float, default=DEFAULT_TIME_THRESHOLD)
+    parser.add_argument("--memory-threshold", type=float, default=DEFAULT_MEMORY_THRESHOLD)
+    args = parser.parse_args(argv)
+
+    datasets = ("synthetic", "recorded") if args.recorded else ("synthetic",)
+    results = run_suite(args.sizes, datasets, args.recorded, args.cases, args.repeat, not args.no_memory)
+
+    if args.save_baseline:
+        save_baselines(results, args.baseline)
+        print(f"Saved {len(results)} baseline results to {args.baseline}")
+
+    if args.check:
+        baselines = load_baselines(args.baseline)
+        if not baselines:
+            print(f"ERROR: No baselines found at {args.baseline}. Run with --save-baseline first.")
+            return 2
+        regressions = compare_to_baselines(results, baselines, args.time_threshold, args.memory_threshold)
+        if regressions:
+            print("Performance regressions detected:")
+            for regression in regressions:
+                print(f"  {regression}")
+            return 1
+        print("No performance regressions detected.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,98 @@
+"""
+策略總覽 (GET /strategies，StrategyService.get_strategies) 效能基準測試。
+
+以 Benchmark/query_benchmark.py 相同的方式在獨立的資料庫中灌入數百萬筆權益點與交易紀錄 (遷移到最新版本，含索引)，
+比較原本逐策略查詢的 N+1 實作 (每個策略查一次執行紀錄、把所有交易紀錄載入 Python 計數加總、再查最近 100 個權益點)
+與目前以 SQL 聚合與視窗函數的固定查詢數實作，列出執行時間、SQL 查詢數，並確認兩者結果相同。
+
+用法:
+    python -m Benchmark.overview_benchmark                               # 預設: 暫存 SQLite 檔、200 個策略
+    python -m Benchmark.overview_benchmark --strategies 500 --equity-rows 5000000
+    python -m Benchmark.overview_benchmark --url postgresql://user:pw@localhost/bench
+"""
+import argparse
+import os
+import sys
+import time
+
+from Benchmark.query_benchmark import migrate, populate
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session
+
+from database import RunningStrategy, SavedStrategy, TradeLog
+from services.equity_store import equity_points
+from services.strategy_service import strategy_service
+
+
+def get_strategies_n_plus_one(db: Session) -> list:
+    """The former StrategyService.get_strategies, without its debug output."""
+    strategies = []
+    for saved_strategy in db.query(SavedStrategy).all():
+        strategy_data = saved_strategy.__dict__.copy()
+        strategy_data.pop('_sa_instance_state', None)
+        running_strategy = db.query(RunningStrategy).filter(RunningStrategy.strategy_id == saved_strategy.id).first()
+        trade_count = 0
+        total_profit_loss = 0.0
+        equity_curve_data = []
+        if running_strategy:
+            trade_logs = db.query(TradeLog).filter(TradeLog.running_strategy_id == running_strategy.id).all()
+            trade_count = len(trade_logs)
+            total_profit_loss = sum(log.profit_loss for log in trade_logs if log.trade_type == 'sell' and log.profit_loss is not None)
+            equity_records = equity_points(db, running_strategy.id, limit=100)
+            equity_curve_data = [[record["timestamp"].isoformat(), record["equity"]] for record in equity_records]
+        strategy_data['trade_count'] = trade_count
+        strategy_data['total_profit_loss'] = round(total_profit_loss, 2)
+        strategy_data['equity_curve_data'] = equity_curve_data
+        strategies.append(strategy_data)
+    return strategies
+
+
+def measure(engine, fn, repeats: int) -> tuple:
+    """(best seconds, SQL statements per call, result) of fn(db), each call in a fresh session."""
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    best, result = float("inf"), None
+    for _ in range(repeats):
+        statements.clear()
+        event.listen(engine, "before_cursor_execute", listener)
+        try:
+            with Session(engine) as db:
+                started = time.perf_counter()
+                result = fn(db)
+                best = min(best, time.perf_counter() - started)
+        finally:
+            event.remove(engine, "before_cursor_execute", listener)
+    return best, len(statements), result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark of the strategy overview (GET /strategies)")
+    parser.add_argument("--url", default=os.environ["DATABASE_URL"], help="An empty database to fill (default: a temporary SQLite file)")
+    parser.add_argument("--strategies", type=int, default=200)
+    parser.add_argument("--equity-rows", type=int, default=2_000_000)
+    parser.add_argument("--trade-rows", type=int, default=500_000)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    engine = create_engine(args.url)
+    migrate(engine, "head")
+    started = time.perf_counter()
+    populate(engine, args.strategies, args.equity_rows, args.trade_rows)
+    print(f"Populated {args.equity_rows:,} equity points and {args.trade_rows:,} trades of {args.strategies} strategies "
+          f"({engine.dialect.name}) in {time.perf_counter() - started:.1f}s\n")
+
+    legacy_seconds, legacy_queries, legacy = measure(engine, get_strategies_n_plus_one, args.repeats)
+    seconds, queries, overview = measure(engine, strategy_service.get_strategies, args.repeats)
+    identical = sorted(legacy, key=lambda strategy: strategy["id"]) == overview
+
+    print(f"{'implementation':<16}{'ms':>12}{'queries':>10}")
+    print(f"{'N+1':<16}{legacy_seconds * 1000:>12.1f}{legacy_queries:>10}")
+    print(f"{'aggregated':<16}{seconds * 1000:>12.1f}{queries:>10}")
+    print(f"\nspeedup {legacy_seconds / seconds:.1f}x, results identical: {identical}")
+    engine.dispose()
+    return 0 if identical else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,173 @@
+"""
+資料庫查詢效能基準測試 (遷移 0002 的熱路徑索引)。
+
+在獨立的資料庫中先只套用基線遷移 (0001，沒有複合索引)，灌入數百萬筆 equity_curves 與 trade_logs，
+量測儀表板與即時交易的熱路徑查詢 (單一策略依時間排序的交易紀錄、最近 100 個權益點、策略總覽、
+查詢執行中策略)；接著升級到最新遷移再量測一次，列出前後的執行時間、加速倍數與查詢計畫。
+
+用法:
+    python -m Benchmark.query_benchmark                                  # 預設: 暫存 SQLite 檔、200 萬筆權益點
+    python -m Benchmark.query_benchmark --equity-rows 5000000 --trade-rows 1000000
+    python -m Benchmark.query_benchmark --url postgresql://user:pw@localhost/bench   # 使用空的 PostgreSQL 資料庫
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+# database.py 在匯入時需要 DATABASE_URL；基準測試只使用 --url 指定的資料庫
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='query-benchmark-'), 'bench.db')}")
+
+import numpy as np
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import create_engine, func, insert, text
+from sqlalchemy.orm import Session
+
+from database import EquityCurve, RunningStrategy, SavedStrategy, TradeLog
+from services.equity_store import equity_points
+from services.partitions import ensure_partitions
+
+ALEMBIC_INI = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "alembic.ini")
+BASELINE_REVISION = "0001"
+CHUNK_ROWS = 50_000
+START = datetime(2023, 1, 1)
+
+
+def migrate(engine, revision: str):
+    config = Config(ALEMBIC_INI)
+    with engine.begin() as connection:
+        config.attributes.update(configure_logger=False, connection=connection)
+        command.upgrade(config, revision)
+
+
+def _insert(engine, model, rows: list):
+    with Session(engine) as db:
+        ensure_partitions(db, model, rows) # Partitioned tables on PostgreSQL from migration 0003 on
+        db.execute(insert(model), rows)
+        db.commit()
+
+
+def populate(engine, strategies: int, equity_rows: int, trade_rows: int, seed: int = 7):
+    """strategies 個策略 (其中一半執行中)，每個策略各自連續的 1 分鐘權益點，以及隨機時間的交易紀錄。"""
+    rng = np.random.default_rng(seed)
+    with engine.begin() as connection:
+        connection.execute(insert(SavedStrategy), [
+            {"id": i + 1, "name": f"bench_{i}", "code": "", "symbol": "BTC", "currency": "USDT", "interval": "1m",
+             "initial_capital": 10_000.0, "commission_rate": 0.001, "slippage": 0.0005, "risk_free_rate": 0.02}
+            for i in range(strategies)
+        ])
+        connection.execute(insert(RunningStrategy), [
+            {"id": i + 1, "strategy_id": i + 1, "status": "running" if i % 2 == 0 else "stopped"} for i in range(strategies)
+        ])
+
+    per_strategy = equity_rows // strategies
+    for first in range(0, equity_rows, CHUNK_ROWS):
+        index = np.arange(first, min(first + CHUNK_ROWS, equity_rows))
+        # Strategies interleaved, as live runners write them: row i is bar i // strategies of strategy i % strategies
+        strategy_ids = index % strategies + 1
+        bars = index // strategies
+        equity = 10_000.0 + rng.normal(0, 50, len(index)).cumsum()
+        _insert(engine, EquityCurve, [
+            {"running_strategy_id": int(s), "timestamp": START + timedelta(minutes=int(b)), "equity": float(e)}
+            for s, b, e in zip(strategy_ids, bars, equity)
+        ])
+
+    for first in range(0, trade_rows, CHUNK_ROWS):
+        size = min(CHUNK_ROWS, trade_rows - first)
+        strategy_ids = rng.integers(1, strategies + 1, size)
+        minutes = rng.integers(0, max(per_strategy, 1), size)
+        sells = rng.random(size) < 0.5
+        profits = rng.normal(0, 20, size)
+        _insert(engine, TradeLog, [
+            {"running_strategy_id": int(s), "timestamp": START + timedelta(minutes=int(m)), "trade_type": "sell" if sell else "buy",
+             "price": 30_000.0, "quantity": 0.01, "commission": 0.3, "profit_loss": float(p) if sell else None}
+            for s, m, sell, p in zip(strategy_ids, minutes, sells, profits)
+        ])
+    with engine.begin() as connection:
+        connection.execute(text("ANALYZE")) # Planner statistics, on SQLite as on PostgreSQL
+
+
+def queries() -> dict:
+    """名稱 -> fn(db, running_strategy_id)，對應 services/strategy_service.py 中的查詢。"""
+    return {
+        "trade log (one strategy, by time)": lambda db, rid: db.query(TradeLog).filter(
+            TradeLog.running_strategy_id == rid).order_by(TradeLog.timestamp).all(),
+        "equity sparkline (last 100)": lambda db, rid: equity_points(db, rid, limit=100),
+        "overview trades (count, P&L)": lambda db, rid: db.query(func.count(TradeLog.id), func.sum(TradeLog.profit_loss)).filter(
+            TradeLog.running_strategy_id == rid, TradeLog.trade_type == "sell").one(),
+        "active strategies": lambda db, rid: db.query(RunningStrategy.id).filter(
+            RunningStrategy.status.in_(("starting", "running", "paused"))).all(),
+    }
+
+
+def explain(engine, statement) -> str:
+    compiled = str(statement.compile(engine, compile_kwargs={"literal_binds": True}))
+    prefix = "EXPLAIN QUERY PLAN " if engine.dialect.name == "sqlite" else "EXPLAIN "
+    with engine.connect() as connection:
+        rows = connection.execute(text(prefix + compiled)).all()
+    return " | ".join(str(row[-1]) for row in rows)
+
+
+def time_queries(engine, strategies: int, repeats: int) -> dict:
+    """每個查詢對 repeats 個不同策略各跑一次 (避免只量到快取)，回傳中位數秒數。"""
+    rng = np.random.default_rng(1)
+    results = {}
+    with Session(engine) as db:
+        for name, query in queries().items():
+            timings = []
+            for rid in rng.integers(1, strategies + 1, repeats):
+                started = time.perf_counter()
+                query(db, int(rid))
+                timings.append(time.perf_counter() - started)
+                db.expunge_all()
+            results[name] = statistics.median(timings)
+    return results
+
+
+def plans(engine) -> dict:
+    return {
+        "trade log (one strategy, by time)": explain(engine, TradeLog.__table__.select().where(
+            TradeLog.running_strategy_id == 1).order_by(TradeLog.timestamp)),
+        "equity sparkline (last 100)": explain(engine, EquityCurve.__table__.select().where(
+            EquityCurve.running_strategy_id == 1).order_by(EquityCurve.timestamp.desc()).limit(100)),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Query benchmark of the hot path indexes (migration 0002)")
+    parser.add_argument("--url", default=os.environ["DATABASE_URL"], help="An empty database to fill (default: a temporary SQLite file)")
+    parser.add_argument("--strategies", type=int, default=200)
+    parser.add_argument("--equity-rows", type=int, default=2_000_000)
+    parser.add_argument("--trade-rows", type=int, default=500_000)
+    parser.add_argument("--repeats", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    engine = create_engine(args.url)
+    migrate(engine, BASELINE_REVISION)
+    started = time.perf_counter()
+    populate(engine, args.strategies, args.equity_rows, args.trade_rows)
+    print(f"Populated {args.equity_rows:,} equity points and {args.trade_rows:,} trades of {args.strategies} strategies "
+          f"({engine.dialect.name}) in {time.perf_counter() - started:.1f}s")
+
+    before, before_plans = time_queries(engine, args.strategies, args.repeats), plans(engine)
+    started = time.perf_counter()
+    migrate(engine, "head")
+    print(f"Applied the hot path indexes in {time.perf_counter() - started:.1f}s")
+    after, after_plans = time_queries(engine, args.strategies, args.repeats), plans(engine)
+
+    print(f"\n{'query':<36}{'baseline ms':>14}{'indexed ms':>14}{'speedup':>10}")
+    for name in before:
+        print(f"{name:<36}{before[name] * 1000:>14.2f}{after[name] * 1000:>14.2f}{before[name] / after[name]:>9.1f}x")
+    print()
+    for name in before_plans:
+        print(f"{name}\n  baseline: {before_plans[name]}\n  indexed:  {after_plans[name]}")
+    engine.dispose()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,512 @@
+"""
+策略共用的技術指標函式庫 (含快取)。
+
+同一份資料在參數掃描或多策略回測時，常常重複計算相同的 EMA / 均線。
+這裡的指標函式會以 (資料指紋, 指標名稱, 參數) 為鍵快取結果，並在數量或記憶體超過上限時以 LRU 淘汰。
+像 true range、Wilder 平滑這類中間結果也以其來源資料的指紋為鍵快取，
+因此 ATR 與 ADX、RSI 與其他以 Wilder 平滑為基礎的指標可以共用計算結果。
+
+所有函式都接受 pd.Series 或 np.ndarray：傳入 Series 時回傳與其索引對齊的 Series，否則回傳 ndarray。
+
+用法 (在 Strategy/*.py 中):
+    from Indicators.indicators import ema, rsi
+    df['ema_fast'] = ema(df['close'], 12)
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+class IndicatorCache:
+    """以 LRU 淘汰的指標結果快取，同時限制項目數量與總位元組數。"""
+
+    def __init__(self, max_entries: int = 512, max_bytes: int = 512 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_or_compute(self, key, compute) -> np.ndarray:
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return cached
+            self.misses += 1
+
+        value = np.asarray(compute(), dtype=np.float64)
+        value.flags.writeable = False # 快取結果會被多個呼叫者共用，禁止就地修改
+
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = value
+                self._bytes += value.nbytes
+                self._evict()
+        return value
+
+    def _evict(self):
+        while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= evicted.nbytes
+            self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+indicator_cache = IndicatorCache()
+
+
+def fingerprint(values) -> str:
+    """資料指紋：以內容雜湊識別資料，與物件身分無關，所以不同 DataFrame 副本中的相同資料會命中同一個快取。"""
+    array = np.ascontiguousarray(_values(values), dtype=np.float64)
+    digest = hashlib.sha1(memoryview(array).cast("B"), usedforsecurity=False).hexdigest()
+    return f"{digest}:{len(array)}"
+
+
+def _values(series) -> np.ndarray:
+    if isinstance(series, pd.Series):
+        return series.to_numpy(dtype=np.float64)
+    return np.asarray(series, dtype=np.float64)
+
+
+def _wrap(values: np.ndarray, like, name: str | None = None):
+    if isinstance(like, pd.Series):
+        return pd.Series(values, index=like.index, name=name)
+    return values
+
+
+class _Source:
+    """一份輸入資料及其快取鍵；衍生結果的鍵由來源鍵組合而成，不需要再次雜湊。"""
+
+    __slots__ = ("key", "values")
+
+    def __init__(self, key, values: np.ndarray):
+        self.key = key
+        self.values = values
+
+    @classmethod
+    def of(cls, series) -> "_Source":
+        values = _values(series)
+        return cls(fingerprint(values), values)
+
+    def derive(self, name: str, *params, compute) -> "_Source":
+        key = (name, self.key) + params
+        return _Source(key, indicator_cache.get_or_compute(key, compute))
+
+
+# --- 核心計算 (以 _Source 為輸入，結果皆經過快取) ---
+
+def _ema(source: _Source, span: int) -> _Source:
+    return source.derive("ema", span, compute=lambda: pd.Series(source.values).ewm(span=span, adjust=False).mean().to_numpy())
+
+
+def _sma(source: _Source, period: int) -> _Source:
+    return source.derive("sma", period, compute=lambda: pd.Series(source.values).rolling(window=period).mean().to_numpy())
+
+
+def _rolling_std(source: _Source, period: int, ddof: int) -> _Source:
+    return source.derive("rolling_std", period, ddof, compute=lambda: pd.Series(source.values).rolling(window=period).std(ddof=ddof).to_numpy())
+
+
+def _rolling_max(source: _Source, period: int) -> _Source:
+    return source.derive("rolling_max", period, compute=lambda: pd.Series(source.values).rolling(window=period).max().to_numpy())
+
+
+def _rolling_min(source: _Source, period: int) -> _Source:
+    return source.derive("rolling_min", period, compute=lambda: pd.Series(source.values).rolling(window=period).min().to_numpy())
+
+
+_MEAN_DEVIATION_BLOCK = 65536 # 每次處理的視窗數，限制 (視窗數, period) 暫存矩陣的大小
+
+
+def _mean_deviation_kernel(values: np.ndarray, period: int) -> np.ndarray:
+    """
+    滾動平均絕對離差 mean(|x - mean(x)|)。無法像標準差一樣由累計和遞推，
+    改以 sliding_window_view 分塊一次計算整批視窗，取代逐視窗呼叫 Python 函式的 rolling.apply。
+    """
+    result = np.full(len(values), np.nan)
+    if len(values) < period:
+        return result
+    windows = sliding_window_view(values, period)
+    for start in range(0, len(windows), _MEAN_DEVIATION_BLOCK):
+        block = windows[start:start + _MEAN_DEVIATION_BLOCK]
+        result[period - 1 + start:period - 1 + start + len(block)] = np.abs(block - block.mean(axis=1, keepdims=True)).mean(axis=1)
+    return result
+
+
+def _mean_deviation(source: _Source, period: int) -> _Source:
+    return source.derive("mean_deviation", period, compute=lambda: _mean_deviation_kernel(source.values, period))
+
+
+def _weighted_window(values: np.ndarray, weights: np.ndarray) -> np.ndarray:
+    """
+    固定權重的滾動加權和 sum(weights[k] * x[t - len(weights) + 1 + k])，weights 由最舊排到最新。
+    以 np.convolve 一次計算，時間與 K 棒數成線性；視窗內有 NaN 時結果為 NaN，視窗未滿時為 NaN。
+    """
+    result = np.full(len(values), np.nan)
+    if len(values) >= len(weights):
+        result[len(weights) - 1:] = np.convolve(values, weights[::-1], mode="valid")
+    return result
+
+
+def _wma(source: _Source, period: int) -> _Source:
+    weights = np.arange(1, period + 1, dtype=np.float64)
+    weights /= weights.sum()
+    return source.derive("wma", period, compute=lambda: _weighted_window(source.values, weights))
+
+
+def _hma(source: _Source, period: int) -> _Source:
+    raw = source.derive("hma_raw", period, compute=lambda: 2 * _wma(source, int(period / 2)).values - _wma(source, period).values)
+    return _wma(raw, int(np.sqrt(period)))
+
+
+def _tema(source: _Source, span: int) -> _Source:
+    ema_1 = _ema(source, span)
+    ema_2 = _ema(ema_1, span)
+    ema_3 = _ema(ema_2, span)
+    return source.derive("tema", span, compute=lambda: 3 * ema_1.values - 3 * ema_2.values + ema_3.values)
+
+
+def _alma(source: _Source, period: int, offset: float, sigma: float) -> _Source:
+    m = offset * (period - 1)
+    s = period / sigma
+    weights = np.exp(-((np.arange(period) - m) ** 2) / (2 * s * s))
+    weights /= weights.sum()
+    return source.derive("alma", period, offset, sigma, compute=lambda: _weighted_window(source.values, weights))
+
+
+def _wilder_smoothing(values: np.ndarray, period: int) -> np.ndarray:
+    """
+    Wilder 平滑 (RMA)：以第一段 period 個有效值的簡單平均作為起始值，
+    之後 r[t] = r[t-1] + (x[t] - r[t-1]) / period。起始值之前為 NaN。
+    """
+    result = np.full(len(values), np.nan)
+    valid = np.flatnonzero(~np.isnan(values))
+    if len(valid) < period:
+        return result
+    start = valid[0]
+    seeded = values[start + period - 1:].copy()
+    seeded[0] = values[start:start + period].mean()
+    # adjust=False 的 ewm 正好是 Wilder 的遞迴式，由 pandas 以 C 實作執行
+    result[start + period - 1:] = pd.Series(seeded).ewm(alpha=1 / period, adjust=False).mean().to_numpy()
+    return result
+
+
+def _wilder(source: _Source, period: int) -> _Source:
+    return source.derive("wilder", period, compute=lambda: _wilder_smoothing(source.values, period))
+
+
+def _true_range(high: _Source, low: _Source, close: _Source) -> _Source:
+    key = ("true_range", high.key, low.key, close.key)
+
+    def compute():
+        prev_close = np.concatenate(([np.nan], close.values[:-1]))
+        return np.fmax(high.values - low.values, np.fmax(np.abs(high.values - prev_close), np.abs(low.values - prev_close)))
+
+    return _Source(key, indicator_cache.get_or_compute(key, compute))
+
+
+def _directional_movement(high: _Source, low: _Source) -> tuple:
+    def compute(sign):
+        up_move = np.concatenate(([np.nan], np.diff(high.values)))
+        down_move = np.concatenate(([np.nan], -np.diff(low.values)))
+        if sign > 0:
+            return np.where((up_move > down_move) & (up_move > 0), up_move, np.where(np.isnan(up_move), np.nan, 0.0))
+        return np.where((down_move > up_move) & (down_move > 0), down_move, np.where(np.isnan(down_move), np.nan, 0.0))
+
+    plus_key = ("plus_dm", high.key, low.key)
+    minus_key = ("minus_dm", high.key, low.key)
+    return (_Source(plus_key, indicator_cache.get_or_compute(plus_key, lambda: compute(1))),
+            _Source(minus_key, indicator_cache.get_or_compute(minus_key, lambda: compute(-1))))
+
+
+# --- 公開指標函式 ---
+
+def ema(series, span: int):
+    """指數移動平均 (與 series.ewm(span=span, adjust=False).mean() 相同)。"""
+    return _wrap(_ema(_Source.of(series), span).values, series)
+
+
+def sma(series, period: int):
+    """簡單移動平均 (與 series.rolling(period).mean() 相同)。"""
+    return _wrap(_sma(_Source.of(series), period).values, series)
+
+
+def wma(series, period: int):
+    """線性加權移動平均，最新一根 K 棒權重為 period，最舊一根為 1。"""
+    return _wrap(_wma(_Source.of(series), period).values, series)
+
+
+def hma(series, period: int):
+    """Hull 移動平均 WMA(2 * WMA(n/2) - WMA(n), sqrt(n))，使用真正的線性加權移動平均。"""
+    return _wrap(_hma(_Source.of(series), period).values, series)
+
+
+def tema(series, span: int):
+    """三重指數移動平均 3 * EMA - 3 * EMA(EMA) + EMA(EMA(EMA))。"""
+    return _wrap(_tema(_Source.of(series), span).values, series)
+
+
+def alma(series, period: int = 9, offset: float = 0.85, sigma: float = 6.0):
+    """
+    Arnaud Legoux 移動平均：以中心在 offset * (period - 1)、標準差 period / sigma 的高斯權重加權
+    (offset 越接近 1 越偏重最新的 K 棒)。
+    """
+    return _wrap(_alma(_Source.of(series), period, offset, sigma).values, series)
+
+
+def rolling_std(series, period: int, ddof: int = 1):
+    """滾動標準差 (與 series.rolling(period).std(ddof=ddof) 相同)。"""
+    return _wrap(_rolling_std(_Source.of(series), period, ddof).values, series)
+
+
+def wilder_smoothing(series, period: int):
+    """Wilder 平滑 (RMA)，RSI / ATR / ADX 的基礎。"""
+    return _wrap(_wilder(_Source.of(series), period).values, series)
+
+
+def rsi(series, period: int = 14, smoothing: str = "wilder"):
+    """
+    相對強弱指數。
+
+    Args:
+        series: 收盤價。
+        period (int): 週期。
+        smoothing (str): "wilder" 為標準的 Wilder 平滑；"ema" 為以 ewm(span=period) 平滑漲跌幅
+                         (Strategy/rsi.py 原本的算法)。
+    """
+    source = _Source.of(series)
+    delta = np.concatenate(([np.nan], np.diff(source.values)))
+    if smoothing == "wilder":
+        gains = source.derive("gains", compute=lambda: np.where(np.isnan(delta), np.nan, np.maximum(delta, 0)))
+        losses = source.derive("losses", compute=lambda: np.where(np.isnan(delta), np.nan, np.maximum(-delta, 0)))
+        avg_gain, avg_loss = _wilder(gains, period), _wilder(losses, period)
+    elif smoothing == "ema":
+        gains = source.derive("gains_filled", compute=lambda: np.where(delta > 0, delta, 0.0))
+        losses = source.derive("losses_filled", compute=lambda: np.where(delta < 0, -delta, 0.0))
+        avg_gain, avg_loss = _ema(gains, period), _ema(losses, period)
+    else:
+        raise ValueError(f"Unknown RSI smoothing '{smoothing}'.")
+
+    def compute():
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return 100 - (100 / (1 + avg_gain.values / avg_loss.values))
+
+    return _wrap(source.derive("rsi", period, smoothing, compute=compute).values, series)
+
+
+def true_range(high, low, close):
+    """真實波幅 max(high-low, |high-prev_close|, |low-prev_close|)。"""
+    return _wrap(_true_range(_Source.of(high), _Source.of(low), _Source.of(close)).values, close)
+
+
+def atr(high, low, close, period: int = 14):
+    """平均真實波幅 (以 Wilder 平滑 true range)。"""
+    return _wrap(_wilder(_true_range(_Source.of(high), _Source.of(low), _Source.of(close)), period).values, close)
+
+
+def bollinger_bands(series, period: int = 20, num_std: float = 2.0) -> tuple:
+    """布林通道，回傳 (中軌, 上軌, 下軌)。"""
+    source = _Source.of(series)
+    middle = _sma(source, period).values
+    std = _rolling_std(source, period, 1).values
+    return (_wrap(middle, series),
+            _wrap(middle + num_std * std, series),
+            _wrap(middle - num_std * std, series))
+
+
+def macd(series, fast_period: int = 12, slow_period: int = 26, signal_period: int = 9) -> tuple:
+    """MACD，回傳 (MACD 線, 訊號線, 柱狀圖)。"""
+    source = _Source.of(series)
+    fast, slow = _ema(source, fast_period), _ema(source, slow_period)
+    line = source.derive("macd_line", fast_period, slow_period, compute=lambda: fast.values - slow.values)
+    signal_line = _ema(line, signal_period)
+    return (_wrap(line.values, series),
+            _wrap(signal_line.values, series),
+            _wrap(line.values - signal_line.values, series))
+
+
+def adx(high, low, close, period: int = 14) -> tuple:
+    """
+    平均趨向指標 (Wilder)，回傳 (ADX, +DI, -DI)。
+    true range 與 Wilder 平滑後的 true range 會與 atr() 共用快取。
+    """
+    high_src, low_src, close_src = _Source.of(high), _Source.of(low), _Source.of(close)
+    smoothed_tr = _wilder(_true_range(high_src, low_src, close_src), period)
+    plus_dm, minus_dm = _directional_movement(high_src, low_src)
+    smoothed_plus, smoothed_minus = _wilder(plus_dm, period), _wilder(minus_dm, period)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        plus_di = 100 * smoothed_plus.values / smoothed_tr.values
+        minus_di = 100 * smoothed_minus.values / smoothed_tr.values
+        dx_values = 100 * np.abs(plus_di - minus_di) / (plus_di + minus_di)
+    dx = _Source(("dx", high_src.key, low_src.key, close_src.key, period), dx_values)
+    adx_values = _wilder(dx, period).values
+    return _wrap(adx_values, close), _wrap(plus_di, close), _wrap(minus_di, close)
+
+
+def rolling_max(series, period: int):
+    """滾動最大值 (與 series.rolling(period).max() 相同)。"""
+    return _wrap(_rolling_max(_Source.of(series), period).values, series)
+
+
+def rolling_min(series, period: int):
+    """滾動最小值 (與 series.rolling(period).min() 相同)。"""
+    return _wrap(_rolling_min(_Source.of(series), period).values, series)
+
+
+def mean_deviation(series, period: int):
+    """滾動平均絕對離差 (與 series.rolling(period).apply(lambda x: np.mean(np.abs(x - np.mean(x)))) 相同)。"""
+    return _wrap(_mean_deviation(_Source.of(series), period).values, series)
+
+
+def momentum(series, period: int = 10):
+    """動量 close - close.shift(period)。"""
+    source = _Source.of(series)
+
+    def compute():
+        result = np.full(len(source.values), np.nan)
+        result[period:] = source.values[period:] - source.values[:-period]
+        return result
+
+    return _wrap(source.derive("momentum", period, compute=compute).values, series)
+
+
+def stochastic(high, low, close, k_period: int = 14, d_period: int = 3) -> tuple:
+    """
+    KD 隨機指標，回傳 (%K, %D)。%K = 100 * (close - 最低價) / (最高價 - 最低價)，%D 為 %K 的簡單移動平均。
+    區間內最高價等於最低價時 %K 為 NaN。
+    """
+    high_src, low_src, close_src = _Source.of(high), _Source.of(low), _Source.of(close)
+    highest = _rolling_max(high_src, k_period).values
+    lowest = _rolling_min(low_src, k_period).values
+
+    def compute():
+        with np.errstate(divide="ignore", invalid="ignore"):
+            k_values = 100 * (close_src.values - lowest) / (highest - lowest)
+        k_values[highest == lowest] = np.nan
+        return k_values
+
+    key = ("stochastic_k", high_src.key, low_src.key, close_src.key, k_period)
+    k_line = _Source(key, indicator_cache.get_or_compute(key, compute))
+    return _wrap(k_line.values, close), _wrap(_sma(k_line, d_period).values, close)
+
+
+def williams_r(high, low, close, period: int = 14):
+    """威廉指標 %R = -100 * (最高價 - close) / (最高價 - 最低價)，介於 -100 與 0。區間內最高價等於最低價時為 NaN。"""
+    highest = _rolling_max(_Source.of(high), period).values
+    lowest = _rolling_min(_Source.of(low), period).values
+    with np.errstate(divide="ignore", invalid="ignore"):
+        values = -100 * (highest - _values(close)) / (highest - lowest)
+    values[highest == lowest] = np.nan
+    return _wrap(values, close)
+
+
+def cci(high, low, close, period: int = 20):
+    """順勢指標 CCI = (典型價格 - 其均線) / (0.015 * 平均絕對離差)，典型價格為 (high + low + close) / 3。"""
+    typical = _Source.of((_values(high) + _values(low) + _values(close)) / 3)
+    deviation = _mean_deviation(typical, period).values
+    with np.errstate(divide="ignore", invalid="ignore"):
+        values = (typical.values - _sma(typical, period).values) / (0.015 * deviation)
+    values[deviation == 0] = np.nan
+    return _wrap(values, close)
+
+
+# --- 參數矩陣 (一次計算多組參數，供 generate_signal_matrix 使用) ---
+
+def _column_matrix(param_columns: tuple, compute) -> np.ndarray:
+    """
+    將多組參數的指標組成 (K棒數, 參數組數) 矩陣。
+    param_columns 為各參數的陣列 (長度皆為參數組數)；每組不重複的參數只呼叫 compute 一次。
+    """
+    keys = list(zip(*(np.ravel(column).tolist() for column in param_columns)))
+    unique = list(dict.fromkeys(keys))
+    computed = np.column_stack([compute(*key) for key in unique])
+    position = {key: i for i, key in enumerate(unique)}
+    return computed[:, [position[key] for key in keys]]
+
+
+def sma_matrix(series, periods) -> np.ndarray:
+    """每個 period 一欄的簡單移動平均矩陣。"""
+    source = _Source.of(series)
+    return _column_matrix((periods,), lambda period: _sma(source, int(period)).values)
+
+
+def ema_matrix(series, spans) -> np.ndarray:
+    """每個 span 一欄的指數移動平均矩陣。"""
+    source = _Source.of(series)
+    return _column_matrix((spans,), lambda span: _ema(source, int(span)).values)
+
+
+def rsi_matrix(series, periods, smoothing: str = "wilder") -> np.ndarray:
+    """每個 period 一欄的 RSI 矩陣。"""
+    values = _values(series)
+    return _column_matrix((periods,), lambda period: rsi(values, int(period), smoothing))
+
+
+def macd_matrix(series, fast_periods, slow_periods, signal_periods) -> tuple:
+    """每組 (fast, slow, signal) 一欄的 MACD，回傳 (MACD 線矩陣, 訊號線矩陣)。"""
+    values = _values(series)
+    params = np.broadcast_arrays(fast_periods, slow_periods, signal_periods)
+    line = _column_matrix(params, lambda fast, slow, signal: macd(values, int(fast), int(slow), int(signal))[0])
+    signal_line = _column_matrix(params, lambda fast, slow, signal: macd(values, int(fast), int(slow), int(signal))[1])
+    return line, signal_line
+
+
+def _as_matrix(values) -> np.ndarray:
+    """1-D 序列視為一欄；2-D 維持原狀 (門檻陣列請以 thresholds[None, :] 傳入單列)。"""
+    values = np.asarray(values, dtype=np.float64)
+    return values.reshape(-1, 1) if values.ndim == 1 else values
+
+
+def _previous_rows(matrix: np.ndarray) -> np.ndarray:
+    if matrix.shape[0] == 1:
+        return matrix # 單列的門檻不隨時間改變
+    previous = np.empty_like(matrix)
+    previous[0] = np.nan
+    previous[1:] = matrix[:-1]
+    return previous
+
+
+def cross_above_matrix(a, b) -> np.ndarray:
+    """
+    a 由下往上穿越 b 的位置 (a > b 且前一根 a <= b)，與 Strategy/*.py 中以 shift 判斷交叉的寫法相同。
+    a、b 為 (K棒數,) 序列、(K棒數, 參數組數) 矩陣或 (1, 參數組數) 的門檻列，依 numpy 規則廣播。
+    """
+    a, b = _as_matrix(a), _as_matrix(b)
+    return (a > b) & (_previous_rows(a) <= _previous_rows(b))
+
+
+def cross_below_matrix(a, b) -> np.ndarray:
+    """a 由上往下穿越 b 的位置 (a < b 且前一根 a >= b)。參數規則同 cross_above_matrix。"""
+    a, b = _as_matrix(a), _as_matrix(b)
+    return (a < b) & (_previous_rows(a) >= _previous_rows(b))
+
+
+def signal_matrix(buy, sell) -> np.ndarray:
+    """由買進/賣出條件矩陣組成訊號矩陣 (1: 買進, -1: 賣出, 0: 不動作)，賣出優先，與 df.loc 的覆寫順序相同。"""
+    signals = np.asarray(buy).astype(np.int8)
+    signals[np.asarray(sell)] = -1
+    return signals
@@ -0,0 +1,368 @@
+"""
+逐根 K 棒增量更新的指標 (實盤用)。
+
+實盤每次只多一根 K 棒，重新對整段回看視窗計算指標只是為了讀最後一列。
+這裡的指標物件保存必要的狀態，每根 K 棒以 O(1) 更新：
+
+    update(x): 納入一根已收盤的 K 棒並回傳最新值。
+    peek(x):   回傳「若下一根 K 棒為 x」時的值，但不改變狀態，用於尚未收盤、價格仍在變動的 K 棒。
+    seed(xs):  以歷史資料初始化 (只需一次)。
+
+數值與 Indicators.indicators / pandas 的批次計算一致，可用 indicator_parity / strategy_parity 驗證。
+
+策略若要支援增量模式，在模組中定義 create_streaming_strategy(**params)，回傳 StreamingStrategy 子類的實例。
+"""
+import math
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+NAN = float("nan")
+_RESUM_INTERVAL = 1024 # 滾動加總每隔多少次更新重新精確加總一次，避免浮點誤差累積
+
+
+class StreamingIndicator:
+    value = NAN
+
+    def update(self, x: float) -> float:
+        raise NotImplementedError
+
+    def peek(self, x: float) -> float:
+        raise NotImplementedError
+
+    def seed(self, values) -> "StreamingIndicator":
+        for x in values:
+            self.update(float(x))
+        return self
+
+
+class EMA(StreamingIndicator):
+    """指數移動平均，等同 ewm(span=span, adjust=False)。"""
+
+    def __init__(self, span: int = None, alpha: float = None):
+        self.alpha = alpha if alpha is not None else 2 / (span + 1)
+        self.value = NAN
+
+    def peek(self, x):
+        if math.isnan(x):
+            return self.value
+        if math.isnan(self.value):
+            return x
+        return self.value + self.alpha * (x - self.value)
+
+    def update(self, x):
+        self.value = self.peek(x)
+        return self.value
+
+
+class _RollingWindow(StreamingIndicator):
+    """固定長度視窗，保存 (x - offset) 的加總以降低大數相減的誤差。"""
+
+    def __init__(self, period: int):
+        self.period = period
+        self.window = deque()
+        self.offset = None
+        self.total = 0.0
+        self.total_sq = 0.0
+        self.updates = 0
+        self.value = NAN
+
+    def _sums_after(self, x):
+        """回傳加入 x (並移除最舊值) 後的 (count, sum, sum_sq)，x 已減去 offset。"""
+        total = self.total + x
+        total_sq = self.total_sq + x * x
+        count = len(self.window) + 1
+        if count > self.period:
+            oldest = self.window[0]
+            total -= oldest
+            total_sq -= oldest * oldest
+            count -= 1
+        return count, total, total_sq
+
+    def _push(self, x):
+        if self.offset is None:
+            self.offset = x
+        x -= self.offset
+        count, self.total, self.total_sq = self._sums_after(x)
+        self.window.append(x)
+        if len(self.window) > self.period:
+            self.window.popleft()
+        self.updates += 1
+        if self.updates % _RESUM_INTERVAL == 0:
+            self._resum()
+
+    def _resum(self):
+        # 以目前視窗的第一個值作為新的 offset 並重新精確加總
+        new_offset = self.offset + self.window[0]
+        shift = self.window[0]
+        self.window = deque(v - shift for v in self.window)
+        self.offset = new_offset
+        self.total = math.fsum(self.window)
+        self.total_sq = math.fsum(v * v for v in self.window)
+
+
+class RollingSMA(_RollingWindow):
+    """簡單移動平均，等同 rolling(period).mean()。"""
+
+    def _mean(self, count, total):
+        if count < self.period:
+            return NAN
+        return self.offset + total / count
+
+    def peek(self, x):
+        if self.offset is None:
+            return x if self.period == 1 else NAN
+        count, total, _ = self._sums_after(x - self.offset)
+        return self._mean(count, total)
+
+    def update(self, x):
+        self._push(x)
+        self.value = self._mean(len(self.window), self.total)
+        return self.value
+
+
+class RollingStd(_RollingWindow):
+    """滾動標準差，等同 rolling(period).std(ddof=ddof)。"""
+
+    def __init__(self, period: int, ddof: int = 1):
+        super().__init__(period)
+        self.ddof = ddof
+
+    def _std(self, count, total, total_sq):
+        if count < self.period or count - self.ddof <= 0:
+            return NAN
+        variance = (total_sq - total * total / count) / (count - self.ddof)
+        return math.sqrt(max(variance, 0.0))
+
+    def peek(self, x):
+        if self.offset is None:
+            return NAN
+        return self._std(*self._sums_after(x - self.offset))
+
+    def update(self, x):
+        self._push(x)
+        self.value = self._std(len(self.window), self.total, self.total_sq)
+        return self.value
+
+
+class RollingWMA(StreamingIndicator):
+    """
+    線性加權移動平均 (最新權重 period，最舊權重 1)。
+    維護視窗加總 S 與加權加總 W：新值進來時 W' = W - S + period * x，S' = S - 最舊值 + x。
+    """
+
+    def __init__(self, period: int):
+        self.period = period
+        self.window = deque()
+        self.total = 0.0
+        self.weighted = 0.0
+        self.denominator = period * (period + 1) / 2
+        self.updates = 0
+        self.value = NAN
+
+    def _sums_after(self, x):
+        count = len(self.window)
+        if count < self.period:
+            return count + 1, self.total + x, self.weighted + (count + 1) * x
+        return count, self.total - self.window[0] + x, self.weighted - self.total + self.period * x
+
+    def peek(self, x):
+        if math.isnan(x):
+            return NAN
+        count, _, weighted = self._sums_after(x)
+        return weighted / self.denominator if count >= self.period else NAN
+
+    def update(self, x):
+        if math.isnan(x):
+            return self.value
+        count, self.total, self.weighted = self._sums_after(x)
+        self.window.append(x)
+        if len(self.window) > self.period:
+            self.window.popleft()
+        self.updates += 1
+        if self.updates % _RESUM_INTERVAL == 0:
+            self.total = math.fsum(self.window)
+            self.weighted = math.fsum((i + 1) * v for i, v in enumerate(self.window))
+        self.value = self.weighted / self.denominator if count >= self.period else NAN
+        return self.value
+
+
+class HullMA(StreamingIndicator):
+    """Hull 移動平均 WMA(2 * WMA(n/2) - WMA(n), sqrt(n))。"""
+
+    def __init__(self, period: int):
+        self.half = RollingWMA(int(period / 2))
+        self.full = RollingWMA(period)
+        self.smooth = RollingWMA(int(math.sqrt(period)))
+        self.value = NAN
+
+    def peek(self, x):
+        raw = 2 * self.half.peek(x) - self.full.peek(x)
+        return NAN if math.isnan(raw) else self.smooth.peek(raw)
+
+    def update(self, x):
+        raw = 2 * self.half.update(x) - self.full.update(x)
+        if not math.isnan(raw):
+            self.smooth.update(raw)
+        self.value = self.smooth.value
+        return self.value
+
+
+class RSI(StreamingIndicator):
+    """
+    相對強弱指數，與 Indicators.indicators.rsi 一致。
+    smoothing="wilder"：以前 period 個漲跌幅的平均為起始值的 Wilder 平滑。
+    smoothing="ema"：以 ewm(span=period) 平滑漲跌幅 (第一根 K 棒的漲跌幅視為 0)。
+    """
+
+    def __init__(self, period: int = 14, smoothing: str = "wilder"):
+        if smoothing not in ("wilder", "ema"):
+            raise ValueError(f"Unknown RSI smoothing '{smoothing}'.")
+        self.period = period
+        self.smoothing = smoothing
+        self.prev_close = None
+        self.value = NAN
+        if smoothing == "ema":
+            self.avg_gain, self.avg_loss = EMA(span=period), EMA(span=period)
+        else:
+            self.avg_gain, self.avg_loss = EMA(alpha=1 / period), EMA(alpha=1 / period)
+            self.seed_gains = []
+            self.seed_losses = []
+
+    @staticmethod
+    def _rsi(avg_gain, avg_loss):
+        if math.isnan(avg_gain) or math.isnan(avg_loss):
+            return NAN
+        if avg_loss == 0:
+            return NAN if avg_gain == 0 else 100.0
+        return 100 - (100 / (1 + avg_gain / avg_loss))
+
+    def _moves(self, x):
+        if self.prev_close is None:
+            return (0.0, 0.0) if self.smoothing == "ema" else None
+        delta = x - self.prev_close
+        return max(delta, 0.0), max(-delta, 0.0)
+
+    def peek(self, x):
+        moves = self._moves(x)
+        if moves is None:
+            return NAN
+        gain, loss = moves
+        if self.smoothing == "wilder" and math.isnan(self.avg_gain.value):
+            if len(self.seed_gains) + 1 < self.period:
+                return NAN
+            return self._rsi((sum(self.seed_gains) + gain) / self.period, (sum(self.seed_losses) + loss) / self.period)
+        return self._rsi(self.avg_gain.peek(gain), self.avg_loss.peek(loss))
+
+    def update(self, x):
+        moves = self._moves(x)
+        self.prev_close = x
+        if moves is None:
+            return self.value
+        gain, loss = moves
+        if self.smoothing == "wilder" and math.isnan(self.avg_gain.value):
+            self.seed_gains.append(gain)
+            self.seed_losses.append(loss)
+            if len(self.seed_gains) == self.period:
+                self.avg_gain.value = sum(self.seed_gains) / self.period
+                self.avg_loss.value = sum(self.seed_losses) / self.period
+                self.seed_gains, self.seed_losses = [], []
+        else:
+            self.avg_gain.update(gain)
+            self.avg_loss.update(loss)
+        self.value = self._rsi(self.avg_gain.value, self.avg_loss.value)
+        return self.value
+
+
+class MACD(StreamingIndicator):
+    """MACD，值為 (MACD 線, 訊號線, 柱狀圖)。"""
+
+    def __init__(self, fast_period: int = 12, slow_period: int = 26, signal_period: int = 9):
+        self.fast = EMA(span=fast_period)
+        self.slow = EMA(span=slow_period)
+        self.signal = EMA(span=signal_period)
+        self.value = (NAN, NAN, NAN)
+
+    def peek(self, x):
+        line = self.fast.peek(x) - self.slow.peek(x)
+        signal_line = self.signal.peek(line)
+        return line, signal_line, line - signal_line
+
+    def update(self, x):
+        line = self.fast.update(x) - self.slow.update(x)
+        signal_line = self.signal.update(line)
+        self.value = (line, signal_line, line - signal_line)
+        return self.value
+
+
+class StreamingStrategy:
+    """
+    增量策略介面。子類實作 _evaluate(bar, commit)：
+    commit=True 時以 update 納入已收盤的 K 棒，False 時以 peek 評估尚未收盤的 K 棒。
+    bar 為具有 close / high / low 等屬性的物件 (例如 DataFrame.itertuples() 的列)。
+    """
+
+    def _evaluate(self, bar, commit: bool) -> int:
+        raise NotImplementedError
+
+    def on_bar(self, bar) -> int:
+        """納入一根已收盤的 K 棒，回傳該根 K 棒的訊號。"""
+        return self._evaluate(bar, commit=True)
+
+    def peek(self, bar) -> int:
+        """回傳尚未收盤的 K 棒目前的訊號，不改變狀態。"""
+        return self._evaluate(bar, commit=False)
+
+    def seed(self, df: pd.DataFrame) -> "StreamingStrategy":
+        for bar in df.itertuples():
+            self.on_bar(bar)
+        return self
+
+
+def crossed_above(prev_a, prev_b, a, b) -> bool:
+    """與批次版 (a > b) & (a.shift(1) <= b.shift(1)) 相同，NaN 比較皆為 False。"""
+    return a > b and prev_a <= prev_b
+
+
+def crossed_below(prev_a, prev_b, a, b) -> bool:
+    return a < b and prev_a >= prev_b
+
+
+def indicator_parity(indicator: StreamingIndicator, values, batch_values, rtol: float = 1e-7, atol: float = 1e-8) -> dict:
+    """
+    比較增量指標與批次計算結果。每一步先 peek 再 update，兩者都需與批次結果一致。
+    batch_values 可為一維陣列，或 (K棒數, k) 的陣列以比較多值指標 (例如 MACD)。
+    """
+    batch_values = np.asarray(batch_values, dtype=np.float64)
+    peeked = np.empty(batch_values.shape)
+    updated = np.empty(batch_values.shape)
+    for i, x in enumerate(np.asarray(values, dtype=np.float64)):
+        peeked[i] = indicator.peek(x)
+        updated[i] = indicator.update(x)
+    ok_peek = np.isclose(peeked, batch_values, rtol=rtol, atol=atol, equal_nan=True)
+    ok_update = np.isclose(updated, batch_values, rtol=rtol, atol=atol, equal_nan=True)
+    mismatches = np.flatnonzero(~(ok_peek & ok_update).reshape(len(batch_values), -1).all(axis=1))
+    return {
+        "bars": len(batch_values),
+        "mismatches": len(mismatches),
+        "first_mismatch": int(mismatches[0]) if len(mismatches) else None,
+        "max_abs_error": float(np.nanmax(np.abs(updated - batch_values))) if np.isfinite(batch_values).any() else 0.0,
+    }
+
+
+def strategy_parity(strategy_module, df: pd.DataFrame, **params) -> dict:
+    """比較策略模組的 create_streaming_strategy 與 generate_signal 在每一根 K 棒上的訊號。"""
+    batch = strategy_module.generate_signal(df.copy(), **params)['signal'].to_numpy()
+    streaming = strategy_module.create_streaming_strategy(**params)
+    peeked, committed = [], []
+    for bar in df.itertuples():
+        peeked.append(streaming.peek(bar))
+        committed.append(streaming.on_bar(bar))
+    mismatches = np.flatnonzero((np.asarray(peeked) != batch) | (np.asarray(committed) != batch))
+    return {
+        "bars": len(batch),
+        "signals": int(np.count_nonzero(batch)),
+        "mismatches": len(mismatches),
+        "first_mismatch": int(mismatches[0]) if len(mismatches) else None,
+    }
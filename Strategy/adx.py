@@ -0,0 +1,20 @@
+REQUIRED_LOOKBACK_PERIODS = 200
+
+from Indicators.indicators import adx
+
+def generate_signal(df, period=14, adx_threshold=25):
+    df = df.copy()
+
+    # 計算 ADX 與 +DI / -DI (Wilder 平滑)
+    df['adx'], df['plus_di'], df['minus_di'] = adx(df['high'], df['low'], df['close'], period)
+
+    # 判斷買賣訊號：趨勢夠強 (ADX 高於門檻) 時，+DI 上穿 -DI 為買，下穿為賣
+    df['signal'] = 0
+    trending = df['adx'] > adx_threshold
+    cond_buy = trending & (df['plus_di'] > df['minus_di']) & (df['plus_di'].shift(1) <= df['minus_di'].shift(1))
+    cond_sell = trending & (df['plus_di'] < df['minus_di']) & (df['plus_di'].shift(1) >= df['minus_di'].shift(1))
+
+    df.loc[cond_buy, 'signal'] = 1
+    df.loc[cond_sell, 'signal'] = -1
+
+    return df
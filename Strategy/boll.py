@@ -0,0 +1,16 @@
+REQUIRED_LOOKBACK_PERIODS = 100
+
+from Indicators.indicators import bollinger_bands
+
+def generate_signal(df, period=20, num_std=2):
+    df = df.copy()
+
+    # 計算布林通道
+    _, df['upper'], df['lower'] = bollinger_bands(df['close'], period, num_std)
+
+    # 判斷買賣訊號：收盤價跌破下軌為買，突破上軌為賣
+    df['signal'] = 0
+    df.loc[df['close'] < df['lower'], 'signal'] = 1
+    df.loc[df['close'] > df['upper'], 'signal'] = -1
+
+    return df
@@ -0,0 +1,19 @@
+REQUIRED_LOOKBACK_PERIODS = 100
+
+from Indicators.indicators import cci
+
+def generate_signal(df, period=20, lower=-100, upper=100):
+    df = df.copy()
+
+    # 計算 CCI
+    df['cci'] = cci(df['high'], df['low'], df['close'], period)
+
+    # 判斷買賣訊號：CCI 由下往上穿越下緣為買，由上往下穿越上緣為賣
+    df['signal'] = 0
+    cond_buy = (df['cci'] > lower) & (df['cci'].shift(1) <= lower)
+    cond_sell = (df['cci'] < upper) & (df['cci'].shift(1) >= upper)
+
+    df.loc[cond_buy, 'signal'] = 1
+    df.loc[cond_sell, 'signal'] = -1
+
+    return df
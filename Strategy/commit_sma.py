@@ -1,11 +1,14 @@
 REQUIRED_LOOKBACK_PERIODS = 50
 
+import numpy as np
+from Indicators.indicators import sma, sma_matrix, cross_above_matrix, cross_below_matrix, signal_matrix
+
 def generate_signal(df):
     n1 = 5
     n2 = 10
     df = df.copy()
-    df['sma_1'] = df['commit_count'].rolling(window=n1).mean()
-    df['sma_2'] = df['commit_count'].rolling(window=n2).mean()
+    df['sma_1'] = sma(df['commit_count'], n1)
+    df['sma_2'] = sma(df['commit_count'], n2)
 
     # 判斷買賣訊號：sma_5 上穿 sma_10 為買，反之為賣
     df['signal'] = 0
@@ -15,4 +18,12 @@ def generate_signal(df):
 
     df.loc[cond_buy, 'signal'] = 1
     df.loc[cond_sell, 'signal'] = -1
-    return df
\ No newline at end of file
+    return df
+
+
+def generate_signal_matrix(df, n1=5, n2=10):
+    # generate_signal 的參數向量化版本：n1、n2 可為陣列，回傳 (K棒數, 參數組數) 的訊號矩陣
+    n1, n2 = np.broadcast_arrays(np.atleast_1d(n1), np.atleast_1d(n2))
+    sma_1 = sma_matrix(df['commit_count'], n1)
+    sma_2 = sma_matrix(df['commit_count'], n2)
+    return signal_matrix(cross_above_matrix(sma_1, sma_2), cross_below_matrix(sma_1, sma_2))
@@ -0,0 +1,20 @@
+REQUIRED_LOOKBACK_PERIODS = 100
+
+from Indicators.indicators import ema
+
+def generate_signal(df, n1=5, n2=20):
+    df = df.copy()
+
+    # 計算短期與長期 EMA
+    df['ema_1'] = ema(df['close'], n1)
+    df['ema_2'] = ema(df['close'], n2)
+
+    # 判斷買賣訊號：短期 EMA 上穿長期 EMA 為買，反之為賣
+    df['signal'] = 0
+    cond_buy = (df['ema_1'] > df['ema_2']) & (df['ema_1'].shift(1) <= df['ema_2'].shift(1))
+    cond_sell = (df['ema_1'] < df['ema_2']) & (df['ema_1'].shift(1) >= df['ema_2'].shift(1))
+
+    df.loc[cond_buy, 'signal'] = 1
+    df.loc[cond_sell, 'signal'] = -1
+
+    return df
@@ -0,0 +1,19 @@
+REQUIRED_LOOKBACK_PERIODS = 50
+
+from Indicators.indicators import stochastic
+
+def generate_signal(df, k_period=14, d_period=3, oversold=30, overbought=70):
+    df = df.copy()
+
+    # 計算 KD 指標
+    df['%K'], df['%D'] = stochastic(df['high'], df['low'], df['close'], k_period, d_period)
+
+    # 判斷買賣訊號：超賣區 K 上穿 D 為買，超買區 K 下穿 D 為賣
+    df['signal'] = 0
+    cond_buy = (df['%K'] > df['%D']) & (df['%K'].shift(1) <= df['%D'].shift(1)) & (df['%K'] < oversold)
+    cond_sell = (df['%K'] < df['%D']) & (df['%K'].shift(1) >= df['%D'].shift(1)) & (df['%K'] > overbought)
+
+    df.loc[cond_buy, 'signal'] = 1
+    df.loc[cond_sell, 'signal'] = -1
+
+    return df
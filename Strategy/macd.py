@@ -1,19 +1,19 @@
 REQUIRED_LOOKBACK_PERIODS = 200
 
+import numpy as np
 import pandas as pd
+from Indicators.indicators import ema, macd, macd_matrix, cross_above_matrix, cross_below_matrix, signal_matrix
+from Indicators.streaming import StreamingStrategy, MACD, crossed_above, crossed_below
 
 def generate_signal(df, fast_period=12, slow_period=26, signal_period=9):
     df = df.copy()
     
     # 計算 EMA 12 和 EMA 26
-    df['ema_fast'] = df['close'].ewm(span=fast_period, adjust=False).mean()
-    df['ema_slow'] = df['close'].ewm(span=slow_period, adjust=False).mean()
+    df['ema_fast'] = ema(df['close'], fast_period)
+    df['ema_slow'] = ema(df['close'], slow_period)
     
-    # 計算 MACD 線
-    df['macd_line'] = df['ema_fast'] - df['ema_slow']
-    
-    # 計算訊號線 (MACD 線的 EMA)
-    df['signal_line'] = df['macd_line'].ewm(span=signal_period, adjust=False).mean()
+    # 計算 MACD 線與訊號線 (MACD 線的 EMA)
+    df['macd_line'], df['signal_line'], _ = macd(df['close'], fast_period, slow_period, signal_period)
     
     # 判斷買賣訊號
     df['signal'] = 0
@@ -23,4 +23,29 @@ def generate_signal(df, fast_period=12, slow_period=26, signal_period=9):
     df.loc[cond_buy, 'signal'] = 1
     df.loc[cond_sell, 'signal'] = -1
     
-    return df
\ No newline at end of file
+    return df
+
+
+def generate_signal_matrix(df, fast_period=12, slow_period=26, signal_period=9):
+    # generate_signal 的參數向量化版本：各參數可為陣列 (依 numpy 規則廣播成 K 組)，回傳 (K棒數, K) 的訊號矩陣
+    macd_line, signal_line = macd_matrix(df['close'], *np.broadcast_arrays(np.atleast_1d(fast_period), np.atleast_1d(slow_period), np.atleast_1d(signal_period)))
+    return signal_matrix(cross_above_matrix(macd_line, signal_line), cross_below_matrix(macd_line, signal_line))
+
+
+class MacdCrossStreaming(StreamingStrategy):
+    """Incremental version of generate_signal for live trading (O(1) per bar)."""
+
+    def __init__(self, fast_period=12, slow_period=26, signal_period=9):
+        self.macd = MACD(fast_period, slow_period, signal_period)
+        self.prev = (float('nan'), float('nan'))
+
+    def _evaluate(self, bar, commit):
+        macd_line, signal_line, _ = self.macd.update(bar.close) if commit else self.macd.peek(bar.close)
+        signal = 1 if crossed_above(*self.prev, macd_line, signal_line) else -1 if crossed_below(*self.prev, macd_line, signal_line) else 0
+        if commit:
+            self.prev = (macd_line, signal_line)
+        return signal
+
+
+def create_streaming_strategy(fast_period=12, slow_period=26, signal_period=9):
+    return MacdCrossStreaming(fast_period, slow_period, signal_period)
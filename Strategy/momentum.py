@@ -0,0 +1,19 @@
+REQUIRED_LOOKBACK_PERIODS = 50
+
+from Indicators.indicators import momentum
+
+def generate_signal(df, period=10):
+    df = df.copy()
+
+    # 計算動量 (收盤價與 period 根 K 棒前的差)
+    df['momentum'] = momentum(df['close'], period)
+
+    # 判斷買賣訊號：動量由負轉正為買，由正轉負為賣
+    df['signal'] = 0
+    cond_buy = (df['momentum'] > 0) & (df['momentum'].shift(1) <= 0)
+    cond_sell = (df['momentum'] < 0) & (df['momentum'].shift(1) >= 0)
+
+    df.loc[cond_buy, 'signal'] = 1
+    df.loc[cond_sell, 'signal'] = -1
+
+    return df
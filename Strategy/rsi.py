@@ -2,26 +2,14 @@ REQUIRED_LOOKBACK_PERIODS = 200
 
 import pandas as pd
 import numpy as np
+from Indicators.indicators import rsi, rsi_matrix, cross_above_matrix, cross_below_matrix, signal_matrix
+from Indicators.streaming import StreamingStrategy, RSI
 
 def generate_signal(df, period=14, buy_threshold=30, sell_threshold=70):
     df = df.copy()
     
-    # 計算每日價格變化
-    delta = df['close'].diff()
-    
-    # 分離上漲和下跌
-    up_gains = delta.where(delta > 0, 0)
-    down_losses = -delta.where(delta < 0, 0)
-    
-    # 計算平均上漲和平均下跌
-    avg_gain = up_gains.ewm(span=period, adjust=False).mean()
-    avg_loss = down_losses.ewm(span=period, adjust=False).mean()
-    
-    # 計算相對強度 (RS)
-    rs = avg_gain / avg_loss
-    
-    # 計算 RSI
-    df['rsi'] = 100 - (100 / (1 + rs))
+    # 計算 RSI (以 EMA 平滑每日漲跌幅)
+    df['rsi'] = rsi(df['close'], period, smoothing="ema")
     
     # 判斷買賣訊號
     df['signal'] = 0
@@ -35,4 +23,39 @@ def generate_signal(df, period=14, buy_threshold=30, sell_threshold=70):
     df.loc[cond_buy_oversold, 'signal'] = 1
     df.loc[cond_sell_overbought, 'signal'] = -1
     
-    return df
\ No newline at end of file
+    return df
+
+
+def generate_signal_matrix(df, period=14, buy_threshold=30, sell_threshold=70):
+    # generate_signal 的參數向量化版本：各參數可為陣列 (依 numpy 規則廣播成 K 組)，回傳 (K棒數, K) 的訊號矩陣。
+    # 相同 period 的 RSI 只計算一次，門檻的掃描只是廣播比較
+    period, buy_threshold, sell_threshold = np.broadcast_arrays(np.atleast_1d(period), np.atleast_1d(buy_threshold), np.atleast_1d(sell_threshold))
+    rsi_values = rsi_matrix(df['close'], period, smoothing="ema")
+    cond_buy_oversold = cross_above_matrix(rsi_values, buy_threshold[None, :])
+    cond_sell_overbought = cross_below_matrix(rsi_values, sell_threshold[None, :])
+    return signal_matrix(cond_buy_oversold, cond_sell_overbought)
+
+
+class RsiThresholdStreaming(StreamingStrategy):
+    """Incremental version of generate_signal for live trading (O(1) per bar)."""
+
+    def __init__(self, period=14, buy_threshold=30, sell_threshold=70):
+        self.rsi = RSI(period, smoothing="ema")
+        self.buy_threshold = buy_threshold
+        self.sell_threshold = sell_threshold
+        self.prev_rsi = float('nan')
+
+    def _evaluate(self, bar, commit):
+        value = self.rsi.update(bar.close) if commit else self.rsi.peek(bar.close)
+        signal = 0
+        if value > self.buy_threshold and self.prev_rsi <= self.buy_threshold:
+            signal = 1
+        if value < self.sell_threshold and self.prev_rsi >= self.sell_threshold:
+            signal = -1
+        if commit:
+            self.prev_rsi = value
+        return signal
+
+
+def create_streaming_strategy(period=14, buy_threshold=30, sell_threshold=70):
+    return RsiThresholdStreaming(period, buy_threshold, sell_threshold)
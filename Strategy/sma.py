@@ -1,6 +1,9 @@
 REQUIRED_LOOKBACK_PERIODS = 50
 
+import numpy as np
 import pandas as pd
+from Indicators.indicators import sma, sma_matrix, cross_above_matrix, cross_below_matrix, signal_matrix
+from Indicators.streaming import StreamingStrategy, RollingSMA, crossed_above, crossed_below
 
 def generate_signal(df: pd.DataFrame) -> pd.DataFrame:
     """
@@ -17,8 +20,8 @@ def generate_signal(df: pd.DataFrame) -> pd.DataFrame:
     n2 = 10 # Long-term SMA period
 
     # Calculate SMAs
-    df['sma_1'] = df['close'].rolling(window=n1).mean()
-    df['sma_2'] = df['close'].rolling(window=n2).mean()
+    df['sma_1'] = sma(df['close'], n1)
+    df['sma_2'] = sma(df['close'], n2)
 
     # Generate signals
     df['signal'] = 0
@@ -34,3 +37,43 @@ def generate_signal(df: pd.DataFrame) -> pd.DataFrame:
     df['signal'] = df['signal'].fillna(0).astype(int)
 
     return df
+
+
+def generate_signal_matrix(df: pd.DataFrame, n1=5, n2=10) -> np.ndarray:
+    """
+    Parameter-vectorized version of generate_signal for parameter sweeps.
+
+    Args:
+        df (pd.DataFrame): DataFrame containing 'close' prices.
+        n1, n2 (int | array-like): Short/long SMA periods, broadcast against each other into K parameter sets.
+
+    Returns:
+        np.ndarray: (bars, K) signal matrix; column k equals generate_signal's 'signal' column for parameter set k.
+    """
+    n1, n2 = np.broadcast_arrays(np.atleast_1d(n1), np.atleast_1d(n2))
+    sma_1 = sma_matrix(df['close'], n1)
+    sma_2 = sma_matrix(df['close'], n2)
+    return signal_matrix(cross_above_matrix(sma_1, sma_2), cross_below_matrix(sma_1, sma_2))
+
+
+class SmaCrossStreaming(StreamingStrategy):
+    """Incremental version of generate_signal for live trading (O(1) per bar)."""
+
+    def __init__(self, n1=5, n2=10):
+        self.sma_1 = RollingSMA(n1)
+        self.sma_2 = RollingSMA(n2)
+        self.prev = (float('nan'), float('nan'))
+
+    def _evaluate(self, bar, commit):
+        if commit:
+            sma_1, sma_2 = self.sma_1.update(bar.close), self.sma_2.update(bar.close)
+        else:
+            sma_1, sma_2 = self.sma_1.peek(bar.close), self.sma_2.peek(bar.close)
+        signal = 1 if crossed_above(*self.prev, sma_1, sma_2) else -1 if crossed_below(*self.prev, sma_1, sma_2) else 0
+        if commit:
+            self.prev = (sma_1, sma_2)
+        return signal
+
+
+def create_streaming_strategy():
+    return SmaCrossStreaming()
@@ -2,17 +2,11 @@ REQUIRED_LOOKBACK_PERIODS = 676
 
 import pandas as pd
 import numpy as np
-
-def ema(series, span):
-    return series.ewm(span=span, adjust=False).mean()
+from Indicators.indicators import ema, hma
+from Indicators.streaming import StreamingStrategy, EMA, HullMA, crossed_above, crossed_below
 
 def hull_moving_average(series, period):
-    half_length = int(period / 2)
-    sqrt_length = int(np.sqrt(period))
-    wma_half = series.rolling(window=half_length).mean()
-    wma_full = series.rolling(window=period).mean()
-    hull = 2 * wma_half - wma_full
-    return hull.rolling(window=sqrt_length).mean()
+    return hma(series, period)
 
 def generate_signal(df):
     df = df.copy()
@@ -60,3 +54,39 @@ def generate_signal(df):
     df.loc[cond_sell, 'signal'] = -1
 
     return df
+
+
+class SmartMoneyStreaming(StreamingStrategy):
+    """Incremental version of generate_signal for live trading (O(1) per bar)."""
+
+    EMA_SPANS = (144, 169, 288, 338, 576, 676)
+
+    def __init__(self):
+        self.emas = {span: EMA(span=span) for span in self.EMA_SPANS}
+        self.main_hull = HullMA(55)
+        self.second_hull = HullMA(21)
+        self.prev_hulls = (float('nan'), float('nan'))
+
+    def _evaluate(self, bar, commit):
+        close = bar.close
+        if commit:
+            e = {span: indicator.update(close) for span, indicator in self.emas.items()}
+            main_hull, second_hull = self.main_hull.update(close), self.second_hull.update(close)
+        else:
+            e = {span: indicator.peek(close) for span, indicator in self.emas.items()}
+            main_hull, second_hull = self.main_hull.peek(close), self.second_hull.peek(close)
+
+        trend_up = e[144] > e[169] and e[288] > e[338] and main_hull > second_hull
+        trend_down = e[144] < e[169] and e[288] < e[338] and main_hull < second_hull
+        signal = 0
+        if crossed_above(*self.prev_hulls, main_hull, second_hull) and trend_up:
+            signal = 1
+        elif crossed_below(*self.prev_hulls, main_hull, second_hull) and trend_down:
+            signal = -1
+        if commit:
+            self.prev_hulls = (main_hull, second_hull)
+        return signal
+
+
+def create_streaming_strategy():
+    return SmartMoneyStreaming()
@@ -0,0 +1,19 @@
+REQUIRED_LOOKBACK_PERIODS = 50
+
+from Indicators.indicators import williams_r
+
+def generate_signal(df, period=14, oversold=-80, overbought=-20):
+    df = df.copy()
+
+    # 計算威廉指標 %R
+    df['%R'] = williams_r(df['high'], df['low'], df['close'], period)
+
+    # 判斷買賣訊號：%R 離開超賣區為買，離開超買區為賣
+    df['signal'] = 0
+    cond_buy = (df['%R'] > oversold) & (df['%R'].shift(1) <= oversold)
+    cond_sell = (df['%R'] < overbought) & (df['%R'].shift(1) >= overbought)
+
+    df.loc[cond_buy, 'signal'] = 1
+    df.loc[cond_sell, 'signal'] = -1
+
+    return df
@@ -5,6 +5,12 @@ from fastapi.middleware.cors import CORSMiddleware
 from routers.strategy_router import router as strategy_router
 from routers.data_router import router as data_router
 from routers.misc_router import router as misc_router
+from routers.metrics_router import router as metrics_router
+from services import metrics
+from services.sandbox import sandbox_pool
+from services.strategy_service import strategy_service
+from database import run_migrations
+from config import LIVE_RUNNER_MODE
 
 # Load environment variables
 from dotenv import load_dotenv
@@ -25,4 +31,38 @@ app.add_middleware(
 app.include_router(strategy_router)
 app.include_router(data_router)
 app.include_router(misc_router)
+app.include_router(metrics_router)
 
+# Metric files of processes from before this start (e.g. runners of the previous deployment) are removed
+@app.on_event("startup")
+def clean_metrics():
+    metrics.remove_dead_processes()
+
+# Pre-warm the strategy sandbox workers so the first backtest doesn't pay for process startup
+@app.on_event("startup")
+def start_sandbox_pool():
+    sandbox_pool.start()
+
+# Bring the database schema up to date (migrations/) before anything reads or writes it
+@app.on_event("startup")
+def migrate_database():
+    run_migrations()
+
+# Pre-fork the live runner workers so starting a strategy hands it to a process that is already connected
+@app.on_event("startup")
+def start_runner_pool():
+    if LIVE_RUNNER_MODE == "process":
+        strategy_service.runner_pool.start()
+
+# Restart live strategies whose runner died (crash, redeploy) from their snapshots, now and then periodically
+@app.on_event("startup")
+def start_strategy_supervisor():
+    strategy_service.start_supervisor()
+
+@app.on_event("shutdown")
+def stop_sandbox_pool():
+    sandbox_pool.shutdown()
+
+@app.on_event("shutdown")
+def stop_runner_pool():
+    strategy_service.runner_pool.shutdown()
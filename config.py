@@ -1,5 +1,6 @@
 from dotenv import load_dotenv
 import os
+import tempfile
 load_dotenv()
 
 # github 設定
@@ -7,6 +8,49 @@ GITHUB_TOKEN = os.environ.get('GITHUB_TOKEN')
 github_headers = {'Authorization': f'token {GITHUB_TOKEN}'} if GITHUB_TOKEN else {}
 
 
+# 使用者策略沙盒 (services/sandbox.py) 設定
+SANDBOX_WORKERS = int(os.environ.get('SANDBOX_WORKERS', 2)) # 預先啟動的工作行程數
+SANDBOX_CPU_SECONDS = int(os.environ.get('SANDBOX_CPU_SECONDS', 60)) # 每個任務的 CPU 時間上限 (秒)
+SANDBOX_MEMORY_LIMIT_MB = int(os.environ.get('SANDBOX_MEMORY_LIMIT_MB', 2048)) # 策略程式碼可用的記憶體上限 (MB，不含工作行程本身已載入的部分)，0 為不限制
+SANDBOX_TIMEOUT_SECONDS = float(os.environ.get('SANDBOX_TIMEOUT_SECONDS', 120)) # 每個任務的執行時間上限 (秒)
+SANDBOX_MAX_TASKS_PER_WORKER = int(os.environ.get('SANDBOX_MAX_TASKS_PER_WORKER', 200)) # 處理這麼多任務後換新的工作行程
+
+
+# 實盤策略執行方式："process" 為每個策略一個行程；"scheduler" 由 services/scheduler.py 的單一行程以 asyncio 同時執行所有策略
+LIVE_RUNNER_MODE = os.environ.get('LIVE_RUNNER_MODE', 'process')
+LIVE_SCHEDULER_WORKERS = int(os.environ.get('LIVE_SCHEDULER_WORKERS', 2)) # 排程器計算訊號用的沙箱工作行程數
+LIVE_SCHEDULER_POLL_SECONDS = float(os.environ.get('LIVE_SCHEDULER_POLL_SECONDS', 5)) # 排程器檢查策略啟動/停止的間隔
+LIVE_RUNNER_POOL_SIZE = int(os.environ.get('LIVE_RUNNER_POOL_SIZE', 4)) # process 模式下預先啟動、等待分派策略的行程數
+LIVE_LEASE_SECONDS = float(os.environ.get('LIVE_LEASE_SECONDS', 30)) # scheduler 模式下節點持有策略租約的時間，未續約即由其他節點接手
+
+# 實盤策略的觸發時機："bar_close" 在每根 K 棒收盤後 (加上穩定延遲) 才抓取並以已收盤 K 棒計算訊號；"poll" 為每 5 秒以形成中的 K 棒計算
+LIVE_SCHEDULING = os.environ.get('LIVE_SCHEDULING', 'bar_close')
+LIVE_BAR_SETTLE_SECONDS = float(os.environ.get('LIVE_BAR_SETTLE_SECONDS', 2)) # 收盤後等待交易所完成 K 棒的秒數
+LIVE_BAR_CONFIRM_RETRIES = int(os.environ.get('LIVE_BAR_CONFIRM_RETRIES', 3)) # 抓到的資料尚未包含剛收盤的 K 棒時重試的次數
+LIVE_BAR_CONFIRM_DELAY_SECONDS = float(os.environ.get('LIVE_BAR_CONFIRM_DELAY_SECONDS', 2)) # 每次重試前等待的秒數
+
+# 實盤策略權益曲線的批次寫入 (services/write_buffer.py)；交易紀錄一律立即寫入
+LIVE_WRITE_BUFFER_ROWS = int(os.environ.get('LIVE_WRITE_BUFFER_ROWS', 200)) # 累積這麼多筆就寫入
+LIVE_WRITE_BUFFER_SECONDS = float(os.environ.get('LIVE_WRITE_BUFFER_SECONDS', 30)) # 最舊一筆等待這麼久就寫入
+
+# 實盤權益曲線的保留政策 (services/equity_store.py)：較舊的逐 K 棒資料壓縮為每小時 OHLC，再更舊的壓縮為每日 OHLC
+EQUITY_RAW_RETENTION_DAYS = float(os.environ.get('EQUITY_RAW_RETENTION_DAYS', 7)) # 逐 K 棒權益點保留天數
+EQUITY_HOURLY_RETENTION_DAYS = float(os.environ.get('EQUITY_HOURLY_RETENTION_DAYS', 90)) # 每小時彙總保留天數，之後併入每日彙總 (永久保留)
+EQUITY_COMPACTION_SECONDS = float(os.environ.get('EQUITY_COMPACTION_SECONDS', 3600)) # 排程器執行壓縮的間隔
+
+# PostgreSQL 上 equity_curves 與 trade_logs 依策略 (LIST) 再依時間 (RANGE) 分區 (services/partitions.py)；分區建立後請勿再修改天數
+EQUITY_PARTITION_DAYS = int(os.environ.get('EQUITY_PARTITION_DAYS', 1)) # 權益點每個時間分區的天數，壓縮後整個分區直接刪除
+TRADE_LOG_PARTITION_DAYS = int(os.environ.get('TRADE_LOG_PARTITION_DAYS', 30)) # 交易紀錄每個時間分區的天數
+PARTITION_ARCHIVE = os.environ.get('PARTITION_ARCHIVE', 'false').lower() == 'true' # true 時舊分區改為分離 (DETACH) 並保留為 archive_ 開頭的資料表，供備份後再刪除
+
+
+# 實盤策略狀態快照 (services/runner_state.py)：重啟或崩潰後由快照恢復持倉與增量指標狀態
+RUNNER_SNAPSHOT_SECONDS = float(os.environ.get('RUNNER_SNAPSHOT_SECONDS', 60)) # 沒有交易時最多隔這麼久存一次快照 (有交易時立即存)
+RUNNER_SUPERVISOR_SECONDS = float(os.environ.get('RUNNER_SUPERVISOR_SECONDS', 30)) # API 檢查並重啟意外結束之實盤策略的間隔
+
+# Prometheus 指標 (services/metrics.py)：API、實盤策略行程與排程器將指標寫入同一目錄，由 GET /metrics 彙總
+METRICS_DIR = os.environ.get('PROMETHEUS_MULTIPROC_DIR', os.path.join(tempfile.gettempdir(), 'backtest-metrics'))
+
 # 預設組件
 PREDEFINED_CRYPTOS = {
     "ethereum": {"binance_symbol": "ETHUSDT", "github_owner": "ethereum", "github_repo": "go-ethereum"},
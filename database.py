@@ -1,6 +1,6 @@
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, Session
-from sqlalchemy import create_engine, Column, Integer, String, Text, DateTime, Float, ForeignKey
+from sqlalchemy import create_engine, Column, Integer, String, Text, DateTime, Float, ForeignKey, Index, LargeBinary
 from sqlalchemy.dialects.postgresql import JSONB # For storing JSON data
 from datetime import datetime
 import os
@@ -44,7 +44,7 @@ class RunningStrategy(Base):
     id = Column(Integer, primary_key=True, index=True)
     strategy_id = Column(Integer, ForeignKey("saved_strategies.id"), unique=True)
     pid = Column(Integer, nullable=True) # Process ID
-    status = Column(String, default="stopped") # running, paused, stopped
+    status = Column(String, default="stopped", index=True) # running, paused, stopped
     started_at = Column(DateTime, default=datetime.now)
     last_updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
 
@@ -61,6 +61,9 @@ class TradeLog(Base):
     commission = Column(Float)
     profit_loss = Column(Float, nullable=True) # For sell trades
 
+    # A strategy's trades in time order (trade log endpoint, strategy overview)
+    __table_args__ = (Index("ix_trade_logs_strategy_timestamp", "running_strategy_id", "timestamp"),)
+
 # Database Model for Equity Curve
 class EquityCurve(Base):
     __tablename__ = "equity_curves"
@@ -70,6 +73,54 @@ class EquityCurve(Base):
     timestamp = Column(DateTime, default=datetime.now)
     equity = Column(Float)
 
+    # One equity point per strategy and bar: live runners upsert on it (services/equity_store.py)
+    __table_args__ = (Index("ix_equity_curves_strategy_timestamp", "running_strategy_id", "timestamp", unique=True),)
+
+# Database Model for compacted equity history: OHLC of equity per hour or day (services/equity_store.py)
+class EquityCurveRollup(Base):
+    __tablename__ = "equity_curve_rollups"
+
+    running_strategy_id = Column(Integer, ForeignKey("running_strategies.id"), primary_key=True)
+    resolution = Column(String, primary_key=True) # "1h" or "1d"
+    bucket_start = Column(DateTime, primary_key=True)
+    open = Column(Float)
+    high = Column(Float)
+    low = Column(Float)
+    close = Column(Float)
+    samples = Column(Integer) # Number of raw equity points summarized
+
+# Database Model for live runner state snapshots, restored after a crash or restart (services/runner_state.py)
+class RunnerSnapshot(Base):
+    __tablename__ = "runner_snapshots"
+
+    running_strategy_id = Column(Integer, ForeignKey("running_strategies.id"), primary_key=True)
+    code_hash = Column(String) # Indicator state is only restored into the same strategy code
+    current_capital = Column(Float)
+    current_holding_shares = Column(Float)
+    last_processed_time = Column(DateTime, nullable=True) # Open time of the last kline a signal was processed for
+    last_committed_time = Column(DateTime, nullable=True) # Open time of the last closed kline in streaming_state
+    streaming_state = Column(LargeBinary, nullable=True) # Pickled attributes of the strategy's StreamingStrategy
+    taken_at = Column(DateTime, default=datetime.now)
+
+# Runner nodes (services/leases.py): live scheduler processes, on any machine, that host live strategies
+class RunnerNode(Base):
+    __tablename__ = "runner_nodes"
+
+    node_id = Column(String, primary_key=True) # host:pid:random suffix
+    hostname = Column(String)
+    pid = Column(Integer)
+    started_at = Column(DateTime, default=datetime.now)
+    heartbeat_at = Column(DateTime, default=datetime.now, index=True)
+
+# Which runner node hosts a running strategy, until expires_at unless the node renews it
+class StrategyLease(Base):
+    __tablename__ = "strategy_leases"
+
+    running_strategy_id = Column(Integer, ForeignKey("running_strategies.id"), primary_key=True)
+    node_id = Column(String, index=True)
+    acquired_at = Column(DateTime, default=datetime.now)
+    expires_at = Column(DateTime, index=True)
+
 # Database Model for GitHub Commit Cache
 class GithubCommitCache(Base):
     __tablename__ = 'github_commit_cache'
@@ -79,8 +130,25 @@ class GithubCommitCache(Base):
     def __repr__(self):
         return f"<GithubCommitCache(id='{self.id}')>"
 
-# Create tables if they don't exist
-Base.metadata.create_all(engine)
+# Database Model for inferred strategy lookbacks (services/lookback.py), keyed by strategy code hash
+class StrategyLookback(Base):
+    __tablename__ = "strategy_lookbacks"
+
+    code_hash = Column(String, primary_key=True) # sha256 of the strategy code
+    lookback_periods = Column(Integer, nullable=True) # None if no stable lookback could be inferred
+    declared_lookback_periods = Column(Integer, nullable=True) # REQUIRED_LOOKBACK_PERIODS at inference time
+    inferred_at = Column(DateTime, default=datetime.now)
+
+# The schema is managed by the Alembic migrations in migrations/: a model change needs a new revision
+def run_migrations():
+    """Upgrades the database to the newest migration (alembic upgrade head); databases created with the
+    former create_all are adopted by the baseline revision."""
+    from alembic import command
+    from alembic.config import Config
+
+    alembic_config = Config(os.path.join(os.path.dirname(os.path.abspath(__file__)), "alembic.ini"))
+    alembic_config.attributes["configure_logger"] = False # Keep the application's logging configuration
+    command.upgrade(alembic_config, "head")
 
 # Dependency to get DB session
 def get_db():
@@ -8,6 +8,10 @@ class StrategyAlreadyRunningException(HTTPException):
     def __init__(self, strategy_id: int, status: str):
         super().__init__(status_code=400, detail=f"Strategy with ID {strategy_id} is already {status}.")
 
+class StrategyNotRunningException(HTTPException):
+    def __init__(self, strategy_id: int):
+        super().__init__(status_code=400, detail=f"Strategy with ID {strategy_id} is not running.")
+
 class StrategyCodeMissingException(HTTPException):
     def __init__(self):
         super().__init__(status_code=400, detail="Strategy name and code are required.")
@@ -31,3 +35,7 @@ class BacktestFailedException(HTTPException):
 class MissingSignalFunctionException(HTTPException):
     def __init__(self):
         super().__init__(status_code=400, detail="Strategy code must contain a 'generate_signal' function.")
+
+class StrategyResourceLimitException(HTTPException):
+    def __init__(self, detail: str = "Strategy exceeded its resource limits."):
+        super().__init__(status_code=422, detail=detail)
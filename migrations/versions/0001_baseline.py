@@ -0,0 +1,130 @@
+"""baseline: the tables database.py used to create with create_all
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def _create_table(name, *columns, indexes=()):
+    # Databases created before migrations existed already have some of the tables; they are adopted as they are
+    if sa.inspect(op.get_bind()).has_table(name):
+        return
+    op.create_table(name, *columns)
+    for index_name, index_columns, unique in indexes:
+        op.create_index(index_name, name, index_columns, unique=unique)
+
+
+def upgrade():
+    _create_table(
+        "saved_strategies",
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("name", sa.String),
+        sa.Column("code", sa.Text, nullable=False),
+        sa.Column("symbol", sa.String),
+        sa.Column("currency", sa.String),
+        sa.Column("interval", sa.String),
+        sa.Column("initial_capital", sa.Float),
+        sa.Column("commission_rate", sa.Float),
+        sa.Column("slippage", sa.Float),
+        sa.Column("risk_free_rate", sa.Float),
+        sa.Column("github_owner", sa.String, nullable=True),
+        sa.Column("github_repo", sa.String, nullable=True),
+        sa.Column("created_at", sa.DateTime),
+        indexes=[("ix_saved_strategies_id", ["id"], False), ("ix_saved_strategies_name", ["name"], True)],
+    )
+    _create_table(
+        "running_strategies",
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("strategy_id", sa.Integer, sa.ForeignKey("saved_strategies.id"), unique=True),
+        sa.Column("pid", sa.Integer, nullable=True),
+        sa.Column("status", sa.String),
+        sa.Column("started_at", sa.DateTime),
+        sa.Column("last_updated_at", sa.DateTime),
+        indexes=[("ix_running_strategies_id", ["id"], False)],
+    )
+    _create_table(
+        "trade_logs",
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("running_strategy_id", sa.Integer, sa.ForeignKey("running_strategies.id")),
+        sa.Column("timestamp", sa.DateTime),
+        sa.Column("trade_type", sa.String),
+        sa.Column("price", sa.Float),
+        sa.Column("quantity", sa.Float),
+        sa.Column("commission", sa.Float),
+        sa.Column("profit_loss", sa.Float, nullable=True),
+        indexes=[("ix_trade_logs_id", ["id"], False)],
+    )
+    _create_table(
+        "equity_curves",
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("running_strategy_id", sa.Integer, sa.ForeignKey("running_strategies.id")),
+        sa.Column("timestamp", sa.DateTime),
+        sa.Column("equity", sa.Float),
+        indexes=[("ix_equity_curves_id", ["id"], False)],
+    )
+    _create_table(
+        "equity_curve_rollups",
+        sa.Column("running_strategy_id", sa.Integer, sa.ForeignKey("running_strategies.id"), primary_key=True),
+        sa.Column("resolution", sa.String, primary_key=True),
+        sa.Column("bucket_start", sa.DateTime, primary_key=True),
+        sa.Column("open", sa.Float),
+        sa.Column("high", sa.Float),
+        sa.Column("low", sa.Float),
+        sa.Column("close", sa.Float),
+        sa.Column("samples", sa.Integer),
+    )
+    _create_table(
+        "runner_snapshots",
+        sa.Column("running_strategy_id", sa.Integer, sa.ForeignKey("running_strategies.id"), primary_key=True),
+        sa.Column("code_hash", sa.String),
+        sa.Column("current_capital", sa.Float),
+        sa.Column("current_holding_shares", sa.Float),
+        sa.Column("last_processed_time", sa.DateTime, nullable=True),
+        sa.Column("last_committed_time", sa.DateTime, nullable=True),
+        sa.Column("streaming_state", sa.LargeBinary, nullable=True),
+        sa.Column("taken_at", sa.DateTime),
+    )
+    _create_table(
+        "runner_nodes",
+        sa.Column("node_id", sa.String, primary_key=True),
+        sa.Column("hostname", sa.String),
+        sa.Column("pid", sa.Integer),
+        sa.Column("started_at", sa.DateTime),
+        sa.Column("heartbeat_at", sa.DateTime),
+        indexes=[("ix_runner_nodes_heartbeat_at", ["heartbeat_at"], False)],
+    )
+    _create_table(
+        "strategy_leases",
+        sa.Column("running_strategy_id", sa.Integer, sa.ForeignKey("running_strategies.id"), primary_key=True),
+        sa.Column("node_id", sa.String),
+        sa.Column("acquired_at", sa.DateTime),
+        sa.Column("expires_at", sa.DateTime),
+        indexes=[("ix_strategy_leases_node_id", ["node_id"], False), ("ix_strategy_leases_expires_at", ["expires_at"], False)],
+    )
+    _create_table(
+        "github_commit_cache",
+        sa.Column("id", sa.String, primary_key=True),
+        sa.Column("repo_data", postgresql.JSONB, nullable=False),
+    )
+    _create_table(
+        "strategy_lookbacks",
+        sa.Column("code_hash", sa.String, primary_key=True),
+        sa.Column("lookback_periods", sa.Integer, nullable=True),
+        sa.Column("declared_lookback_periods", sa.Integer, nullable=True),
+        sa.Column("inferred_at", sa.DateTime),
+    )
+
+
+def downgrade():
+    for name in ("strategy_lookbacks", "github_commit_cache", "strategy_leases", "runner_nodes", "runner_snapshots",
+                 "equity_curve_rollups", "equity_curves", "trade_logs", "running_strategies", "saved_strategies"):
+        op.drop_table(name)
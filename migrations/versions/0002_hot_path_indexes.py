@@ -0,0 +1,38 @@
+"""hot path indexes: per-strategy time-ordered reads of trade_logs and equity_curves, active running strategies
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def _has_index(table, name) -> bool:
+    return any(index["name"] == name for index in sa.inspect(op.get_bind()).get_indexes(table))
+
+
+def upgrade():
+    # Live runners upsert equity points on (running_strategy_id, timestamp), so it is unique; databases from
+    # before the index may hold several points per bar, of which the newest is kept
+    if not _has_index("equity_curves", "ix_equity_curves_strategy_timestamp"):
+        op.execute("DELETE FROM equity_curves WHERE id NOT IN "
+                   "(SELECT MAX(id) FROM equity_curves GROUP BY running_strategy_id, timestamp)")
+        op.create_index("ix_equity_curves_strategy_timestamp", "equity_curves", ["running_strategy_id", "timestamp"], unique=True)
+    # Trade logs of one strategy in time order: the trade log endpoint and the strategy overview
+    if not _has_index("trade_logs", "ix_trade_logs_strategy_timestamp"):
+        op.create_index("ix_trade_logs_strategy_timestamp", "trade_logs", ["running_strategy_id", "timestamp"])
+    # Runner nodes, the supervisor and the scheduler look up the active strategies every poll
+    if not _has_index("running_strategies", "ix_running_strategies_status"):
+        op.create_index("ix_running_strategies_status", "running_strategies", ["status"])
+
+
+def downgrade():
+    op.drop_index("ix_running_strategies_status", "running_strategies")
+    op.drop_index("ix_trade_logs_strategy_timestamp", "trade_logs")
+    op.drop_index("ix_equity_curves_strategy_timestamp", "equity_curves")
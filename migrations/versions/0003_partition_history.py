@@ -0,0 +1,78 @@
+"""partition equity_curves and trade_logs by strategy and time on PostgreSQL (services/partitions.py)
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19
+"""
+from datetime import timedelta
+
+from alembic import op
+
+from services.partitions import PARTITION_DAYS, create_partitions, period_start
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+TABLES = ("equity_curves", "trade_logs")
+# Columns after id, running_strategy_id and "timestamp"
+COLUMNS = {
+    "equity_curves": ["equity DOUBLE PRECISION"],
+    "trade_logs": ["trade_type VARCHAR", "price DOUBLE PRECISION", "quantity DOUBLE PRECISION", "commission DOUBLE PRECISION",
+                   "profit_loss DOUBLE PRECISION"],
+}
+STRATEGY_TIMESTAMP_INDEX = {"equity_curves": "UNIQUE INDEX ix_equity_curves_strategy_timestamp",
+                            "trade_logs": "INDEX ix_trade_logs_strategy_timestamp"}
+
+
+def _column_names(table):
+    return ", ".join(["id", "running_strategy_id", '"timestamp"'] + [column.split()[0] for column in COLUMNS[table]])
+
+
+def _rebuild(table, partitioned: bool):
+    """Replaces table by a copy of it, partitioned or plain, keeping its id sequence."""
+    old = f"{table}_old"
+    op.execute(f"ALTER TABLE {table} RENAME TO {old}")
+    op.execute(f"ALTER SEQUENCE {table}_id_seq OWNED BY NONE")
+    keys_null = "NOT NULL" if partitioned else "NULL"
+    op.execute(f"CREATE TABLE {table} (id INTEGER NOT NULL DEFAULT nextval('{table}_id_seq'), "
+               f"running_strategy_id INTEGER {keys_null} REFERENCES running_strategies (id), "
+               f"\"timestamp\" TIMESTAMP WITHOUT TIME ZONE {keys_null}, {', '.join(COLUMNS[table])})"
+               + (" PARTITION BY LIST (running_strategy_id)" if partitioned else ""))
+    where = ""
+    if partitioned:
+        connection = op.get_bind()
+        keys = set()
+        for running_strategy_id, first, last in connection.exec_driver_sql(
+                f'SELECT running_strategy_id, MIN("timestamp"), MAX("timestamp") FROM {old} GROUP BY running_strategy_id '
+                f'HAVING running_strategy_id IS NOT NULL AND MIN("timestamp") IS NOT NULL'):
+            start = period_start(table, first)
+            while start <= last:
+                keys.add((running_strategy_id, start))
+                start += timedelta(days=PARTITION_DAYS[table])
+        create_partitions(connection, table, keys)
+        # Rows without a strategy or time were never shown anywhere and have no partition to go to
+        where = ' WHERE running_strategy_id IS NOT NULL AND "timestamp" IS NOT NULL'
+    op.execute(f"INSERT INTO {table} ({_column_names(table)}) SELECT {_column_names(table)} FROM {old}{where}")
+    op.execute(f"DROP TABLE {old}")
+    op.execute(f"ALTER SEQUENCE {table}_id_seq OWNED BY {table}.id")
+    # Primary keys (and unique indexes) of partitioned tables must contain the partition keys
+    op.execute(f"ALTER TABLE {table} ADD PRIMARY KEY " + ('(id, running_strategy_id, "timestamp")' if partitioned else "(id)"))
+    op.execute(f"CREATE INDEX ix_{table}_id ON {table} (id)")
+    op.execute(f'CREATE {STRATEGY_TIMESTAMP_INDEX[table]} ON {table} (running_strategy_id, "timestamp")')
+
+
+def upgrade():
+    # SQLite and other databases without declarative partitioning keep the plain tables
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    for table in TABLES:
+        _rebuild(table, partitioned=True)
+
+
+def downgrade():
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    for table in TABLES:
+        _rebuild(table, partitioned=False)
@@ -0,0 +1,11 @@
+from fastapi import APIRouter, Response
+
+from services import metrics
+
+router = APIRouter()
+
+
+@router.get("/metrics")
+async def get_metrics():
+    body, content_type = metrics.render()
+    return Response(content=body, media_type=content_type)
@@ -1,4 +1,7 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Depends
+from sqlalchemy.orm import Session
+
+from database import get_db
 
 from services.misc_service import MiscService
 
@@ -14,8 +17,14 @@ async def get_strategy_list():
 async def get_strategy_code(strategy_name: str):
     return misc_service.get_strategy_code(strategy_name)
 
+@router.get("/strategy_metadata/{strategy_name}")
+async def get_strategy_metadata(strategy_name: str, db: Session = Depends(get_db)):
+    return misc_service.get_strategy_metadata(strategy_name, db)
+
+# A plain def: FastAPI runs it in its threadpool, so a backtest waiting on the sandbox pool (up to
+# SANDBOX_TIMEOUT_SECONDS) does not block the event loop, and concurrent backtests use every pool worker
 @router.post("/run_backtest")
-async def run_backtest(
+def run_backtest(
     request: dict,
 ):
     symbol = request.get("symbol")
@@ -2,11 +2,10 @@ from fastapi import APIRouter, HTTPException, Depends
 from sqlalchemy.orm import Session
 
 from database import get_db
-from services.strategy_service import StrategyService
+from services.strategy_service import strategy_service
 
 router = APIRouter()
 
-strategy_service = StrategyService()
 
 @router.post("/strategies")
 async def save_strategy(request: dict, db: Session = Depends(get_db)):
@@ -28,6 +27,18 @@ async def start_strategy(strategy_id: int, db: Session = Depends(get_db)):
 async def stop_strategy(strategy_id: int, db: Session = Depends(get_db)):
     return strategy_service.stop_strategy(strategy_id, db)
 
+@router.post("/strategies/{strategy_id}/pause")
+async def pause_strategy(strategy_id: int, db: Session = Depends(get_db)):
+    return strategy_service.pause_strategy(strategy_id, db)
+
+@router.post("/strategies/{strategy_id}/resume")
+async def resume_strategy(strategy_id: int, db: Session = Depends(get_db)):
+    return strategy_service.resume_strategy(strategy_id, db)
+
+@router.post("/strategies/{strategy_id}/reload")
+async def reload_strategy(strategy_id: int, db: Session = Depends(get_db)):
+    return strategy_service.reload_strategy(strategy_id, db)
+
 @router.get("/strategies/{strategy_id}/status")
 async def get_strategy_status(strategy_id: int, db: Session = Depends(get_db)):
     return strategy_service.get_strategy_status(strategy_id, db)
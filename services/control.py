@@ -0,0 +1,109 @@
+import json
+import multiprocessing
+import queue
+import select
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import NullPool
+
+from database import engine
+
+CONTROL_CHANNEL = "strategy_control"
+COMMANDS = ("stop", "pause", "resume", "reload", "start")
+
+
+class ControlListener:
+    """
+    The receiving end of the control channel, handed to a runner process or the scheduler.
+
+    On PostgreSQL it LISTENs on CONTROL_CHANNEL over its own connection (opened lazily, so the listener can be
+    passed to another process); otherwise it reads a multiprocessing queue created by the API process.
+    running_strategy_id restricts it to commands for one strategy; None receives every command.
+    """
+
+    def __init__(self, running_strategy_id: int | None = None, local_queue=None):
+        self.running_strategy_id = running_strategy_id
+        self.local_queue = local_queue
+        self._connection = None
+
+    def _listen_connection(self):
+        if self._connection is None:
+            # NullPool: a fresh connection rather than one from a pool inherited across fork
+            self._connection = create_engine(engine.url, poolclass=NullPool).raw_connection()
+            self._connection.driver_connection.autocommit = True
+            with self._connection.driver_connection.cursor() as cursor:
+                cursor.execute(f"LISTEN {CONTROL_CHANNEL}")
+        return self._connection.driver_connection
+
+    def wait(self, timeout: float) -> list:
+        """Blocks up to timeout seconds for commands; returns the commands received (possibly none) as dicts."""
+        if self.local_queue is not None:
+            try:
+                commands = [self.local_queue.get(timeout=max(timeout, 0))]
+            except queue.Empty:
+                return []
+            while True:
+                try:
+                    commands.append(self.local_queue.get_nowait())
+                except queue.Empty:
+                    break
+        else:
+            connection = self._listen_connection()
+            if not connection.notifies and select.select([connection], [], [], max(timeout, 0)) == ([], [], []):
+                return []
+            connection.poll()
+            commands = []
+            while connection.notifies:
+                commands.append(json.loads(connection.notifies.pop(0).payload))
+        return [command for command in commands
+                if self.running_strategy_id is None or command.get("running_strategy_id") == self.running_strategy_id]
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+
+class ControlChannel:
+    """
+    Pushes stop/pause/resume/reload/start commands from the API process to live runners.
+
+    On PostgreSQL commands are sent with NOTIFY, so any listener can receive them, including a scheduler
+    started outside the API. Other databases have no NOTIFY; there a multiprocessing queue per listener
+    stands in, which covers the runner processes and the scheduler the API starts itself.
+    """
+
+    def __init__(self):
+        self.use_notify = engine.dialect.name == "postgresql"
+        self._queues = {}
+
+    def listener(self, key, running_strategy_id: int | None = None, context=multiprocessing) -> ControlListener:
+        """
+        A listener to pass to the process started for key (a running strategy id, or "scheduler"). context is
+        the multiprocessing context that process is started with, which its queue has to come from.
+        """
+        local_queue = None
+        if not self.use_notify:
+            local_queue = self._queues[key] = context.Queue()
+        return ControlListener(running_strategy_id, local_queue)
+
+    def rekey(self, key, new_key):
+        """Moves the queue of a listener handed out under key (e.g. to a pre-started runner) to new_key."""
+        if key in self._queues:
+            self._queues[new_key] = self._queues.pop(key)
+
+    def forget(self, key):
+        self._queues.pop(key, None)
+
+    def send(self, command: str, running_strategy_id: int, key=None):
+        """Sends command for running_strategy_id; without NOTIFY it goes to the queue of key (defaults to the strategy id)."""
+        if command not in COMMANDS:
+            raise ValueError(f"Unknown control command '{command}'.")
+        message = {"command": command, "running_strategy_id": running_strategy_id}
+        if self.use_notify:
+            with engine.begin() as connection:
+                connection.execute(text("SELECT pg_notify(:channel, :payload)"), {"channel": CONTROL_CHANNEL, "payload": json.dumps(message)})
+            return
+        local_queue = self._queues.get(running_strategy_id if key is None else key)
+        if local_queue is not None:
+            local_queue.put(message)
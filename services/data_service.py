@@ -1,10 +1,13 @@
 from datetime import datetime, timedelta
+import numpy as np
 import pandas as pd
 import requests
 import time
 import json
 import os
 
+from services.metrics import timed, klines_weight, record_binance_response, FETCH_ERRORS
+
 class DataService:
     def get_crypto_prices(self, symbol, currency, start_date, end_date=None, interval="1d", data_limit=None):
         full_symbol = f"{symbol.upper()}{currency.upper()}"
@@ -20,31 +23,38 @@ class DataService:
             }
             print(f"DEBUG: Fetching latest {data_limit} {full_symbol} klines from Binance API. URL: {url}, Params: {params}")
             try:
-                response = requests.get(url, params=params)
+                with timed("fetch"):
+                    response = requests.get(url, params=params)
+                record_binance_response(response, "klines", klines_weight(data_limit))
                 print(f"DEBUG: Binance API Response Status Code: {response.status_code}")
                 if 'x-mbx-used-weight' in response.headers:
                     print(f"DEBUG: Binance API Used Weight: {response.headers['x-mbx-used-weight']}")
                 if 'x-mbx-used-weight-1m' in response.headers:
                     print(f"DEBUG: Binance API Used Weight (1m): {response.headers['x-mbx-used-weight-1m']}")
                 response.raise_for_status()
-                klines = response.json()
+                with timed("decode"):
+                    klines = response.json()
                 all_klines.extend(klines)
                 print(f"DEBUG: Received {len(klines)} klines from Binance API for data_limit request.")
             except requests.exceptions.HTTPError as e:
+                FETCH_ERRORS.labels("http").inc()
                 print(f"ERROR: HTTP error occurred while fetching {full_symbol} price with data_limit: {e}")
                 if 'response' in locals():
                     print(f"ERROR: Binance API Response Status Code: {response.status_code}")
                     print(f"ERROR: Binance API Response Content: {response.text}")
                 return pd.Series(dtype='float64')
             except requests.exceptions.RequestException as e:
+                FETCH_ERRORS.labels("connection").inc()
                 print(f"ERROR: Failed to connect to Binance API with data_limit: {e}")
                 return pd.Series(dtype='float64')
             except json.JSONDecodeError as e:
+                FETCH_ERRORS.labels("decode").inc()
                 print(f"ERROR: Failed to decode JSON response from Binance API with data_limit: {e}")
                 if 'response' in locals():
                     print(f"ERROR: Raw response content: {response.text}")
                 return pd.Series(dtype='float64')
             except Exception as e:
+                FETCH_ERRORS.labels("other").inc()
                 print(f"ERROR: An unknown error occurred while fetching {full_symbol} price with data_limit: {e}")
                 return pd.Series(dtype='float64')
         else:
@@ -68,7 +78,9 @@ class DataService:
             while True:
                 try:
                     print(f"DEBUG: Requesting data from {datetime.fromtimestamp(params['startTime']/1000)} to {datetime.fromtimestamp(params['endTime']/1000)}")
-                    response = requests.get(url, params=params)
+                    with timed("fetch"):
+                        response = requests.get(url, params=params)
+                    record_binance_response(response, "klines", klines_weight(params["limit"]))
                     print(f"DEBUG: Binance API Response Status Code: {response.status_code}")
                     
                     # Check for rate limit headers
@@ -78,7 +90,8 @@ class DataService:
                         print(f"DEBUG: Binance API Used Weight (1m): {response.headers['x-mbx-used-weight-1m']}")
 
                     response.raise_for_status()  # 檢查 HTTP 請求是否成功
-                    klines = response.json()
+                    with timed("decode"):
+                        klines = response.json()
                     print(f"DEBUG: Received {len(klines)} klines from Binance API.")
 
                     if not klines:
@@ -93,20 +106,24 @@ class DataService:
                     params["startTime"] = klines[-1][6] + 1 # Modified: Use close_time + 1
                     time.sleep(0.1)  # Be kind to the API
                 except requests.exceptions.HTTPError as e:
+                    FETCH_ERRORS.labels("http").inc()
                     print(f"ERROR: HTTP error occurred while fetching {full_symbol} price: {e}")
                     if 'response' in locals():
                         print(f"ERROR: Binance API Response Status Code: {response.status_code}")
                         print(f"ERROR: Binance API Response Content: {response.text}")
                     return pd.Series(dtype='float64')
                 except requests.exceptions.RequestException as e:
+                    FETCH_ERRORS.labels("connection").inc()
                     print(f"ERROR: Failed to connect to Binance API: {e}")
                     return pd.Series(dtype='float64')
                 except json.JSONDecodeError as e:
+                    FETCH_ERRORS.labels("decode").inc()
                     print(f"ERROR: Failed to decode JSON response from Binance API: {e}")
                     if 'response' in locals():
                         print(f"ERROR: Raw response content: {response.text}")
                     return pd.Series(dtype='float64')
                 except Exception as e:
+                    FETCH_ERRORS.labels("other").inc()
                     print(f"ERROR: An unknown error occurred while fetching {full_symbol} price: {e}")
                     return pd.Series(dtype='float64')
         
@@ -114,7 +131,18 @@ class DataService:
             print(f"Warning: No price data fetched for {full_symbol} from Binance. Check symbol, interval or date range.")
             return pd.Series(dtype='float64')
         
-        df = pd.DataFrame(all_klines, columns=[
+        with timed("decode"):
+            df = self.parse_klines(all_klines)
+
+        # Ensure we return only the requested number of data points from the end
+        if data_limit is not None and len(df) > data_limit:
+            df = df.tail(data_limit)
+
+        return df
+
+    def parse_klines(self, klines):
+        # Decode raw Binance kline rows into an OHLCV DataFrame indexed by open_time
+        df = pd.DataFrame(klines, columns=[
             'open_time', 'open', 'high', 'low', 'close', 'volume',
             'close_time', 'quote_asset_volume', 'number_of_trades',
             'taker_buy_base_asset_volume', 'taker_buy_quote_asset_volume', 'ignore'
@@ -126,11 +154,6 @@ class DataService:
         for col in numeric_cols:
             df[col] = pd.to_numeric(df[col])
         df.set_index('open_time', inplace=True)
-        
-        # Ensure we return only the requested number of data points from the end
-        if data_limit is not None and len(df) > data_limit:
-            df = df.tail(data_limit)
-
         return df[['open','high','low','close','volume']]
 
     def get_binance_trading_pairs(self, top_n):
@@ -265,4 +288,40 @@ class DataService:
 
         return df
 
+
+def generate_synthetic_ohlcv(n_bars: int, interval: str = "1min", seed: int = 0, start: str = "2020-01-01") -> pd.DataFrame:
+    """
+    產生以幾何隨機漫步為基礎的合成 OHLCV 資料，欄位與 get_crypto_prices (parse_klines) 的輸出相同，
+    另外附上 commit_sma 需要的 'commit_count' 欄位。
+
+    Args:
+        n_bars (int): K 棒數量。
+        interval (str): pandas 頻率字串，決定 open_time 索引的間隔。
+        seed (int): 亂數種子，固定種子可讓每次產生的資料相同。
+        start (str): 第一根 K 棒的時間。
+
+    Returns:
+        pd.DataFrame: 以 open_time 為索引的 OHLCV DataFrame。
+    """
+    rng = np.random.default_rng(seed)
+    log_returns = rng.normal(0.0, 0.002, n_bars)
+    close = 20000.0 * np.exp(np.cumsum(log_returns))
+    open_ = np.empty(n_bars)
+    open_[0] = close[0]
+    open_[1:] = close[:-1]
+    spread = np.abs(rng.normal(0.0, 0.001, n_bars)) * close
+    high = np.maximum(open_, close) + spread
+    low = np.minimum(open_, close) - spread
+    volume = rng.gamma(2.0, 50.0, n_bars)
+    index = pd.date_range(start=start, periods=n_bars, freq=interval, name="open_time")
+    return pd.DataFrame({
+        "open": open_,
+        "high": high,
+        "low": low,
+        "close": close,
+        "volume": volume,
+        "commit_count": rng.poisson(3.0, n_bars).astype(float),
+    }, index=index)
+
+
 data_service = DataService()
\ No newline at end of file
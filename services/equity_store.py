@@ -0,0 +1,226 @@
+from datetime import datetime, timedelta
+
+import pandas as pd
+from sqlalchemy import func, insert, or_, select, union_all
+from sqlalchemy.orm import Session
+
+from config import EQUITY_RAW_RETENTION_DAYS, EQUITY_HOURLY_RETENTION_DAYS, PARTITION_ARCHIVE
+from database import EquityCurve, EquityCurveRollup, RunningStrategy
+from services.partitions import delete_strategy_rows, retire_partitions
+
+RESOLUTIONS = {"1h": "h", "1d": "D"} # Rollup resolution -> pandas floor frequency
+
+
+def upsert_equity_rows(db: Session, rows: list):
+    """Inserts equity points, replacing the equity of a (running_strategy_id, timestamp) that already has one."""
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        db.execute(insert(EquityCurve), rows)
+        return
+    statement = dialect_insert(EquityCurve)
+    statement = statement.on_conflict_do_update(
+        index_elements=[EquityCurve.running_strategy_id, EquityCurve.timestamp],
+        set_={"equity": statement.excluded.equity},
+    )
+    db.execute(statement, rows)
+
+
+def _ohlc(frame: pd.DataFrame, freq: str) -> pd.DataFrame:
+    """Buckets (bucket_start, open, high, low, close, samples) of time-ordered rows with the same columns at a finer resolution."""
+    grouped = frame.groupby(frame["bucket_start"].dt.floor(freq), sort=True)
+    return pd.DataFrame({
+        "open": grouped["open"].first(),
+        "high": grouped["high"].max(),
+        "low": grouped["low"].min(),
+        "close": grouped["close"].last(),
+        "samples": grouped["samples"].sum(),
+    }).rename_axis("bucket_start").reset_index()
+
+
+def _store_rollups(db: Session, running_strategy_id: int, resolution: str, buckets: pd.DataFrame):
+    """Writes buckets, combining them with rollups already stored for the same buckets (assumed to cover earlier data)."""
+    existing = {
+        rollup.bucket_start: rollup
+        for rollup in db.query(EquityCurveRollup).filter(
+            EquityCurveRollup.running_strategy_id == running_strategy_id,
+            EquityCurveRollup.resolution == resolution,
+            EquityCurveRollup.bucket_start.between(buckets["bucket_start"].iloc[0].to_pydatetime(), buckets["bucket_start"].iloc[-1].to_pydatetime()),
+        )
+    }
+    new_rows = []
+    for bucket in buckets.itertuples(index=False):
+        bucket_start = bucket.bucket_start.to_pydatetime()
+        rollup = existing.get(bucket_start)
+        if rollup is None:
+            new_rows.append({
+                "running_strategy_id": running_strategy_id, "resolution": resolution, "bucket_start": bucket_start,
+                "open": float(bucket.open), "high": float(bucket.high), "low": float(bucket.low),
+                "close": float(bucket.close), "samples": int(bucket.samples),
+            })
+            continue
+        rollup.high = max(rollup.high, float(bucket.high))
+        rollup.low = min(rollup.low, float(bucket.low))
+        rollup.close = float(bucket.close)
+        rollup.samples += int(bucket.samples)
+    if new_rows:
+        db.execute(insert(EquityCurveRollup), new_rows)
+
+
+def _compact_raw(db: Session, running_strategy_id: int, cutoff: datetime) -> int:
+    points = db.query(EquityCurve.timestamp, EquityCurve.equity).filter(
+        EquityCurve.running_strategy_id == running_strategy_id, EquityCurve.timestamp < cutoff
+    ).order_by(EquityCurve.timestamp).all()
+    if not points:
+        return 0
+    frame = pd.DataFrame(points, columns=["bucket_start", "equity"])
+    frame["bucket_start"] = pd.to_datetime(frame["bucket_start"])
+    frame = frame.assign(open=frame["equity"], high=frame["equity"], low=frame["equity"], close=frame["equity"], samples=1)
+    _store_rollups(db, running_strategy_id, "1h", _ohlc(frame, RESOLUTIONS["1h"]))
+    # Whole time partitions before the cutoff go at once; the DELETE only finds rows in one straddling it
+    retire_partitions(db, EquityCurve, running_strategy_id, cutoff, archive=PARTITION_ARCHIVE)
+    db.query(EquityCurve).filter(
+        EquityCurve.running_strategy_id == running_strategy_id, EquityCurve.timestamp < cutoff
+    ).delete(synchronize_session=False)
+    return len(points)
+
+
+def _compact_hourly(db: Session, running_strategy_id: int, cutoff: datetime) -> int:
+    hourly = db.query(EquityCurveRollup).filter(
+        EquityCurveRollup.running_strategy_id == running_strategy_id,
+        EquityCurveRollup.resolution == "1h",
+        EquityCurveRollup.bucket_start < cutoff,
+    ).order_by(EquityCurveRollup.bucket_start).all()
+    if not hourly:
+        return 0
+    frame = pd.DataFrame([(rollup.bucket_start, rollup.open, rollup.high, rollup.low, rollup.close, rollup.samples) for rollup in hourly],
+                         columns=["bucket_start", "open", "high", "low", "close", "samples"])
+    frame["bucket_start"] = pd.to_datetime(frame["bucket_start"])
+    _store_rollups(db, running_strategy_id, "1d", _ohlc(frame, RESOLUTIONS["1d"]))
+    db.query(EquityCurveRollup).filter(
+        EquityCurveRollup.running_strategy_id == running_strategy_id,
+        EquityCurveRollup.resolution == "1h",
+        EquityCurveRollup.bucket_start < cutoff,
+    ).delete(synchronize_session=False)
+    return len(hourly)
+
+
+def compact_equity(db: Session, now: datetime | None = None, raw_retention_days: float = EQUITY_RAW_RETENTION_DAYS,
+                   hourly_retention_days: float = EQUITY_HOURLY_RETENTION_DAYS) -> dict:
+    """
+    Applies the retention policy: raw equity points older than raw_retention_days become hourly OHLC rollups,
+    and hourly rollups older than hourly_retention_days become daily ones, which are kept. Cutoffs are aligned
+    to whole days so a bucket is always compacted complete. Each strategy is compacted in its own transaction.
+    """
+    now = now or datetime.now()
+    raw_cutoff = (pd.Timestamp(now) - timedelta(days=raw_retention_days)).floor("D").to_pydatetime()
+    hourly_cutoff = (pd.Timestamp(now) - timedelta(days=hourly_retention_days)).floor("D").to_pydatetime()
+
+    raw_strategies = [row[0] for row in db.query(EquityCurve.running_strategy_id).filter(EquityCurve.timestamp < raw_cutoff).distinct()]
+    hourly_strategies = [row[0] for row in db.query(EquityCurveRollup.running_strategy_id).filter(
+        EquityCurveRollup.resolution == "1h", EquityCurveRollup.bucket_start < hourly_cutoff).distinct()]
+
+    result = {"raw_points_compacted": 0, "hourly_rollups_compacted": 0}
+    for running_strategy_id in sorted(set(raw_strategies) | set(hourly_strategies)):
+        try:
+            result["raw_points_compacted"] += _compact_raw(db, running_strategy_id, raw_cutoff)
+            db.flush()
+            result["hourly_rollups_compacted"] += _compact_hourly(db, running_strategy_id, hourly_cutoff)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+    return result
+
+
+def equity_points(db: Session, running_strategy_id: int, limit: int | None = None) -> list:
+    """
+    The equity curve of a running strategy, oldest first: daily rollup closes, then hourly rollup closes, then
+    the raw points, as dicts with timestamp, equity and resolution ("1d", "1h" or "raw"). With limit, only the
+    latest limit points, read newest-first from the finest table and topped up from coarser ones.
+    """
+    points = []
+    raw = db.query(EquityCurve).filter(EquityCurve.running_strategy_id == running_strategy_id).order_by(EquityCurve.timestamp.desc())
+    for record in (raw.limit(limit) if limit else raw):
+        points.append({"id": record.id, "running_strategy_id": running_strategy_id, "timestamp": record.timestamp,
+                       "equity": record.equity, "resolution": "raw"})
+    for resolution in ("1h", "1d"):
+        if limit and len(points) >= limit:
+            break
+        rollups = db.query(EquityCurveRollup).filter(
+            EquityCurveRollup.running_strategy_id == running_strategy_id, EquityCurveRollup.resolution == resolution
+        )
+        if points:
+            rollups = rollups.filter(EquityCurveRollup.bucket_start < points[-1]["timestamp"])
+        rollups = rollups.order_by(EquityCurveRollup.bucket_start.desc())
+        for rollup in (rollups.limit(limit - len(points)) if limit else rollups):
+            points.append({"id": None, "running_strategy_id": running_strategy_id, "timestamp": rollup.bucket_start,
+                           "equity": rollup.close, "resolution": resolution})
+    points.reverse()
+    return points
+
+
+def latest_equity_points(db: Session, running_strategy_ids: list, limit: int) -> dict:
+    """
+    equity_points(db, running_strategy_id, limit) of many strategies in one query: {running_strategy_id: [(timestamp,
+    equity), ...]}, oldest first, strategies without points left out. Raw points, hourly closes older than the
+    oldest raw point and daily closes older than both are ranked per strategy, newest first, with a window function.
+    Per strategy index lookups bound the input first (the limit-th newest raw point, the oldest raw and hourly ones),
+    so only the candidate rows are ranked, not whole histories.
+    """
+    if not running_strategy_ids:
+        return {}
+    strategy = RunningStrategy.id
+    bounds = select(
+        strategy.label("running_strategy_id"),
+        select(EquityCurve.timestamp).where(EquityCurve.running_strategy_id == strategy).order_by(
+            EquityCurve.timestamp.desc()).offset(limit - 1).limit(1).scalar_subquery().label("raw_cutoff"),
+        select(func.min(EquityCurve.timestamp)).where(EquityCurve.running_strategy_id == strategy).scalar_subquery().label("raw_first"),
+        select(func.min(EquityCurveRollup.bucket_start)).where(
+            EquityCurveRollup.running_strategy_id == strategy, EquityCurveRollup.resolution == "1h").scalar_subquery().label("hourly_first"),
+    ).where(strategy.in_(running_strategy_ids)).cte("bounds").prefix_with("MATERIALIZED") # Looked up once per strategy, not per joined row
+
+    def rollups(resolution: str, *older_than):
+        # Only strategies with fewer than limit raw points are topped up from the rollups
+        return select(EquityCurveRollup.running_strategy_id, EquityCurveRollup.bucket_start.label("timestamp"),
+                      EquityCurveRollup.close.label("equity")).select_from(bounds).join(
+            EquityCurveRollup, EquityCurveRollup.running_strategy_id == bounds.c.running_strategy_id
+        ).where(bounds.c.raw_cutoff.is_(None), EquityCurveRollup.resolution == resolution,
+                *[or_(first.is_(None), EquityCurveRollup.bucket_start < first) for first in older_than])
+
+    points = union_all(
+        # Without a cutoff (fewer than limit raw points) every raw point from the first on; kept sargable for the index
+        select(EquityCurve.running_strategy_id, EquityCurve.timestamp, EquityCurve.equity).select_from(bounds).join(
+            EquityCurve, EquityCurve.running_strategy_id == bounds.c.running_strategy_id
+        ).where(EquityCurve.timestamp >= func.coalesce(bounds.c.raw_cutoff, bounds.c.raw_first)),
+        rollups("1h", bounds.c.raw_first),
+        rollups("1d", bounds.c.raw_first, bounds.c.hourly_first),
+    ).subquery()
+    ranked = select(points.c.running_strategy_id, points.c.timestamp, points.c.equity, func.row_number().over(
+        partition_by=points.c.running_strategy_id, order_by=points.c.timestamp.desc()).label("rank")).subquery()
+    result = {}
+    for running_strategy_id, timestamp, equity in db.execute(
+            select(ranked.c.running_strategy_id, ranked.c.timestamp, ranked.c.equity).where(ranked.c.rank <= limit)
+            .order_by(ranked.c.running_strategy_id, ranked.c.timestamp)):
+        result.setdefault(running_strategy_id, []).append((timestamp, equity))
+    return result
+
+
+def delete_equity(db: Session, running_strategy_id: int):
+    delete_strategy_rows(db, EquityCurve, running_strategy_id)
+    db.query(EquityCurveRollup).filter(EquityCurveRollup.running_strategy_id == running_strategy_id).delete()
+
+
+if __name__ == '__main__':
+    # Applies the retention policy once, e.g. from cron when live strategies run as one process each
+    from database import SessionLocal
+    db = SessionLocal()
+    try:
+        print(compact_equity(db))
+        print(f"equity_curves rows: {db.query(func.count(EquityCurve.id)).scalar()}, "
+              f"equity_curve_rollups rows: {db.query(func.count(EquityCurveRollup.running_strategy_id)).scalar()}")
+    finally:
+        db.close()
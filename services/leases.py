@@ -0,0 +1,190 @@
+import math
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, func, or_
+from sqlalchemy.exc import IntegrityError
+
+from config import LIVE_LEASE_SECONDS
+from database import SessionLocal, RunningStrategy, RunnerNode, StrategyLease
+
+ACTIVE_STATUSES = ("starting", "running", "paused")
+
+
+def new_node_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+class LeaseManager:
+    """
+    Distributes live strategies over runner nodes (scheduler processes, possibly on different machines) through
+    expiring leases in strategy_leases.
+
+    Every sync() a node heartbeats in runner_nodes, renews the leases it holds and claims unleased or expired
+    ones (rows locked with SELECT ... FOR UPDATE SKIP LOCKED where the database has it; the lease itself is
+    taken with an insert or a conditional update, so two nodes never both win) up to its fair share: the active
+    strategies divided by the nodes that heartbeated within one lease period. A node holding more than its share
+    while another live node holds less hands the surplus back, so strategies rebalance when nodes join; when a
+    node leaves or dies, its leases are released or expire and the others claim them, so a strategy is taken
+    over within lease_seconds plus one poll. now can be passed in to simulate time.
+    """
+
+    def __init__(self, node_id: str | None = None, lease_seconds: float = LIVE_LEASE_SECONDS, session_factory=SessionLocal):
+        self.node_id = node_id or new_node_id()
+        self.lease_duration = timedelta(seconds=lease_seconds)
+        self.session_factory = session_factory
+        self.pid = os.getpid()
+
+    def _heartbeat(self, db, now: datetime):
+        node = db.get(RunnerNode, self.node_id)
+        if node is None:
+            db.add(RunnerNode(node_id=self.node_id, hostname=socket.gethostname(), pid=self.pid, started_at=now, heartbeat_at=now))
+        else:
+            node.heartbeat_at = now
+        db.commit()
+
+    def _leases_per_node(self, db, now: datetime) -> dict:
+        live_nodes = [row[0] for row in db.query(RunnerNode.node_id).filter(RunnerNode.heartbeat_at >= now - self.lease_duration)]
+        counts = dict.fromkeys(live_nodes, 0)
+        counts[self.node_id] = 0
+        for node_id, leases in db.query(StrategyLease.node_id, func.count()).filter(
+                StrategyLease.expires_at >= now).group_by(StrategyLease.node_id):
+            if node_id in counts:
+                counts[node_id] = leases
+        return counts
+
+    def _claim(self, db, now: datetime, limit: int) -> list:
+        unleased = db.query(RunningStrategy.id, StrategyLease.node_id, StrategyLease.expires_at).outerjoin(
+            StrategyLease, StrategyLease.running_strategy_id == RunningStrategy.id
+        ).filter(
+            RunningStrategy.status.in_(ACTIVE_STATUSES),
+            or_(StrategyLease.running_strategy_id.is_(None), StrategyLease.expires_at < now),
+        ).order_by(RunningStrategy.id).limit(limit).with_for_update(of=RunningStrategy, skip_locked=True).all()
+        claimed = []
+        for running_strategy_id, node_id, expires_at in unleased:
+            if node_id is None:
+                try:
+                    with db.begin_nested():
+                        db.add(StrategyLease(running_strategy_id=running_strategy_id, node_id=self.node_id, acquired_at=now,
+                                             expires_at=now + self.lease_duration))
+                except IntegrityError:
+                    continue # Another node inserted it first
+            elif not db.query(StrategyLease).filter(
+                    StrategyLease.running_strategy_id == running_strategy_id, StrategyLease.node_id == node_id,
+                    StrategyLease.expires_at == expires_at
+            ).update({"node_id": self.node_id, "acquired_at": now, "expires_at": now + self.lease_duration}, synchronize_session=False):
+                continue
+            claimed.append(running_strategy_id)
+        db.commit()
+        return claimed
+
+    def sync(self, now: datetime | None = None) -> tuple:
+        """
+        One heartbeat/renew/claim round. Returns ({running_strategy_id: (saved_strategy_id, status)} of the
+        strategies this node holds, [running_strategy_ids] it should hand over with release()). A claimed
+        'starting' row becomes 'running' (with pid set to this process, for the status API); an orphaned
+        'paused' row stays paused.
+        """
+        now = now or datetime.now()
+        db = self.session_factory()
+        try:
+            self._heartbeat(db, now)
+            # Leases of strategies stopped or deleted meanwhile are renewed as well: they are no longer hosted, but
+            # stay held until the node has drained their tasks and calls release_stopped()
+            db.query(StrategyLease).filter(StrategyLease.node_id == self.node_id, StrategyLease.expires_at >= now).update(
+                {"expires_at": now + self.lease_duration}, synchronize_session=False)
+            db.commit()
+
+            counts = self._leases_per_node(db, now)
+            active = db.query(func.count(RunningStrategy.id)).filter(RunningStrategy.status.in_(ACTIVE_STATUSES)).scalar()
+            share = math.ceil(active / len(counts)) if active else 0
+            if counts[self.node_id] < share:
+                counts[self.node_id] += len(self._claim(db, now, share - counts[self.node_id]))
+
+            held = db.query(RunningStrategy).join(StrategyLease, StrategyLease.running_strategy_id == RunningStrategy.id).filter(
+                StrategyLease.node_id == self.node_id, StrategyLease.expires_at >= now, RunningStrategy.status.in_(ACTIVE_STATUSES)
+            ).order_by(RunningStrategy.id).all()
+            hosted = {}
+            for row in held:
+                if row.status == "starting" or row.pid != self.pid:
+                    db.query(RunningStrategy).filter(RunningStrategy.id == row.id).update(
+                        {"status": "paused" if row.status == "paused" else "running", "pid": self.pid, "last_updated_at": now},
+                        synchronize_session=False)
+                hosted[row.id] = (row.strategy_id, "paused" if row.status == "paused" else "running")
+            db.commit()
+
+            surplus = []
+            if len(hosted) > share and any(count < share for node_id, count in counts.items() if node_id != self.node_id):
+                # Newest first, so the strategies that have been here longest stay
+                surplus = sorted(hosted, reverse=True)[:len(hosted) - share]
+            return hosted, surplus
+        finally:
+            db.close()
+
+    def release(self, running_strategy_ids):
+        """Gives up leases (after the strategies' tasks were stopped and their state saved) so other nodes claim them."""
+        if not running_strategy_ids:
+            return
+        db = self.session_factory()
+        try:
+            db.query(StrategyLease).filter(
+                StrategyLease.node_id == self.node_id, StrategyLease.running_strategy_id.in_(list(running_strategy_ids))
+            ).delete(synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+
+    def release_stopped(self, keep=()) -> list:
+        """
+        Gives up the leases of strategies that were stopped or deleted, except those in keep (whose tasks are still
+        being stopped). Releasing one tells the API the node has stopped writing for it (see stop_acknowledged).
+        Returns the ids released.
+        """
+        db = self.session_factory()
+        try:
+            rows = db.query(StrategyLease.running_strategy_id).filter(StrategyLease.node_id == self.node_id).outerjoin(
+                RunningStrategy, RunningStrategy.id == StrategyLease.running_strategy_id
+            ).filter(or_(RunningStrategy.id.is_(None), RunningStrategy.status.notin_(ACTIVE_STATUSES))).all()
+            stopped = [row[0] for row in rows if row[0] not in keep]
+            if stopped:
+                db.query(StrategyLease).filter(
+                    StrategyLease.node_id == self.node_id, StrategyLease.running_strategy_id.in_(stopped)
+                ).delete(synchronize_session=False)
+            db.commit()
+            return stopped
+        finally:
+            db.close()
+
+    def leave(self):
+        """Releases every lease and deregisters the node, so the remaining nodes take over at their next poll."""
+        db = self.session_factory()
+        try:
+            db.query(StrategyLease).filter(StrategyLease.node_id == self.node_id).delete(synchronize_session=False)
+            db.query(RunnerNode).filter(RunnerNode.node_id == self.node_id).delete(synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+
+
+def unleased_strategies(db, now: datetime | None = None) -> list:
+    """Ids of active running strategies no node holds a valid lease for."""
+    now = now or datetime.now()
+    return [row[0] for row in db.query(RunningStrategy.id).outerjoin(
+        StrategyLease, and_(StrategyLease.running_strategy_id == RunningStrategy.id, StrategyLease.expires_at >= now)
+    ).filter(RunningStrategy.status.in_(ACTIVE_STATUSES), StrategyLease.running_strategy_id.is_(None))]
+
+
+def stop_acknowledged(db, running_strategy_id: int, now: datetime | None = None) -> bool:
+    """
+    Whether no node holds a valid lease of a stopped strategy any more: its node has drained the strategy's
+    writes and released it, or died (the lease expired), or it was never claimed.
+    """
+    now = now or datetime.now()
+    return db.query(StrategyLease).filter(StrategyLease.running_strategy_id == running_strategy_id,
+                                          StrategyLease.expires_at >= now).first() is None
+
+
+def delete_lease(db, running_strategy_id: int):
+    db.query(StrategyLease).filter(StrategyLease.running_strategy_id == running_strategy_id).delete()
@@ -0,0 +1,302 @@
+from datetime import datetime, timedelta
+import time
+import pandas as pd
+
+from database import TradeLog, EquityCurve
+from services.metrics import timed, record_signal
+
+INTERVAL_TIMEDELTAS = {
+    '1m': timedelta(minutes=1),
+    '3m': timedelta(minutes=3),
+    '5m': timedelta(minutes=5),
+    '15m': timedelta(minutes=15),
+    '30m': timedelta(minutes=30),
+    '1h': timedelta(hours=1),
+    '4h': timedelta(hours=4),
+    '1d': timedelta(days=1),
+}
+
+# Number of most recent klines fetched per loop once a streaming strategy has been seeded:
+# the forming bar plus the bar(s) that closed since the previous loop.
+STREAMING_FETCH_LIMIT = 3
+# Binance returns at most this many klines per request
+MAX_FETCH_LIMIT = 1000
+
+
+def calculate_start_dt(end_dt, interval, lookback_periods=200):
+    interval_delta = INTERVAL_TIMEDELTAS.get(interval)
+    if interval_delta is None:
+        print(f"Warning: Unknown interval '{interval}'. Defaulting to 365 days lookback.")
+        return end_dt - timedelta(days=365)
+    return end_dt - interval_delta * lookback_periods
+
+
+def next_bar_close(interval_delta: timedelta, now: float | None = None) -> float:
+    """Epoch seconds of the next kline close; Binance klines are aligned to multiples of the interval since the epoch (UTC)."""
+    now = time.time() if now is None else now
+    seconds = interval_delta.total_seconds()
+    return (now // seconds + 1) * seconds
+
+
+def bar_time(epoch_seconds: float) -> pd.Timestamp:
+    """An epoch time as a naive UTC timestamp, comparable to the open_time index of DataService klines."""
+    return pd.Timestamp(int(epoch_seconds * 1000), unit='ms')
+
+
+def latest_signal_row(df_with_signal):
+    """(signal, close, open_time) of the last kline of a generate_signal result."""
+    latest_signal_row = df_with_signal.iloc[-1]
+    return latest_signal_row['signal'], latest_signal_row['close'], df_with_signal.index[-1]
+
+
+class LiveStrategyRunner:
+    """
+    Holds the trading state of one live strategy: fetching its data window, computing the latest
+    signal and turning it into paper trades and equity points. The caller owns the loop and the DB session.
+
+    Strategies that define create_streaming_strategy() are seeded from the lookback window once and then
+    updated incrementally from the few most recent klines; all others recompute generate_signal over the
+    whole lookback window every loop.
+    """
+
+    def __init__(self, data_service, running_strategy_id: int, saved_strategy_record, strategy_module, lookback_periods: int | None = None):
+        self.data_service = data_service
+        self.running_strategy_id = running_strategy_id
+        self.strategy_module = strategy_module
+
+        self.name = saved_strategy_record.name
+        self.symbol = saved_strategy_record.symbol
+        self.currency = saved_strategy_record.currency
+        self.interval = saved_strategy_record.interval
+        self.initial_capital = saved_strategy_record.initial_capital
+        self.commission_rate = saved_strategy_record.commission_rate
+        self.slippage = saved_strategy_record.slippage
+        self.github_owner = saved_strategy_record.github_owner
+        self.github_repo = saved_strategy_record.github_repo
+
+        # An inferred lookback (services/lookback.py) takes precedence over the hand-set REQUIRED_LOOKBACK_PERIODS
+        self.lookback_periods = lookback_periods or getattr(strategy_module, 'REQUIRED_LOOKBACK_PERIODS', 100)
+
+        self.current_capital = self.initial_capital
+        self.current_holding_shares = 0
+        self.last_processed_time = None
+
+        self.interval_delta = INTERVAL_TIMEDELTAS.get(self.interval)
+        self.streaming = None
+        self.last_committed_time = None
+        if hasattr(strategy_module, 'create_streaming_strategy') and self.interval_delta is not None:
+            self.streaming = strategy_module.create_streaming_strategy()
+
+    def take_position_from(self, other):
+        """Carries over the paper position of the runner this one replaces (e.g. after a reload); returns self."""
+        self.current_capital = other.current_capital
+        self.current_holding_shares = other.current_holding_shares
+        self.last_processed_time = other.last_processed_time
+        return self
+
+    def snapshot(self) -> dict:
+        """The state needed to resume this runner elsewhere: paper position, last processed kline and streaming indicator state."""
+        return {
+            "current_capital": self.current_capital,
+            "current_holding_shares": self.current_holding_shares,
+            "last_processed_time": self.last_processed_time,
+            "last_committed_time": self.last_committed_time if self.streaming is not None else None,
+            "streaming_state": dict(vars(self.streaming)) if self.streaming is not None and self.last_committed_time is not None else None,
+        }
+
+    def restore(self, state: dict):
+        """Resumes from a snapshot(); without streaming_state the strategy is seeded from a lookback window as on a fresh start."""
+        self.current_capital = state["current_capital"]
+        self.current_holding_shares = state["current_holding_shares"]
+        self.last_processed_time = state["last_processed_time"]
+        if self.streaming is not None and state.get("streaming_state") is not None:
+            vars(self.streaming).update(state["streaming_state"])
+            self.last_committed_time = state["last_committed_time"]
+        return self
+
+    def fetch_window(self, closed_before=None):
+        """
+        The lookback window of klines up to now. With closed_before (a bar open time), only klines that opened
+        before it are kept, so the last row is the most recently closed kline instead of the forming one.
+        """
+        end_dt = datetime.now()
+        lookback_periods = self.lookback_periods + (1 if closed_before is not None else 0)
+        start_dt = calculate_start_dt(end_dt, self.interval, lookback_periods)
+        print(f"STRATEGY_RUNNER DEBUG: Strategy calculation data range: start_dt={start_dt}, end_dt={end_dt}, lookback_periods={self.lookback_periods}")
+
+        df = self.data_service.get_crypto_prices(self.symbol, self.currency, start_dt, end_dt, self.interval)
+        print(f"STRATEGY_RUNNER DEBUG: Received {len(df)} klines for strategy calculation.")
+        if df.empty:
+            return df
+        if closed_before is not None:
+            df = df[df.index < closed_before]
+        return self.add_github_commits(df, start_dt, end_dt)
+
+    @property
+    def needs_github_commits(self) -> bool:
+        return self.name == "commit_sma" and bool(self.github_owner and self.github_repo)
+
+    def add_github_commits(self, df, start_dt=None, end_dt=None):
+        """Adds the daily commit_count column for strategies that read it; other strategies get df back unchanged."""
+        if not self.needs_github_commits:
+            return df
+        start_dt = start_dt if start_dt is not None else df.index[0].to_pydatetime()
+        end_dt = end_dt if end_dt is not None else datetime.now()
+        github_commits_df = self.data_service.get_github_commits(self.github_owner, self.github_repo, start_dt, end_dt, {})
+        if github_commits_df.empty:
+            print("STRATEGY_RUNNER WARNING: No GitHub commit data fetched. Strategy might not work as expected.")
+            return df
+        github_commits_count = github_commits_df.groupby(github_commits_df['date'].dt.floor('D')).size().reset_index(name='commit_count')
+        github_commits_count.rename(columns={'date': 'open_time'}, inplace=True)
+        github_commits_count.set_index('open_time', inplace=True)
+        df = pd.merge(df, github_commits_count, left_index=True, right_index=True, how='left')
+        df['commit_count'] = df['commit_count'].fillna(0)
+        return df
+
+    def latest_signal(self, closed_before=None):
+        """
+        Returns (signal, close, open_time) for the latest (still forming) kline, or None if no data was fetched.
+        With closed_before, the signal is for the last kline that opened before it (see fetch_window).
+        """
+        if self.streaming is not None:
+            return self._latest_signal_streaming(closed_before)
+
+        df = self.fetch_window(closed_before)
+        if df.empty:
+            return None
+        with timed("signal"):
+            return latest_signal_row(self.strategy_module.generate_signal(df.copy()))
+
+    def latest_closed_signal(self, bar_close: float, retries: int, retry_delay: float):
+        """
+        latest_signal for the kline that closed at bar_close (epoch seconds). The exchange may publish a kline
+        a little after its close, so the fetch is retried while the newest closed kline is an older one.
+        Returns None if no data was fetched; after the last retry, the signal of the newest closed kline found.
+        """
+        closed_before = bar_time(bar_close)
+        expected = closed_before - self.interval_delta
+        for attempt in range(retries + 1):
+            latest = self.latest_signal(closed_before)
+            if latest is not None and latest[2] >= expected:
+                return latest
+            if attempt < retries:
+                time.sleep(retry_delay)
+        print(f"STRATEGY_RUNNER WARNING: Kline {expected} of {self.symbol}{self.currency} not available after {retries} retries.")
+        return latest
+
+    def signal_from_window(self, df):
+        """
+        latest_signal for a lookback window fetched by someone else (the market data hub), whose last kline is
+        still forming. A streaming strategy only consumes the klines that closed since its last update and is
+        reseeded from the window when it has fallen behind it.
+        """
+        if self.streaming is None:
+            return latest_signal_row(self.strategy_module.generate_signal(df.copy()))
+        if self.last_committed_time is not None:
+            newer = df[df.index > self.last_committed_time]
+            if newer.empty or newer.index[0] <= self.last_committed_time + self.interval_delta:
+                self._commit_bars(newer.iloc[:-1])
+                return self._peek(df)
+            print(f"STRATEGY_RUNNER WARNING: Gap after {self.last_committed_time} for {self.name}, reseeding streaming state.")
+            self.streaming = self.strategy_module.create_streaming_strategy()
+        self._seed(df)
+        return self._peek(df)
+
+    def _seed(self, df):
+        # Every kline but the last has closed; the last one is still forming and is only peeked at
+        self.streaming.seed(df.iloc[:-1])
+        self.last_committed_time = df.index[-1] - self.interval_delta
+        print(f"STRATEGY_RUNNER: Seeded streaming state of {self.name} with {len(df) - 1} klines.")
+
+    def _commit_bars(self, closed):
+        for bar in closed.itertuples():
+            self.streaming.on_bar(bar)
+            self.last_committed_time = bar.Index
+
+    def _peek(self, df):
+        latest_bar = next(df.iloc[-1:].itertuples())
+        return self.streaming.peek(latest_bar), float(latest_bar.close), latest_bar.Index
+
+    def _latest_signal_streaming(self, closed_before=None):
+        if self.last_committed_time is None:
+            df = self.fetch_window(closed_before)
+            if df.empty:
+                return None
+            closed = None
+        else:
+            # Usually the last closed kline and the forming one; after a restart, every kline closed since the snapshot
+            missed = int((bar_time(time.time()) - self.last_committed_time) / self.interval_delta)
+            if missed > min(self.lookback_periods, MAX_FETCH_LIMIT - 1):
+                print(f"STRATEGY_RUNNER: {missed} klines of {self.name} missed since {self.last_committed_time}, reseeding streaming state.")
+                self.streaming = self.strategy_module.create_streaming_strategy()
+                self.last_committed_time = None
+                return self._latest_signal_streaming(closed_before)
+            data_limit = max(STREAMING_FETCH_LIMIT, missed + 1)
+            df = self.data_service.get_crypto_prices(self.symbol, self.currency, None, None, self.interval, data_limit=data_limit)
+            if closed_before is not None and not df.empty:
+                df = df[df.index < closed_before]
+            if df.empty:
+                return None
+            newer = df[df.index > self.last_committed_time]
+            if not newer.empty and newer.index[0] > self.last_committed_time + self.interval_delta:
+                # Missed more klines than were fetched (e.g. after a long retry sleep): reseed from the full window
+                print(f"STRATEGY_RUNNER WARNING: Gap after {self.last_committed_time} for {self.name}, reseeding streaming state.")
+                self.streaming = self.strategy_module.create_streaming_strategy()
+                self.last_committed_time = None
+                return self._latest_signal_streaming(closed_before)
+            closed = newer.iloc[:-1]
+        with timed("signal"):
+            if closed is None:
+                self._seed(df)
+            else:
+                self._commit_bars(closed)
+            return self._peek(df)
+
+    def process_signal(self, latest_signal, latest_close_price, latest_open_time):
+        """Applies a signal to the paper position. Returns (new TradeLog rows, EquityCurve row)."""
+        trade_logs = []
+        if self.last_processed_time is None or latest_open_time > self.last_processed_time:
+            print(f"STRATEGY_RUNNER: New signal generated at {latest_open_time}: {latest_signal}")
+            record_signal(latest_signal)
+            if latest_signal == 1:
+                if self.current_holding_shares == 0:
+                    buy_price = latest_close_price * (1 + self.slippage)
+                    shares_to_buy = (self.current_capital / (buy_price * (1 + self.commission_rate)))
+                    if shares_to_buy > 0:
+                        commission = shares_to_buy * buy_price * self.commission_rate
+                        self.current_capital -= (shares_to_buy * buy_price + commission)
+                        self.current_holding_shares += shares_to_buy
+                        trade_logs.append(TradeLog(
+                            running_strategy_id=self.running_strategy_id,
+                            timestamp=latest_open_time,
+                            trade_type="buy",
+                            price=buy_price,
+                            quantity=shares_to_buy,
+                            commission=commission
+                        ))
+
+            elif latest_signal == -1:
+                if self.current_holding_shares > 0:
+                    sell_price = latest_close_price * (1 - self.slippage)
+                    commission = self.current_holding_shares * sell_price * self.commission_rate
+                    profit_loss = (self.current_holding_shares * sell_price - (self.initial_capital - self.current_capital)) - commission
+                    self.current_capital += (self.current_holding_shares * sell_price - commission)
+                    trade_logs.append(TradeLog(
+                        running_strategy_id=self.running_strategy_id,
+                        timestamp=latest_open_time,
+                        trade_type="sell",
+                        price=sell_price,
+                        quantity=self.current_holding_shares,
+                        commission=commission,
+                        profit_loss=profit_loss
+                    ))
+                    self.current_holding_shares = 0
+
+        current_equity = self.current_capital + self.current_holding_shares * latest_close_price
+        equity_record = EquityCurve(
+            running_strategy_id=self.running_strategy_id,
+            timestamp=latest_open_time,
+            equity=current_equity
+        )
+        self.last_processed_time = latest_open_time
+        return trade_logs, equity_record
@@ -0,0 +1,101 @@
+import math
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from services.data_service import generate_synthetic_ohlcv
+from database import StrategyLookback
+from services.strategy_loader import strategy_code_hash, strategy_loader
+
+# The inferred window is padded by this factor, since the synthetic data cannot cover every market regime
+LOOKBACK_SAFETY_MARGIN = 1.25
+MAX_INFERRED_LOOKBACK = 4096
+
+
+def _last_signal(strategy_module, window) -> int:
+    value = strategy_module.generate_signal(window.copy())['signal'].iloc[-1]
+    return 0 if value != value else int(value) # NaN counts as no signal
+
+
+def _choose_endpoints(reference: np.ndarray, start: int, count: int, rng) -> np.ndarray:
+    """Bars whose last signal is checked: up to half with a non-zero reference signal, the rest without."""
+    candidates = np.arange(start, len(reference))
+    active = candidates[reference[candidates] != 0]
+    inactive = candidates[reference[candidates] == 0]
+    active = active[np.linspace(0, len(active) - 1, min(len(active), count // 2)).astype(int)] if len(active) else active
+    inactive = rng.choice(inactive, min(len(inactive), count - len(active)), replace=False) if len(inactive) else inactive
+    return np.sort(np.concatenate((active, inactive)))
+
+
+def infer_lookback(strategy_module, max_lookback: int = MAX_INFERRED_LOOKBACK, endpoints: int = 120, seed: int = 0) -> int | None:
+    """
+    Finds the smallest number of bars a strategy needs for its latest signal to match a run over the full history.
+
+    The strategy is run on synthetic data once over the whole series (the reference) and then on windows of
+    increasing length ending at sampled bars; the window is stable when the last signal of every window matches
+    the reference at that bar. Lengths are doubled until stable and then bisected. Returns the stable length
+    padded by LOOKBACK_SAFETY_MARGIN, or None if the strategy produces no signals on the synthetic data or is not
+    stable within max_lookback bars.
+    """
+    df = generate_synthetic_ohlcv(max_lookback + 4 * endpoints, seed=seed)
+    reference = strategy_module.generate_signal(df.copy())['signal'].to_numpy(dtype=np.float64)
+    reference = np.nan_to_num(reference, nan=0.0)
+    checked = _choose_endpoints(reference, max_lookback, endpoints, np.random.default_rng(seed))
+    if not np.any(reference[checked] != 0):
+        return None
+
+    def stable(length: int) -> bool:
+        return all(_last_signal(strategy_module, df.iloc[end - length + 1:end + 1]) == reference[end] for end in checked)
+
+    low, high = 1, 2
+    while not stable(high):
+        if high >= max_lookback:
+            return None
+        low, high = high, min(2 * high, max_lookback)
+    # Invariant: low is unstable (or trivially small), high is stable
+    while high - low > 1:
+        middle = (low + high) // 2
+        if stable(middle):
+            high = middle
+        else:
+            low = middle
+    return math.ceil(high * LOOKBACK_SAFETY_MARGIN)
+
+
+def load_lookback(db: Session, strategy_code: str) -> tuple:
+    """Returns (found, lookback_periods) of the inference stored for this code."""
+    record = db.query(StrategyLookback).filter(StrategyLookback.code_hash == strategy_code_hash(strategy_code)).first()
+    return (True, record.lookback_periods) if record is not None else (False, None)
+
+
+def store_lookback(db: Session, strategy_code: str, lookback_periods: int | None, declared_lookback_periods: int | None):
+    db.merge(StrategyLookback(code_hash=strategy_code_hash(strategy_code), lookback_periods=lookback_periods,
+                              declared_lookback_periods=declared_lookback_periods))
+    db.commit()
+
+
+def infer_lookback_safely(strategy_code: str, strategy_module=None) -> int | None:
+    """infer_lookback that loads the module from code if needed (so it can run in a process pool) and never raises."""
+    try:
+        return infer_lookback(strategy_module or strategy_loader.load(strategy_code).module)
+    except Exception as e:
+        print(f"LOOKBACK WARNING: Could not infer lookback for strategy {strategy_code_hash(strategy_code)[:12]}: {e}")
+        return None
+
+
+def get_or_infer_lookback(db: Session, strategy_code: str, strategy_module) -> int | None:
+    """Returns the inferred lookback stored for this code, inferring and storing it on first use."""
+    found, lookback_periods = load_lookback(db, strategy_code)
+    if found:
+        return lookback_periods
+    lookback_periods = infer_lookback_safely(strategy_code, strategy_module)
+    store_lookback(db, strategy_code, lookback_periods, getattr(strategy_module, 'REQUIRED_LOOKBACK_PERIODS', None))
+    return lookback_periods
+
+
+if __name__ == '__main__':
+    # Prints the inferred lookback of every built-in strategy next to its hand-set REQUIRED_LOOKBACK_PERIODS
+    from Benchmark.benchmark import load_strategy_modules
+    for name, module in load_strategy_modules().items():
+        declared = getattr(module, 'REQUIRED_LOOKBACK_PERIODS', None)
+        print(f"{name:<12} declared={declared!s:<6} inferred={infer_lookback(module)}")
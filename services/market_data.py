@@ -0,0 +1,195 @@
+import asyncio
+import time
+import traceback
+from datetime import datetime
+
+import pandas as pd
+
+from config import LIVE_SCHEDULING, LIVE_BAR_SETTLE_SECONDS, LIVE_BAR_CONFIRM_RETRIES, LIVE_BAR_CONFIRM_DELAY_SECONDS
+from services.metrics import current_runner
+from services.live_runner import INTERVAL_TIMEDELTAS, STREAMING_FETCH_LIMIT, calculate_start_dt, next_bar_close, bar_time
+
+FETCH_INTERVAL_SECONDS = 5
+NO_DATA_RETRY_SECONDS = 60
+
+
+class Subscription:
+    """One strategy's view of a feed: the latest kline window, trimmed to the strategy's lookback."""
+
+    def __init__(self, feed, lookback_periods: int):
+        self.feed = feed
+        self.lookback_periods = lookback_periods
+        # Only the newest window matters; a window the strategy has not picked up yet is replaced, not queued
+        self.windows = asyncio.Queue(maxsize=1)
+        self.dropped = 0
+
+    def deliver(self, window: pd.DataFrame):
+        if self.windows.full():
+            self.windows.get_nowait()
+            self.dropped += 1
+        self.windows.put_nowait(window.tail(self.lookback_periods))
+
+    async def next_window(self) -> pd.DataFrame:
+        return await self.windows.get()
+
+
+class _Feed:
+    """Klines of one (symbol, currency, interval), fetched once per refresh and fanned out to every subscription."""
+
+    def __init__(self, hub, key: tuple):
+        self.hub = hub
+        self.symbol, self.currency, self.interval = key
+        self.interval_delta = INTERVAL_TIMEDELTAS.get(self.interval)
+        self.subscriptions = []
+        self.window = None
+        self.task = None
+        self.fetches = 0
+        self.full_fetches = 0
+        self.deliveries = 0
+        self.confirm_retries = 0
+
+    @property
+    def lookback_periods(self) -> int:
+        return max(subscription.lookback_periods for subscription in self.subscriptions)
+
+    def _fetch_full(self, closed_before=None) -> pd.DataFrame:
+        end_dt = datetime.now()
+        lookback_periods = self.lookback_periods + (1 if closed_before is not None else 0)
+        start_dt = calculate_start_dt(end_dt, self.interval, lookback_periods)
+        self.full_fetches += 1
+        return self.hub.data_service.get_crypto_prices(self.symbol, self.currency, start_dt, end_dt, self.interval)
+
+    def _fetch(self, closed_before=None) -> pd.DataFrame:
+        """
+        The current window: a full lookback fetch the first time, then only the newest klines merged into it.
+        With closed_before (a bar open time), the window ends at the last kline that opened before it.
+        """
+        self.fetches += 1
+        self.hub.fetches += 1
+        window = self.window
+        if window is None or self.interval_delta is None or len(window) < self.lookback_periods:
+            recent = self._fetch_full(closed_before)
+            window = None
+        else:
+            recent = self.hub.data_service.get_crypto_prices(self.symbol, self.currency, None, None, self.interval, data_limit=STREAMING_FETCH_LIMIT)
+        if closed_before is not None and not recent.empty:
+            recent = recent[recent.index < closed_before]
+        if window is None or recent.empty:
+            return recent
+        if recent.index[0] > window.index[-1] + self.interval_delta:
+            # Missed more klines than were fetched (e.g. after a long retry sleep): fetch the whole window again
+            self.window = None
+            return self._fetch(closed_before)
+        return pd.concat([window[window.index < recent.index[0]], recent]).tail(self.lookback_periods)
+
+    async def _fetch_closed(self, bar_close: float) -> pd.DataFrame:
+        """The window ending at the kline that closed at bar_close, retried while the exchange has not published it yet."""
+        closed_before = bar_time(bar_close)
+        expected = closed_before - self.interval_delta
+        for attempt in range(LIVE_BAR_CONFIRM_RETRIES + 1):
+            window = await asyncio.to_thread(self._fetch, closed_before)
+            if not window.empty and window.index[-1] >= expected:
+                return window
+            if attempt < LIVE_BAR_CONFIRM_RETRIES:
+                self.confirm_retries += 1
+                await asyncio.sleep(LIVE_BAR_CONFIRM_DELAY_SECONDS)
+        print(f"MARKET_DATA WARNING: Kline {expected} of {self.symbol}{self.currency} not available after {LIVE_BAR_CONFIRM_RETRIES} retries.")
+        return window
+
+    async def run(self):
+        current_runner.set(f"{self.symbol}{self.currency}:{self.interval}") # Fetches of the feed are shared by its subscribers
+        # In bar_close scheduling the feed wakes once per kline, just after it closes; it starts from the last closed kline
+        bar_aligned = LIVE_SCHEDULING == "bar_close" and self.interval_delta is not None
+        if bar_aligned:
+            bar_close = next_bar_close(self.interval_delta) - self.interval_delta.total_seconds()
+        while self.subscriptions:
+            try:
+                if bar_aligned:
+                    wait_seconds = bar_close + LIVE_BAR_SETTLE_SECONDS - time.time()
+                    if wait_seconds > 0:
+                        await asyncio.sleep(wait_seconds)
+                    window = await self._fetch_closed(bar_close)
+                else:
+                    window = await asyncio.to_thread(self._fetch)
+            except Exception:
+                traceback.print_exc()
+                window = pd.DataFrame()
+            if window.empty:
+                self.window = None
+                print(f"MARKET_DATA WARNING: No crypto data fetched for {self.symbol}{self.currency} {self.interval}. Retrying in {NO_DATA_RETRY_SECONDS} seconds.")
+                await asyncio.sleep(NO_DATA_RETRY_SECONDS)
+                if bar_aligned:
+                    bar_close = next_bar_close(self.interval_delta) - self.interval_delta.total_seconds()
+                continue
+            self.window = window
+            for subscription in self.subscriptions:
+                subscription.deliver(window)
+            self.deliveries += len(self.subscriptions)
+            self.hub.deliveries += len(self.subscriptions)
+            if bar_aligned:
+                bar_close = next_bar_close(self.interval_delta)
+            else:
+                await asyncio.sleep(FETCH_INTERVAL_SECONDS)
+
+
+class MarketDataHub:
+    """
+    Fetches klines once per (symbol, currency, interval) for all live strategies hosted in one process.
+
+    A strategy subscribes with its lookback; the feed for its key keeps a window as long as the longest
+    lookback among its subscribers, refreshes it with a small fetch of the newest klines and hands every
+    subscriber the tail it needs. With LIVE_SCHEDULING=bar_close a feed refreshes once per kline, right
+    after it closes, and the window ends at the closed kline; otherwise it polls every few seconds and the
+    window ends at the forming kline. Feeds start with their first subscriber and stop with their last.
+    """
+
+    def __init__(self, data_service):
+        self.data_service = data_service
+        self.feeds = {}
+        # Totals over the hub's lifetime, including feeds that have since stopped
+        self.fetches = 0
+        self.deliveries = 0
+
+    def subscribe(self, symbol: str, currency: str, interval: str, lookback_periods: int) -> Subscription:
+        key = (symbol.upper(), currency.upper(), interval)
+        feed = self.feeds.get(key)
+        if feed is None:
+            feed = self.feeds[key] = _Feed(self, key)
+        subscription = Subscription(feed, lookback_periods)
+        feed.subscriptions.append(subscription)
+        if feed.task is None:
+            feed.task = asyncio.create_task(feed.run())
+        elif feed.window is not None and len(feed.window) >= lookback_periods:
+            subscription.deliver(feed.window) # Start from the feed's current window instead of waiting a poll
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        feed = subscription.feed
+        if subscription in feed.subscriptions:
+            feed.subscriptions.remove(subscription)
+        if not feed.subscriptions:
+            if feed.task is not None:
+                feed.task.cancel()
+            self.feeds.pop((feed.symbol, feed.currency, feed.interval), None)
+
+    def stats(self) -> dict:
+        """Subscriptions per feed and the fetches saved compared to every strategy fetching its own window."""
+        feeds = {}
+        for (symbol, currency, interval), feed in self.feeds.items():
+            feeds[f"{symbol}{currency}:{interval}"] = {
+                "subscriptions": len(feed.subscriptions),
+                "lookback_periods": feed.lookback_periods,
+                "fetches": feed.fetches,
+                "full_fetches": feed.full_fetches,
+                "deliveries": feed.deliveries,
+                "confirm_retries": feed.confirm_retries,
+                "dropped_windows": sum(subscription.dropped for subscription in feed.subscriptions),
+            }
+        return {
+            "feeds": len(self.feeds),
+            "subscriptions": sum(len(feed.subscriptions) for feed in self.feeds.values()),
+            "fetches": self.fetches,
+            "deliveries": self.deliveries,
+            "fetches_saved": self.deliveries - self.fetches,
+            "by_feed": feeds,
+        }
@@ -0,0 +1,81 @@
+import contextvars
+import os
+import time
+from contextlib import contextmanager
+
+import psutil
+
+from config import METRICS_DIR
+
+# prometheus_client picks multiprocess mode from this variable, so it must be set before it is imported
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", METRICS_DIR)
+os.makedirs(os.environ["PROMETHEUS_MULTIPROC_DIR"], exist_ok=True)
+
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess
+
+STAGES = ("fetch", "decode", "signal", "trade", "persist")
+STAGE_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# The live strategy (or market data feed) the current thread or task works for; "api" outside of live runners
+current_runner = contextvars.ContextVar("current_runner", default="api")
+
+STAGE_SECONDS = Histogram("live_runner_stage_seconds", "Time spent in each stage of a live runner loop.",
+                          ["runner", "stage"], buckets=STAGE_BUCKETS)
+SIGNALS = Counter("live_runner_signals", "Signals generated by live strategies.", ["runner", "signal"])
+RUNNER_START_SECONDS = Histogram("live_runner_start_seconds", "Time from handing a strategy to a runner worker until it is ready.",
+                                 ["worker"], buckets=STAGE_BUCKETS)
+API_WEIGHT = Counter("binance_api_weight", "Request weight of the Binance API calls made, per Binance's weight table.", ["endpoint"])
+API_USED_WEIGHT = Gauge("binance_api_used_weight_1m", "Request weight used in the current minute, as last reported by Binance.",
+                        multiprocess_mode="mostrecent")
+FETCH_ERRORS = Counter("binance_fetch_errors", "Failed Binance API calls.", ["kind"])
+
+
+@contextmanager
+def timed(stage: str):
+    """Observes the time spent in the block as stage of the current runner."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.labels(current_runner.get(), stage).observe(time.perf_counter() - started)
+
+
+def klines_weight(limit: int) -> int:
+    """Binance's request weight of GET /api/v3/klines for a limit."""
+    if limit < 100:
+        return 1
+    if limit < 500:
+        return 2
+    if limit <= 1000:
+        return 5
+    return 10
+
+
+def record_binance_response(response, endpoint: str, weight: int):
+    API_WEIGHT.labels(endpoint).inc(weight)
+    used_weight = response.headers.get("x-mbx-used-weight-1m")
+    if used_weight is not None:
+        API_USED_WEIGHT.set(float(used_weight))
+
+
+def record_signal(signal):
+    SIGNALS.labels(current_runner.get(), {1: "buy", -1: "sell"}.get(signal, "hold")).inc()
+
+
+def remove_dead_processes():
+    """
+    Deletes the metric files of processes that are gone, which also resets the totals they contributed; called
+    by the API at startup, before it starts any runner, so stale files of earlier deployments do not pile up.
+    """
+    directory = os.environ["PROMETHEUS_MULTIPROC_DIR"]
+    for name in os.listdir(directory):
+        pid = name.rsplit("_", 1)[-1].removesuffix(".db")
+        if pid.isdigit() and int(pid) != os.getpid() and not psutil.pid_exists(int(pid)):
+            os.remove(os.path.join(directory, name))
+
+
+def render() -> tuple:
+    """(body, content type) of the metrics of every process writing to the metrics directory."""
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -1,34 +1,34 @@
 from fastapi import HTTPException
-import os
-import importlib.util
+import math
 from datetime import datetime
 import pandas as pd
 import traceback
 
 from Backtest.backtest import run_backtest
 from services.data_service import DataService
-from exceptions import DataNotFoundException, InvalidDateFormatException, MissingSignalFunctionException, BacktestFailedException
+from services.sandbox import sandbox_pool
+from services.strategy_registry import strategy_registry
+from exceptions import DataNotFoundException, InvalidDateFormatException, BacktestFailedException
 
 class MiscService:
     def __init__(self):
         self.data_service = DataService()
 
     def get_strategy_list(self):
-        strategy_dir = "Strategy"
-        strategies = []
-        for filename in os.listdir(strategy_dir):
-            if filename.endswith(".py") and filename != "__init__.py":
-                strategies.append(filename[:-3]) # Remove .py extension
-        return {"strategies": strategies}
+        return {"strategies": strategy_registry.list_strategies()}
 
     def get_strategy_code(self, strategy_name: str):
-        strategy_path = os.path.join("Strategy", f"{strategy_name}.py")
-        if not os.path.exists(strategy_path):
+        code = strategy_registry.get_code(strategy_name)
+        if code is None:
             raise HTTPException(status_code=404, detail="Strategy not found.")
-        with open(strategy_path, "r", encoding="utf-8") as f:
-            code = f.read()
         return {"code": code}
 
+    def get_strategy_metadata(self, strategy_name: str, db=None):
+        metadata = strategy_registry.describe(strategy_name, db)
+        if metadata is None:
+            raise HTTPException(status_code=404, detail="Strategy not found.")
+        return metadata
+
     def run_backtest(
         self,
         symbol: str,
@@ -71,14 +71,8 @@ class MiscService:
                     df = pd.merge(df, github_commits_count, left_index=True, right_index=True, how='left')
                     df['commit_count'] = df['commit_count'].fillna(0)
 
-            spec = importlib.util.spec_from_loader("temp_strategy_module", loader=None)
-            temp_strategy_module = importlib.util.module_from_spec(spec)
-            exec(strategy_code, temp_strategy_module.__dict__)
-
-            if not hasattr(temp_strategy_module, 'generate_signal'):
-                raise MissingSignalFunctionException()
-
-            df_with_signal = temp_strategy_module.generate_signal(df.copy())
+            # User code runs in a resource-limited worker process, not in the API process
+            df_with_signal = sandbox_pool.generate_signal(df, strategy_code)
 
             results = run_backtest(
                 df_with_signal,
@@ -92,6 +86,13 @@ class MiscService:
                 if isinstance(value, pd.Series):
                     results['fig'][key] = {'index': value.index.strftime('%Y-%m-%d %H:%M:%S').tolist(), 'values': value.tolist()}
 
+            # The per-trade ledger can hold hundreds of thousands of rows, so only the aggregated analytics are returned
+            results.pop('ledger', None)
+            results['analytics'] = {
+                key: (None if isinstance(value, float) and not math.isfinite(value) else value)
+                for key, value in results['analytics'].items()
+            }
+
             return {"message": "Backtest completed successfully!", "status": "SUCCESS", "result": results}
         except HTTPException as e:
             raise e
@@ -0,0 +1,136 @@
+import re
+import weakref
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+
+from config import EQUITY_PARTITION_DAYS, TRADE_LOG_PARTITION_DAYS
+
+# On PostgreSQL (migration 0003) equity_curves and trade_logs are partitioned by LIST (running_strategy_id), one
+# partition per strategy, each partitioned by RANGE ("timestamp") in periods of these lengths. Other databases
+# keep plain tables, and every function here falls back to ordinary statements on them.
+PARTITION_DAYS = {"equity_curves": EQUITY_PARTITION_DAYS, "trade_logs": TRADE_LOG_PARTITION_DAYS}
+EPOCH = datetime(1970, 1, 1) # Periods are aligned to it, so every process computes the same boundaries
+ARCHIVE_PREFIX = "archive_"
+_UPPER_BOUND = re.compile(r"TO \('([^']+)'\)")
+_DUPLICATE_CODES = {"42P07", "23505"} # duplicate_table, unique_violation (two processes created it at once)
+# engine -> {table: partitioned}; the layout only changes through migrations, which run before anything is written
+_partitioned = weakref.WeakKeyDictionary()
+
+
+def is_partitioned(db: Session, model) -> bool:
+    engine = db.get_bind()
+    if engine.dialect.name != "postgresql":
+        return False
+    tables = _partitioned.setdefault(engine, {})
+    if model.__tablename__ not in tables:
+        tables[model.__tablename__] = db.execute(text(
+            "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(:table))"
+        ), {"table": model.__tablename__}).scalar()
+    return tables[model.__tablename__]
+
+
+def period_start(table: str, timestamp: datetime) -> datetime:
+    days = PARTITION_DAYS[table]
+    return EPOCH + timedelta(days=(timestamp - EPOCH).days // days * days)
+
+
+def strategy_partition(table: str, running_strategy_id: int) -> str:
+    return f"{table}_s{int(running_strategy_id)}"
+
+
+def period_partition(table: str, running_strategy_id: int, start: datetime) -> str:
+    return f"{strategy_partition(table, running_strategy_id)}_p{start:%Y%m%d}"
+
+
+def _existing(db, names) -> set:
+    return set(db.execute(text("SELECT name FROM unnest(CAST(:names AS text[])) AS name WHERE to_regclass(name) IS NOT NULL"),
+                          {"names": sorted(names)}).scalars())
+
+
+def _attach(db, parent: str, name: str, bound: str, partition_by: str = ""):
+    # CREATE TABLE ... PARTITION OF would lock the parent ACCESS EXCLUSIVE, waiting for (and then blocking) every
+    # open read of it; ATTACH PARTITION only takes SHARE UPDATE EXCLUSIVE, so reads and writes go on meanwhile
+    try:
+        with db.begin_nested():
+            db.execute(text(f"CREATE TABLE {name} (LIKE {parent} INCLUDING DEFAULTS){partition_by}"))
+            db.execute(text(f"ALTER TABLE {parent} ATTACH PARTITION {name} {bound}"))
+    except DBAPIError as e:
+        if getattr(e.orig, "pgcode", None) not in _DUPLICATE_CODES:
+            raise
+
+
+def create_partitions(db, table: str, keys) -> int:
+    """
+    Creates the partitions of (running_strategy_id, period start) keys that do not exist yet, in the caller's
+    transaction (db is a Session or a Connection). Returns how many tables were created.
+    """
+    keys = set(keys)
+    if not keys:
+        return 0
+    days = PARTITION_DAYS[table]
+    wanted = {strategy_partition(table, rid) for rid, _ in keys} | {period_partition(table, rid, start) for rid, start in keys}
+    missing = wanted - _existing(db, wanted)
+    for running_strategy_id in sorted({rid for rid, _ in keys}):
+        name = strategy_partition(table, running_strategy_id)
+        if name in missing:
+            _attach(db, table, name, f"FOR VALUES IN ({int(running_strategy_id)})", ' PARTITION BY RANGE ("timestamp")')
+    for running_strategy_id, start in sorted(keys):
+        name = period_partition(table, running_strategy_id, start)
+        if name in missing:
+            end = start + timedelta(days=days)
+            _attach(db, strategy_partition(table, running_strategy_id), name,
+                    f"FOR VALUES FROM ('{start:%Y-%m-%d %H:%M:%S}') TO ('{end:%Y-%m-%d %H:%M:%S}')")
+    return len(missing)
+
+
+def ensure_partitions(db: Session, model, rows: list):
+    """Creates the partitions rows (dicts of model columns) are about to be inserted into; a no-op if unpartitioned."""
+    if not rows or not is_partitioned(db, model):
+        return
+    table = model.__tablename__
+    create_partitions(db, table, {(row["running_strategy_id"], period_start(table, row["timestamp"])) for row in rows})
+
+
+def delete_strategy_rows(db: Session, model, running_strategy_id: int):
+    """
+    Deletes every row of a running strategy. A partitioned table drops the strategy's partition instead, which
+    frees the space at once and leaves no dead rows behind for vacuum.
+    """
+    if is_partitioned(db, model):
+        db.execute(text(f"DROP TABLE IF EXISTS {strategy_partition(model.__tablename__, running_strategy_id)}"))
+    else:
+        db.query(model).filter(model.running_strategy_id == running_strategy_id).delete(synchronize_session=False)
+
+
+def period_partitions(db: Session, model, running_strategy_id: int) -> list:
+    """[(name, upper bound)] of the time partitions of a strategy, oldest first; [] if unpartitioned."""
+    if not is_partitioned(db, model):
+        return []
+    rows = db.execute(text(
+        "SELECT child.relname, pg_get_expr(child.relpartbound, child.oid) FROM pg_inherits "
+        "JOIN pg_class child ON child.oid = pg_inherits.inhrelid WHERE pg_inherits.inhparent = to_regclass(:parent)"
+    ), {"parent": strategy_partition(model.__tablename__, running_strategy_id)}).all()
+    return sorted(((name, datetime.fromisoformat(_UPPER_BOUND.search(bound).group(1))) for name, bound in rows), key=lambda row: row[1])
+
+
+def retire_partitions(db: Session, model, running_strategy_id: int, before: datetime, archive: bool = False) -> list:
+    """
+    Removes the time partitions of a strategy that end at or before `before`: dropped, or with archive detached
+    and renamed to archive_<name>, a standalone table that no longer shows up in queries and can be dumped and
+    dropped later. Rows before `before` in a partition that straddles it are left to the caller. Returns the
+    names of the partitions removed.
+    """
+    retired = []
+    for name, upper_bound in period_partitions(db, model, running_strategy_id):
+        if upper_bound > before:
+            break
+        if archive:
+            db.execute(text(f"ALTER TABLE {strategy_partition(model.__tablename__, running_strategy_id)} DETACH PARTITION {name}"))
+            db.execute(text(f"ALTER TABLE {name} RENAME TO {ARCHIVE_PREFIX}{name}"))
+        else:
+            db.execute(text(f"DROP TABLE {name}"))
+        retired.append(name)
+    return retired
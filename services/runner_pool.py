@@ -0,0 +1,186 @@
+import multiprocessing
+import os
+import signal
+import threading
+import time
+
+from sqlalchemy import text
+
+from config import LIVE_RUNNER_POOL_SIZE
+from database import engine
+from services.metrics import RUNNER_START_SECONDS
+
+
+def _warm_runner_main(conn, run, control):
+    # Pooled connections a forked worker may have inherited stay with its parent; open this worker's own one now
+    engine.dispose(close=False)
+    with engine.connect() as connection:
+        connection.execute(text("SELECT 1"))
+    signal.signal(signal.SIGINT, signal.SIG_IGN) # Ctrl+C is handled by the API process, which stops the pool
+    conn.send("ready")
+    try:
+        assignment = conn.recv()
+    except EOFError:
+        return
+    if assignment is None:
+        return
+    running_strategy_id, saved_strategy_id, assigned_at, kind = assignment
+    control.running_strategy_id = running_strategy_id
+
+    def started():
+        start_seconds = time.time() - assigned_at
+        print(f"RUNNER_POOL: Running strategy {running_strategy_id} ready {1000 * start_seconds:.0f} ms after its assignment (PID {os.getpid()}).")
+        RUNNER_START_SECONDS.labels(kind).observe(start_seconds)
+        conn.send(("started", start_seconds))
+
+    run(running_strategy_id, saved_strategy_id, control, started)
+
+
+# Imported once by the forkserver, so a worker forked from it starts with them loaded
+RUNNER_PRELOAD = ["pandas", "sqlalchemy", "services.sandbox", "services.strategy_service"]
+
+
+def _runner_context():
+    """
+    forkserver where available: workers are forked from a single-threaded server process that has already
+    imported pandas, SQLAlchemy and the services, rather than forked from the threaded API process (which can
+    copy a lock held by another thread) or started as a fresh interpreter that imports everything again.
+
+    The forkserver is shared with the backtest sandbox; whichever pool starts it first sets the preload, so
+    this list includes the sandbox module as well.
+    """
+    if "forkserver" not in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context()
+    context = multiprocessing.get_context("forkserver")
+    context.set_forkserver_preload(RUNNER_PRELOAD)
+    return context
+
+
+class _Worker:
+    def __init__(self, context, run, control, key):
+        self.key = key
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_warm_runner_main, args=(child_conn, run, control))
+        self.process.start()
+        child_conn.close()
+        self.warm = False
+
+    def is_warm(self) -> bool:
+        if not self.warm and self.conn.poll(0):
+            self.warm = self.conn.recv() == "ready"
+        return self.warm
+
+
+class RunnerPool:
+    """
+    Pre-forked processes for live strategies started with LIVE_RUNNER_MODE=process.
+
+    Every worker is started ahead of time, opens its database connection and then waits for a strategy, so
+    starting one only hands a running strategy id to an idle worker instead of starting a process, importing
+    modules and connecting first. A worker runs one strategy for its whole life; the pool is topped up in the
+    background after each assignment. The time from assignment until the runner is about to fetch its first
+    klines is reported back by each worker and summarized by stats(), split by whether the worker was warm.
+    """
+
+    def __init__(self, run, control_channel, size: int = LIVE_RUNNER_POOL_SIZE):
+        self.run = run
+        self.control_channel = control_channel
+        self.size = size
+        self._idle = []
+        self._assigned = {} # running_strategy_id -> _Worker until its start latency was reported
+        self._lock = threading.Lock()
+        self._fill_lock = threading.Lock()
+        self._context = None
+        self._spawned = 0
+        self.start_seconds = {"warm": [], "cold": []}
+
+    def _spawn(self) -> _Worker:
+        if self._context is None:
+            self._context = _runner_context()
+        with self._lock:
+            self._spawned += 1
+            key = ("warm_runner", self._spawned)
+        return _Worker(self._context, self.run, self.control_channel.listener(key, context=self._context), key)
+
+    def _fill(self):
+        if not self._fill_lock.acquire(blocking=False):
+            return # Another thread is already topping the pool up
+        try:
+            self._top_up()
+        finally:
+            self._fill_lock.release()
+
+    def _top_up(self):
+        while True:
+            with self._lock:
+                if len(self._idle) >= self.size:
+                    return
+            worker = self._spawn()
+            with self._lock:
+                self._idle.append(worker)
+
+    def start(self):
+        """Starts workers up to the pool size; called at API startup so the first strategies find warm workers."""
+        self._fill()
+
+    def assign(self, running_strategy_id: int, saved_strategy_id: int):
+        """Runs the strategy in an idle worker (a freshly started one if none is left); returns its process."""
+        with self._lock:
+            self._idle = [worker for worker in self._idle if worker.process.is_alive()]
+            worker = self._idle.pop(0) if self._idle else None
+        if worker is None:
+            worker = self._spawn() # A cold start, even if it happens to be connected by the time it gets the strategy
+        else:
+            worker.is_warm()
+        self.control_channel.rekey(worker.key, running_strategy_id)
+        worker.conn.send((running_strategy_id, saved_strategy_id, time.time(), "warm" if worker.warm else "cold"))
+        with self._lock:
+            self._assigned[running_strategy_id] = worker
+        threading.Thread(target=self._fill, name="runner-pool-fill", daemon=True).start()
+        return worker.process
+
+    def _collect(self):
+        """Records the start latencies reported since the last call."""
+        with self._lock:
+            assigned = list(self._assigned.items())
+        for running_strategy_id, worker in assigned:
+            finished = not worker.process.is_alive()
+            try:
+                while worker.conn.poll(0):
+                    message = worker.conn.recv()
+                    if message == "ready":
+                        continue # Warmed up only after it was assigned: a cold start
+                    self.start_seconds["warm" if worker.warm else "cold"].append(message[1])
+                    finished = True
+            except (EOFError, OSError):
+                finished = True
+            if finished:
+                with self._lock:
+                    self._assigned.pop(running_strategy_id, None)
+                worker.conn.close()
+
+    def stats(self) -> dict:
+        self._collect()
+        with self._lock:
+            idle = sum(1 for worker in self._idle if worker.process.is_alive())
+        stats = {"idle_workers": idle, "pending_starts": len(self._assigned)}
+        for kind, seconds in self.start_seconds.items():
+            stats[f"{kind}_starts"] = len(seconds)
+            stats[f"{kind}_mean_start_ms"] = 1000 * sum(seconds) / len(seconds) if seconds else 0.0
+            stats[f"{kind}_max_start_ms"] = 1000 * max(seconds) if seconds else 0.0
+        return stats
+
+    def shutdown(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for worker in idle:
+            try:
+                worker.conn.send(None)
+            except (BrokenPipeError, OSError):
+                pass
+            worker.process.join(timeout=1)
+            if worker.process.is_alive():
+                worker.process.kill()
+                worker.process.join(timeout=1)
+            worker.conn.close()
+            self.control_channel.forget(worker.key)
@@ -0,0 +1,81 @@
+import pickle
+import time
+from datetime import datetime
+
+from sqlalchemy.orm import Session
+
+from config import RUNNER_SNAPSHOT_SECONDS
+from database import RunnerSnapshot
+from services.strategy_loader import strategy_code_hash
+
+
+class SnapshotSchedule:
+    """Decides when a runner's state is saved: right after a trade, otherwise at most every interval seconds."""
+
+    def __init__(self, interval: float = RUNNER_SNAPSHOT_SECONDS):
+        self.interval = interval
+        self._last = time.monotonic()
+
+    def due(self, traded: bool) -> bool:
+        if traded or time.monotonic() - self._last >= self.interval:
+            self._last = time.monotonic()
+            return True
+        return False
+
+
+def save_snapshot(db: Session, runner, strategy_code: str):
+    """Stores the runner's paper position and streaming indicator state, replacing its previous snapshot."""
+    state = runner.snapshot()
+    streaming_state = None
+    if state["streaming_state"] is not None:
+        try:
+            streaming_state = pickle.dumps(state["streaming_state"])
+        except Exception as e:
+            # The position is still saved; the strategy is reseeded from a lookback window on restore
+            print(f"RUNNER_STATE WARNING: Streaming state of {runner.name} cannot be pickled ({e}).")
+    try:
+        db.merge(RunnerSnapshot(
+            running_strategy_id=runner.running_strategy_id,
+            code_hash=strategy_code_hash(strategy_code),
+            current_capital=state["current_capital"],
+            current_holding_shares=state["current_holding_shares"],
+            last_processed_time=state["last_processed_time"],
+            last_committed_time=state["last_committed_time"] if streaming_state is not None else None,
+            streaming_state=streaming_state,
+            taken_at=datetime.now(),
+        ))
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+
+def restore_snapshot(db: Session, runner, strategy_code: str) -> bool:
+    """
+    Resumes runner from its running strategy's snapshot, if there is one; returns whether it did. The indicator
+    state is only restored if the snapshot was taken with the same strategy code.
+    """
+    snapshot = db.get(RunnerSnapshot, runner.running_strategy_id)
+    if snapshot is None:
+        return False
+    streaming_state = None
+    if snapshot.streaming_state is not None and snapshot.code_hash == strategy_code_hash(strategy_code):
+        try:
+            streaming_state = pickle.loads(snapshot.streaming_state)
+        except Exception as e:
+            print(f"RUNNER_STATE WARNING: Streaming state of {runner.name} cannot be restored ({e}).")
+    runner.restore({
+        "current_capital": snapshot.current_capital,
+        "current_holding_shares": snapshot.current_holding_shares,
+        "last_processed_time": snapshot.last_processed_time,
+        "last_committed_time": snapshot.last_committed_time,
+        "streaming_state": streaming_state,
+    })
+    print(f"RUNNER_STATE: Restored {runner.name} from snapshot of {snapshot.taken_at} "
+          f"(capital {snapshot.current_capital}, shares {snapshot.current_holding_shares}, "
+          f"indicator state {'restored' if streaming_state is not None else 'reseeded'}).")
+    return True
+
+
+def delete_snapshot(db: Session, running_strategy_id: int):
+    db.query(RunnerSnapshot).filter(RunnerSnapshot.running_strategy_id == running_strategy_id).delete()
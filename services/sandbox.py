@@ -0,0 +1,262 @@
+import math
+import multiprocessing
+import queue
+import signal
+import threading
+import traceback
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+import pandas as pd
+
+try:
+    import resource
+except ImportError: # Not available on Windows: workers still isolate the API process, just without rlimits
+    resource = None
+
+from config import SANDBOX_WORKERS, SANDBOX_CPU_SECONDS, SANDBOX_MEMORY_LIMIT_MB, SANDBOX_TIMEOUT_SECONDS, SANDBOX_MAX_TASKS_PER_WORKER
+from exceptions import MissingSignalFunctionException, BacktestFailedException, StrategyResourceLimitException
+from services.strategy_loader import strategy_loader
+
+
+class _SharedFrame:
+    """
+    A price DataFrame laid out in one shared memory block so workers can map it instead of unpickling it.
+
+    Rows of the (2 + columns, bars) float64 block: the index as int64 nanoseconds, one row per column,
+    and a last row the worker fills with the strategy's signal.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        self.columns = list(df.columns)
+        self.length = len(df)
+        self.shape = (len(self.columns) + 2, self.length)
+        self.shm = shared_memory.SharedMemory(create=True, size=max(8 * self.shape[0] * self.shape[1], 1))
+        block = np.ndarray(self.shape, dtype=np.float64, buffer=self.shm.buf)
+        block[0].view(np.int64)[:] = df.index.values.astype("datetime64[ns]").view(np.int64)
+        for row, column in enumerate(self.columns, start=1):
+            block[row] = df[column].to_numpy(dtype=np.float64)
+        block[-1] = np.nan
+
+    def task(self, strategy_code: str) -> dict:
+        return {"shm_name": self.shm.name, "shape": self.shape, "columns": self.columns, "code": strategy_code}
+
+    def signal(self) -> np.ndarray:
+        return np.ndarray(self.shape, dtype=np.float64, buffer=self.shm.buf)[-1].copy()
+
+    def release(self):
+        self.shm.close()
+        self.shm.unlink()
+
+
+def _address_space_bytes() -> int:
+    """The process's current virtual memory size (what RLIMIT_AS is checked against), or 0 if it cannot be read."""
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmSize:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return 0
+
+
+def _limit_cpu(seconds):
+    if resource is None:
+        return
+    _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+    if seconds is None:
+        resource.setrlimit(resource.RLIMIT_CPU, (hard, hard))
+        return
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    # RLIMIT_CPU counts the whole process lifetime, so the per-task budget is added to what was used so far
+    soft = math.ceil(usage.ru_utime + usage.ru_stime) + seconds
+    resource.setrlimit(resource.RLIMIT_CPU, (soft if hard == resource.RLIM_INFINITY else min(soft, hard), hard))
+
+
+def _run_task(task: dict):
+    # Workers share the parent's resource tracker, so attaching here does not take ownership of the block
+    shm = shared_memory.SharedMemory(name=task["shm_name"])
+    block = None
+    try:
+        block = np.ndarray(task["shape"], dtype=np.float64, buffer=shm.buf)
+        index = pd.DatetimeIndex(block[0].view(np.int64).view("datetime64[ns]"), name="open_time")
+        df = pd.DataFrame({column: block[row] for row, column in enumerate(task["columns"], start=1)}, index=index)
+
+        loaded_strategy = strategy_loader.load(task["code"])
+        df_with_signal = loaded_strategy.generate_signal(df.copy())
+        if 'signal' not in df_with_signal.columns or len(df_with_signal) != task["shape"][1]:
+            raise ValueError("generate_signal must return the input rows with a 'signal' column.")
+        block[-1] = df_with_signal['signal'].to_numpy(dtype=np.float64)
+    finally:
+        del block
+        shm.close()
+
+
+def _worker_main(conn, cpu_seconds, memory_limit_bytes):
+    if resource is not None and memory_limit_bytes:
+        # RLIMIT_AS covers the whole address space, so the interpreter and libraries already mapped are added
+        # to the budget: the strategy itself gets memory_limit_bytes
+        limit = _address_space_bytes() + memory_limit_bytes
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    signal.signal(signal.SIGINT, signal.SIG_IGN) # Ctrl+C is handled by the API process, which shuts the pool down
+
+    while True:
+        try:
+            task = conn.recv()
+        except EOFError:
+            break
+        if task is None:
+            break
+        try:
+            _limit_cpu(cpu_seconds)
+            _run_task(task)
+            reply = ("ok", None)
+        except MissingSignalFunctionException:
+            reply = ("missing_signal", None)
+        except MemoryError:
+            reply = ("memory", f"Strategy exceeded the {memory_limit_bytes // (1024 * 1024)} MB memory limit.")
+        except Exception as e:
+            traceback.print_exc()
+            reply = ("error", f"{type(e).__name__}: {e}")
+        finally:
+            _limit_cpu(None)
+        conn.send(reply)
+
+
+def _worker_context():
+    """
+    forkserver where available: workers are forked from a small server process that has only imported this
+    module, instead of from the API process with everything it has loaded and allocated.
+    """
+    if "forkserver" not in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context()
+    context = multiprocessing.get_context("forkserver")
+    context.set_forkserver_preload([__name__])
+    return context
+
+
+class _Worker:
+    def __init__(self, context, cpu_seconds, memory_limit_bytes):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_worker_main, args=(child_conn, cpu_seconds, memory_limit_bytes), daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.tasks = 0
+
+    def stop(self, kill: bool = False):
+        if not kill and self.process.is_alive():
+            try:
+                self.conn.send(None)
+            except (BrokenPipeError, OSError):
+                pass
+            self.process.join(timeout=1)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join(timeout=1)
+        self.conn.close()
+
+
+class SandboxPool:
+    """
+    A pool of pre-forked worker processes that run user strategy code (generate_signal) outside the API process.
+
+    Workers are started from a lean forkserver process where the platform has one. Each worker runs under an
+    address-space limit (RLIMIT_AS, on top of what the worker has mapped before running any strategy) and a
+    per-task CPU-time limit (RLIMIT_CPU), and every task has a wall-clock timeout; a worker that times out, dies or runs out of memory is replaced.
+    Price data is handed over through shared memory and the signal comes back the same way, so only the
+    strategy code and a small task header cross the pipe.
+    """
+
+    def __init__(self, workers: int = SANDBOX_WORKERS, cpu_seconds: int = SANDBOX_CPU_SECONDS,
+                 memory_limit_mb: int = SANDBOX_MEMORY_LIMIT_MB, timeout: float = SANDBOX_TIMEOUT_SECONDS,
+                 max_tasks_per_worker: int = SANDBOX_MAX_TASKS_PER_WORKER):
+        self.size = workers
+        self.cpu_seconds = cpu_seconds
+        self.memory_limit_bytes = memory_limit_mb * 1024 * 1024 if memory_limit_mb else None
+        self.timeout = timeout
+        self.max_tasks_per_worker = max_tasks_per_worker
+        self._idle = queue.Queue()
+        self._workers = []
+        self._lock = threading.Lock()
+        self._started = False
+        self._context = None
+
+    def _spawn(self) -> _Worker:
+        if self._context is None:
+            self._context = _worker_context()
+        worker = _Worker(self._context, self.cpu_seconds, self.memory_limit_bytes)
+        with self._lock:
+            self._workers.append(worker)
+        return worker
+
+    def _retire(self, worker: _Worker, kill: bool = False):
+        with self._lock:
+            if worker in self._workers:
+                self._workers.remove(worker)
+        worker.stop(kill=kill)
+
+    def start(self):
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+        # Start the resource tracker before starting workers so they share it instead of each starting their own
+        resource_tracker.ensure_running()
+        for _ in range(self.size):
+            self._idle.put(self._spawn())
+
+    def shutdown(self):
+        with self._lock:
+            workers, self._workers = self._workers, []
+            self._started = False
+        while not self._idle.empty():
+            self._idle.get_nowait()
+        for worker in workers:
+            worker.stop()
+
+    def generate_signal(self, df: pd.DataFrame, strategy_code: str) -> pd.DataFrame:
+        """Runs the strategy's generate_signal on df in a worker and returns a copy of df with its 'signal' column."""
+        self.start()
+        frame = _SharedFrame(df)
+        worker = self._idle.get()
+        failure = None
+        try:
+            worker.tasks += 1
+            worker.conn.send(frame.task(strategy_code))
+            if not worker.conn.poll(self.timeout):
+                raise StrategyResourceLimitException(detail=f"Strategy timed out after {self.timeout} seconds.")
+            try:
+                status, message = worker.conn.recv()
+            except EOFError:
+                worker.process.join(timeout=1)
+                if hasattr(signal, "SIGXCPU") and worker.process.exitcode == -signal.SIGXCPU:
+                    raise StrategyResourceLimitException(detail=f"Strategy exceeded the {self.cpu_seconds} second CPU time limit.")
+                raise StrategyResourceLimitException(detail=f"Strategy worker exited unexpectedly (exit code {worker.process.exitcode}).")
+            signal_values = frame.signal() if status == "ok" else None
+        except BaseException as e:
+            failure = e
+        finally:
+            frame.release()
+
+        if failure is None and status != "memory" and worker.tasks < self.max_tasks_per_worker:
+            self._idle.put(worker)
+        else:
+            # Timed out, crashed, hit the memory limit or served its quota: replace it with a fresh worker
+            self._retire(worker, kill=failure is not None or status == "memory")
+            self._idle.put(self._spawn())
+
+        if failure is not None:
+            raise failure
+        if status == "missing_signal":
+            raise MissingSignalFunctionException()
+        if status == "memory":
+            raise StrategyResourceLimitException(detail=message)
+        if status == "error":
+            raise BacktestFailedException(detail=f"Backtest failed: {message}")
+        df_with_signal = df.copy()
+        df_with_signal['signal'] = signal_values
+        return df_with_signal
+
+
+sandbox_pool = SandboxPool()
@@ -0,0 +1,311 @@
+import asyncio
+import os
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from config import LIVE_SCHEDULER_WORKERS, LIVE_SCHEDULER_POLL_SECONDS, EQUITY_COMPACTION_SECONDS
+from database import SessionLocal, SavedStrategy, RunningStrategy, engine, run_migrations
+from services.control import ControlListener
+from services.data_service import DataService
+from services.equity_store import compact_equity
+from services.leases import LeaseManager
+from services.live_runner import LiveStrategyRunner, latest_signal_row
+from services.lookback import load_lookback, store_lookback, infer_lookback_safely
+from services.market_data import MarketDataHub
+from services.metrics import current_runner, timed
+from services.runner_state import SnapshotSchedule, save_snapshot, restore_snapshot
+from services.sandbox import SandboxPool
+from services.strategy_loader import strategy_loader
+from services.write_buffer import WriteBuffer
+
+STATS_LOG_SECONDS = 300
+
+
+class LiveScheduler:
+    """
+    Hosts many live strategies in one process instead of one process per strategy; several schedulers, on one
+    machine or many, share the running strategies as runner nodes.
+
+    Every strategy is an asyncio task fed by a MarketDataHub, which fetches the klines of each
+    (symbol, currency, interval) once for all strategies trading it. Trades and equity points go through one
+    shared WriteBuffer from threads, and generate_signal over a full lookback window runs in a SandboxPool
+    (services/sandbox.py), whose resource-limited workers are replaced one by one when a strategy kills its own,
+    so one bad strategy cannot take the others down (streaming strategies are updated inline, since that is O(1)
+    per bar). Every poll the scheduler syncs its leases (services/leases.py): it hosts the strategies it holds a lease for, including rows set to 'starting'
+    by StrategyService.start_strategy and those of nodes that died, cancels tasks whose row was set to 'stopped'
+    or deleted or whose lease was lost (a stopped strategy's lease is only released once its task has finished
+    its last write, which the API waits for before deleting the strategy's rows), and hands its surplus to nodes that joined, saving a snapshot first so
+    the new owner resumes where it stopped. 'paused' strategies skip their windows, so the start/stop/status API
+    and DB records are unchanged. Commands pushed over the control channel wake the loop immediately.
+    """
+
+    def __init__(self, workers: int = LIVE_SCHEDULER_WORKERS, poll_interval: float = LIVE_SCHEDULER_POLL_SECONDS, control: ControlListener | None = None,
+                 leases: LeaseManager | None = None):
+        self.poll_interval = poll_interval
+        self.leases = leases or LeaseManager()
+        # Without a control channel (a standalone scheduler on a database without NOTIFY) changes are only seen by polling
+        self.control = control if control is not None else (ControlListener() if engine.dialect.name == "postgresql" else None)
+        self.workers = workers
+        self.sandbox = SandboxPool(workers=workers)
+        # Tasks wait here for an idle sandbox worker, so they do not tie up the default executor's threads
+        self.signal_threads = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="live-signal")
+        # Lookback inference runs a strategy many times in one task, so it has a process pool of its own
+        self.process_pool = ProcessPoolExecutor(max_workers=workers)
+        self.data_service = DataService()
+        self.market_data = MarketDataHub(self.data_service)
+        self.write_buffer = WriteBuffer()
+        self.tasks = {}
+        self.runners = {}
+        self.paused = set()
+        self.pid = os.getpid()
+
+    async def run(self):
+        print(f"LIVE_SCHEDULER: Started with PID {self.pid} as runner node {self.leases.node_id}.")
+        await asyncio.to_thread(run_migrations)
+        stats_logged_at = time.monotonic()
+        compacted_at = None
+        try:
+            while True:
+                try:
+                    await self.reconcile()
+                    await asyncio.to_thread(self.write_buffer.flush_if_due)
+                    if compacted_at is None or time.monotonic() - compacted_at >= EQUITY_COMPACTION_SECONDS:
+                        compacted_at = time.monotonic()
+                        print(f"LIVE_SCHEDULER: Equity compaction {await asyncio.to_thread(self._compact_equity)}")
+                except Exception:
+                    traceback.print_exc()
+                if time.monotonic() - stats_logged_at >= STATS_LOG_SECONDS:
+                    stats = self.market_data.stats()
+                    print(f"LIVE_SCHEDULER: {len(self.tasks)} strategies on {stats['feeds']} market data feeds, "
+                          f"{stats['fetches']} fetches for {stats['deliveries']} windows ({stats['fetches_saved']} fetches saved).")
+                    print(f"LIVE_SCHEDULER: Write buffer {self.write_buffer.stats()}")
+                    stats_logged_at = time.monotonic()
+                await self._wait_for_commands()
+        finally:
+            for task in self.tasks.values():
+                task.cancel()
+            self.write_buffer.flush("stop")
+            # Hand every strategy over right away instead of after its lease expires
+            self._save_snapshots(list(self.tasks))
+            self.leases.leave()
+            self.signal_threads.shutdown(wait=False, cancel_futures=True)
+            self.sandbox.shutdown()
+            self.process_pool.shutdown(cancel_futures=True)
+            if self.control is not None:
+                self.control.close()
+
+    async def _wait_for_commands(self):
+        """
+        Sleeps until the next poll or until the API pushes a command. The DB status has already been updated
+        when a command arrives, so start/stop/pause/resume are applied by the reconcile right after this returns;
+        only reload and stop need handling here.
+        """
+        if self.control is None:
+            await asyncio.sleep(self.poll_interval)
+            return
+        for command in await asyncio.to_thread(self.control.wait, self.poll_interval):
+            running_strategy_id = command.get("running_strategy_id")
+            if command["command"] == "reload" and running_strategy_id in self.tasks and running_strategy_id in self.runners:
+                saved_strategy_id, runner, _ = self.runners[running_strategy_id]
+                await self._stop_task(running_strategy_id)
+                self.tasks[running_strategy_id] = asyncio.create_task(self._run_strategy(running_strategy_id, saved_strategy_id, previous_runner=runner))
+                print(f"LIVE_SCHEDULER: Strategy run {running_strategy_id} reloaded.")
+            elif command["command"] == "stop" and running_strategy_id in self.tasks:
+                # Stopping deletes the strategy's equity curve, so its buffered points are dropped rather than written
+                await self._stop_task(running_strategy_id, discard=True)
+                await asyncio.to_thread(self.leases.release_stopped, set(self.tasks))
+                print(f"LIVE_SCHEDULER: Strategy run {running_strategy_id} stopped.")
+
+    async def _stop_task(self, running_strategy_id: int, discard: bool = False):
+        """
+        Cancels a strategy's task and waits until it has finished the write or snapshot it was in, so nothing of
+        it reaches the database afterwards. With discard its buffered rows are dropped; discard() waits for a
+        flush in progress, which could be writing them.
+        """
+        task = self.tasks.pop(running_strategy_id)
+        task.cancel()
+        await asyncio.wait([task])
+        if discard:
+            await asyncio.to_thread(self.write_buffer.discard, running_strategy_id)
+
+    @staticmethod
+    async def _in_thread(function, *args):
+        """asyncio.to_thread whose caller, when cancelled, still waits for function to return."""
+        future = asyncio.ensure_future(asyncio.to_thread(function, *args))
+        try:
+            return await asyncio.shield(future)
+        except asyncio.CancelledError:
+            await asyncio.wait([future])
+            raise
+
+    # --- running_strategies table ---
+
+    def _set_error(self, running_strategy_id: int):
+        db = SessionLocal()
+        try:
+            record = db.query(RunningStrategy).filter(RunningStrategy.id == running_strategy_id).first()
+            if record and record.status != "stopped":
+                record.status = "error"
+                db.commit()
+        finally:
+            db.close()
+
+    def _compact_equity(self) -> dict:
+        db = SessionLocal()
+        try:
+            return compact_equity(db)
+        finally:
+            db.close()
+
+    def _save_snapshots(self, running_strategy_ids):
+        for running_strategy_id in running_strategy_ids:
+            if running_strategy_id in self.runners:
+                _, runner, strategy_code = self.runners[running_strategy_id]
+                try:
+                    self._with_session(save_snapshot, runner, strategy_code)
+                except Exception:
+                    traceback.print_exc()
+
+    async def reconcile(self):
+        hosted, surplus = await asyncio.to_thread(self.leases.sync)
+        if surplus:
+            for running_strategy_id in surplus:
+                hosted.pop(running_strategy_id, None)
+                if running_strategy_id in self.tasks:
+                    await self._stop_task(running_strategy_id)
+            await asyncio.to_thread(self.write_buffer.flush, "handover")
+            await asyncio.to_thread(self._save_snapshots, surplus)
+            await asyncio.to_thread(self.leases.release, surplus)
+            print(f"LIVE_SCHEDULER: Handed strategy runs {surplus} over to other runner nodes.")
+        for running_strategy_id in list(self.tasks):
+            task = self.tasks[running_strategy_id]
+            if running_strategy_id not in hosted or task.done():
+                # Stopped or deleted (seen here when the stop command was missed), or its lease was lost to another
+                # node: its buffered points are dropped rather than written back over a deleted curve
+                await self._stop_task(running_strategy_id, discard=running_strategy_id not in hosted and not task.done())
+                print(f"LIVE_SCHEDULER: Strategy run {running_strategy_id} stopped.")
+        # Only now that their tasks are drained, so the API deletes their rows after the last write
+        await asyncio.to_thread(self.leases.release_stopped, set(self.tasks))
+        for running_strategy_id in list(self.runners):
+            if running_strategy_id not in self.tasks:
+                del self.runners[running_strategy_id]
+        self.paused = {running_strategy_id for running_strategy_id, (_, status) in hosted.items() if status == "paused"}
+        for running_strategy_id, (saved_strategy_id, _) in hosted.items():
+            if running_strategy_id not in self.tasks:
+                self.tasks[running_strategy_id] = asyncio.create_task(self._run_strategy(running_strategy_id, saved_strategy_id))
+
+    # --- one strategy ---
+
+    def _load_saved_strategy(self, saved_strategy_id: int):
+        """Returns (SavedStrategy detached from the session, stored lookback found, stored lookback)."""
+        db = SessionLocal()
+        try:
+            record = db.query(SavedStrategy).filter(SavedStrategy.id == saved_strategy_id).first()
+            if record is None:
+                return None, False, None
+            found, lookback_periods = load_lookback(db, record.code)
+            db.expunge(record)
+            return record, found, lookback_periods
+        finally:
+            db.close()
+
+    async def _create_runner(self, running_strategy_id: int, saved_strategy_id: int, previous_runner=None):
+        record, found, lookback_periods = await asyncio.to_thread(self._load_saved_strategy, saved_strategy_id)
+        if record is None:
+            return None, None
+        module = strategy_loader.load(record.code).module
+        if not found:
+            lookback_periods = await self._in_process_pool(infer_lookback_safely, record.code)
+            await asyncio.to_thread(self._store_lookback, record.code, lookback_periods, getattr(module, 'REQUIRED_LOOKBACK_PERIODS', None))
+        runner = LiveStrategyRunner(self.data_service, running_strategy_id, record, module, lookback_periods)
+        if previous_runner is not None:
+            runner.take_position_from(previous_runner)
+        else:
+            # Claimed after a restart or from a scheduler that died: resume from the strategy's snapshot
+            await asyncio.to_thread(self._with_session, restore_snapshot, runner, record.code)
+        self.runners[running_strategy_id] = (saved_strategy_id, runner, record.code)
+        return runner, record.code
+
+    async def _in_process_pool(self, function, *args):
+        """
+        Runs function in the process pool. A worker that died (segfault, OOM kill, os._exit) breaks the whole
+        executor, failing every task in it: the broken executor is replaced and the task retried once, so only a
+        strategy that kills the new pool as well fails.
+        """
+        for attempt in range(2):
+            pool = self.process_pool
+            try:
+                return await asyncio.get_running_loop().run_in_executor(pool, function, *args)
+            except BrokenProcessPool:
+                if self.process_pool is pool:
+                    print("LIVE_SCHEDULER WARNING: Process pool broken by a dead worker, replacing it.")
+                    self.process_pool = ProcessPoolExecutor(max_workers=self.workers)
+                    pool.shutdown(wait=False)
+                if attempt:
+                    raise
+
+    def _with_session(self, function, *args):
+        db = SessionLocal()
+        try:
+            return function(db, *args)
+        finally:
+            db.close()
+
+    def _store_lookback(self, strategy_code, lookback_periods, declared_lookback_periods):
+        db = SessionLocal()
+        try:
+            store_lookback(db, strategy_code, lookback_periods, declared_lookback_periods)
+        finally:
+            db.close()
+
+    async def _window_signal(self, runner: LiveStrategyRunner, strategy_code: str, df):
+        if runner.needs_github_commits:
+            df = await asyncio.to_thread(runner.add_github_commits, df)
+        with timed("signal"):
+            if runner.streaming is not None:
+                return runner.signal_from_window(df)
+            df_with_signal = await asyncio.get_running_loop().run_in_executor(self.signal_threads, self.sandbox.generate_signal, df, strategy_code)
+            return latest_signal_row(df_with_signal)
+
+    async def _run_strategy(self, running_strategy_id: int, saved_strategy_id: int, previous_runner=None):
+        subscription = None
+        try:
+            runner, strategy_code = await self._create_runner(running_strategy_id, saved_strategy_id, previous_runner)
+            if runner is None:
+                print(f"LIVE_SCHEDULER ERROR: Saved strategy record {saved_strategy_id} not found.")
+                await asyncio.to_thread(self._set_error, running_strategy_id)
+                return
+            current_runner.set(runner.name) # Each task runs in its own context
+            print(f"LIVE_SCHEDULER: Hosting {runner.name} (run {running_strategy_id}), lookback {runner.lookback_periods} klines"
+                  f"{', streaming' if runner.streaming is not None else ''}.")
+            subscription = self.market_data.subscribe(runner.symbol, runner.currency, runner.interval, runner.lookback_periods)
+            snapshots = SnapshotSchedule()
+            while True:
+                df = await subscription.next_window()
+                if running_strategy_id in self.paused:
+                    continue
+                latest = await self._window_signal(runner, strategy_code, df)
+                with timed("trade"):
+                    trade_logs, equity_record = runner.process_signal(*latest)
+                with timed("persist"):
+                    await self._in_thread(self.write_buffer.add, trade_logs, equity_record)
+                    if snapshots.due(bool(trade_logs)):
+                        await self._in_thread(self._with_session, save_snapshot, runner, strategy_code)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            traceback.print_exc()
+            await asyncio.to_thread(self._set_error, running_strategy_id)
+        finally:
+            if subscription is not None:
+                self.market_data.unsubscribe(subscription)
+
+
+def run_scheduler(control: ControlListener | None = None):
+    asyncio.run(LiveScheduler(control=control).run())
+
+
+if __name__ == '__main__':
+    run_scheduler()
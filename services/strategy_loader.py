@@ -0,0 +1,99 @@
+import hashlib
+import importlib.util
+import inspect
+import threading
+from collections import OrderedDict
+
+from exceptions import MissingSignalFunctionException
+
+
+class LoadedStrategy:
+    """A strategy module that has been compiled, executed and validated once."""
+
+    def __init__(self, code_hash: str, code_object, module, metadata: dict):
+        self.code_hash = code_hash
+        self.code_object = code_object
+        self.module = module
+        self.metadata = metadata
+
+    @property
+    def generate_signal(self):
+        return self.module.generate_signal
+
+
+def strategy_code_hash(strategy_code: str) -> str:
+    return hashlib.sha256(strategy_code.encode("utf-8")).hexdigest()
+
+
+def _extract_metadata(module) -> dict:
+    parameters = {}
+    for index, parameter in enumerate(inspect.signature(module.generate_signal).parameters.values()):
+        if index == 0 or parameter.kind in (parameter.VAR_POSITIONAL, parameter.VAR_KEYWORD):
+            continue # The first parameter is the price DataFrame
+        parameters[parameter.name] = None if parameter.default is inspect.Parameter.empty else parameter.default
+    return {
+        "required_lookback_periods": getattr(module, "REQUIRED_LOOKBACK_PERIODS", None),
+        "parameters": parameters,
+        "supports_streaming": callable(getattr(module, "create_streaming_strategy", None)),
+        "description": inspect.getdoc(module.generate_signal),
+    }
+
+
+class StrategyLoader:
+    """
+    Loads strategy code into a module once per distinct code and caches it by code hash.
+
+    The compiled code object, the initialized module (module-level imports such as pandas/numpy already
+    executed) and its metadata are kept in a bounded LRU cache, so repeated backtests or runner starts
+    with the same code neither re-parse nor re-execute it. Cached modules are shared between callers,
+    so strategies must not keep per-run state in module globals.
+    """
+
+    def __init__(self, max_entries: int = 64):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def load(self, strategy_code: str) -> LoadedStrategy:
+        code_hash = strategy_code_hash(strategy_code)
+        with self._lock:
+            loaded = self._entries.get(code_hash)
+            if loaded is not None:
+                self._entries.move_to_end(code_hash)
+                self.hits += 1
+                return loaded
+            self.misses += 1
+
+        code_object = compile(strategy_code, f"<strategy {code_hash[:12]}>", "exec")
+        spec = importlib.util.spec_from_loader(f"strategy_{code_hash[:12]}", loader=None)
+        module = importlib.util.module_from_spec(spec)
+        exec(code_object, module.__dict__)
+
+        if not callable(getattr(module, 'generate_signal', None)):
+            raise MissingSignalFunctionException()
+
+        loaded = LoadedStrategy(code_hash, code_object, module, _extract_metadata(module))
+        with self._lock:
+            self._entries[code_hash] = loaded
+            self._entries.move_to_end(code_hash)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return loaded
+
+    def metadata(self, strategy_code: str) -> dict:
+        return self.load(strategy_code).metadata
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+
+strategy_loader = StrategyLoader()
@@ -0,0 +1,193 @@
+import ast
+import os
+import threading
+import time
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from database import SavedStrategy
+from services.strategy_loader import strategy_code_hash
+
+# Columns every kline DataFrame from DataService already provides
+BASE_COLUMNS = {"open", "high", "low", "close", "volume"}
+
+
+def _literal(node):
+    try:
+        return ast.literal_eval(node)
+    except (ValueError, TypeError, SyntaxError, MemoryError, RecursionError):
+        return None
+
+
+def _function_parameters(function: ast.FunctionDef) -> dict:
+    positional = function.args.posonlyargs + function.args.args
+    defaults = [None] * (len(positional) - len(function.args.defaults)) + list(function.args.defaults)
+    parameters = {arg.arg: _literal(default) if default is not None else None
+                  for arg, default in list(zip(positional, defaults))[1:]} # The first parameter is the price DataFrame
+    for arg, default in zip(function.args.kwonlyargs, function.args.kw_defaults):
+        parameters[arg.arg] = _literal(default) if default is not None else None
+    return parameters
+
+
+def _column_accesses(tree: ast.AST) -> tuple:
+    """Returns (read, written) column names of df['...'] subscripts anywhere in the module (helpers included)."""
+    read, written = set(), set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Subscript) and isinstance(node.slice, ast.Constant) and isinstance(node.slice.value, str):
+            (written if isinstance(node.ctx, ast.Store) else read).add(node.slice.value)
+    return read, written
+
+
+def extract_metadata(strategy_code: str) -> dict:
+    """
+    Describes a strategy from its source without executing it: lookback, tunable parameters of
+    generate_signal, the input columns it reads beyond the kline OHLCV columns (e.g. commit_count)
+    and which optional entry points (streaming, signal matrix) it defines.
+    """
+    try:
+        tree = ast.parse(strategy_code)
+    except SyntaxError as e:
+        return {"valid": False, "error": f"SyntaxError: {e.msg} (line {e.lineno})"}
+
+    metadata = {
+        "valid": False,
+        "required_lookback_periods": None,
+        "parameters": {},
+        "required_columns": [],
+        "supports_streaming": False,
+        "supports_signal_matrix": False,
+        "description": None,
+    }
+    read, written = _column_accesses(tree)
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and any(isinstance(target, ast.Name) and target.id == "REQUIRED_LOOKBACK_PERIODS" for target in node.targets):
+            metadata["required_lookback_periods"] = _literal(node.value)
+        elif isinstance(node, ast.FunctionDef):
+            if node.name == "generate_signal":
+                metadata["valid"] = True
+                metadata["parameters"] = _function_parameters(node)
+                metadata["required_columns"] = sorted(BASE_COLUMNS & read | (read - written - BASE_COLUMNS - {"signal"}))
+                metadata["description"] = ast.get_docstring(node)
+            elif node.name == "create_streaming_strategy":
+                metadata["supports_streaming"] = True
+            elif node.name == "generate_signal_matrix":
+                metadata["supports_signal_matrix"] = True
+    if not metadata["valid"]:
+        metadata["error"] = "generate_signal function not found"
+    return metadata
+
+
+class _Entry:
+    __slots__ = ("name", "code", "code_hash", "metadata", "version")
+
+    def __init__(self, name: str, code: str, version):
+        self.name = name
+        self.code = code
+        self.code_hash = strategy_code_hash(code)
+        self.metadata = extract_metadata(code)
+        self.version = version
+
+
+class StrategyRegistry:
+    """
+    In-memory index of the built-in strategies in Strategy/ and the SavedStrategy table.
+
+    Built-in files are re-stat'ed at most every check_interval seconds and only re-read when their
+    mtime changes; saved strategies are re-queried only when the table's (row count, max id) changes
+    (saved strategies are insert/delete only) or after invalidate_saved(). Metadata is extracted from
+    the AST, so listing or describing a strategy never executes its code.
+    """
+
+    def __init__(self, strategy_dir: str = "Strategy", check_interval: float = 2.0):
+        self.strategy_dir = strategy_dir
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._builtin = {}
+        self._builtin_checked_at = None
+        self._saved = {}
+        self._saved_signature = None
+
+    # --- built-in strategies ---
+
+    def _refresh_builtin(self, force: bool = False):
+        now = time.monotonic()
+        if not force and self._builtin_checked_at is not None and now - self._builtin_checked_at < self.check_interval:
+            return
+        current = {}
+        with os.scandir(self.strategy_dir) as entries:
+            for entry in entries:
+                if entry.is_file() and entry.name.endswith(".py") and entry.name != "__init__.py":
+                    current[entry.name[:-3]] = (entry.path, entry.stat().st_mtime_ns)
+        builtin = {}
+        for name, (path, mtime) in current.items():
+            cached = self._builtin.get(name)
+            if cached is not None and cached.version == mtime:
+                builtin[name] = cached
+                continue
+            with open(path, "r", encoding="utf-8") as f:
+                builtin[name] = _Entry(name, f.read(), mtime)
+        self._builtin = builtin
+        self._builtin_checked_at = now
+
+    def list_strategies(self) -> list:
+        with self._lock:
+            self._refresh_builtin()
+            return sorted(self._builtin)
+
+    def get_code(self, name: str) -> str | None:
+        with self._lock:
+            self._refresh_builtin()
+            entry = self._builtin.get(name)
+        return entry.code if entry is not None else None
+
+    def get_metadata(self, name: str) -> dict | None:
+        with self._lock:
+            self._refresh_builtin()
+            entry = self._builtin.get(name)
+        return entry.metadata if entry is not None else None
+
+    # --- saved strategies ---
+
+    def _refresh_saved(self, db: Session):
+        signature = db.query(func.count(SavedStrategy.id), func.max(SavedStrategy.id)).one()
+        signature = tuple(signature)
+        if signature == self._saved_signature:
+            return
+        saved = {}
+        for strategy_id, name, code in db.query(SavedStrategy.id, SavedStrategy.name, SavedStrategy.code).all():
+            cached = self._saved.get(name)
+            saved[name] = cached if cached is not None and cached.version == strategy_id and cached.code == code else _Entry(name, code, strategy_id)
+        self._saved = saved
+        self._saved_signature = signature
+
+    def invalidate_saved(self):
+        with self._lock:
+            self._saved_signature = None
+
+    def get_saved_metadata(self, name: str, db: Session) -> dict | None:
+        with self._lock:
+            self._refresh_saved(db)
+            entry = self._saved.get(name)
+        return entry.metadata if entry is not None else None
+
+    def describe(self, name: str, db: Session | None = None) -> dict | None:
+        """Metadata of a built-in strategy, or of a saved strategy with that name if db is given."""
+        metadata = self.get_metadata(name)
+        if metadata is not None:
+            return {"name": name, "source": "builtin", **metadata}
+        if db is not None:
+            metadata = self.get_saved_metadata(name, db)
+            if metadata is not None:
+                return {"name": name, "source": "saved", **metadata}
+        return None
+
+    def refresh(self, db: Session | None = None):
+        with self._lock:
+            self._refresh_builtin(force=True)
+            if db is not None:
+                self._saved_signature = None
+                self._refresh_saved(db)
+
+
+strategy_registry = StrategyRegistry()
@@ -1,29 +1,77 @@
+from fastapi import HTTPException
+from sqlalchemy import func
 from sqlalchemy.orm import Session
-from datetime import datetime, timedelta
+from datetime import datetime
 import multiprocessing
 import time
-import importlib.util
 import os
+import threading
 import pandas as pd
+import psutil
 import traceback
 
-from database import SessionLocal, SavedStrategy, RunningStrategy, TradeLog, EquityCurve
+from config import LIVE_RUNNER_MODE, LIVE_SCHEDULING, LIVE_BAR_SETTLE_SECONDS, LIVE_BAR_CONFIRM_RETRIES, LIVE_BAR_CONFIRM_DELAY_SECONDS, RUNNER_SUPERVISOR_SECONDS
+from database import SessionLocal, SavedStrategy, RunningStrategy, TradeLog
+from services.control import ControlChannel, ControlListener
 from services.data_service import DataService
+from services.equity_store import equity_points, latest_equity_points, delete_equity
+from services.leases import unleased_strategies, delete_lease, stop_acknowledged
+from services.live_runner import LiveStrategyRunner, next_bar_close
+from services.lookback import get_or_infer_lookback
+from services.metrics import current_runner, timed
+from services.partitions import delete_strategy_rows
+from services.runner_pool import RunnerPool
+from services.runner_state import SnapshotSchedule, save_snapshot, restore_snapshot, delete_snapshot
+from services.scheduler import run_scheduler
+from services.strategy_loader import strategy_loader
+from services.strategy_registry import strategy_registry
+from services.write_buffer import WriteBuffer
 from exceptions import (
     StrategyNotFoundException,
     StrategyAlreadyRunningException,
     StrategyCodeMissingException,
     StrategyNameExistsException,
-    MissingSignalFunctionException
+    StrategyNotRunningException
 )
 
+POLL_INTERVAL_SECONDS = 5
+# Runners get stop/pause/resume/reload pushed over the control channel; the DB status is only re-read this often,
+# in case a command was missed (e.g. a NOTIFY sent while the listener was reconnecting)
+CONTROL_RECONCILE_SECONDS = 60
+CONTROL_STOP_TIMEOUT_SECONDS = 10
+STOP_ACKNOWLEDGE_POLL_SECONDS = 0.1
+
+
 class StrategyService:
     def __init__(self):
         self.running_strategy_processes = {}
+        self.scheduler_process = None
+        self.control = ControlChannel()
         self.data_service = DataService()
-
-    def _run_live_strategy_process(self, running_strategy_id: int, saved_strategy_id: int):
+        self.runner_pool = RunnerPool(run_live_strategy_process, self.control)
+
+    def _load_runner(self, db: Session, running_strategy_id: int, saved_strategy_record):
+        live_strategy = strategy_loader.load(saved_strategy_record.code)
+        lookback_periods = get_or_infer_lookback(db, saved_strategy_record.code, live_strategy.module)
+        runner = LiveStrategyRunner(self.data_service, running_strategy_id, saved_strategy_record, live_strategy.module, lookback_periods)
+        print(f"STRATEGY_RUNNER: Strategy {saved_strategy_record.name} (ID: {saved_strategy_record.id}) uses a lookback of {runner.lookback_periods} klines.")
+        if runner.streaming is not None:
+            print(f"STRATEGY_RUNNER: Strategy {saved_strategy_record.name} (ID: {saved_strategy_record.id}) runs in streaming mode.")
+        return runner
+
+    def _status_command(self, db: Session, running_strategy_id: int) -> dict:
+        """The command matching the DB status: the fallback for a control message that was missed."""
+        db.expire_all()
+        record = db.query(RunningStrategy).filter(RunningStrategy.id == running_strategy_id).first()
+        if not record or record.status == "stopped":
+            return {"command": "stop"}
+        return {"command": "pause" if record.status == "paused" else "resume"}
+
+    def _run_live_strategy_process(self, running_strategy_id: int, saved_strategy_id: int, control: ControlListener, on_started=None):
         db = SessionLocal()
+        write_buffer = WriteBuffer()
+        runner = None
+        stop_requested = False
         try:
             running_strategy_record = db.query(RunningStrategy).filter(RunningStrategy.id == running_strategy_id).first()
             if not running_strategy_record:
@@ -35,149 +83,81 @@ class StrategyService:
                 print(f"STRATEGY_RUNNER ERROR: Saved strategy record {saved_strategy_id} not found.")
                 return
 
+            # A strategy restarted by the supervisor while paused stays paused
+            paused = running_strategy_record.status == "paused"
             running_strategy_record.pid = os.getpid()
-            running_strategy_record.status = "running"
+            running_strategy_record.status = "paused" if paused else "running"
             db.commit()
-            print(f"STRATEGY_RUNNER: Updated running_strategy {running_strategy_id} status to 'running' with PID {os.getpid()}")
+            print(f"STRATEGY_RUNNER: Updated running_strategy {running_strategy_id} status to '{running_strategy_record.status}' with PID {os.getpid()}")
 
-            strategy_code = saved_strategy_record.code
             symbol = saved_strategy_record.symbol
             currency = saved_strategy_record.currency
-            interval = saved_strategy_record.interval
-            initial_capital = saved_strategy_record.initial_capital
-            commission_rate = saved_strategy_record.commission_rate
-            slippage = saved_strategy_record.slippage
-            risk_free_rate = saved_strategy_record.risk_free_rate
-            github_owner = saved_strategy_record.github_owner
-            github_repo = saved_strategy_record.github_repo
-
-            spec = importlib.util.spec_from_loader("live_strategy_module", loader=None)
-            live_strategy_module = importlib.util.module_from_spec(spec)
-            exec(strategy_code, live_strategy_module.__dict__)
-
-            if not hasattr(live_strategy_module, 'generate_signal'):
-                raise MissingSignalFunctionException()
-
-            lookback_periods = getattr(live_strategy_module, 'REQUIRED_LOOKBACK_PERIODS', 100)
-
-            current_capital = initial_capital
-            current_holding_shares = 0
-            last_processed_time = None
-
-            def calculate_start_dt(end_dt, interval, lookback_periods=200):
-                if interval == '1m':
-                    return end_dt - timedelta(minutes=lookback_periods)
-                elif interval == '3m':
-                    return end_dt - timedelta(minutes=lookback_periods * 3)
-                elif interval == '5m':
-                    return end_dt - timedelta(minutes=lookback_periods * 5)
-                elif interval == '15m':
-                    return end_dt - timedelta(minutes=lookback_periods * 15)
-                elif interval == '30m':
-                    return end_dt - timedelta(minutes=lookback_periods * 30)
-                elif interval == '1h':
-                    return end_dt - timedelta(hours=lookback_periods)
-                elif interval == '4h':
-                    return end_dt - timedelta(hours=lookback_periods * 4)
-                elif interval == '1d':
-                    return end_dt - timedelta(days=lookback_periods)
-                else:
-                    print(f"Warning: Unknown interval '{interval}'. Defaulting to 365 days lookback.")
-                    return end_dt - timedelta(days=365)
+            runner = self._load_runner(db, running_strategy_id, saved_strategy_record)
+            current_runner.set(saved_strategy_record.name)
+            restore_snapshot(db, runner, saved_strategy_record.code)
+            snapshots = SnapshotSchedule()
+            if on_started is not None:
+                on_started()
+
+            # In bar_close scheduling the loop wakes once per kline, just after it closes; it starts from the last closed kline
+            bar_aligned = LIVE_SCHEDULING == "bar_close" and runner.interval_delta is not None
+            due_at = next_bar_close(runner.interval_delta) - runner.interval_delta.total_seconds() + LIVE_BAR_SETTLE_SECONDS if bar_aligned else time.time()
+            status_checked_at = time.monotonic()
 
             while True:
-                # Re-fetch the running strategy record in each iteration to get the latest status
-                current_running_strategy = db.query(RunningStrategy).filter(RunningStrategy.id == running_strategy_id).first()
-
-                if not current_running_strategy or current_running_strategy.status == "stopped":
-                    print(f"STRATEGY_RUNNER: Strategy {saved_strategy_record.name} (ID: {saved_strategy_id}) stopped or deleted. Exiting loop.")
-                    break
-
-                # Update the local running_strategy_record reference
-                running_strategy_record = current_running_strategy
+                wait_seconds = due_at - time.time()
+                if paused or wait_seconds > 0:
+                    # Idle until the next run or a control command (stop/pause/resume/reload pushed by the API)
+                    write_buffer.flush_if_due()
+                    commands = control.wait(CONTROL_RECONCILE_SECONDS if paused else min(wait_seconds, CONTROL_RECONCILE_SECONDS))
+                    if not commands and time.monotonic() - status_checked_at >= CONTROL_RECONCILE_SECONDS:
+                        commands = [self._status_command(db, running_strategy_id)]
+                        status_checked_at = time.monotonic()
+                    for command in commands:
+                        if command["command"] == "stop":
+                            stop_requested = True
+                        elif command["command"] == "pause":
+                            paused = True
+                        elif command["command"] == "resume":
+                            paused = False
+                        elif command["command"] == "reload":
+                            db.expire_all()
+                            saved_strategy_record = db.query(SavedStrategy).filter(SavedStrategy.id == saved_strategy_id).first()
+                            runner = self._load_runner(db, running_strategy_id, saved_strategy_record).take_position_from(runner)
+                            print(f"STRATEGY_RUNNER: Strategy {saved_strategy_record.name} (ID: {saved_strategy_id}) reloaded.")
+                    if stop_requested:
+                        # Its equity curve is being deleted, so buffered points are dropped rather than written back
+                        write_buffer.discard(running_strategy_id)
+                        print(f"STRATEGY_RUNNER: Strategy {saved_strategy_record.name} (ID: {saved_strategy_id}) stopped or deleted. Exiting loop.")
+                        break
+                    continue
 
                 print(f"STRATEGY_RUNNER: Fetching data for {symbol}{currency} at {datetime.now()} for strategy {saved_strategy_record.name} (ID: {saved_strategy_id})...")
-                end_dt = datetime.now()
-                start_dt = calculate_start_dt(end_dt, interval, lookback_periods)
-                print(f"STRATEGY_RUNNER DEBUG: Strategy calculation data range: start_dt={start_dt}, end_dt={end_dt}, lookback_periods={lookback_periods}")
-
-                df = self.data_service.get_crypto_prices(symbol, currency, start_dt, end_dt, interval)
-                print(f"STRATEGY_RUNNER DEBUG: Received {len(df)} klines for strategy calculation.")
-                if df.empty:
+                if bar_aligned:
+                    # The most recent close, which is the one waited for unless the loop was paused or retrying
+                    bar_close = next_bar_close(runner.interval_delta) - runner.interval_delta.total_seconds()
+                    latest = runner.latest_closed_signal(bar_close, LIVE_BAR_CONFIRM_RETRIES, LIVE_BAR_CONFIRM_DELAY_SECONDS)
+                else:
+                    latest = runner.latest_signal()
+                if latest is None:
                     print(f"STRATEGY_RUNNER WARNING: No crypto data fetched for {symbol}{currency}. Retrying in 60 seconds.")
-                    time.sleep(60)
+                    due_at = time.time() + 60
                     continue
 
-                if saved_strategy_record.name == "commit_sma" and github_owner and github_repo:
-                    github_commits_df = self.data_service.get_github_commits(github_owner, github_repo, start_dt, end_dt, {})
-                    if github_commits_df.empty:
-                        print("STRATEGY_RUNNER WARNING: No GitHub commit data fetched. Strategy might not work as expected.")
-                    else:
-                        github_commits_count = github_commits_df.groupby(github_commits_df['date'].dt.floor('D')).size().reset_index(name='commit_count')
-                        github_commits_count.rename(columns={'date': 'open_time'}, inplace=True)
-                        github_commits_count.set_index('open_time', inplace=True)
-                        df = pd.merge(df, github_commits_count, left_index=True, right_index=True, how='left')
-                        df['commit_count'] = df['commit_count'].fillna(0)
-
-                df_with_signal = live_strategy_module.generate_signal(df.copy())
-                latest_signal_row = df_with_signal.iloc[-1]
-                latest_signal = latest_signal_row['signal']
+                latest_signal, latest_close_price, latest_open_time = latest
                 print(f"STRATEGY_RUNNER DEBUG: Latest generated signal: {latest_signal}")
-                latest_close_price = latest_signal_row['close']
-                latest_open_time = df_with_signal.index[-1]
-
-                if last_processed_time is None or latest_open_time > last_processed_time:
-                    print(f"STRATEGY_RUNNER: New signal generated at {latest_open_time}: {latest_signal}")
-                    if latest_signal == 1:
-                        if current_holding_shares == 0:
-                            buy_price = latest_close_price * (1 + slippage)
-                            shares_to_buy = (current_capital / (buy_price * (1 + commission_rate)))
-                            if shares_to_buy > 0:
-                                commission = shares_to_buy * buy_price * commission_rate
-                                current_capital -= (shares_to_buy * buy_price + commission)
-                                current_holding_shares += shares_to_buy
-                                trade_log = TradeLog(
-                                    running_strategy_id=running_strategy_id,
-                                    timestamp=latest_open_time,
-                                    trade_type="buy",
-                                    price=buy_price,
-                                    quantity=shares_to_buy,
-                                    commission=commission
-                                )
-                                db.add(trade_log)
-                                db.commit()
-
-                    elif latest_signal == -1:
-                        if current_holding_shares > 0:
-                            sell_price = latest_close_price * (1 - slippage)
-                            commission = current_holding_shares * sell_price * commission_rate
-                            profit_loss = (current_holding_shares * sell_price - (initial_capital - current_capital)) - commission
-                            current_capital += (current_holding_shares * sell_price - commission)
-                            trade_log = TradeLog(
-                                running_strategy_id=running_strategy_id,
-                                timestamp=latest_open_time,
-                                trade_type="sell",
-                                price=sell_price,
-                                quantity=current_holding_shares,
-                                commission=commission,
-                                profit_loss=profit_loss
-                            )
-                            db.add(trade_log)
-                            db.commit()
-                            current_holding_shares = 0
-
-                current_equity = current_capital + current_holding_shares * latest_close_price
-                equity_record = EquityCurve(
-                    running_strategy_id=running_strategy_id,
-                    timestamp=latest_open_time,
-                    equity=current_equity
-                )
-                db.add(equity_record)
-                db.commit()
 
-                last_processed_time = latest_open_time
+                with timed("trade"):
+                    trade_logs, equity_record = runner.process_signal(latest_signal, latest_close_price, latest_open_time)
+                with timed("persist"):
+                    write_buffer.add(trade_logs, equity_record)
+                    if snapshots.due(bool(trade_logs)):
+                        save_snapshot(db, runner, saved_strategy_record.code)
 
-                time.sleep(5)
+                if bar_aligned:
+                    due_at = next_bar_close(runner.interval_delta) + LIVE_BAR_SETTLE_SECONDS
+                else:
+                    due_at = time.time() + POLL_INTERVAL_SECONDS
 
         except Exception as e:
             import traceback
@@ -192,8 +172,124 @@ class StrategyService:
                 except Exception as db_e:
                     print(f"STRATEGY_RUNNER ERROR: Failed to update strategy status to 'error' in DB: {db_e}")
         finally:
+            try:
+                write_buffer.flush("stop")
+                print(f"STRATEGY_RUNNER: Write buffer stats for running strategy {running_strategy_id}: {write_buffer.stats()}")
+            except Exception as flush_e:
+                print(f"STRATEGY_RUNNER ERROR: Failed to flush buffered equity points: {flush_e}")
+            if runner is not None and not stop_requested:
+                try:
+                    save_snapshot(db, runner, saved_strategy_record.code)
+                except Exception as snapshot_e:
+                    print(f"STRATEGY_RUNNER ERROR: Failed to save runner snapshot: {snapshot_e}")
+            control.close()
             db.close()
 
+    def _ensure_scheduler(self):
+        if self.scheduler_process is None or not self.scheduler_process.is_alive():
+            self.scheduler_process = multiprocessing.Process(target=run_scheduler, args=(self.control.listener("scheduler"),))
+            self.scheduler_process.start()
+            print(f"DEBUG: Started live strategy scheduler with PID {self.scheduler_process.pid}.")
+        return self.scheduler_process
+
+    def _send_control(self, command: str, running_strategy_id: int):
+        # In scheduler mode every command goes to the scheduler's listener, which hosts all strategies
+        self.control.send(command, running_strategy_id, key="scheduler" if LIVE_RUNNER_MODE == "scheduler" else None)
+
+    def _stop_process(self, running_strategy_id: int, db: Session):
+        """
+        Asks the runner process to stop (it flushes and exits at once) and only terminates it if it does not. In
+        scheduler mode there is no process to join: the runner node releases the strategy's lease once its last
+        write is done, and that is waited for instead, so no write of this run lands after its rows are deleted.
+        """
+        self._send_control("stop", running_strategy_id)
+        process = self.running_strategy_processes.pop(running_strategy_id, None)
+        self.control.forget(running_strategy_id)
+        if LIVE_RUNNER_MODE == "scheduler":
+            deadline = time.monotonic() + CONTROL_STOP_TIMEOUT_SECONDS
+            while not stop_acknowledged(db, running_strategy_id):
+                if time.monotonic() >= deadline:
+                    print(f"WARNING: Runner node of strategy {running_strategy_id} did not release it within {CONTROL_STOP_TIMEOUT_SECONDS} seconds.")
+                    break
+                time.sleep(STOP_ACKNOWLEDGE_POLL_SECONDS)
+            db.commit() # Ends the read transaction of the polls
+            return
+        if process is None:
+            return
+        if not process.is_alive():
+            print(f"DEBUG: Process for strategy {running_strategy_id} was already dead.")
+            return
+        process.join(timeout=CONTROL_STOP_TIMEOUT_SECONDS)
+        if process.is_alive():
+            print(f"WARNING: Process {process.pid} for strategy {running_strategy_id} did not stop within {CONTROL_STOP_TIMEOUT_SECONDS} seconds, terminating it.")
+            process.terminate()
+            process.join(timeout=5)
+            if process.is_alive():
+                print(f"WARNING: Process {process.pid} for strategy {running_strategy_id} did not terminate gracefully, attempting kill.")
+                os.kill(process.pid, 9) # Force kill
+                process.join(timeout=1)
+
+    def _spawn_runner(self, running_strategy_id: int, saved_strategy_id: int):
+        # Runs in a pre-forked worker of the runner pool, which is already connected to the database
+        process = self.runner_pool.assign(running_strategy_id, saved_strategy_id)
+        self.running_strategy_processes[running_strategy_id] = process
+        return process
+
+    def _runner_alive(self, running_strategy) -> bool:
+        # Our own children are checked through their Process, which also reaps them once they have exited
+        process = self.running_strategy_processes.get(running_strategy.id) or self.scheduler_process
+        if process is not None and process.pid == running_strategy.pid:
+            return process.is_alive()
+        return bool(running_strategy.pid) and psutil.pid_exists(running_strategy.pid)
+
+    def supervise(self, db: Session) -> list:
+        """
+        Restarts live strategies whose runner exited without being stopped (a crash, an OOM kill, a redeploy); they
+        resume from their snapshot. In scheduler mode any runner node claims strategies without a valid lease
+        itself, so this only makes sure the API's own scheduler is running while there are such strategies. A row
+        is claimed with a conditional UPDATE, so several API processes can supervise the same database. Returns
+        the ids of the running strategies restarted (or waiting for a runner node).
+        """
+        db.expire_all()
+        if LIVE_RUNNER_MODE == "scheduler":
+            unleased = unleased_strategies(db)
+            if unleased:
+                self._ensure_scheduler()
+            return unleased
+        rows = db.query(RunningStrategy).filter(RunningStrategy.status.in_(("starting", "running", "paused"))).all()
+        restarted = []
+        for row in rows:
+            # A 'starting' row's process has not written its pid yet
+            if row.status == "starting" or self._runner_alive(row):
+                continue
+            claimed = db.query(RunningStrategy).filter(
+                RunningStrategy.id == row.id, RunningStrategy.status == row.status, RunningStrategy.pid == row.pid
+            ).update({"pid": os.getpid(), "last_updated_at": datetime.now()}, synchronize_session=False)
+            db.commit()
+            if not claimed:
+                continue
+            print(f"STRATEGY_SUPERVISOR: Runner {row.pid} of running strategy {row.id} is gone, restarting it from its snapshot.")
+            process = self._spawn_runner(row.id, row.strategy_id)
+            db.query(RunningStrategy).filter(RunningStrategy.id == row.id, RunningStrategy.pid == os.getpid()).update(
+                {"pid": process.pid}, synchronize_session=False)
+            db.commit()
+            restarted.append(row.id)
+        return restarted
+
+    def start_supervisor(self, interval: float = RUNNER_SUPERVISOR_SECONDS):
+        """Runs supervise() every interval seconds in a daemon thread."""
+        def supervise_forever():
+            while True:
+                db = SessionLocal()
+                try:
+                    self.supervise(db)
+                except Exception:
+                    traceback.print_exc()
+                finally:
+                    db.close()
+                time.sleep(interval)
+        threading.Thread(target=supervise_forever, name="strategy-supervisor", daemon=True).start()
+
     def start_strategy(self, strategy_id: int, db: Session):
         saved_strategy = db.query(SavedStrategy).filter(SavedStrategy.id == strategy_id).first()
         if not saved_strategy:
@@ -209,19 +305,22 @@ class StrategyService:
             db.commit()
             db.refresh(running_strategy)
         else:
+            # A new run starts from the initial capital, not from the snapshot of the previous one
+            delete_snapshot(db, running_strategy.id)
             running_strategy.status = "starting"
             running_strategy.started_at = datetime.now()
             running_strategy.last_updated_at = datetime.now()
             db.commit()
 
+        if LIVE_RUNNER_MODE == "scheduler":
+            # The scheduler process picks up the 'starting' record and sets pid/status itself
+            scheduler_process = self._ensure_scheduler()
+            self._send_control("start", running_strategy.id)
+            return {"message": "Strategy started successfully!", "running_strategy_id": running_strategy.id, "pid": scheduler_process.pid}
+
         try:
             # Start the strategy in a separate process
-            process = multiprocessing.Process(
-                target=self._run_live_strategy_process,
-                args=(running_strategy.id, saved_strategy.id)
-            )
-            process.start()
-            self.running_strategy_processes[running_strategy.id] = process
+            process = self._spawn_runner(running_strategy.id, saved_strategy.id)
             # The PID will be updated by the _run_live_strategy_process itself
             return {"message": "Strategy started successfully!", "running_strategy_id": running_strategy.id, "pid": process.pid}
         except Exception as e:
@@ -247,22 +346,14 @@ class StrategyService:
             db.commit()
             print(f"DEBUG: Set running strategy {running_strategy.id} status to 'stopped'.")
 
-            # Terminate the process if it's still running
-            if running_strategy.id in self.running_strategy_processes:
-                process = self.running_strategy_processes[running_strategy.id]
-                if process.is_alive():
-                    process.terminate()
-                    process.join(timeout=5) # Give it some time to terminate
-                    if process.is_alive():
-                        print(f"WARNING: Process {process.pid} for strategy {running_strategy.id} did not terminate gracefully.")
-                    del self.running_strategy_processes[running_strategy.id]
-                else:
-                    print(f"DEBUG: Process for strategy {running_strategy.id} was already dead.")
-                    del self.running_strategy_processes[running_strategy.id]
+            # Stop the runner (it exits after flushing) before its logs are deleted
+            self._stop_process(running_strategy.id, db)
 
             # Delete associated trade logs and equity curves first
-            db.query(TradeLog).filter(TradeLog.running_strategy_id == running_strategy.id).delete()
-            db.query(EquityCurve).filter(EquityCurve.running_strategy_id == running_strategy.id).delete()
+            delete_strategy_rows(db, TradeLog, running_strategy.id)
+            delete_equity(db, running_strategy.id)
+            delete_snapshot(db, running_strategy.id)
+            delete_lease(db, running_strategy.id)
             db.commit() # Commit deletions of related records
 
             return {"message": "Strategy stopped successfully!"}
@@ -282,27 +373,14 @@ class StrategyService:
                 db.commit()
                 print(f"DEBUG: Set running strategy {running_strategy.id} status to 'stopped' for deletion.")
 
-            # Terminate the process if it's still running
-            if running_strategy.id in self.running_strategy_processes:
-                process = self.running_strategy_processes[running_strategy.id]
-                if process.is_alive():
-                    process.terminate()
-                    # Wait for the process to actually terminate
-                    process.join(timeout=1) # Reduced timeout
-                    if process.is_alive():
-                        print(f"WARNING: Process {process.pid} for strategy {running_strategy.id} did not terminate gracefully, attempting kill.")
-                        os.kill(process.pid, 9) # Force kill
-                        process.join(timeout=1) # Wait again after kill
-                    if process.is_alive():
-                        print(f"ERROR: Process {process.pid} for strategy {running_strategy.id} is still alive after force kill.")
-                    del self.running_strategy_processes[running_strategy.id]
-                else:
-                    print(f"DEBUG: Process for strategy {running_strategy.id} was already dead.")
-                    del self.running_strategy_processes[running_strategy.id]
+            # Stop the runner (it exits after flushing) before its logs are deleted
+            self._stop_process(running_strategy.id, db)
 
             # Delete its associated trade logs and equity curves
-            db.query(TradeLog).filter(TradeLog.running_strategy_id == running_strategy.id).delete()
-            db.query(EquityCurve).filter(EquityCurve.running_strategy_id == running_strategy.id).delete()
+            delete_strategy_rows(db, TradeLog, running_strategy.id)
+            delete_equity(db, running_strategy.id)
+            delete_snapshot(db, running_strategy.id)
+            delete_lease(db, running_strategy.id)
             db.commit() # Commit deletions of related records
             # Then delete the running strategy itself
             db.delete(running_strategy)
@@ -311,8 +389,33 @@ class StrategyService:
 
         db.delete(strategy)
         db.commit()
+        strategy_registry.invalidate_saved()
         return {"message": "Strategy deleted successfully!"}
 
+    def _set_paused(self, strategy_id: int, paused: bool, db: Session):
+        running_strategy = db.query(RunningStrategy).filter(RunningStrategy.strategy_id == strategy_id).first()
+        if not running_strategy or running_strategy.status not in ("running", "paused"):
+            raise StrategyNotRunningException(strategy_id=strategy_id)
+        running_strategy.status = "paused" if paused else "running"
+        db.commit()
+        self._send_control("pause" if paused else "resume", running_strategy.id)
+
+    def pause_strategy(self, strategy_id: int, db: Session):
+        self._set_paused(strategy_id, True, db)
+        return {"message": "Strategy paused successfully!"}
+
+    def resume_strategy(self, strategy_id: int, db: Session):
+        self._set_paused(strategy_id, False, db)
+        return {"message": "Strategy resumed successfully!"}
+
+    def reload_strategy(self, strategy_id: int, db: Session):
+        """Makes the live runner reload the saved strategy (code and settings), keeping its paper position."""
+        running_strategy = db.query(RunningStrategy).filter(RunningStrategy.strategy_id == strategy_id).first()
+        if not running_strategy or running_strategy.status not in ("running", "paused"):
+            raise StrategyNotRunningException(strategy_id=strategy_id)
+        self._send_control("reload", running_strategy.id)
+        return {"message": "Strategy reload requested."}
+
     def get_strategy_status(self, strategy_id: int, db: Session):
         running_strategy = db.query(RunningStrategy).filter(RunningStrategy.strategy_id == strategy_id).first()
         if not running_strategy:
@@ -332,8 +435,7 @@ class StrategyService:
         if not running_strategy:
             raise StrategyNotFoundException(strategy_id=strategy_id)
 
-        equity_curve = db.query(EquityCurve).filter(EquityCurve.running_strategy_id == running_strategy.id).order_by(EquityCurve.timestamp).all()
-        return equity_curve
+        return equity_points(db, running_strategy.id)
 
     def save_strategy(self, request: dict, db: Session):
         strategy_name = request.get("name")
@@ -372,37 +474,42 @@ class StrategyService:
         db.add(new_strategy)
         db.commit()
         db.refresh(new_strategy)
+        strategy_registry.invalidate_saved()
         return {"message": "Strategy saved successfully!", "strategy_id": new_strategy.id}
 
     def get_strategies(self, db: Session):
+        """
+        Saved strategies with the trade count, total P&L and last 100 equity points of their running strategy, in
+        two queries however many strategies there are: one joining per-strategy trade aggregates, one for the
+        equity points of all of them.
+        """
+        # P&L sums only 'sell' trades, as 'buy' trades don't have profit_loss
+        trade_totals = db.query(
+            TradeLog.running_strategy_id,
+            func.count(TradeLog.id).label("trade_count"),
+            func.sum(TradeLog.profit_loss).filter(TradeLog.trade_type == "sell").label("total_profit_loss"),
+        ).group_by(TradeLog.running_strategy_id).subquery()
+        rows = db.query(SavedStrategy, RunningStrategy.id, trade_totals.c.trade_count, trade_totals.c.total_profit_loss).outerjoin(
+            RunningStrategy, RunningStrategy.strategy_id == SavedStrategy.id
+        ).outerjoin(trade_totals, trade_totals.c.running_strategy_id == RunningStrategy.id).order_by(SavedStrategy.id).all()
+
+        # Equity curve data for the sparklines, limited to the last 100 points (older history from the hourly/daily rollups)
+        equity_curves = latest_equity_points(db, [row[1] for row in rows if row[1] is not None], limit=100)
+
         strategies = []
-        saved_strategies = db.query(SavedStrategy).all()
-        for saved_strategy in saved_strategies:
+        for saved_strategy, running_strategy_id, trade_count, total_profit_loss in rows:
             strategy_data = saved_strategy.__dict__.copy()
             strategy_data.pop('_sa_instance_state', None) # Remove SQLAlchemy internal state
-
-            running_strategy = db.query(RunningStrategy).filter(RunningStrategy.strategy_id == saved_strategy.id).first()
-            
-            trade_count = 0
-            total_profit_loss = 0.0
-            equity_curve_data = []
-
-            if running_strategy:
-                trade_logs = db.query(TradeLog).filter(TradeLog.running_strategy_id == running_strategy.id).all()
-                trade_count = len(trade_logs)
-                # Sum profit_loss only for 'sell' trades, as 'buy' trades don't have profit_loss
-                total_profit_loss = sum(log.profit_loss for log in trade_logs if log.trade_type == 'sell' and log.profit_loss is not None)
-
-                # Fetch equity curve data, limit to last 100 points for sparkline
-                equity_records = db.query(EquityCurve).filter(EquityCurve.running_strategy_id == running_strategy.id).order_by(EquityCurve.timestamp.desc()).limit(100).all()
-                # Reverse the order to be chronological for charting
-                equity_curve_data = [[record.timestamp.isoformat(), record.equity] for record in reversed(equity_records)]
-            
-            strategy_data['trade_count'] = trade_count
-            strategy_data['total_profit_loss'] = round(total_profit_loss, 2) # Round to 2 decimal places for display
-            strategy_data['equity_curve_data'] = equity_curve_data
-            print(f"DEBUG: Equity curve data for strategy {saved_strategy.id}: {equity_curve_data[:5]}...") # Print first 5 points for brevity
+            strategy_data['trade_count'] = trade_count or 0
+            strategy_data['total_profit_loss'] = round(total_profit_loss or 0.0, 2) # Round to 2 decimal places for display
+            strategy_data['equity_curve_data'] = [[timestamp.isoformat(), equity] for timestamp, equity in equity_curves.get(running_strategy_id, [])]
             strategies.append(strategy_data)
         return strategies
 
+
+def run_live_strategy_process(running_strategy_id: int, saved_strategy_id: int, control: ControlListener, on_started=None):
+    """The runner pool's entry point: a module-level function, so it can be pickled to a forkserver worker."""
+    strategy_service._run_live_strategy_process(running_strategy_id, saved_strategy_id, control, on_started)
+
+
 strategy_service = StrategyService()
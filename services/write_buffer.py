@@ -0,0 +1,190 @@
+import threading
+import time
+
+from sqlalchemy import insert
+
+from config import LIVE_WRITE_BUFFER_ROWS, LIVE_WRITE_BUFFER_SECONDS
+from database import SessionLocal, EquityCurve, TradeLog
+from services.equity_store import upsert_equity_rows
+from services.partitions import ensure_partitions
+
+
+def _row(record) -> dict:
+    return {column.name: getattr(record, column.name) for column in record.__table__.columns if not column.primary_key}
+
+
+class WriteBuffer:
+    """
+    Write-behind buffer for the TradeLog and EquityCurve rows produced by live strategies.
+
+    Rows are kept per running strategy. Equity points are held in memory, one per bar (a later point for the
+    same bar replaces the pending one, and the flush upserts on the same key), and written with one multi-row
+    statement per table once max_rows are pending or the oldest has waited max_delay seconds (checked on every
+    add and by flush_if_due, which the loops call while idle). Trades are never buffered: adding one flushes it
+    together with all pending equity points in a single transaction, so a trade is committed before the runner
+    moves on. If a flush fails, each strategy's rows are retried in their own transaction, so one bad batch (e.g.
+    of a strategy deleted meanwhile) cannot block the others; a batch that still fails after max_attempts
+    flushes is dropped. discard() drops the rows of a strategy that was stopped or deleted. Safe to share
+    between threads.
+    """
+
+    def __init__(self, max_rows: int = LIVE_WRITE_BUFFER_ROWS, max_delay: float = LIVE_WRITE_BUFFER_SECONDS,
+                 session_factory=SessionLocal, max_attempts: int = 3):
+        self.max_rows = max_rows
+        self.max_delay = max_delay
+        self.session_factory = session_factory
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        self._pending = {} # running_strategy_id -> _Batch
+        self._oldest = None
+        self.equity_points_merged = 0
+        self.flushes = 0
+        self.failed_flushes = 0
+        self.rows_written = 0
+        self.rows_dropped = 0
+        self.max_batch_rows = 0
+        self.flush_seconds_total = 0.0
+        self.max_flush_seconds = 0.0
+        self.flush_reasons = {}
+
+    def _pending_rows(self) -> int:
+        return sum(batch.rows() for batch in self._pending.values())
+
+    def add(self, trade_logs, equity_record=None):
+        """
+        Queues the rows of one loop iteration (runner.process_signal's result); flushes right away if any trade is
+        included, raising if that strategy's rows could not be written.
+        """
+        with self._lock:
+            if self._oldest is None:
+                self._oldest = time.monotonic()
+            for trade_log in trade_logs:
+                self._batch(trade_log.running_strategy_id).trades.append(_row(trade_log))
+            if equity_record is not None:
+                equity = self._batch(equity_record.running_strategy_id).equity
+                if equity_record.timestamp in equity:
+                    self.equity_points_merged += 1
+                equity[equity_record.timestamp] = _row(equity_record)
+            if trade_logs:
+                self._flush("trade", raise_for=trade_logs[0].running_strategy_id)
+            elif self._pending_rows() >= self.max_rows:
+                self._flush("size")
+            elif time.monotonic() - self._oldest >= self.max_delay:
+                self._flush("time")
+
+    def _batch(self, running_strategy_id: int) -> "_Batch":
+        batch = self._pending.get(running_strategy_id)
+        if batch is None:
+            batch = self._pending[running_strategy_id] = _Batch()
+        return batch
+
+    def discard(self, running_strategy_id: int):
+        """Drops the pending rows of one strategy (it was stopped or deleted, so its curve is being deleted)."""
+        with self._lock:
+            batch = self._pending.pop(running_strategy_id, None)
+            if batch is not None:
+                self.rows_dropped += batch.rows()
+            if not self._pending:
+                self._oldest = None
+
+    def flush_if_due(self):
+        with self._lock:
+            if self._oldest is not None and time.monotonic() - self._oldest >= self.max_delay:
+                self._flush("time")
+
+    def flush(self, reason: str = "explicit"):
+        with self._lock:
+            self._flush(reason)
+
+    def _write(self, batches: list):
+        db = self.session_factory()
+        try:
+            # One transaction for both tables, so a trade and the equity point after it become visible together
+            trades = [row for batch in batches for row in batch.trades]
+            equity = [row for batch in batches for row in batch.equity.values()]
+            ensure_partitions(db, TradeLog, trades)
+            ensure_partitions(db, EquityCurve, equity)
+            if trades:
+                db.execute(insert(TradeLog), trades)
+            if equity:
+                upsert_equity_rows(db, equity)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def _flush(self, reason: str, raise_for: int | None = None):
+        batch_rows = self._pending_rows()
+        if batch_rows == 0:
+            self._pending = {}
+            self._oldest = None
+            return
+        started = time.perf_counter()
+        pending, self._pending = self._pending, {}
+        self._oldest = None
+        written = batch_rows
+        error = None
+        try:
+            self._write(list(pending.values()))
+        except Exception as e:
+            self.failed_flushes += 1
+            print(f"WRITE_BUFFER WARNING: Flush of {batch_rows} rows failed ({e}); retrying per strategy.")
+            for running_strategy_id, batch in pending.items():
+                try:
+                    self._write([batch])
+                except Exception as strategy_e:
+                    written -= batch.rows()
+                    batch.attempts += 1
+                    if running_strategy_id == raise_for:
+                        error = strategy_e
+                    if batch.attempts >= self.max_attempts:
+                        self.rows_dropped += batch.rows()
+                        print(f"WRITE_BUFFER ERROR: Dropping {batch.rows()} rows of running strategy {running_strategy_id} "
+                              f"after {batch.attempts} failed flushes: {strategy_e}")
+                    else:
+                        self._pending[running_strategy_id] = batch
+                        if self._oldest is None:
+                            self._oldest = time.monotonic()
+        elapsed = time.perf_counter() - started
+
+        self.flushes += 1
+        self.rows_written += written
+        self.max_batch_rows = max(self.max_batch_rows, written)
+        self.flush_seconds_total += elapsed
+        self.max_flush_seconds = max(self.max_flush_seconds, elapsed)
+        self.flush_reasons[reason] = self.flush_reasons.get(reason, 0) + 1
+        if error is not None:
+            raise error
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "pending_rows": self._pending_rows(),
+                "pending_strategies": len(self._pending),
+                "flushes": self.flushes,
+                "failed_flushes": self.failed_flushes,
+                "rows_written": self.rows_written,
+                "rows_dropped": self.rows_dropped,
+                "equity_points_merged": self.equity_points_merged,
+                "mean_batch_rows": self.rows_written / self.flushes if self.flushes else 0.0,
+                "max_batch_rows": self.max_batch_rows,
+                "mean_flush_ms": 1000 * self.flush_seconds_total / self.flushes if self.flushes else 0.0,
+                "max_flush_ms": 1000 * self.max_flush_seconds,
+                "flush_reasons": dict(self.flush_reasons),
+            }
+
+
+class _Batch:
+    """Pending rows of one running strategy: trades in order, equity points keyed by bar timestamp."""
+
+    __slots__ = ("trades", "equity", "attempts")
+
+    def __init__(self):
+        self.trades = []
+        self.equity = {}
+        self.attempts = 0
+
+    def rows(self) -> int:
+        return len(self.trades) + len(self.equity)
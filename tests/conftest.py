@@ -0,0 +1,66 @@
+import os
+import tempfile
+import uuid
+
+# database.py needs DATABASE_URL at import time; the tests run against a throwaway SQLite file
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='backtest-tests-'), 'test.db')}")
+# Metrics of the test processes go to their own directory (services/metrics.py)
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", tempfile.mkdtemp(prefix='backtest-metrics-'))
+
+import pytest
+
+from services.data_service import generate_synthetic_ohlcv
+
+
+@pytest.fixture(scope="session", autouse=True)
+def migrated_database():
+    """The schema comes from the migrations, as in production."""
+    from database import run_migrations
+    run_migrations()
+
+
+@pytest.fixture(scope="session")
+def postgres_url():
+    """
+    The PostgreSQL server in TEST_POSTGRES_URL, or a throwaway local one started with pgserver (pip install
+    pgserver); tests using it are skipped when neither is available.
+    """
+    url = os.environ.get("TEST_POSTGRES_URL")
+    if url:
+        yield url
+        return
+    pgserver = pytest.importorskip("pgserver")
+    server = pgserver.get_server(tempfile.mkdtemp(prefix="backtest-postgres-"), cleanup_mode="stop")
+    yield server.get_uri().replace("postgresql://", "postgresql+psycopg2://", 1) # The driver in requirements.txt
+    server.cleanup()
+
+
+@pytest.fixture
+def ohlcv():
+    return generate_synthetic_ohlcv(5_000, seed=7)
+
+
+@pytest.fixture
+def db():
+    from database import SessionLocal
+    session = SessionLocal()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def make_running_strategy(db):
+    """Creates a saved strategy with a running record and returns the running strategy id."""
+    from database import RunningStrategy, SavedStrategy
+
+    def make(status: str = "running") -> int:
+        saved = SavedStrategy(name=f"strategy_{uuid.uuid4().hex[:12]}", code="", symbol="BTC", currency="USDT", interval="1m",
+                              initial_capital=10_000, commission_rate=0.001, slippage=0.0005, risk_free_rate=0.02)
+        db.add(saved)
+        db.flush()
+        running = RunningStrategy(strategy_id=saved.id, status=status)
+        db.add(running)
+        db.commit()
+        return running.id
+
+    return make
@@ -0,0 +1,32 @@
+from collections import Counter
+from types import SimpleNamespace
+
+from services import live_runner
+
+from services.data_service import generate_synthetic_ohlcv
+
+
+class FakeDataService:
+    """Serves klines of a synthetic series up to `published` bars, counting requests per symbol."""
+
+    def __init__(self, bars: int = 2_000):
+        self.klines = generate_synthetic_ohlcv(bars, interval="1min").drop(columns="commit_count")
+        self.published = bars
+        self.calls = Counter()
+        self.full_calls = Counter()
+
+    def get_crypto_prices(self, symbol, currency, start_date, end_date=None, interval="1d", data_limit=None):
+        self.calls[symbol] += 1
+        available = self.klines.iloc[:self.published]
+        if data_limit is not None:
+            return available.tail(data_limit)
+        self.full_calls[symbol] += 1
+        # The series is not anchored to the wall clock: serve as many klines as the requested range spans
+        return available.tail(round((end_date - start_date).total_seconds() / 60))
+
+
+def publish(monkeypatch, data_service: FakeDataService, bars: int):
+    """Makes kline number bars - 1 the forming one, with the live runners' wall clock inside it."""
+    data_service.published = bars
+    now = data_service.klines.index[bars - 1].tz_localize("UTC").timestamp() + 30
+    monkeypatch.setattr(live_runner, "time", SimpleNamespace(time=lambda: now, sleep=lambda seconds: None))
@@ -0,0 +1,101 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+
+from services import market_data
+from services.live_runner import INTERVAL_TIMEDELTAS, LiveStrategyRunner, bar_time, next_bar_close
+from services.market_data import MarketDataHub
+from Strategy import ema
+from tests.fakes import FakeDataService
+
+
+def epoch(*args) -> float:
+    return datetime(*args, tzinfo=timezone.utc).timestamp()
+
+
+@pytest.mark.parametrize("interval, now, expected", [
+    ("1m", epoch(2024, 5, 1, 12, 34, 56), epoch(2024, 5, 1, 12, 35)),
+    ("15m", epoch(2024, 5, 1, 12, 34, 56), epoch(2024, 5, 1, 12, 45)),
+    ("4h", epoch(2024, 5, 1, 12, 34, 56), epoch(2024, 5, 1, 16)),
+    ("1d", epoch(2024, 5, 1, 23, 59, 59), epoch(2024, 5, 2)),
+    # Exactly on a close: that kline has just closed, the next close is a whole interval away
+    ("1h", epoch(2024, 5, 1, 13), epoch(2024, 5, 1, 14)),
+])
+def test_next_bar_close_is_aligned_to_utc_interval_multiples(interval, now, expected):
+    assert next_bar_close(INTERVAL_TIMEDELTAS[interval], now) == expected
+
+
+def test_bar_time_is_naive_utc():
+    assert bar_time(epoch(2024, 5, 1, 12, 35)) == datetime(2024, 5, 1, 12, 35)
+
+
+class LatePublishingDataService(FakeDataService):
+    """The kline that just closed shows up only after `delay_calls` requests, like an exchange still finalizing it."""
+
+    def __init__(self, closed_bars: int, delay_calls: int):
+        super().__init__()
+        self.published = closed_bars - 1
+        self.closed_bars = closed_bars
+        self.delay_calls = delay_calls
+
+    def get_crypto_prices(self, *args, **kwargs):
+        if sum(self.calls.values()) >= self.delay_calls:
+            self.published = self.closed_bars + 1 # The closed kline and the one now forming
+        return super().get_crypto_prices(*args, **kwargs)
+
+
+def _bar_close_of(data_service, bars: int) -> float:
+    """Epoch close of kline number bars - 1 of the fake series (the open time of kline number bars)."""
+    return data_service.klines.index[bars].tz_localize("UTC").timestamp()
+
+
+def test_feed_retries_until_the_closed_kline_is_published(monkeypatch):
+    monkeypatch.setattr(market_data, "LIVE_BAR_CONFIRM_RETRIES", 3)
+    monkeypatch.setattr(market_data, "LIVE_BAR_CONFIRM_DELAY_SECONDS", 0)
+    data_service = LatePublishingDataService(closed_bars=1_500, delay_calls=2)
+    feed = market_data._Feed(MarketDataHub(data_service), ("BTC", "USDT", "1m"))
+    feed.subscriptions.append(market_data.Subscription(feed, 100))
+
+    window = asyncio.run(feed._fetch_closed(_bar_close_of(data_service, 1_500)))
+
+    # Ends at the kline that closed, not the one forming after it
+    assert window.index[-1] == data_service.klines.index[1_499]
+    assert len(window) == 100
+    assert feed.confirm_retries == 2
+
+
+def test_feed_gives_up_after_the_configured_retries(monkeypatch):
+    monkeypatch.setattr(market_data, "LIVE_BAR_CONFIRM_RETRIES", 2)
+    monkeypatch.setattr(market_data, "LIVE_BAR_CONFIRM_DELAY_SECONDS", 0)
+    data_service = LatePublishingDataService(closed_bars=1_500, delay_calls=100)
+    feed = market_data._Feed(MarketDataHub(data_service), ("BTC", "USDT", "1m"))
+    feed.subscriptions.append(market_data.Subscription(feed, 100))
+
+    window = asyncio.run(feed._fetch_closed(_bar_close_of(data_service, 1_500)))
+
+    assert window.index[-1] == data_service.klines.index[1_498]
+    assert sum(data_service.calls.values()) == 3
+
+
+def test_runner_signal_is_for_the_closed_kline():
+    data_service = LatePublishingDataService(closed_bars=1_500, delay_calls=1)
+    record = SimpleNamespace(name="ema", symbol="BTC", currency="USDT", interval="1m", initial_capital=10_000,
+                             commission_rate=0.001, slippage=0.0005, github_owner=None, github_repo=None)
+    runner = LiveStrategyRunner(data_service, 1, record, ema, lookback_periods=120)
+
+    signal, close, open_time = runner.latest_closed_signal(_bar_close_of(data_service, 1_500), retries=3, retry_delay=0)
+
+    assert open_time == data_service.klines.index[1_499]
+    assert close == data_service.klines["close"].iloc[1_499]
+    window = data_service.klines.iloc[1_500 - 120:1_500]
+    assert signal == ema.generate_signal(window.copy())["signal"].iloc[-1]
+    assert sum(data_service.calls.values()) == 2
+
+
+def test_next_wake_up_after_a_close_is_the_following_close():
+    interval = timedelta(minutes=5)
+    close = epoch(2024, 5, 1, 12, 5)
+    settle = 2
+    assert next_bar_close(interval, close + settle) == close + interval.total_seconds()
@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+
+from Backtest.backtest import run_backtest
+from Backtest.chunked import ColumnStore, run_backtest_chunked
+from Strategy import macd, sma
+
+
+@pytest.mark.parametrize("strategy_module", [sma, macd])
+@pytest.mark.parametrize("chunk_size", [333, 1_000, 10_000])
+def test_chunked_metrics_match_in_memory(tmp_path, ohlcv, strategy_module, chunk_size):
+    expected = run_backtest(strategy_module.generate_signal(ohlcv.copy()), 10_000)
+    store = ColumnStore.from_dataframe(ohlcv, str(tmp_path / "store"))
+
+    result = run_backtest_chunked(store, strategy_module.generate_signal, 10_000, chunk_size=chunk_size,
+                                  warmup=1_000, output_dir=str(tmp_path / "out"))
+
+    assert result["metrics"] == expected["metrics"]
+    equity = np.memmap(result["files"]["equity"], dtype=np.float64, mode="r")
+    np.testing.assert_allclose(equity, expected["fig"]["策略資產曲線序列"].to_numpy()[1:], rtol=1e-9)
+    trade_signal = np.memmap(result["files"]["trade_signal"], dtype=np.int8, mode="r")
+    np.testing.assert_array_equal(trade_signal, expected["fig"]["買賣點序列"].to_numpy())
+
+
+def test_column_store_appends_in_batches(tmp_path, ohlcv):
+    store = ColumnStore.create(str(tmp_path / "store"), columns=list(ohlcv.columns))
+    for start in range(0, len(ohlcv), 1_500):
+        store.append(ohlcv.iloc[start:start + 1_500])
+
+    reopened = ColumnStore(str(tmp_path / "store"))
+    assert len(reopened) == len(ohlcv)
+    window = reopened.read(1_000, 1_200)
+    assert window.index.equals(ohlcv.index[1_000:1_200])
+    np.testing.assert_array_equal(window["close"].to_numpy(), ohlcv["close"].to_numpy()[1_000:1_200])
+
+
+def test_flat_strategy_has_undefined_sharpe(tmp_path, ohlcv):
+    def never_trades(df):
+        return df.assign(signal=0)
+
+    store = ColumnStore.from_dataframe(ohlcv, str(tmp_path / "store"))
+    with np.errstate(all="raise"):
+        chunked = run_backtest_chunked(store, never_trades, 10_000, chunk_size=1_000)
+        in_memory = run_backtest(never_trades(ohlcv), 10_000)
+    assert chunked["metrics"]["夏普率"] == in_memory["metrics"]["夏普率"] == "nan"
@@ -0,0 +1,172 @@
+import threading
+import time
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine
+
+from database import RunningStrategy
+from services import control, strategy_service as strategy_service_module
+from services.control import ControlChannel, ControlListener
+from services.strategy_service import strategy_service
+
+
+def _eventually(predicate, timeout: float = 5) -> bool:
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def _receive(listener, count: int, timeout: float = 5) -> list:
+    commands = []
+    deadline = time.monotonic() + timeout
+    while len(commands) < count and time.monotonic() < deadline:
+        commands.extend(listener.wait(0.1))
+    return commands
+
+
+def test_local_queue_delivers_commands_in_order():
+    channel = ControlChannel()
+    listener = channel.listener(7, running_strategy_id=7)
+
+    for command in ("pause", "resume", "reload", "stop"):
+        channel.send(command, 7)
+
+    assert [command["command"] for command in _receive(listener, 4)] == ["pause", "resume", "reload", "stop"]
+    assert listener.wait(0) == []
+    with pytest.raises(ValueError):
+        channel.send("restart", 7)
+
+
+def test_listener_only_sees_its_own_strategy():
+    channel = ControlChannel()
+    scheduler, runner = channel.listener("scheduler"), channel.listener("shared", running_strategy_id=7)
+
+    # Both listeners read queues that carry commands for every strategy
+    channel.send("stop", 8, key="scheduler")
+    channel.send("pause", 7, key="scheduler")
+    channel.send("stop", 8, key="shared")
+    channel.send("pause", 7, key="shared")
+
+    assert _receive(scheduler, 2) == [{"command": "stop", "running_strategy_id": 8}, {"command": "pause", "running_strategy_id": 7}]
+    assert _receive(runner, 1) == [{"command": "pause", "running_strategy_id": 7}]
+    assert runner.wait(0.05) == []
+
+
+def test_rekeyed_and_forgotten_listeners():
+    channel = ControlChannel()
+    warm = channel.listener("warm-0")
+
+    channel.rekey("warm-0", 12) # A pre-started runner is assigned running strategy 12
+    channel.send("reload", 12)
+    assert _receive(warm, 1) == [{"command": "reload", "running_strategy_id": 12}]
+
+    channel.forget(12)
+    channel.send("stop", 12) # Nobody listens for it any more: dropped
+    assert warm.wait(0.05) == []
+
+
+class StubRunner:
+    interval_delta = None
+
+    def __init__(self, loads: list):
+        self.signals = 0
+        self.previous = None
+        loads.append(self)
+
+    def latest_signal(self):
+        self.signals += 1
+        return 0, 100.0, datetime(2024, 5, 1)
+
+    def process_signal(self, signal, close, open_time):
+        return [], None
+
+    def take_position_from(self, other):
+        self.previous = other
+        return self
+
+
+@pytest.fixture
+def runner_loop(monkeypatch, db, make_running_strategy):
+    """Runs the live runner loop of a new running strategy in a thread, with a stub runner polling every 20 ms."""
+    monkeypatch.setattr(strategy_service_module, "POLL_INTERVAL_SECONDS", 0.02)
+    monkeypatch.setattr(strategy_service_module, "restore_snapshot", lambda *args: False)
+    monkeypatch.setattr(strategy_service_module, "save_snapshot", lambda *args: None)
+    loads = []
+    monkeypatch.setattr(strategy_service, "_load_runner", lambda *args: StubRunner(loads))
+    running_strategy_id = make_running_strategy()
+    saved_strategy_id = db.get(RunningStrategy, running_strategy_id).strategy_id
+    channel = ControlChannel()
+    listener = channel.listener(running_strategy_id, running_strategy_id)
+    thread = threading.Thread(target=strategy_service._run_live_strategy_process, args=(running_strategy_id, saved_strategy_id, listener))
+    thread.start()
+    assert _eventually(lambda: loads and loads[-1].signals >= 2)
+    yield channel, running_strategy_id, loads, thread
+    channel.send("stop", running_strategy_id)
+    thread.join(timeout=5)
+
+
+def _is_idle(loads) -> bool:
+    """Whether the runner made no new signal over a few poll intervals."""
+    before = loads[-1].signals
+    time.sleep(0.2)
+    return loads[-1].signals == before
+
+
+def test_runner_loop_follows_pushed_commands(runner_loop):
+    channel, running_strategy_id, loads, thread = runner_loop
+
+    channel.send("pause", running_strategy_id)
+    assert _eventually(lambda: _is_idle(loads))
+    channel.send("resume", running_strategy_id)
+    assert not _is_idle(loads)
+
+    channel.send("reload", running_strategy_id)
+    assert _eventually(lambda: len(loads) == 2)
+    assert loads[1].previous is loads[0] # The paper position carries over
+
+    channel.send("stop", running_strategy_id)
+    thread.join(timeout=5)
+    assert not thread.is_alive()
+
+
+def test_runner_loop_falls_back_to_the_db_status(monkeypatch, db, runner_loop):
+    monkeypatch.setattr(strategy_service_module, "CONTROL_RECONCILE_SECONDS", 0.1)
+    channel, running_strategy_id, loads, thread = runner_loop
+    channel.forget(running_strategy_id) # Every command is missed from here on
+
+    def set_status(status):
+        db.query(RunningStrategy).filter(RunningStrategy.id == running_strategy_id).update({"status": status})
+        db.commit()
+
+    set_status("paused")
+    assert _eventually(lambda: _is_idle(loads))
+    set_status("running")
+    assert _eventually(lambda: not _is_idle(loads))
+    set_status("stopped")
+    thread.join(timeout=5)
+    assert not thread.is_alive()
+
+
+def test_commands_are_delivered_over_listen_notify(monkeypatch, postgres_url):
+    pg_engine = create_engine(postgres_url)
+    monkeypatch.setattr(control, "engine", pg_engine)
+    channel = ControlChannel()
+    mine, everything = ControlListener(running_strategy_id=7), ControlListener()
+    try:
+        assert channel.use_notify and mine.local_queue is None
+        assert mine.wait(0) == everything.wait(0) == [] # LISTENing from here on
+
+        channel.send("pause", 7)
+        channel.send("stop", 8)
+
+        assert _receive(mine, 1) == [{"command": "pause", "running_strategy_id": 7}]
+        assert mine.wait(0.1) == []
+        assert _receive(everything, 2) == [{"command": "pause", "running_strategy_id": 7}, {"command": "stop", "running_strategy_id": 8}]
+    finally:
+        mine.close()
+        everything.close()
+        pg_engine.dispose()
@@ -0,0 +1,98 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+from sqlalchemy import insert
+
+from database import EquityCurve, EquityCurveRollup
+from services.equity_store import compact_equity, delete_equity, equity_points
+
+NOW = datetime(2024, 6, 1, 15, 30)
+
+
+@pytest.fixture
+def curve(db, make_running_strategy):
+    """A running strategy with one equity point per minute over the last 10 days."""
+    # compact_equity works on every strategy, so the counts below assume no other curves are stored
+    db.query(EquityCurve).delete()
+    db.query(EquityCurveRollup).delete()
+    running_strategy_id = make_running_strategy()
+    start = NOW - timedelta(days=10)
+    values = 10_000 + np.cumsum(np.random.default_rng(running_strategy_id).normal(0, 5, 10 * 24 * 60))
+    db.execute(insert(EquityCurve), [
+        {"running_strategy_id": running_strategy_id, "timestamp": start + timedelta(minutes=i), "equity": float(value)}
+        for i, value in enumerate(values)
+    ])
+    db.commit()
+    return running_strategy_id, start, values
+
+
+def rollups(db, running_strategy_id, resolution):
+    return db.query(EquityCurveRollup).filter(EquityCurveRollup.running_strategy_id == running_strategy_id,
+                                              EquityCurveRollup.resolution == resolution).order_by(EquityCurveRollup.bucket_start).all()
+
+
+def test_compaction_tiers(db, curve):
+    running_strategy_id, start, values = curve
+
+    compact_equity(db, now=NOW, raw_retention_days=2, hourly_retention_days=5)
+
+    raw_cutoff = datetime(2024, 5, 30) # Cutoffs are floored to whole days
+    hourly_cutoff = datetime(2024, 5, 27)
+    raw = db.query(EquityCurve).filter(EquityCurve.running_strategy_id == running_strategy_id).order_by(EquityCurve.timestamp).all()
+    assert raw[0].timestamp == raw_cutoff and len(raw) == (NOW - raw_cutoff) // timedelta(minutes=1)
+
+    hourly = rollups(db, running_strategy_id, "1h")
+    assert hourly[0].bucket_start == hourly_cutoff and hourly[-1].bucket_start == raw_cutoff - timedelta(hours=1)
+    daily = rollups(db, running_strategy_id, "1d")
+    assert daily[0].bucket_start == start.replace(hour=0, minute=0) and daily[-1].bucket_start == hourly_cutoff - timedelta(days=1)
+
+    # Every raw point is summarized exactly once
+    assert len(raw) + sum(r.samples for r in hourly) + sum(r.samples for r in daily) == len(values)
+
+    # OHLC of a compacted hour matches the raw points it replaced
+    bucket = hourly[5]
+    offset = int((bucket.bucket_start - start).total_seconds() // 60)
+    hour = values[offset:offset + 60]
+    assert (bucket.open, bucket.high, bucket.low, bucket.close, bucket.samples) == pytest.approx((hour[0], hour.max(), hour.min(), hour[-1], 60))
+
+
+def test_repeated_compaction_extends_existing_buckets(db, curve):
+    running_strategy_id, _, values = curve
+    compact_equity(db, now=NOW, raw_retention_days=2, hourly_retention_days=5)
+    first_pass = {(r.bucket_start, r.samples) for r in rollups(db, running_strategy_id, "1d")}
+
+    result = compact_equity(db, now=NOW + timedelta(days=1), raw_retention_days=2, hourly_retention_days=5)
+
+    assert result["raw_points_compacted"] == 24 * 60
+    assert result["hourly_rollups_compacted"] == 24
+    daily = rollups(db, running_strategy_id, "1d")
+    assert first_pass < {(r.bucket_start, r.samples) for r in daily}
+    assert all(r.samples == 24 * 60 for r in daily[1:])
+    assert compact_equity(db, now=NOW + timedelta(days=1), raw_retention_days=2, hourly_retention_days=5) == \
+        {"raw_points_compacted": 0, "hourly_rollups_compacted": 0}
+
+
+def test_equity_points_read_across_tiers(db, curve):
+    running_strategy_id, _, values = curve
+    compact_equity(db, now=NOW, raw_retention_days=2, hourly_retention_days=5)
+
+    points = equity_points(db, running_strategy_id)
+    timestamps = [point["timestamp"] for point in points]
+    assert timestamps == sorted(timestamps) and len(set(timestamps)) == len(timestamps)
+    assert [point["resolution"] for point in points[:1]] == ["1d"] and points[-1]["resolution"] == "raw"
+    assert points[-1]["equity"] == pytest.approx(values[-1])
+
+    latest = equity_points(db, running_strategy_id, limit=200)
+    assert latest == points[-200:]
+    assert len(equity_points(db, running_strategy_id, limit=len(points) + 10)) == len(points)
+
+
+def test_delete_equity_removes_every_tier(db, curve):
+    running_strategy_id, _, _ = curve
+    compact_equity(db, now=NOW, raw_retention_days=2, hourly_retention_days=5)
+
+    delete_equity(db, running_strategy_id)
+    db.commit()
+
+    assert equity_points(db, running_strategy_id) == []
@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from Indicators.indicators import IndicatorCache, indicator_cache, ema, atr, adx, fingerprint
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    indicator_cache.clear()
+    indicator_cache.hits = indicator_cache.misses = indicator_cache.evictions = 0
+    yield
+    indicator_cache.clear()
+
+
+def test_same_data_in_another_frame_hits(ohlcv):
+    first = ema(ohlcv["close"], 12)
+    misses = indicator_cache.stats()["misses"]
+
+    second = ema(ohlcv.copy()["close"], 12)
+
+    assert indicator_cache.stats()["misses"] == misses
+    assert indicator_cache.stats()["hits"] == 1
+    pd.testing.assert_series_equal(first, second)
+    pd.testing.assert_series_equal(first, ohlcv["close"].ewm(span=12, adjust=False).mean(), check_names=False)
+
+
+def test_changed_data_or_parameters_miss(ohlcv):
+    ema(ohlcv["close"], 12)
+    ema(ohlcv["close"], 26)
+    changed = ohlcv["close"].copy()
+    changed.iloc[-1] *= 1.01
+    updated = ema(changed, 12)
+
+    assert indicator_cache.stats()["hits"] == 0
+    assert indicator_cache.stats()["misses"] == 3
+    assert updated.iloc[-1] != ema(ohlcv["close"], 12).iloc[-1]
+    assert fingerprint(changed) != fingerprint(ohlcv["close"])
+
+
+def test_intermediate_results_are_shared(ohlcv):
+    atr(ohlcv["high"], ohlcv["low"], ohlcv["close"], 14)
+    hits = indicator_cache.stats()["hits"]
+
+    adx(ohlcv["high"], ohlcv["low"], ohlcv["close"], 14)
+
+    # ADX smooths the same true range ATR did
+    assert indicator_cache.stats()["hits"] > hits
+
+
+def test_cached_results_are_read_only(ohlcv):
+    values = ema(ohlcv["close"].to_numpy(), 12)
+    with pytest.raises(ValueError):
+        values[0] = 0.0
+
+
+def test_lru_eviction_by_entries_and_bytes():
+    cache = IndicatorCache(max_entries=2, max_bytes=10 * 8)
+    cache.get_or_compute("a", lambda: np.zeros(4))
+    cache.get_or_compute("b", lambda: np.zeros(4))
+    cache.get_or_compute("a", lambda: pytest.fail("should be cached"))
+    cache.get_or_compute("c", lambda: np.zeros(4)) # Over both limits: "b" is the least recently used
+
+    assert cache.stats() == {"entries": 2, "bytes": 64, "hits": 1, "misses": 3, "evictions": 1}
+    cache.get_or_compute("a", lambda: pytest.fail("should be cached"))
+    cache.get_or_compute("b", lambda: np.ones(4))
+    assert cache.stats()["misses"] == 4
+
+    cache.clear()
+    assert cache.stats()["entries"] == 0 and cache.stats()["bytes"] == 0
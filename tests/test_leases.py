@@ -0,0 +1,111 @@
+import multiprocessing
+from datetime import datetime, timedelta
+
+import pytest
+
+from database import RunningStrategy, RunnerNode, StrategyLease, engine
+from services.leases import ACTIVE_STATUSES, LeaseManager, stop_acknowledged, unleased_strategies
+
+T0 = datetime(2024, 5, 1, 12)
+
+
+@pytest.fixture
+def strategies(db, make_running_strategy):
+    """Six active running strategies and no other active ones, leases or nodes."""
+    db.query(StrategyLease).delete()
+    db.query(RunnerNode).delete()
+    db.query(RunningStrategy).filter(RunningStrategy.status.in_(ACTIVE_STATUSES)).update({"status": "stopped"})
+    db.commit()
+    return [make_running_strategy(status) for status in ("starting", "running", "running", "paused", "running", "starting")]
+
+
+def _sync(manager, now):
+    hosted, surplus = manager.sync(now)
+    manager.release(surplus)
+    return set(hosted) - set(surplus)
+
+
+def test_first_node_claims_everything_and_keeps_statuses(db, strategies):
+    hosted, surplus = LeaseManager("a", lease_seconds=30).sync(T0)
+
+    assert set(hosted) == set(strategies) and surplus == []
+    assert hosted[strategies[0]][1] == "running" # Claimed 'starting' rows start running
+    assert hosted[strategies[3]][1] == "paused"
+    db.expire_all()
+    assert db.get(RunningStrategy, strategies[0]).status == "running"
+    assert unleased_strategies(db, T0) == []
+
+
+def test_strategies_rebalance_when_a_node_joins(db, strategies):
+    a, b = LeaseManager("a", lease_seconds=30), LeaseManager("b", lease_seconds=30)
+    assert _sync(a, T0) == set(strategies)
+    assert _sync(b, T0 + timedelta(seconds=1)) == set() # Everything is leased yet
+
+    held_by_a = _sync(a, T0 + timedelta(seconds=5))
+    held_by_b = _sync(b, T0 + timedelta(seconds=6))
+
+    assert len(held_by_a) == len(held_by_b) == 3
+    assert held_by_a | held_by_b == set(strategies)
+
+
+def test_leases_of_a_dead_node_fail_over_after_they_expire(db, strategies):
+    a, b = LeaseManager("a", lease_seconds=30), LeaseManager("b", lease_seconds=30)
+    _sync(a, T0)
+    _sync(b, T0)
+    _sync(a, T0 + timedelta(seconds=5))
+    held_by_b = _sync(b, T0 + timedelta(seconds=5))
+    assert len(held_by_b) == 3
+
+    # a stops heartbeating: its leases are still valid just before they expire, and taken over right after
+    assert _sync(b, T0 + timedelta(seconds=34)) == held_by_b
+    assert _sync(b, T0 + timedelta(seconds=36)) == set(strategies)
+
+
+def test_stopped_strategy_is_no_longer_hosted(db, strategies):
+    a = LeaseManager("a", lease_seconds=30)
+    _sync(a, T0)
+    db.query(RunningStrategy).filter(RunningStrategy.id == strategies[1]).update({"status": "stopped"})
+    db.commit()
+
+    assert _sync(a, T0 + timedelta(seconds=5)) == set(strategies) - {strategies[1]}
+    # Held until the node has drained the strategy's task
+    assert not stop_acknowledged(db, strategies[1], T0 + timedelta(seconds=5))
+    assert a.release_stopped(keep={strategies[1]}) == []
+    assert a.release_stopped() == [strategies[1]]
+    db.expire_all()
+    assert db.get(StrategyLease, strategies[1]) is None
+    assert stop_acknowledged(db, strategies[1], T0 + timedelta(seconds=5))
+
+
+def test_leaving_node_hands_over_at_once(db, strategies):
+    a, b = LeaseManager("a", lease_seconds=30), LeaseManager("b", lease_seconds=30)
+    _sync(a, T0)
+    a.leave()
+
+    assert _sync(b, T0 + timedelta(seconds=1)) == set(strategies)
+
+
+def _node(node_id, rounds, barrier, results):
+    engine.dispose(close=False) # The connections of the test process stay with it
+    manager = LeaseManager(node_id, lease_seconds=60)
+    held = set()
+    for _ in range(rounds):
+        barrier.wait()
+        held = _sync(manager, None)
+    results.put((node_id, sorted(held)))
+
+
+@pytest.mark.skipif("fork" not in multiprocessing.get_all_start_methods(), reason="needs fork")
+def test_local_node_processes_split_the_strategies(db, strategies):
+    context = multiprocessing.get_context("fork")
+    nodes = 3
+    barrier, results = context.Barrier(nodes), context.Queue()
+    processes = [context.Process(target=_node, args=(f"node-{i}", 4, barrier, results)) for i in range(nodes)]
+    for process in processes:
+        process.start()
+    held = dict(results.get(timeout=60) for _ in processes)
+    for process in processes:
+        process.join(timeout=10)
+
+    assert sorted(len(ids) for ids in held.values()) == [2, 2, 2]
+    assert sorted(sum(held.values(), [])) == sorted(strategies)
@@ -0,0 +1,127 @@
+import itertools
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from Backtest.backtest import run_backtest
+from Backtest.ledger import extract_trade_ledger, holding_mask, trade_analytics
+
+
+def per_bar_backtest(close, signal, initial_capital, commission_rate=0.001, slippage=0.0005):
+    """The per-bar loop run_backtest used before the vectorized ledger, kept here as the reference."""
+    capital = initial_capital
+    shares = cost = 0.0
+    start = -1
+    equity, trade_signal, trades = [], np.zeros(len(close), dtype=int), []
+    for i, (price, sig) in enumerate(zip(close, signal)):
+        if sig == 1 and shares == 0:
+            buy_price = price * (1 + slippage)
+            shares = capital / (buy_price * (1 + commission_rate))
+            capital -= shares * buy_price * (1 + commission_rate)
+            cost = shares * buy_price
+            start = i
+            trade_signal[i] = 1
+        elif sig == -1 and shares > 0:
+            sell_price = price * (1 - slippage)
+            commission = shares * sell_price * commission_rate
+            trades.append(((shares * sell_price - cost) - commission, i - start))
+            capital += shares * sell_price - commission
+            shares = 0.0
+            trade_signal[i] = -1
+        equity.append(capital + shares * price)
+    if shares > 0:
+        sell_price = close[-1] * (1 - slippage)
+        commission = shares * sell_price * commission_rate
+        trades.append(((shares * sell_price - cost) - commission, len(close) - 1 - start))
+        capital += shares * sell_price - commission
+        shares = 0.0
+        trade_signal[-1] = -1
+        equity[-1] = capital
+    return np.array(equity), trade_signal, trades, capital
+
+
+@pytest.fixture
+def random_signal():
+    rng = np.random.default_rng(3)
+    return rng.choice([-1, 0, 0, 0, 0, 1], size=5_000)
+
+
+def test_ledger_matches_per_bar_loop(ohlcv, random_signal):
+    close = ohlcv["close"].to_numpy()
+    expected_equity, expected_points, expected_trades, expected_final = per_bar_backtest(close, random_signal, 10_000)
+
+    ledger, equity, trade_signal = extract_trade_ledger(close, random_signal, 10_000, index=ohlcv.index)
+
+    np.testing.assert_allclose(equity, expected_equity, rtol=1e-9)
+    np.testing.assert_array_equal(trade_signal, expected_points)
+    assert len(ledger) == len(expected_trades)
+    np.testing.assert_allclose(ledger["profit_loss"], [pnl for pnl, _ in expected_trades], rtol=1e-9, atol=1e-9)
+    np.testing.assert_array_equal(ledger["holding_period"], [period for _, period in expected_trades])
+    assert equity[-1] == pytest.approx(expected_final, rel=1e-12)
+
+
+def test_forced_exit_is_not_counted_twice(ohlcv):
+    close = ohlcv["close"].to_numpy()
+    signal = np.zeros(len(close), dtype=int)
+    signal[100] = 1 # Still holding on the last bar
+
+    ledger, equity, trade_signal = extract_trade_ledger(close, signal, 10_000)
+    result = run_backtest(ohlcv.assign(signal=signal), 10_000)
+
+    assert bool(ledger["forced_exit"].iloc[-1])
+    assert trade_signal[-1] == -1
+    # The final asset is the cash after liquidating, not that cash plus the liquidated position's market value
+    assert equity[-1] == pytest.approx(ledger["exit_capital"].iloc[-1])
+    assert equity[-1] < 2 * ledger["shares"].iloc[-1] * close[-1]
+    assert result["metrics"]["最終資產"] == f"${ledger['exit_capital'].iloc[-1]:,.2f}"
+
+
+def test_holding_mask_follows_last_active_signal():
+    signal = np.array([0, -1, 1, 0, 1, np.nan, -1, 0, 1])
+    np.testing.assert_array_equal(holding_mask(signal), [False, False, True, True, True, True, False, False, True])
+    np.testing.assert_array_equal(holding_mask(np.column_stack((signal, -signal)))[:, 1],
+                                  [False, True, False, False, False, False, True, True, False])
+
+
+def test_trade_analytics(ohlcv, random_signal):
+    ledger, _, _ = extract_trade_ledger(ohlcv["close"], random_signal, 10_000, index=ohlcv.index,
+                                        high=ohlcv["high"], low=ohlcv["low"])
+    analytics = trade_analytics(ledger)
+
+    pnl = ledger["profit_loss"]
+    assert analytics["total_trades"] == len(ledger)
+    assert analytics["win_rate"] == pytest.approx((pnl > 0).mean())
+    assert analytics["net_profit"] == pytest.approx(pnl.sum())
+    assert analytics["profit_factor"] == pytest.approx(pnl[pnl > 0].sum() / -pnl[pnl < 0].sum())
+    assert sum(analytics["monthly_profit_loss"].values()) == pytest.approx(pnl.sum())
+    assert (ledger["mae"] <= 0).all() and (ledger["mfe"] >= 0).all()
+    win_streaks = [len(list(run)) for won, run in itertools.groupby(pnl > 0) if won]
+    assert analytics["max_consecutive_wins"] == max(win_streaks, default=0)
+
+
+def test_excursions_start_after_the_entry_fill():
+    # Filled at the entry bar's close (100): its low of 90 and high of 120 came before the position existed
+    close = np.array([100.0, 100.0, 104.0, 99.0, 101.0, 103.0])
+    high = np.array([101.0, 120.0, 106.0, 102.0, 103.0, 104.0])
+    low = np.array([99.0, 90.0, 101.0, 97.0, 100.0, 102.0])
+    signal = np.array([0, 1, 0, -1, 1, -1])
+
+    ledger, _, _ = extract_trade_ledger(close, signal, 10_000, high=high, low=low)
+
+    np.testing.assert_allclose(ledger["mfe"], [0.06, 104.0 / 101.0 - 1])
+    np.testing.assert_allclose(ledger["mae"], [-0.03, 0.0]) # Entry and exit on adjacent bars: only the exit bar counts
+
+
+def test_entry_on_the_last_bar_has_no_excursion():
+    ledger, _, _ = extract_trade_ledger(np.array([100.0, 101.0]), np.array([0, 1]), 10_000,
+                                        high=np.array([102.0, 110.0]), low=np.array([98.0, 90.0]))
+    assert ledger["forced_exit"].tolist() == [True]
+    assert ledger[["mae", "mfe"]].values.tolist() == [[0.0, 0.0]]
+
+
+def test_no_trades():
+    ledger, equity, trade_signal = extract_trade_ledger(pd.Series([1.0, 2.0, 3.0]), np.zeros(3), 100)
+    assert ledger.empty
+    np.testing.assert_array_equal(equity, [100, 100, 100])
+    assert trade_analytics(ledger)["total_trades"] == 0
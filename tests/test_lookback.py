@@ -0,0 +1,51 @@
+import numpy as np
+
+from database import SessionLocal
+from services.data_service import generate_synthetic_ohlcv
+from services.lookback import LOOKBACK_SAFETY_MARGIN, get_or_infer_lookback, infer_lookback, load_lookback
+from services.strategy_loader import strategy_loader
+from Strategy import sma
+
+WINDOW_CODE = """
+import numpy as np
+
+def generate_signal(df):
+    rolling_high = df['close'].rolling(30).max()
+    df['signal'] = np.where(df['close'] >= rolling_high, 1, np.where(df['close'] <= df['close'].rolling(30).min(), -1, 0))
+    return df
+"""
+
+
+def test_sma_crossover_needs_its_long_window():
+    lookback = infer_lookback(sma)
+    # The 10-bar SMA and the previous bar's crossover state need 11 bars
+    assert lookback == int(np.ceil(11 * LOOKBACK_SAFETY_MARGIN))
+
+
+def test_inferred_window_reproduces_the_full_history_signal():
+    module = strategy_loader.load(WINDOW_CODE).module
+    lookback = infer_lookback(module)
+    assert 30 <= lookback <= int(np.ceil(30 * LOOKBACK_SAFETY_MARGIN))
+
+    df = generate_synthetic_ohlcv(3_000, seed=11)
+    reference = module.generate_signal(df.copy())['signal'].to_numpy()
+    for end in range(lookback, len(df), 97):
+        window = df.iloc[end - lookback + 1:end + 1]
+        assert module.generate_signal(window.copy())['signal'].iloc[-1] == reference[end]
+
+
+def test_strategy_without_signals_has_no_lookback():
+    module = strategy_loader.load("def generate_signal(df):\n    df['signal'] = 0\n    return df\n").module
+    assert infer_lookback(module) is None
+
+
+def test_inference_is_stored_by_code_hash():
+    db = SessionLocal()
+    try:
+        module = strategy_loader.load(WINDOW_CODE).module
+        assert load_lookback(db, WINDOW_CODE) == (False, None)
+        lookback = get_or_infer_lookback(db, WINDOW_CODE, module)
+        assert load_lookback(db, WINDOW_CODE) == (True, lookback)
+        assert get_or_infer_lookback(db, WINDOW_CODE, None) == lookback # Not inferred again
+    finally:
+        db.close()
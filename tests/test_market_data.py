@@ -0,0 +1,102 @@
+import asyncio
+
+import pandas as pd
+
+from services import market_data
+from services.data_service import generate_synthetic_ohlcv
+from services.market_data import MarketDataHub
+from tests.fakes import FakeDataService
+
+
+async def _collect(hub, subscriptions, rounds):
+    windows = {id(subscription): [] for subscription in subscriptions}
+    for _ in range(rounds):
+        for subscription in subscriptions:
+            windows[id(subscription)].append(await asyncio.wait_for(subscription.next_window(), timeout=5))
+    return windows
+
+
+def test_one_fetch_per_symbol_interval_for_all_subscribers(monkeypatch):
+    monkeypatch.setattr(market_data, "LIVE_SCHEDULING", "poll")
+    monkeypatch.setattr(market_data, "FETCH_INTERVAL_SECONDS", 0.01)
+    data_service = FakeDataService()
+
+    async def scenario():
+        hub = MarketDataHub(data_service)
+        btc = [hub.subscribe("btc", "usdt", "1m", lookback) for lookback in (50, 200, 120)]
+        eth = hub.subscribe("ETH", "USDT", "1m", 80)
+        windows = await _collect(hub, btc + [eth], rounds=3)
+        stats = hub.stats()
+        for subscription in btc + [eth]:
+            hub.unsubscribe(subscription)
+        return windows, stats, hub
+
+    windows, stats, hub = asyncio.run(scenario())
+
+    assert stats["feeds"] == 2 and stats["subscriptions"] == 4
+    by_feed = stats["by_feed"]
+    assert by_feed["BTCUSDT:1m"]["lookback_periods"] == 200
+    # One full lookback fetch per feed, then only the newest klines merged in
+    assert data_service.full_calls == {"BTC": 1, "ETH": 1}
+    assert by_feed["BTCUSDT:1m"]["fetches"] <= by_feed["BTCUSDT:1m"]["deliveries"] / 3 + 1
+    assert stats["fetches_saved"] > 0
+    assert hub.feeds == {}
+    for subscription_windows, lookback in zip(windows.values(), (50, 200, 120, 80)):
+        assert all(len(window) == lookback for window in subscription_windows)
+        assert all(window.index[-1] == data_service.klines.index[-1] for window in subscription_windows)
+
+
+def test_late_subscriber_starts_from_the_current_window(monkeypatch):
+    monkeypatch.setattr(market_data, "LIVE_SCHEDULING", "poll")
+    monkeypatch.setattr(market_data, "FETCH_INTERVAL_SECONDS", 60)
+    data_service = FakeDataService()
+
+    async def scenario():
+        hub = MarketDataHub(data_service)
+        first = hub.subscribe("BTC", "USDT", "1m", 100)
+        await asyncio.wait_for(first.next_window(), timeout=5)
+        late = hub.subscribe("BTC", "USDT", "1m", 60)
+        window = late.windows.get_nowait() # Delivered immediately, without another fetch
+        hub.unsubscribe(first)
+        hub.unsubscribe(late)
+        return window
+
+    window = asyncio.run(scenario())
+    assert len(window) == 60
+    assert sum(data_service.calls.values()) == 1
+
+
+def test_slow_subscriber_only_keeps_the_newest_window():
+    async def scenario():
+        hub = MarketDataHub(FakeDataService())
+        feed = market_data._Feed(hub, ("BTC", "USDT", "1m"))
+        subscription = market_data.Subscription(feed, 10)
+        frames = [generate_synthetic_ohlcv(20, seed=seed) for seed in range(3)]
+        for frame in frames:
+            subscription.deliver(frame)
+        return subscription, frames, await subscription.next_window()
+
+    subscription, frames, window = asyncio.run(scenario())
+    assert subscription.dropped == 2
+    pd.testing.assert_frame_equal(window, frames[-1].tail(10))
+
+
+def test_merge_refetches_after_a_gap(monkeypatch):
+    data_service = FakeDataService()
+    data_service.published = 1_000
+    hub = MarketDataHub(data_service)
+    feed = market_data._Feed(hub, ("BTC", "USDT", "1m"))
+    feed.subscriptions.append(market_data.Subscription(feed, 100))
+    feed.window = feed._fetch()
+
+    data_service.published = 1_002
+    window = feed._fetch()
+    assert window.index[-1] == data_service.klines.index[1_001] and len(window) == 100
+    assert data_service.full_calls["BTC"] == 1
+
+    feed.window = window
+    data_service.published = 1_050 # More new klines than one small fetch returns
+    window = feed._fetch()
+    assert window.index[-1] == data_service.klines.index[1_049]
+    assert window.index.is_monotonic_increasing and window.index.is_unique
+    assert data_service.full_calls["BTC"] == 2
@@ -0,0 +1,77 @@
+import multiprocessing
+from types import SimpleNamespace
+
+import pytest
+from prometheus_client.parser import text_string_to_metric_families
+
+from services import metrics
+from services.live_runner import LiveStrategyRunner
+from Strategy import ema, macd
+from tests.fakes import FakeDataService, publish
+
+
+def _sample(name: str, **labels) -> float:
+    body, _ = metrics.render()
+    for family in text_string_to_metric_families(body.decode()):
+        for sample in family.samples:
+            if sample.name == name and all(sample.labels.get(key) == value for key, value in labels.items()):
+                return sample.value
+    return 0.0
+
+
+def _runner(strategy_module, name):
+    record = SimpleNamespace(name=name, symbol="BTC", currency="USDT", interval="1m", initial_capital=10_000,
+                             commission_rate=0.001, slippage=0.0005, github_owner=None, github_repo=None)
+    return LiveStrategyRunner(FakeDataService(), 1, record, strategy_module, lookback_periods=120)
+
+
+@pytest.mark.parametrize("strategy_module", [ema, macd])
+def test_runner_loop_records_signal_time_and_signals(monkeypatch, strategy_module):
+    name = f"metrics_{strategy_module.__name__}"
+    runner = _runner(strategy_module, name)
+    token = metrics.current_runner.set(name)
+    try:
+        for bars in range(1_000, 1_003):
+            publish(monkeypatch, runner.data_service, bars)
+            latest = runner.latest_signal()
+            with metrics.timed("trade"):
+                runner.process_signal(*latest)
+    finally:
+        metrics.current_runner.reset(token)
+
+    assert _sample("live_runner_stage_seconds_count", runner=name, stage="signal") == 3
+    assert _sample("live_runner_stage_seconds_count", runner=name, stage="trade") == 3
+    signals = sum(_sample("live_runner_signals_total", runner=name, signal=signal) for signal in ("buy", "sell", "hold"))
+    assert signals == 3
+
+
+def _observe_in_child():
+    with metrics.timed("fetch"):
+        pass
+    metrics.FETCH_ERRORS.labels("http").inc()
+
+
+@pytest.mark.skipif("fork" not in multiprocessing.get_all_start_methods(), reason="needs fork")
+def test_metrics_of_runner_processes_are_aggregated():
+    before = _sample("binance_fetch_errors_total", kind="http")
+    for _ in range(2):
+        process = multiprocessing.get_context("fork").Process(target=_observe_in_child)
+        process.start()
+        process.join(timeout=10)
+        assert process.exitcode == 0
+
+    assert _sample("binance_fetch_errors_total", kind="http") == before + 2
+    assert _sample("live_runner_stage_seconds_count", runner="api", stage="fetch") >= 2
+
+
+@pytest.mark.parametrize("limit, weight", [(3, 1), (99, 1), (100, 2), (499, 2), (500, 5), (1000, 5), (1500, 10)])
+def test_klines_weight_follows_binance_weight_table(limit, weight):
+    assert metrics.klines_weight(limit) == weight
+
+
+def test_binance_response_weight_is_counted():
+    before = _sample("binance_api_weight_total", endpoint="klines")
+    metrics.record_binance_response(SimpleNamespace(headers={"x-mbx-used-weight-1m": "42"}), "klines", 5)
+
+    assert _sample("binance_api_weight_total", endpoint="klines") == before + 5
+    assert _sample("binance_api_used_weight_1m") == 42
@@ -0,0 +1,59 @@
+import os
+from datetime import datetime
+
+import pytest
+from alembic import command
+from alembic.autogenerate import compare_metadata
+from alembic.config import Config
+from alembic.migration import MigrationContext
+from sqlalchemy import create_engine, inspect, text
+
+from database import Base, engine
+
+ALEMBIC_INI = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "alembic.ini")
+
+
+def _upgrade(connection):
+    config = Config(ALEMBIC_INI)
+    config.attributes.update(configure_logger=False, connection=connection)
+    command.upgrade(config, "head")
+
+
+def test_migrated_schema_matches_the_models():
+    with engine.connect() as connection:
+        diff = compare_metadata(MigrationContext.configure(connection, opts={"compare_type": False}), Base.metadata)
+    assert diff == []
+
+
+@pytest.fixture
+def legacy_engine(tmp_path):
+    """A database as the former Base.metadata.create_all left it: no equity unique index, duplicated bars."""
+    legacy = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    with legacy.begin() as connection:
+        connection.execute(text("CREATE TABLE saved_strategies (id INTEGER PRIMARY KEY, name VARCHAR, code TEXT NOT NULL, "
+                                "symbol VARCHAR, currency VARCHAR, interval VARCHAR, initial_capital FLOAT, commission_rate FLOAT, "
+                                "slippage FLOAT, risk_free_rate FLOAT, github_owner VARCHAR, github_repo VARCHAR, created_at DATETIME)"))
+        connection.execute(text("CREATE TABLE running_strategies (id INTEGER PRIMARY KEY, strategy_id INTEGER UNIQUE, pid INTEGER, "
+                                "status VARCHAR, started_at DATETIME, last_updated_at DATETIME)"))
+        connection.execute(text("CREATE TABLE equity_curves (id INTEGER PRIMARY KEY, running_strategy_id INTEGER, timestamp DATETIME, equity FLOAT)"))
+        connection.execute(text("INSERT INTO saved_strategies (id, name, code) VALUES (1, 'legacy', '')"))
+        connection.execute(text("INSERT INTO running_strategies (id, strategy_id, status) VALUES (1, 1, 'running')"))
+        bar = datetime(2024, 5, 1, 12)
+        for equity in (100.0, 101.0, 102.0):
+            connection.execute(text("INSERT INTO equity_curves (running_strategy_id, timestamp, equity) VALUES (1, :bar, :equity)"),
+                               {"bar": bar, "equity": equity})
+    yield legacy
+    legacy.dispose()
+
+
+def test_database_from_create_all_is_adopted_and_deduplicated(legacy_engine):
+    with legacy_engine.begin() as connection:
+        _upgrade(connection)
+        _upgrade(connection) # Upgrading an up-to-date database is a no-op
+
+    inspector = inspect(legacy_engine)
+    assert {"trade_logs", "runner_snapshots", "strategy_leases", "alembic_version"} <= set(inspector.get_table_names())
+    assert {"ix_equity_curves_strategy_timestamp"} <= {index["name"] for index in inspector.get_indexes("equity_curves")}
+    assert {"ix_trade_logs_strategy_timestamp"} <= {index["name"] for index in inspector.get_indexes("trade_logs")}
+    with legacy_engine.connect() as connection:
+        assert connection.execute(text("SELECT equity FROM equity_curves")).scalars().all() == [102.0] # The newest point stays
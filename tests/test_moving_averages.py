@@ -0,0 +1,87 @@
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from Indicators.indicators import wma, hma, tema, alma
+
+
+def naive_wma(values, period):
+    result = [math.nan] * len(values)
+    for t in range(period - 1, len(values)):
+        window = values[t - period + 1:t + 1]
+        result[t] = sum(weight * x for weight, x in zip(range(1, period + 1), window)) / (period * (period + 1) / 2)
+    return np.array(result)
+
+
+def naive_alma(values, period, offset, sigma):
+    m = offset * (period - 1)
+    s = period / sigma
+    weights = [math.exp(-((i - m) ** 2) / (2 * s * s)) for i in range(period)]
+    result = [math.nan] * len(values)
+    for t in range(period - 1, len(values)):
+        window = values[t - period + 1:t + 1]
+        result[t] = sum(w * x for w, x in zip(weights, window)) / sum(weights)
+    return np.array(result)
+
+
+@pytest.fixture
+def close(ohlcv):
+    return ohlcv["close"].to_numpy()[:400]
+
+
+def test_wma_reference_values():
+    np.testing.assert_allclose(wma(np.arange(1.0, 6.0), 3), [np.nan, np.nan, 14 / 6, 20 / 6, 26 / 6], equal_nan=True)
+
+
+def test_wma_matches_naive(close):
+    np.testing.assert_allclose(wma(close, 14), naive_wma(close, 14), rtol=1e-12, equal_nan=True)
+
+
+def test_hma_is_wma_of_the_hull_difference(close):
+    period = 16
+    raw = 2 * naive_wma(close, period // 2) - naive_wma(close, period)
+    expected = np.full(len(close), np.nan)
+    first = period - 1
+    expected[first:] = naive_wma(raw[first:], int(math.sqrt(period)))
+    np.testing.assert_allclose(hma(close, period), expected, rtol=1e-12, equal_nan=True)
+
+
+def test_hma_of_a_line_has_no_lag():
+    line = np.arange(100.0)
+    result = hma(line, 9)
+    np.testing.assert_allclose(result[~np.isnan(result)], line[~np.isnan(result)], rtol=1e-12)
+
+
+def test_tema_matches_triple_ema(close):
+    series = pd.Series(close)
+    ema_1 = series.ewm(span=10, adjust=False).mean()
+    ema_2 = ema_1.ewm(span=10, adjust=False).mean()
+    ema_3 = ema_2.ewm(span=10, adjust=False).mean()
+    np.testing.assert_allclose(tema(close, 10), 3 * ema_1 - 3 * ema_2 + ema_3, rtol=1e-12)
+
+
+@pytest.mark.parametrize("offset, sigma", [(0.85, 6.0), (0.5, 3.0), (0.0, 6.0)])
+def test_alma_matches_naive(close, offset, sigma):
+    np.testing.assert_allclose(alma(close, 9, offset, sigma), naive_alma(close, 9, offset, sigma), rtol=1e-12, equal_nan=True)
+
+
+def test_alma_reference_values():
+    # Weights for period 3, offset 0.5, sigma 3: exp(-(i - 1)^2 / 2) for i = 0, 1, 2
+    weights = np.exp(-np.array([1.0, 0.0, 1.0]) / 2)
+    expected = (weights @ [1.0, 2.0, 4.0]) / weights.sum()
+    assert alma(np.array([1.0, 2.0, 4.0]), 3, 0.5, 3.0)[-1] == pytest.approx(expected)
+
+
+def test_series_in_series_out(ohlcv):
+    result = wma(ohlcv["close"], 5)
+    assert isinstance(result, pd.Series)
+    assert result.index.equals(ohlcv.index)
+
+
+def test_nan_in_window_propagates():
+    values = np.array([1.0, 2.0, np.nan, 4.0, 5.0, 6.0, 7.0])
+    result = wma(values, 3)
+    assert np.isnan(result[2:5]).all()
+    assert result[5] == pytest.approx((4 + 2 * 5 + 3 * 6) / 6)
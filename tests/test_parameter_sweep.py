@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+from Backtest.backtest import parameter_grid, run_backtest, run_backtest_matrix, run_parameter_sweep
+from Strategy import macd, rsi, sma
+
+ANALYTICS_COLUMNS = ["total_trades", "win_rate", "profit_factor", "total_commission", "average_holding_period",
+                     "average_trade_profit", "max_single_profit", "max_single_loss"]
+
+
+def assert_row_matches_run_backtest(row, df_with_signal):
+    expected = run_backtest(df_with_signal, 10_000)
+    curve = expected["fig"]["策略資產曲線序列"]
+    assert row["final_asset"] == pytest.approx(curve.iloc[-1], rel=1e-9)
+    assert row["max_drawdown"] == pytest.approx((curve / curve.cummax() - 1).min(), rel=1e-9, abs=1e-12)
+    assert f"{row['sharpe_ratio']:.2f}" == expected["metrics"]["夏普率"]
+    for column in ANALYTICS_COLUMNS:
+        assert row[column] == pytest.approx(expected["analytics"][column], rel=1e-9, abs=1e-9), column
+
+
+def test_rsi_sweep_matches_run_backtest_per_parameter_set(ohlcv):
+    params = {"period": [7, 14], "buy_threshold": [25, 30], "sell_threshold": [70]}
+    results = run_parameter_sweep(rsi, ohlcv, 10_000, **params)
+
+    assert len(results) == 4
+    for _, row in results.iterrows():
+        df_with_signal = rsi.generate_signal(ohlcv, int(row["period"]), int(row["buy_threshold"]), int(row["sell_threshold"]))
+        assert_row_matches_run_backtest(row, df_with_signal)
+
+
+def test_matrix_columns_match_single_signals(ohlcv):
+    grid = parameter_grid(fast_period=[8, 12], slow_period=[26, 40], signal_period=[9])
+    signals = macd.generate_signal_matrix(ohlcv, **grid)
+    for column in range(signals.shape[1]):
+        expected = macd.generate_signal(ohlcv, int(grid["fast_period"][column]), int(grid["slow_period"][column]),
+                                        int(grid["signal_period"][column]))['signal'].to_numpy()
+        np.testing.assert_array_equal(signals[:, column], expected)
+
+    results = run_backtest_matrix(ohlcv["close"], signals, 10_000, params=grid, column_block=3)
+    for column, row in results.iterrows():
+        assert_row_matches_run_backtest(row, ohlcv.assign(signal=signals[:, column]))
+
+
+def test_single_signal_column(ohlcv):
+    df_with_signal = sma.generate_signal(ohlcv)
+    results = run_backtest_matrix(ohlcv["close"], df_with_signal["signal"].to_numpy(), 10_000)
+    assert_row_matches_run_backtest(results.iloc[0], df_with_signal)
+
+
+def test_parameter_grid_is_cartesian_product():
+    grid = parameter_grid(a=[1, 2, 3], b=[10, 20])
+    assert sorted(zip(grid["a"], grid["b"])) == [(a, b) for a in (1, 2, 3) for b in (10, 20)]
+
+
+def test_entry_on_last_bar(ohlcv):
+    signal = np.zeros(len(ohlcv), dtype=int)
+    signal[[10, 20, -1]] = [1, -1, 1] # The last trade is opened and force-closed on the final bar
+    results = run_backtest_matrix(ohlcv["close"], signal, 10_000)
+    assert_row_matches_run_backtest(results.iloc[0], ohlcv.assign(signal=signal))
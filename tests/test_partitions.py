@@ -0,0 +1,216 @@
+"""
+Partitioned equity_curves and trade_logs (migration 0003) exist on PostgreSQL only. These tests run against
+the postgres_url server (tests/conftest.py), each test in a schema of its own.
+"""
+import json
+import multiprocessing
+import os
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import create_engine, select, text
+from sqlalchemy.orm import sessionmaker
+
+from database import EquityCurve, EquityCurveRollup, RunningStrategy, SavedStrategy, TradeLog
+from services import equity_store
+from services.equity_store import compact_equity, delete_equity, equity_points, latest_equity_points
+from services.partitions import delete_strategy_rows, period_partitions
+from services.write_buffer import WriteBuffer
+
+ALEMBIC_INI = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "alembic.ini")
+DAY0 = datetime(2024, 5, 1)
+
+
+def _upgrade(engine, revision: str = "head"):
+    config = Config(ALEMBIC_INI)
+    with engine.begin() as connection:
+        config.attributes.update(configure_logger=False, connection=connection)
+        command.upgrade(config, revision)
+
+
+@pytest.fixture
+def pg_engine(postgres_url):
+    schema = f"test_{uuid.uuid4().hex[:12]}"
+    admin = create_engine(postgres_url)
+    with admin.begin() as connection:
+        connection.execute(text(f"CREATE SCHEMA {schema}"))
+    engine = create_engine(postgres_url, connect_args={"options": f"-csearch_path={schema}"})
+    yield engine
+    engine.dispose()
+    with admin.begin() as connection:
+        connection.execute(text(f"DROP SCHEMA {schema} CASCADE"))
+    admin.dispose()
+
+
+@pytest.fixture
+def pg_sessions(pg_engine):
+    _upgrade(pg_engine)
+    return sessionmaker(bind=pg_engine)
+
+
+@pytest.fixture
+def pg_session(pg_sessions):
+    db = pg_sessions()
+    yield db
+    db.close()
+
+
+def _running_strategies(db, count: int) -> list:
+    ids = []
+    for i in range(count):
+        saved = SavedStrategy(name=f"partitioned_{i}", code="", symbol="BTC", currency="USDT", interval="1h")
+        db.add(saved)
+        db.flush()
+        running = RunningStrategy(strategy_id=saved.id, status="running")
+        db.add(running)
+        db.flush()
+        ids.append(running.id)
+    db.commit()
+    return ids
+
+
+def _write_history(session_factory, running_strategy_ids, days: int):
+    """Hourly equity points and a trade per day for every strategy, through the live runners' write path."""
+    buffer = WriteBuffer(max_rows=10_000, max_delay=3600, session_factory=session_factory)
+    for running_strategy_id in running_strategy_ids:
+        for hour in range(days * 24):
+            timestamp = DAY0 + timedelta(hours=hour)
+            trades = [TradeLog(running_strategy_id=running_strategy_id, timestamp=timestamp, trade_type="sell", price=100.0,
+                               quantity=1.0, commission=0.1, profit_loss=1.0)] if hour % 24 == 12 else []
+            buffer.add(trades, EquityCurve(running_strategy_id=running_strategy_id, timestamp=timestamp, equity=1_000.0 + hour))
+    buffer.flush()
+    assert buffer.rows_dropped == 0
+
+
+def _scanned(db, statement) -> set:
+    """Names of the tables the plan of statement reads."""
+    compiled = str(statement.compile(db.get_bind(), compile_kwargs={"literal_binds": True}))
+    plan = db.execute(text(f"EXPLAIN (FORMAT JSON) {compiled}")).scalar()
+    plan = json.loads(plan) if isinstance(plan, str) else plan
+    relations, nodes = set(), [plan[0]["Plan"]]
+    while nodes:
+        node = nodes.pop()
+        if "Relation Name" in node:
+            relations.add(node["Relation Name"])
+        nodes.extend(node.get("Plans", []))
+    return relations
+
+
+def test_range_scans_touch_only_the_strategy_and_period_partitions(pg_sessions, pg_session):
+    db = pg_session
+    first, second, third = _running_strategies(db, 3)
+    _write_history(pg_sessions, (first, second, third), days=4)
+
+    day2 = select(EquityCurve).where(EquityCurve.running_strategy_id == second, EquityCurve.timestamp >= DAY0 + timedelta(days=2),
+                                     EquityCurve.timestamp < DAY0 + timedelta(days=3))
+    assert _scanned(db, day2) == {f"equity_curves_s{second}_p20240503"}
+    assert len(db.execute(day2).all()) == 24
+
+    # A strategy's whole history (trade log endpoint) reads its own partitions only
+    trades = select(TradeLog).where(TradeLog.running_strategy_id == third).order_by(TradeLog.timestamp)
+    assert _scanned(db, trades) == {name for name, _ in period_partitions(db, TradeLog, third)}
+    assert [row.running_strategy_id for row in db.scalars(trades)] == [third] * 4
+
+    # The strategy overview's window query over every partition
+    latest = latest_equity_points(db, [first, second, third], limit=100)
+    assert latest[second] == [(point["timestamp"], point["equity"]) for point in equity_points(db, second, limit=100)]
+
+
+def test_stopping_a_strategy_drops_its_partitions_without_touching_others(pg_sessions, pg_session):
+    db = pg_session
+    first, second = _running_strategies(db, 2)
+    _write_history(pg_sessions, (first, second), days=2)
+
+    delete_strategy_rows(db, TradeLog, first)
+    delete_equity(db, first)
+    db.commit()
+
+    assert db.execute(text(f"SELECT to_regclass('equity_curves_s{first}')")).scalar() is None
+    assert db.query(EquityCurve).filter(EquityCurve.running_strategy_id == first).count() == 0
+    assert db.query(TradeLog).filter(TradeLog.running_strategy_id == first).count() == 0
+    assert db.query(EquityCurve).filter(EquityCurve.running_strategy_id == second).count() == 48
+
+    # A restarted strategy gets its partitions back on its first write
+    _write_history(pg_sessions, (first,), days=1)
+    assert db.query(EquityCurve).filter(EquityCurve.running_strategy_id == first).count() == 24
+
+
+@pytest.mark.parametrize("archive", [False, True])
+def test_compaction_retires_whole_partitions(monkeypatch, pg_sessions, pg_session, archive):
+    monkeypatch.setattr(equity_store, "PARTITION_ARCHIVE", archive)
+    db = pg_session
+    (running_strategy_id,) = _running_strategies(db, 1)
+    _write_history(pg_sessions, (running_strategy_id,), days=5)
+
+    result = compact_equity(db, now=DAY0 + timedelta(days=10), raw_retention_days=7)
+
+    assert result["raw_points_compacted"] == 3 * 24
+    assert [name for name, _ in period_partitions(db, EquityCurve, running_strategy_id)] == \
+           [f"equity_curves_s{running_strategy_id}_p2024050{day}" for day in (4, 5)]
+    assert db.query(EquityCurveRollup).filter(EquityCurveRollup.running_strategy_id == running_strategy_id).count() == 3 * 24
+    archived = db.execute(text("SELECT count(*) FROM pg_tables WHERE tablename LIKE 'archive_equity_curves_%' "
+                               "AND schemaname = current_schema()")).scalar()
+    assert archived == (3 if archive else 0)
+
+
+def test_migration_moves_existing_rows_into_partitions(pg_engine):
+    _upgrade(pg_engine, "0002")
+    db = sessionmaker(bind=pg_engine)()
+    try:
+        (running_strategy_id,) = _running_strategies(db, 1)
+        db.add_all([EquityCurve(running_strategy_id=running_strategy_id, timestamp=DAY0 + timedelta(days=day), equity=float(day))
+                    for day in range(3)])
+        db.commit()
+        last_id = max(row.id for row in db.query(EquityCurve))
+    finally:
+        db.close()
+
+    _upgrade(pg_engine)
+
+    db = sessionmaker(bind=pg_engine)()
+    try:
+        assert db.execute(text("SELECT relkind FROM pg_class WHERE oid = to_regclass('equity_curves')")).scalar() == "p"
+        assert [row.equity for row in db.query(EquityCurve).order_by(EquityCurve.timestamp)] == [0.0, 1.0, 2.0]
+        assert len(period_partitions(db, EquityCurve, running_strategy_id)) == 3
+        # Ids continue from the old table's sequence
+        db.add(EquityCurve(running_strategy_id=running_strategy_id, timestamp=DAY0 + timedelta(hours=1), equity=9.0))
+        db.commit()
+        assert db.query(EquityCurve).filter(EquityCurve.equity == 9.0).one().id > last_id
+    finally:
+        db.close()
+
+
+
+def _upgrade_process(url: str, schema: str, barrier, results):
+    engine = create_engine(url, connect_args={"options": f"-csearch_path={schema}"})
+    try:
+        barrier.wait()
+        _upgrade(engine)
+        results.put("ok")
+    except Exception as e:
+        results.put(repr(e))
+    finally:
+        engine.dispose()
+
+
+@pytest.mark.skipif("fork" not in multiprocessing.get_all_start_methods(), reason="needs fork")
+def test_concurrent_upgrades_take_turns(postgres_url, pg_engine):
+    # Several API workers or runner nodes starting at once all run upgrade head
+    with pg_engine.connect() as connection:
+        schema = connection.execute(text("SELECT current_schema()")).scalar()
+    context = multiprocessing.get_context("fork")
+    barrier, results = context.Barrier(3), context.Queue()
+    processes = [context.Process(target=_upgrade_process, args=(postgres_url, schema, barrier, results)) for _ in range(3)]
+    for process in processes:
+        process.start()
+    outcomes = [results.get(timeout=120) for _ in processes]
+    for process in processes:
+        process.join(timeout=10)
+
+    assert outcomes == ["ok"] * 3
+    with pg_engine.connect() as connection:
+        assert connection.execute(text("SELECT version_num FROM alembic_version")).scalars().all() == ["0003"]
+        assert connection.execute(text("SELECT relkind FROM pg_class WHERE oid = to_regclass('equity_curves')")).scalar() == "p"
@@ -0,0 +1,87 @@
+import importlib
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from Benchmark.benchmark import POC_DETECTORS, load_poc_detectors
+from Indicators.indicators import adx, atr
+from services.data_service import generate_synthetic_ohlcv
+from Strategy import adx as adx_strategy
+
+# ADX deliberately moved from the Poc rolling means to Wilder smoothing; it is pinned against a reference below
+IDENTICAL_TO_POC = sorted(set(POC_DETECTORS) - {"adx"})
+
+
+@pytest.fixture(scope="module")
+def bars():
+    return generate_synthetic_ohlcv(20_000, seed=11)
+
+
+@pytest.mark.parametrize("name", IDENTICAL_TO_POC)
+def test_port_matches_poc_signals(bars, name):
+    poc_detector = load_poc_detectors({f"poc:{name}"})[name]
+    port = importlib.import_module(f"Strategy.{name}")
+
+    expected = poc_detector(bars.copy())["signal"].to_numpy()
+    actual = port.generate_signal(bars.copy())["signal"].to_numpy()
+
+    assert (expected != 0).sum() > 100
+    np.testing.assert_array_equal(actual, expected)
+
+
+def test_wilder_smoothing():
+    # A constant close with a symmetric range makes every true range high - low: 1, 2, ..., 6
+    true_range = np.arange(1.0, 7.0)
+    close = pd.Series(np.full(6, 100.0))
+    smoothed = atr(close + true_range / 2, close - true_range / 2, close, period=3)
+
+    # Seeded with the mean of the first period values, then r[t] = r[t-1] + (x[t] - r[t-1]) / period
+    np.testing.assert_allclose(smoothed, [np.nan, np.nan, 2.0, 8 / 3, 31 / 9, 116 / 27])
+
+
+def _wilder_reference(values: np.ndarray, period: int) -> np.ndarray:
+    result = np.full(len(values), np.nan)
+    start = np.flatnonzero(~np.isnan(values))[0]
+    result[start + period - 1] = values[start:start + period].mean()
+    for t in range(start + period, len(values)):
+        result[t] = result[t - 1] + (values[t] - result[t - 1]) / period
+    return result
+
+
+def _adx_reference(df: pd.DataFrame, period: int = 14) -> tuple:
+    """The Poc detect_adx_signal formulas with its rolling means replaced by Wilder smoothing, as a plain loop."""
+    high, low, close = (df[column].to_numpy() for column in ("high", "low", "close"))
+    up_move = np.concatenate(([np.nan], high[1:] - high[:-1]))
+    down_move = np.concatenate(([np.nan], low[:-1] - low[1:]))
+    plus_dm = np.where((up_move > down_move) & (up_move > 0), up_move, 0.0)
+    minus_dm = np.where((down_move > up_move) & (down_move > 0), down_move, 0.0)
+    plus_dm[0] = minus_dm[0] = np.nan
+    previous_close = np.concatenate(([np.nan], close[:-1]))
+    true_range = np.nanmax([high - low, np.abs(high - previous_close), np.abs(low - previous_close)], axis=0)
+
+    smoothed_tr = _wilder_reference(true_range, period)
+    plus_di = 100 * _wilder_reference(plus_dm, period) / smoothed_tr
+    minus_di = 100 * _wilder_reference(minus_dm, period) / smoothed_tr
+    adx_values = _wilder_reference(100 * np.abs(plus_di - minus_di) / (plus_di + minus_di), period)
+    return adx_values, plus_di, minus_di
+
+
+def test_adx_matches_the_wilder_reference(bars):
+    df = bars.iloc[:5_000]
+    expected_adx, expected_plus, expected_minus = _adx_reference(df)
+
+    actual_adx, actual_plus, actual_minus = adx(df["high"], df["low"], df["close"], 14)
+    np.testing.assert_allclose(actual_adx, expected_adx, rtol=1e-9)
+    np.testing.assert_allclose(actual_plus, expected_plus, rtol=1e-9)
+    np.testing.assert_allclose(actual_minus, expected_minus, rtol=1e-9)
+
+    # Same threshold and +DI/-DI crossing rules as the Poc detector
+    plus, minus = pd.Series(expected_plus), pd.Series(expected_minus)
+    crossed_up = (plus > minus) & (plus.shift(1) <= minus.shift(1))
+    crossed_down = (plus < minus) & (plus.shift(1) >= minus.shift(1))
+    trending = pd.Series(expected_adx) > 25
+    expected_signal = np.where(trending & crossed_up, 1, np.where(trending & crossed_down, -1, 0))
+    signal = adx_strategy.generate_signal(df.copy())["signal"].to_numpy()
+    assert (expected_signal != 0).sum() > 50
+    np.testing.assert_array_equal(signal, expected_signal)
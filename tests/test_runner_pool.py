@@ -0,0 +1,79 @@
+import multiprocessing
+import os
+from functools import partial
+import time
+
+import pytest
+
+from services.control import ControlChannel
+from services.runner_pool import RunnerPool, _runner_context
+
+
+def _record_run(runs, running_strategy_id, saved_strategy_id, control, on_started):
+    on_started()
+    runs.put((running_strategy_id, saved_strategy_id, control.running_strategy_id, os.getppid()))
+
+
+@pytest.fixture
+def runs():
+    # Passed to the workers along with the run function, so it must come from the context they are started with
+    return _runner_context().Queue()
+
+
+def _wait_for(condition, timeout=10):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.05)
+
+
+def _warm(pool):
+    with pool._lock:
+        return all(worker.is_warm() for worker in pool._idle)
+
+
+def test_strategy_starts_on_a_warm_worker_and_the_pool_is_topped_up(runs):
+    control = ControlChannel()
+    pool = RunnerPool(partial(_record_run, runs), control, size=2)
+    try:
+        pool.start()
+        _wait_for(lambda: _warm(pool))
+
+        process = pool.assign(7, 3)
+
+        assert runs.get(timeout=10)[:3] == (7, 3, 7)
+        process.join(timeout=10)
+        _wait_for(lambda: pool.stats()["idle_workers"] == 2 and pool.stats()["pending_starts"] == 0)
+        stats = pool.stats()
+        assert (stats["warm_starts"], stats["cold_starts"]) == (1, 0)
+        # Control commands for the strategy now go to the queue the worker was forked with
+        assert 7 in control._queues
+    finally:
+        pool.shutdown()
+    assert not control._queues.keys() - {7}
+
+
+def test_empty_pool_starts_a_cold_worker(runs):
+    pool = RunnerPool(partial(_record_run, runs), ControlChannel(), size=0)
+    try:
+        process = pool.assign(8, 4)
+
+        assert runs.get(timeout=10)[:3] == (8, 4, 8)
+        process.join(timeout=10)
+        _wait_for(lambda: pool.stats()["pending_starts"] == 0)
+        assert pool.stats()["cold_starts"] == 1
+    finally:
+        pool.shutdown()
+
+
+@pytest.mark.skipif("forkserver" not in multiprocessing.get_all_start_methods(), reason="needs forkserver")
+def test_workers_are_not_forked_from_the_api_process(runs):
+    pool = RunnerPool(partial(_record_run, runs), ControlChannel(), size=0)
+    try:
+        pool.assign(9, 5)
+
+        # The parent of a worker is the forkserver, which has the runner modules preloaded
+        assert runs.get(timeout=10)[3] != os.getpid()
+        assert pool._context.get_start_method() == "forkserver"
+    finally:
+        pool.shutdown()
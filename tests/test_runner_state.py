@@ -0,0 +1,102 @@
+from types import SimpleNamespace
+
+import pytest
+
+from database import RunnerSnapshot
+from services.live_runner import LiveStrategyRunner
+from services.runner_state import delete_snapshot, restore_snapshot, save_snapshot
+from Strategy import macd
+from tests.fakes import FakeDataService, publish
+
+CODE = "# macd"
+
+
+def _runner(data_service, running_strategy_id):
+    record = SimpleNamespace(name="macd", symbol="BTC", currency="USDT", interval="1m", initial_capital=10_000,
+                             commission_rate=0.001, slippage=0.0005, github_owner=None, github_repo=None)
+    return LiveStrategyRunner(data_service, running_strategy_id, record, macd, lookback_periods=200)
+
+
+def _step(runner):
+    return runner.process_signal(*runner.latest_signal())
+
+
+@pytest.fixture
+def running_strategy_id(db, make_running_strategy):
+    running_strategy_id = make_running_strategy()
+    yield running_strategy_id
+    delete_snapshot(db, running_strategy_id)
+    db.commit()
+
+
+def test_restored_runner_resumes_with_a_catch_up_fetch(monkeypatch, db, running_strategy_id):
+    data_service = FakeDataService()
+    runner = _runner(data_service, running_strategy_id)
+    for bars in range(1_000, 1_300):
+        publish(monkeypatch, data_service, bars)
+        _step(runner)
+    assert runner.current_holding_shares or runner.current_capital != 10_000
+    save_snapshot(db, runner, CODE)
+
+    # The process dies; 7 klines close before the restarted one resumes from the snapshot
+    restarted_service = FakeDataService()
+    restarted = _runner(restarted_service, running_strategy_id)
+    assert restore_snapshot(db, restarted, CODE)
+    assert (restarted.current_capital, restarted.current_holding_shares, restarted.last_processed_time) == \
+           (runner.current_capital, runner.current_holding_shares, runner.last_processed_time)
+    for service in (data_service, restarted_service):
+        publish(monkeypatch, service, 1_306)
+
+    assert restarted.latest_signal() == runner.latest_signal()
+    assert restarted_service.full_calls["BTC"] == 0
+    assert restarted.last_committed_time == runner.last_committed_time == data_service.klines.index[1_304]
+
+
+def test_snapshot_of_other_code_restores_only_the_position(monkeypatch, db, running_strategy_id):
+    data_service = FakeDataService()
+    runner = _runner(data_service, running_strategy_id)
+    publish(monkeypatch, data_service, 1_000)
+    _step(runner)
+    runner.current_capital = 12_345.0
+    save_snapshot(db, runner, CODE)
+
+    restarted = _runner(data_service, running_strategy_id)
+    restore_snapshot(db, restarted, CODE + "\n# edited")
+
+    assert restarted.current_capital == 12_345.0
+    assert restarted.last_committed_time is None
+    restarted.latest_signal()
+    assert data_service.full_calls["BTC"] == 2 # Seeded from a lookback window again
+
+
+def test_runner_that_missed_more_than_its_lookback_is_reseeded(monkeypatch, db, running_strategy_id):
+    data_service = FakeDataService()
+    runner = _runner(data_service, running_strategy_id)
+    publish(monkeypatch, data_service, 1_000)
+    _step(runner)
+    save_snapshot(db, runner, CODE)
+
+    restarted = _runner(data_service, running_strategy_id)
+    restore_snapshot(db, restarted, CODE)
+    publish(monkeypatch, data_service, 1_500)
+    restarted.latest_signal()
+
+    assert data_service.full_calls["BTC"] == 2
+    assert restarted.last_committed_time == data_service.klines.index[1_498]
+
+
+def test_snapshot_is_replaced_and_deleted(monkeypatch, db, running_strategy_id):
+    data_service = FakeDataService()
+    runner = _runner(data_service, running_strategy_id)
+    publish(monkeypatch, data_service, 1_000)
+    _step(runner)
+    save_snapshot(db, runner, CODE)
+    runner.current_capital = 9_000.0
+    save_snapshot(db, runner, CODE)
+
+    assert db.query(RunnerSnapshot).filter(RunnerSnapshot.running_strategy_id == running_strategy_id).count() == 1
+    db.expire_all()
+    assert db.get(RunnerSnapshot, running_strategy_id).current_capital == 9_000.0
+    delete_snapshot(db, running_strategy_id)
+    db.commit()
+    assert not restore_snapshot(db, _runner(data_service, running_strategy_id), CODE)
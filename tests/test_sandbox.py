@@ -0,0 +1,100 @@
+import inspect
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from exceptions import BacktestFailedException, MissingSignalFunctionException, StrategyResourceLimitException
+from routers import misc_router
+from services.sandbox import SandboxPool, resource
+
+SIGNAL_CODE = """
+def generate_signal(df):
+    df['signal'] = (df['close'] > df['close'].rolling(5).mean()).astype(int)
+    return df
+"""
+
+ALLOCATE_CODE = """
+import numpy as np
+
+def generate_signal(df):
+    block = np.ones({megabytes} * 1024 * 1024 // 8)
+    df['signal'] = 0
+    return df
+"""
+
+pytestmark = pytest.mark.skipif(resource is None, reason="rlimits are not available on this platform")
+
+
+@pytest.fixture(scope="module")
+def pool():
+    pool = SandboxPool(workers=1, cpu_seconds=2, memory_limit_mb=256, timeout=10, max_tasks_per_worker=3)
+    yield pool
+    pool.shutdown()
+
+
+@pytest.fixture
+def df(ohlcv):
+    return ohlcv.iloc[:500]
+
+
+def test_runs_strategy_in_worker(pool, df):
+    result = pool.generate_signal(df, SIGNAL_CODE)
+    expected = (df['close'] > df['close'].rolling(5).mean()).astype(int)
+    assert result['signal'].tolist() == expected.tolist()
+    assert 'signal' not in df.columns
+
+
+def test_memory_limit_applies_to_strategy_allocations(pool, df):
+    # Well within the limit even though the worker's own address space (interpreter, numpy, pandas) is larger
+    pool.generate_signal(df, ALLOCATE_CODE.format(megabytes=128))
+    with pytest.raises(StrategyResourceLimitException, match="memory limit"):
+        pool.generate_signal(df, ALLOCATE_CODE.format(megabytes=512))
+    assert pool.generate_signal(df, SIGNAL_CODE)['signal'].notna().all()
+
+
+def test_cpu_limit(pool, df):
+    with pytest.raises(StrategyResourceLimitException, match="CPU time limit"):
+        pool.generate_signal(df, "def generate_signal(df):\n    while True:\n        pass\n")
+    assert pool.generate_signal(df, SIGNAL_CODE)['signal'].notna().all()
+
+
+def test_wall_clock_timeout(df):
+    pool = SandboxPool(workers=1, cpu_seconds=60, memory_limit_mb=0, timeout=1)
+    try:
+        with pytest.raises(StrategyResourceLimitException, match="timed out"):
+            pool.generate_signal(df, "import time\n\ndef generate_signal(df):\n    time.sleep(30)\n    return df\n")
+        assert pool.generate_signal(df, SIGNAL_CODE)['signal'].notna().all()
+    finally:
+        pool.shutdown()
+
+
+def test_strategy_errors_keep_the_worker(pool, df):
+    with pytest.raises(MissingSignalFunctionException):
+        pool.generate_signal(df, "x = 1\n")
+    with pytest.raises(BacktestFailedException, match="ZeroDivisionError"):
+        pool.generate_signal(df, "def generate_signal(df):\n    return 1 / 0\n")
+    assert len(pool._workers) == 1
+
+
+def test_workers_are_recycled_after_their_quota(pool, df):
+    for _ in range(2 * pool.max_tasks_per_worker):
+        pool.generate_signal(df, SIGNAL_CODE)
+    assert len(pool._workers) == 1
+    assert pool._workers[0].tasks < pool.max_tasks_per_worker
+
+
+def test_concurrent_backtests_use_every_worker(df):
+    # The route runs in FastAPI's threadpool rather than blocking the event loop on the pool
+    assert not inspect.iscoroutinefunction(misc_router.run_backtest)
+    pool = SandboxPool(workers=2, cpu_seconds=60, memory_limit_mb=0, timeout=10)
+    code = "import time\n\ndef generate_signal(df):\n    time.sleep(1)\n    df['signal'] = 0\n    return df\n"
+    try:
+        pool.generate_signal(df, SIGNAL_CODE) # Both workers are up before timing
+        started = time.perf_counter()
+        with ThreadPoolExecutor(2) as threads:
+            results = list(threads.map(lambda _: pool.generate_signal(df, code), range(2)))
+        assert time.perf_counter() - started < 1.8
+        assert all(result['signal'].eq(0).all() for result in results)
+    finally:
+        pool.shutdown()
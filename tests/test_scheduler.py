@@ -0,0 +1,263 @@
+import asyncio
+import os
+import threading
+import time
+import uuid
+from concurrent.futures.process import BrokenProcessPool
+from types import SimpleNamespace
+
+import pytest
+
+from database import RunningStrategy, RunnerNode, RunnerSnapshot, SavedStrategy, SessionLocal, StrategyLease
+from exceptions import StrategyResourceLimitException
+from services import market_data
+from services.control import ControlChannel
+from services.data_service import generate_synthetic_ohlcv
+from services.leases import ACTIVE_STATUSES, LeaseManager, stop_acknowledged
+from services.lookback import store_lookback
+from services.market_data import MarketDataHub
+from services.runner_state import delete_snapshot
+from services.scheduler import LiveScheduler
+from tests.fakes import FakeDataService, publish
+
+SIGNAL_CODE = """
+def generate_signal(df):
+    df['signal'] = (df['close'] > df['close'].rolling(5).mean()).astype(int)
+    return df
+"""
+
+CRASH_CODE = "import os\n\ndef generate_signal(df):\n    os._exit(1)\n"
+
+with open(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Strategy", "sma.py")) as strategy_file:
+    STREAMING_CODE = strategy_file.read() # Updated inline, so the scheduler tests need no sandbox workers
+
+
+def _exit_once(marker: str) -> int:
+    """Kills its pool worker the first time it runs, then succeeds."""
+    if not os.path.exists(marker):
+        open(marker, "w").close()
+        os._exit(1)
+    return 42
+
+
+@pytest.fixture
+def no_active_strategies(db):
+    db.query(StrategyLease).delete()
+    db.query(RunnerNode).delete()
+    db.query(RunningStrategy).filter(RunningStrategy.status.in_(ACTIVE_STATUSES)).update({"status": "stopped"})
+    db.commit()
+
+
+@pytest.fixture
+def scheduler():
+    scheduler = LiveScheduler(workers=2, poll_interval=0.01, leases=LeaseManager("test-node"))
+    yield scheduler
+    scheduler.signal_threads.shutdown()
+    scheduler.sandbox.shutdown()
+    scheduler.process_pool.shutdown(cancel_futures=True)
+
+
+def test_a_crashing_strategy_fails_alone(scheduler):
+    df = generate_synthetic_ohlcv(300, seed=3).drop(columns="commit_count")
+    runner = SimpleNamespace(needs_github_commits=False, streaming=None)
+
+    async def scenario():
+        return await asyncio.gather(scheduler._window_signal(runner, CRASH_CODE, df),
+                                    *(scheduler._window_signal(runner, SIGNAL_CODE, df) for _ in range(4)), return_exceptions=True)
+
+    crashed, *others = asyncio.run(scenario())
+
+    assert isinstance(crashed, StrategyResourceLimitException)
+    expected = int(df['close'].iloc[-1] > df['close'].iloc[-5:].mean())
+    assert [signal for signal, _, _ in others] == [expected] * 4
+    assert len(scheduler.sandbox._workers) == 2
+
+
+def test_a_broken_process_pool_is_replaced(scheduler, tmp_path):
+    broken = scheduler.process_pool
+
+    assert asyncio.run(scheduler._in_process_pool(_exit_once, str(tmp_path / "marker"))) == 42
+    assert scheduler.process_pool is not broken
+    with pytest.raises(BrokenProcessPool):
+        asyncio.run(scheduler._in_process_pool(os._exit, 1)) # Kills the replacement as well
+    assert asyncio.run(scheduler._in_process_pool(_exit_once, str(tmp_path / "marker"))) == 42
+
+
+def test_a_stop_is_acknowledged_after_the_last_write(db, no_active_strategies, make_running_strategy, scheduler):
+    running_strategy_id = make_running_strategy()
+    events = []
+
+    def slow_add(trade_logs, equity_record=None):
+        events.append("write started")
+        threading.Event().wait(0.3)
+        lookup = SessionLocal()
+        try:
+            events.append(f"acknowledged while writing: {stop_acknowledged(lookup, running_strategy_id)}")
+        finally:
+            lookup.close()
+        events.append("write done")
+
+    scheduler.write_buffer.add = slow_add
+    scheduler.write_buffer.discard = lambda running_strategy_id: events.append("discarded")
+
+    async def strategy():
+        await scheduler._in_thread(scheduler.write_buffer.add, [])
+        await asyncio.sleep(3600)
+
+    async def scenario():
+        await asyncio.to_thread(scheduler.leases.sync) # Hosted by this node, running strategy() as its task
+        scheduler.tasks[running_strategy_id] = asyncio.create_task(strategy())
+        await asyncio.sleep(0.05)
+        db.query(RunningStrategy).filter(RunningStrategy.id == running_strategy_id).update({"status": "stopped"})
+        db.commit()
+        await scheduler.reconcile()
+
+    asyncio.run(scenario())
+
+    assert events == ["write started", "acknowledged while writing: False", "write done", "discarded"]
+    assert scheduler.tasks == {}
+    assert stop_acknowledged(db, running_strategy_id)
+
+
+@pytest.fixture
+def hosting(monkeypatch, db, no_active_strategies, scheduler):
+    """The scheduler fed by a fake data service, polled every 10 ms; returns a function starting a strategy."""
+    monkeypatch.setattr(market_data, "LIVE_SCHEDULING", "poll")
+    monkeypatch.setattr(market_data, "FETCH_INTERVAL_SECONDS", 0.01)
+    data_service = FakeDataService()
+    publish(monkeypatch, data_service, 1_000)
+    scheduler.data_service = data_service
+    scheduler.market_data = MarketDataHub(data_service)
+    store_lookback(db, STREAMING_CODE, 60, None) # Skips lookback inference
+    started = []
+
+    def start(status: str = "starting", code: str = STREAMING_CODE) -> int:
+        saved = SavedStrategy(name=f"scheduled_{uuid.uuid4().hex[:12]}", code=code, symbol="BTC", currency="USDT", interval="1m",
+                              initial_capital=10_000, commission_rate=0.001, slippage=0.0005, risk_free_rate=0.02)
+        db.add(saved)
+        db.flush()
+        running = RunningStrategy(strategy_id=saved.id, status=status)
+        db.add(running)
+        db.commit()
+        started.append(running.id)
+        return running.id
+
+    yield start
+    for running_strategy_id in started:
+        delete_snapshot(db, running_strategy_id)
+    db.commit()
+
+
+async def _until(predicate, timeout: float = 10):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "timed out"
+        await asyncio.sleep(0.01)
+
+
+def _status(running_strategy_id: int) -> str:
+    db = SessionLocal()
+    try:
+        return db.get(RunningStrategy, running_strategy_id).status
+    finally:
+        db.close()
+
+
+def _set_status(db, running_strategy_id: int, status: str):
+    db.query(RunningStrategy).filter(RunningStrategy.id == running_strategy_id).update({"status": status})
+    db.commit()
+
+
+def _traded(scheduler, running_strategy_id: int) -> bool:
+    entry = scheduler.runners.get(running_strategy_id)
+    return entry is not None and entry[1].last_processed_time is not None
+
+
+def test_reconcile_starts_and_stops_strategies(db, hosting, scheduler):
+    running_strategy_id = hosting()
+
+    async def scenario():
+        await scheduler.reconcile()
+        assert set(scheduler.tasks) == {running_strategy_id}
+        await _until(lambda: _traded(scheduler, running_strategy_id))
+        assert _status(running_strategy_id) == "running"
+
+        _set_status(db, running_strategy_id, "stopped")
+        await scheduler.reconcile()
+
+    asyncio.run(scenario())
+
+    assert scheduler.tasks == {} and scheduler.runners == {}
+    assert stop_acknowledged(db, running_strategy_id)
+
+
+def test_paused_strategy_skips_its_windows(db, hosting, scheduler):
+    running_strategy_id = hosting("paused")
+
+    async def scenario():
+        await scheduler.reconcile()
+        await _until(lambda: running_strategy_id in scheduler.runners and scheduler.market_data.stats()["deliveries"] >= 5)
+        assert not _traded(scheduler, running_strategy_id)
+
+        _set_status(db, running_strategy_id, "running")
+        await scheduler.reconcile()
+        await _until(lambda: _traded(scheduler, running_strategy_id))
+
+    asyncio.run(scenario())
+
+    assert _status(running_strategy_id) == "running"
+
+
+def test_reload_command_keeps_the_position(db, hosting, scheduler):
+    running_strategy_id = hosting()
+    channel = ControlChannel()
+    scheduler.control = channel.listener("scheduler")
+
+    async def scenario():
+        await scheduler.reconcile()
+        await _until(lambda: _traded(scheduler, running_strategy_id))
+        _, runner, _ = scheduler.runners[running_strategy_id]
+        runner.current_capital = 12_345.0
+        channel.send("reload", running_strategy_id, key="scheduler")
+        await scheduler._wait_for_commands()
+        await _until(lambda: scheduler.runners[running_strategy_id][1] is not runner)
+        return runner, scheduler.runners[running_strategy_id][1]
+
+    previous, reloaded = asyncio.run(scenario())
+
+    assert reloaded.current_capital == 12_345.0
+    assert reloaded.last_processed_time == previous.last_processed_time
+
+
+def test_surplus_is_handed_over_with_a_snapshot(db, hosting, scheduler):
+    first, second = hosting(), hosting()
+    other_node = LeaseManager("other-node")
+
+    async def scenario():
+        await scheduler.reconcile()
+        await _until(lambda: _traded(scheduler, first) and _traded(scheduler, second))
+        await asyncio.to_thread(other_node.sync) # Joins: the strategies are split one each
+        await scheduler.reconcile()
+
+    asyncio.run(scenario())
+
+    assert set(scheduler.tasks) == {first}
+    db.expire_all()
+    assert db.get(RunnerSnapshot, second) is not None
+    hosted, _ = other_node.sync()
+    assert set(hosted) == {second}
+
+
+def test_failing_strategy_is_marked_as_error(db, hosting, scheduler):
+    running_strategy_id = hosting(code="raise RuntimeError('broken strategy')\n")
+
+    async def scenario():
+        await scheduler.reconcile()
+        await _until(lambda: scheduler.tasks[running_strategy_id].done())
+        await scheduler.reconcile()
+
+    asyncio.run(scenario())
+
+    assert _status(running_strategy_id) == "error"
+    assert scheduler.tasks == {}
+    assert stop_acknowledged(db, running_strategy_id)
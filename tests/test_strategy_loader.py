@@ -0,0 +1,80 @@
+import pytest
+
+from exceptions import MissingSignalFunctionException
+from services.strategy_loader import StrategyLoader, strategy_code_hash
+
+EXECUTIONS = [] # Appended to by the module-level code of the strategies below
+
+STRATEGY_CODE = '''
+from tests.test_strategy_loader import EXECUTIONS
+EXECUTIONS.append({tag!r})
+
+REQUIRED_LOOKBACK_PERIODS = 30
+
+def generate_signal(df, fast=5, slow=20, *args, **kwargs):
+    """Crosses fast over slow."""
+    df['signal'] = 0
+    return df
+'''
+
+
+def _code(tag: str) -> str:
+    return STRATEGY_CODE.format(tag=tag)
+
+
+@pytest.fixture(autouse=True)
+def executions():
+    EXECUTIONS.clear()
+    return EXECUTIONS
+
+
+def test_same_code_is_executed_once(executions):
+    loader = StrategyLoader()
+
+    first = loader.load(_code("a"))
+    again = loader.load(_code("a"))
+    other = loader.load(_code("b"))
+
+    assert again is first and other is not first
+    assert first.code_hash == strategy_code_hash(_code("a"))
+    assert executions == ["a", "b"]
+    assert loader.stats() == {"entries": 2, "hits": 1, "misses": 2, "evictions": 0}
+
+
+def test_metadata_comes_from_the_cached_module(executions):
+    loader = StrategyLoader()
+    loader.load(_code("a"))
+
+    metadata = loader.metadata(_code("a"))
+
+    assert metadata == {"required_lookback_periods": 30, "parameters": {"fast": 5, "slow": 20}, "supports_streaming": False,
+                        "description": "Crosses fast over slow."}
+    assert executions == ["a"]
+
+
+def test_least_recently_used_code_is_evicted(executions):
+    loader = StrategyLoader(max_entries=2)
+    loader.load(_code("a"))
+    loader.load(_code("b"))
+    loader.load(_code("a")) # b is now the least recently used
+    loader.load(_code("c"))
+
+    assert loader.stats()["evictions"] == 1
+    loader.load(_code("a"))
+    loader.load(_code("b"))
+    assert executions == ["a", "b", "c", "b"]
+    assert loader.stats()["entries"] == 2
+
+
+def test_code_without_generate_signal_fails_at_load(executions):
+    loader = StrategyLoader()
+    code = "from tests.test_strategy_loader import EXECUTIONS\nEXECUTIONS.append('missing')\nsignal = 1\n"
+
+    with pytest.raises(MissingSignalFunctionException):
+        loader.load(code)
+
+    # Raised when loading rather than on first use, and never cached as a usable strategy
+    assert executions == ["missing"]
+    assert loader.stats()["entries"] == 0
+    with pytest.raises(MissingSignalFunctionException):
+        loader.load(code)
@@ -0,0 +1,86 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event, insert
+
+from database import EquityCurve, EquityCurveRollup, RunningStrategy, TradeLog, engine
+from services.equity_store import equity_points, latest_equity_points
+from services.strategy_service import strategy_service
+
+T0 = datetime(2024, 3, 1)
+
+
+def _store(db, running_strategy_id, raw=0, hourly=0, daily=0):
+    """raw minutes ending at T0, hourly rollups ending one hour after the oldest raw point, daily ones ending a day after the oldest hour."""
+    if raw:
+        db.execute(insert(EquityCurve), [{"running_strategy_id": running_strategy_id, "timestamp": T0 - timedelta(minutes=i),
+                                          "equity": 1_000.0 + i} for i in range(raw)])
+    # The newest hourly bucket overlaps the raw points, as after a compaction; only older buckets are shown
+    hourly_end = T0 - timedelta(minutes=raw) + timedelta(hours=1)
+    if hourly:
+        db.execute(insert(EquityCurveRollup), [{"running_strategy_id": running_strategy_id, "resolution": "1h",
+                                                "bucket_start": hourly_end - timedelta(hours=i), "open": 1.0, "high": 1.0, "low": 1.0,
+                                                "close": 2_000.0 + i, "samples": 60} for i in range(hourly)])
+    daily_end = hourly_end - timedelta(hours=hourly) + timedelta(days=1)
+    if daily:
+        db.execute(insert(EquityCurveRollup), [{"running_strategy_id": running_strategy_id, "resolution": "1d",
+                                                "bucket_start": daily_end - timedelta(days=i), "open": 1.0, "high": 1.0, "low": 1.0,
+                                                "close": 3_000.0 + i, "samples": 24} for i in range(daily)])
+    db.commit()
+
+
+@pytest.fixture
+def histories(db, make_running_strategy):
+    shapes = {"long": dict(raw=150), "tiered": dict(raw=30, hourly=50, daily=40), "rollups only": dict(hourly=20, daily=200),
+              "daily only": dict(daily=5), "empty": dict()}
+    ids = {}
+    for name, shape in shapes.items():
+        ids[name] = make_running_strategy()
+        _store(db, ids[name], **shape)
+    return ids
+
+
+def test_latest_equity_points_match_equity_points(db, histories):
+    latest = latest_equity_points(db, list(histories.values()), limit=100)
+
+    for name, running_strategy_id in histories.items():
+        expected = [(point["timestamp"], point["equity"]) for point in equity_points(db, running_strategy_id, limit=100)]
+        assert latest.get(running_strategy_id, []) == expected, name
+    assert len(latest[histories["tiered"]]) == 100
+    assert histories["empty"] not in latest
+
+
+def test_overview_sums_sell_trades(db, make_running_strategy):
+    running_strategy_id = make_running_strategy()
+    _store(db, running_strategy_id, raw=3)
+    db.execute(insert(TradeLog), [
+        {"running_strategy_id": running_strategy_id, "timestamp": T0, "trade_type": trade_type, "price": 100.0, "quantity": 1.0,
+         "commission": 0.1, "profit_loss": profit_loss}
+        for trade_type, profit_loss in [("buy", None), ("sell", 12.345), ("buy", None), ("sell", -2.0), ("sell", None)]
+    ])
+    db.commit()
+    saved_strategy_id = db.get(RunningStrategy, running_strategy_id).strategy_id
+
+    overview = {strategy["id"]: strategy for strategy in strategy_service.get_strategies(db)}[saved_strategy_id]
+
+    assert overview["trade_count"] == 5
+    assert overview["total_profit_loss"] == 10.35
+    assert overview["equity_curve_data"] == [[(T0 - timedelta(minutes=i)).isoformat(), 1_000.0 + i] for i in (2, 1, 0)]
+
+
+def test_overview_takes_the_same_queries_for_any_number_of_strategies(db, make_running_strategy):
+    def count_queries() -> int:
+        statements = []
+        listener = lambda *args: statements.append(args[2])
+        event.listen(engine, "before_cursor_execute", listener)
+        try:
+            strategy_service.get_strategies(db)
+        finally:
+            event.remove(engine, "before_cursor_execute", listener)
+        return len(statements)
+
+    before = count_queries()
+    for _ in range(5):
+        _store(db, make_running_strategy(), raw=20, hourly=3)
+
+    assert count_queries() == before == 2
@@ -0,0 +1,121 @@
+import asyncio
+import os
+import uuid
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import event
+
+from database import SavedStrategy, engine
+from routers import misc_router
+from services.strategy_registry import StrategyRegistry, extract_metadata
+
+STRATEGY_CODE = '''
+raise SystemExit("executing strategy code while describing it")
+
+REQUIRED_LOOKBACK_PERIODS = {lookback}
+
+def _helper(df):
+    return df['commit_count'].rolling(3).sum()
+
+def generate_signal(df, period=14, threshold=0.5, *, mode="fast"):
+    """Buys on commit bursts."""
+    df['bursts'] = _helper(df)
+    df['signal'] = (df['bursts'] > df['close'] * threshold).astype(int)
+    return df
+
+def create_streaming_strategy():
+    return None
+'''
+
+
+def _write(directory, name: str, lookback: int, mtime_ns: int | None = None):
+    path = os.path.join(directory, f"{name}.py")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(STRATEGY_CODE.format(lookback=lookback))
+    if mtime_ns is not None:
+        os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+def test_metadata_is_extracted_without_executing_the_code():
+    metadata = extract_metadata(STRATEGY_CODE.format(lookback=120))
+
+    assert metadata == {
+        "valid": True,
+        "required_lookback_periods": 120,
+        "parameters": {"period": 14, "threshold": 0.5, "mode": "fast"},
+        "required_columns": ["close", "commit_count"], # 'bursts' and 'signal' are written by the strategy itself
+        "supports_streaming": True,
+        "supports_signal_matrix": False,
+        "description": "Buys on commit bursts.",
+    }
+    broken = extract_metadata("def generate_signal(df:\n")
+    assert not broken["valid"] and broken["error"].startswith("SyntaxError")
+    assert extract_metadata("x = 1\n")["error"] == "generate_signal function not found"
+
+
+def test_builtin_strategies_are_reread_when_their_mtime_changes(tmp_path):
+    _write(tmp_path, "alpha", 10, mtime_ns=1_000_000_000)
+    _write(tmp_path, "beta", 20, mtime_ns=1_000_000_000)
+    registry = StrategyRegistry(strategy_dir=str(tmp_path), check_interval=3600)
+    assert registry.list_strategies() == ["alpha", "beta"]
+    beta = registry._builtin["beta"]
+
+    _write(tmp_path, "alpha", 11, mtime_ns=2_000_000_000)
+    _write(tmp_path, "gamma", 30)
+    assert registry.get_metadata("alpha")["required_lookback_periods"] == 10 # Not re-stat'ed within check_interval
+
+    registry.refresh()
+    assert registry.list_strategies() == ["alpha", "beta", "gamma"]
+    assert registry.get_metadata("alpha")["required_lookback_periods"] == 11
+    assert registry._builtin["beta"] is beta # Unchanged files are not read again
+
+    os.remove(tmp_path / "beta.py")
+    registry.refresh()
+    assert registry.get_code("beta") is None
+    assert registry.get_metadata("gamma")["required_lookback_periods"] == 30
+
+
+def _saved(db, lookback: int) -> SavedStrategy:
+    saved = SavedStrategy(name=f"registry_{uuid.uuid4().hex[:12]}", code=STRATEGY_CODE.format(lookback=lookback), symbol="BTC",
+                          currency="USDT", interval="1h")
+    db.add(saved)
+    db.commit()
+    return saved
+
+
+def test_saved_strategies_are_requeried_when_the_table_changes(db):
+    registry = StrategyRegistry()
+    first = _saved(db, 40)
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        assert registry.get_saved_metadata(first.name, db)["required_lookback_periods"] == 40
+        statements.clear()
+        assert registry.get_saved_metadata(first.name, db)["required_lookback_periods"] == 40
+        assert len(statements) == 1 # Only the (count, max id) signature
+
+        second = _saved(db, 50)
+        assert registry.get_saved_metadata(second.name, db)["required_lookback_periods"] == 50
+
+        # An in-place edit keeps (count, max id): only seen after invalidate_saved()
+        first.code = STRATEGY_CODE.format(lookback=41)
+        db.commit()
+        assert registry.get_saved_metadata(first.name, db)["required_lookback_periods"] == 40
+        registry.invalidate_saved()
+        assert registry.get_saved_metadata(first.name, db)["required_lookback_periods"] == 41
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+
+
+def test_strategy_metadata_route(db):
+    metadata = asyncio.run(misc_router.get_strategy_metadata("sma", db))
+    assert metadata["source"] == "builtin" and metadata["valid"]
+
+    saved = _saved(db, 60)
+    assert asyncio.run(misc_router.get_strategy_metadata(saved.name, db))["source"] == "saved"
+
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(misc_router.get_strategy_metadata("no_such_strategy", db))
+    assert error.value.status_code == 404
@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+from numpy.lib.stride_tricks import sliding_window_view
+
+from Indicators import indicators
+from Indicators.streaming import EMA, RollingSMA, RollingStd, RollingWMA, HullMA, RSI, MACD, indicator_parity, strategy_parity
+from Strategy import macd, rsi, sma, smartmoney
+
+PERIOD = 20
+
+
+@pytest.mark.parametrize("indicator, batch", [
+    (lambda: EMA(PERIOD), lambda close: indicators.ema(close, PERIOD)),
+    (lambda: RollingSMA(PERIOD), lambda close: indicators.sma(close, PERIOD)),
+    (lambda: RollingStd(PERIOD), lambda close: indicators.rolling_std(close, PERIOD)),
+    (lambda: RollingWMA(PERIOD), lambda close: indicators.wma(close, PERIOD)),
+    (lambda: HullMA(PERIOD), lambda close: indicators.hma(close, PERIOD)),
+    (lambda: RSI(14), lambda close: indicators.rsi(close, 14)),
+    (lambda: RSI(14, smoothing="ema"), lambda close: indicators.rsi(close, 14, smoothing="ema")),
+    (lambda: MACD(), lambda close: np.column_stack(indicators.macd(close))),
+], ids=["ema", "sma", "std", "wma", "hma", "rsi", "rsi_ema", "macd"])
+def test_streaming_indicator_matches_batch(ohlcv, indicator, batch):
+    close = ohlcv["close"].to_numpy()
+    result = indicator_parity(indicator(), close, batch(close))
+    assert result["mismatches"] == 0, result
+
+
+def test_rolling_sums_stay_accurate_over_long_series():
+    # Large prices with small moves: the offset sums and periodic re-summing keep cancellation error from accumulating
+    close = 1e6 + np.cumsum(np.random.default_rng(1).normal(0, 0.01, 50_000))
+    exact = np.full(len(close), np.nan)
+    exact[PERIOD - 1:] = sliding_window_view(close, PERIOD).std(axis=1, ddof=1)
+    result = indicator_parity(RollingStd(PERIOD), close, exact, rtol=1e-9, atol=0)
+    assert result["mismatches"] == 0, result
+
+
+def test_seed_then_update_matches_batch(ohlcv):
+    close = ohlcv["close"].to_numpy()
+    indicator = RollingWMA(PERIOD).seed(close[:-10])
+    for x in close[-10:]:
+        indicator.update(x)
+    assert indicator.value == pytest.approx(indicators.wma(close, PERIOD)[-1], rel=1e-9)
+
+
+@pytest.mark.parametrize("strategy_module", [sma, rsi, macd, smartmoney], ids=lambda module: module.__name__.split(".")[-1])
+def test_streaming_strategy_matches_generate_signal(ohlcv, strategy_module):
+    result = strategy_parity(strategy_module, ohlcv)
+    assert result["mismatches"] == 0, result
+    assert result["signals"] > 0
@@ -0,0 +1,125 @@
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from database import EquityCurve, TradeLog
+from services import write_buffer as write_buffer_module
+from services.write_buffer import WriteBuffer
+
+BAR = datetime(2024, 5, 1, 12, 0)
+
+
+def equity(running_strategy_id, minutes, value):
+    return EquityCurve(running_strategy_id=running_strategy_id, timestamp=BAR + timedelta(minutes=minutes), equity=value)
+
+
+def trade(running_strategy_id, minutes):
+    return TradeLog(running_strategy_id=running_strategy_id, timestamp=BAR + timedelta(minutes=minutes), trade_type="buy",
+                    price=100.0, quantity=1.0, commission=0.1)
+
+
+def stored_equity(db, running_strategy_id):
+    db.expire_all()
+    return [(point.timestamp, point.equity) for point in
+            db.query(EquityCurve).filter(EquityCurve.running_strategy_id == running_strategy_id).order_by(EquityCurve.timestamp)]
+
+
+def test_equity_points_wait_for_size_or_age(db, make_running_strategy):
+    running_strategy_id = make_running_strategy()
+    buffer = WriteBuffer(max_rows=3, max_delay=3600)
+    buffer.add([], equity(running_strategy_id, 0, 100.0))
+    buffer.add([], equity(running_strategy_id, 1, 101.0))
+    assert stored_equity(db, running_strategy_id) == []
+
+    buffer.add([], equity(running_strategy_id, 2, 102.0))
+    assert [value for _, value in stored_equity(db, running_strategy_id)] == [100.0, 101.0, 102.0]
+    assert buffer.stats()["flush_reasons"] == {"size": 1}
+
+    buffer.max_delay = 0.01
+    buffer.add([], equity(running_strategy_id, 3, 103.0)) # Not yet due when added...
+    time.sleep(0.02)
+    buffer.flush_if_due() # ...but due once it has waited max_delay
+    assert len(stored_equity(db, running_strategy_id)) == 4
+
+
+def test_trade_flushes_pending_equity_with_it(db, make_running_strategy):
+    running_strategy_id = make_running_strategy()
+    buffer = WriteBuffer(max_rows=100, max_delay=3600)
+    buffer.add([], equity(running_strategy_id, 0, 100.0))
+    buffer.add([trade(running_strategy_id, 1)], equity(running_strategy_id, 1, 99.9))
+
+    assert db.query(TradeLog).filter(TradeLog.running_strategy_id == running_strategy_id).count() == 1
+    assert len(stored_equity(db, running_strategy_id)) == 2
+    assert buffer.stats()["pending_rows"] == 0
+
+
+def test_points_for_the_same_bar_are_merged_and_upserted(db, make_running_strategy):
+    running_strategy_id = make_running_strategy()
+    buffer = WriteBuffer(max_rows=100, max_delay=3600)
+    for value in (100.0, 100.5, 101.0): # The poll loop sees the forming bar several times
+        buffer.add([], equity(running_strategy_id, 0, value))
+    buffer.flush()
+    assert stored_equity(db, running_strategy_id) == [(BAR, 101.0)]
+    assert buffer.stats()["equity_points_merged"] == 2
+
+    buffer.add([], equity(running_strategy_id, 0, 102.0)) # Same bar after the flush: replaces the stored point
+    buffer.flush()
+    assert stored_equity(db, running_strategy_id) == [(BAR, 102.0)]
+
+
+def test_discard_drops_only_that_strategy(db, make_running_strategy):
+    stopped, running = make_running_strategy(), make_running_strategy()
+    buffer = WriteBuffer(max_rows=100, max_delay=3600)
+    buffer.add([], equity(stopped, 0, 100.0))
+    buffer.add([], equity(running, 0, 200.0))
+
+    buffer.discard(stopped)
+    buffer.flush()
+
+    assert stored_equity(db, stopped) == []
+    assert stored_equity(db, running) == [(BAR, 200.0)]
+    assert buffer.stats()["rows_dropped"] == 1
+
+
+def test_failing_strategy_does_not_block_the_others(db, make_running_strategy, monkeypatch):
+    broken, healthy = make_running_strategy(), make_running_strategy()
+    upsert = write_buffer_module.upsert_equity_rows
+
+    def upsert_failing_for_broken(session, rows):
+        if any(row["running_strategy_id"] == broken for row in rows):
+            raise RuntimeError("foreign key violation") # e.g. the strategy was deleted meanwhile
+        upsert(session, rows)
+
+    monkeypatch.setattr(write_buffer_module, "upsert_equity_rows", upsert_failing_for_broken)
+    buffer = WriteBuffer(max_rows=100, max_delay=3600, max_attempts=2)
+    buffer.add([], equity(broken, 0, 100.0))
+    buffer.add([], equity(healthy, 0, 200.0))
+
+    buffer.flush()
+    assert stored_equity(db, healthy) == [(BAR, 200.0)]
+    assert buffer.stats()["pending_strategies"] == 1 # Kept for another attempt
+
+    buffer.add([], equity(healthy, 1, 201.0))
+    buffer.flush()
+    stats = buffer.stats()
+    assert stats["pending_rows"] == 0 and stats["rows_dropped"] == 1 and stats["failed_flushes"] == 2
+    assert len(stored_equity(db, healthy)) == 2
+
+
+def test_trade_that_cannot_be_written_raises_to_its_runner(db, make_running_strategy, monkeypatch):
+    running_strategy_id, other = make_running_strategy(), make_running_strategy()
+    buffer = WriteBuffer(max_rows=100, max_delay=3600)
+    buffer.add([], equity(other, 0, 100.0))
+
+    def failing_insert(*args, **kwargs):
+        raise RuntimeError("database is unavailable")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(write_buffer_module, "upsert_equity_rows", failing_insert)
+        with pytest.raises(RuntimeError, match="unavailable"):
+            buffer.add([trade(running_strategy_id, 0)], equity(running_strategy_id, 0, 99.9))
+
+    buffer.flush()
+    assert db.query(TradeLog).filter(TradeLog.running_strategy_id == running_strategy_id).count() == 1
+    assert stored_equity(db, other) == [(BAR, 100.0)]